@@ -58,7 +58,8 @@ def trading_data_servicer_and_port():
     class MockTradingDataServicer(TradingDataServiceServicer):
         pass
 
-    return server, port, MockTradingDataServicer
+    yield server, port, MockTradingDataServicer
+    server.stop(None)
 
 
 @pytest.fixture
@@ -71,7 +72,8 @@ def trading_data_v2_servicer_and_port():
     class MockTradingDataServicer(TradingDataServiceServicerV2):
         pass
 
-    return server, port, MockTradingDataServicer
+    yield server, port, MockTradingDataServicer
+    server.stop(None)
 
 
 @pytest.fixture
@@ -84,7 +86,8 @@ def core_servicer_and_port():
     class MockCoreServicer(CoreServiceServicer):
         pass
 
-    return server, port, MockCoreServicer
+    yield server, port, MockCoreServicer
+    server.stop(None)
 
 
 def test_positions_by_market(trading_data_v2_servicer_and_port):
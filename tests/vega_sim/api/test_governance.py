@@ -0,0 +1,45 @@
+from unittest.mock import MagicMock
+
+import vega_protos.protos.vega as vega_protos
+import vega_sim.api.governance as gov
+
+
+def test_network_parameter_changes_are_one_batch_proposal():
+    wallet = MagicMock()
+    wallet.public_key.return_value = "pub_key"
+    data_client = MagicMock()
+    data_client.GetGovernanceData.return_value.data = (
+        vega_protos.governance.GovernanceData(
+            proposal=vega_protos.governance.Proposal(
+                id="batch_id",
+                state=vega_protos.governance.Proposal.State.STATE_OPEN,
+            )
+        )
+    )
+
+    proposal_id = gov.propose_network_parameter_changes(
+        parameters={"market.fee.factors.makerFee": "0.1", "spam.pow.difficulty": "0"},
+        key_name="key",
+        wallet=wallet,
+        closing_time=100,
+        enactment_time=200,
+        data_client=data_client,
+    )
+
+    assert proposal_id == "batch_id"
+    wallet.submit_transaction.assert_called_once()
+    submitted = wallet.submit_transaction.call_args.kwargs
+    assert submitted["transaction_type"] == "batch_proposal_submission"
+    terms = submitted["transaction"].terms
+    assert terms.closing_timestamp == 100
+    assert [
+        (
+            change.update_network_parameter.changes.key,
+            change.update_network_parameter.changes.value,
+            change.enactment_timestamp,
+        )
+        for change in terms.changes
+    ] == [
+        ("market.fee.factors.makerFee", "0.1", 200),
+        ("spam.pow.difficulty", "0", 200),
+    ]
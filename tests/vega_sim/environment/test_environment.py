@@ -0,0 +1,106 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from vega_sim.environment.agent import StateAgent, TwoPhaseAgent
+from vega_sim.environment.environment import MarketEnvironmentWithState
+
+
+class _DecidingAgent(TwoPhaseAgent, StateAgent):
+    def __init__(self, name, barrier, log):
+        super().__init__(tag=name)
+        self.barrier = barrier
+        self.log = log
+
+    def decide(self, vega_state):
+        # Only passes if every deciding agent is deciding at the same time
+        self.barrier.wait(timeout=5)
+        return f"{self.tag}:{vega_state}"
+
+    def submit(self, decision):
+        self.log.append(decision)
+
+
+class _Agent(StateAgent):
+    def __init__(self, log):
+        super().__init__(tag="plain")
+        self.log = log
+
+    def step(self, vega_state):
+        self.log.append(f"plain:{vega_state}")
+
+
+def test_agents_decide_concurrently_and_submit_in_order():
+    log = []
+    barrier = threading.Barrier(3)
+    agents = [
+        _DecidingAgent("a", barrier, log),
+        _Agent(log),
+        _DecidingAgent("b", barrier, log),
+        _DecidingAgent("c", barrier, log),
+    ]
+    env = MarketEnvironmentWithState(
+        agents=agents,
+        n_steps=1,
+        random_agent_ordering=False,
+        state_func=lambda vega: "state",
+        decide_concurrently=True,
+    )
+
+    env.step(MagicMock())
+    assert log == ["a:state", "plain:state", "b:state", "c:state"]
+    env._decide_executor.shutdown()
+
+
+def test_other_agents_step_once_every_agent_has_decided():
+    decided = []
+    steps_seen_after = []
+
+    class _RecordingDecidingAgent(_DecidingAgent):
+        def decide(self, vega_state):
+            decision = super().decide(vega_state)
+            decided.append(self.tag)
+            return decision
+
+    class _RecordingAgent(_Agent):
+        def step(self, vega_state):
+            steps_seen_after.append(len(decided))
+
+    barrier = threading.Barrier(2)
+    env = MarketEnvironmentWithState(
+        agents=[
+            _RecordingAgent([]),
+            _RecordingDecidingAgent("a", barrier, []),
+            _RecordingDecidingAgent("b", barrier, []),
+        ],
+        n_steps=1,
+        random_agent_ordering=False,
+        state_func=lambda vega: "state",
+        decide_concurrently=True,
+    )
+
+    env.step(MagicMock())
+    assert steps_seen_after == [2]
+    env._decide_executor.shutdown()
+
+
+def test_two_phase_agents_must_implement_both_phases():
+    class _DecideOnly(TwoPhaseAgent, StateAgent):
+        def decide(self, vega_state):
+            return None
+
+    with pytest.raises(TypeError):
+        _DecideOnly()
+
+
+def test_two_phase_agents_step_sequentially_by_default():
+    log = []
+    agent = _DecidingAgent("a", threading.Barrier(1), log)
+    env = MarketEnvironmentWithState(
+        agents=[agent], n_steps=1, state_func=lambda vega: "state"
+    )
+
+    env.step(MagicMock())
+    assert log == ["a:state"]
+    assert env._decide_executor is None
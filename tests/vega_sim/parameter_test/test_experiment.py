@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import vega_sim.parameter_test.parameter.experiment as experiment
+
+
+def _fake_iteration(value, random_state, **kwargs):
+    return None, {"value": value, "draw": random_state.randint(1e9), "pid": os.getpid()}
+
+
+@pytest.fixture
+def fake_experiment(monkeypatch):
+    monkeypatch.setattr(experiment, "_run_parameter_iteration", _fake_iteration)
+    return experiment.SingleParameterExperiment(
+        name="test",
+        parameter_type="network",
+        parameter_to_vary="param",
+        values=["1", "2", "3"],
+        scenario=None,
+        runs_per_scenario=2,
+    )
+
+
+def test_parallel_matches_sequential(fake_experiment):
+    sequential = experiment.run_single_parameter_experiment(fake_experiment)
+    parallel = experiment.run_single_parameter_experiment(
+        fake_experiment, num_workers=3
+    )
+    for value in fake_experiment.values:
+        assert [r["draw"] for r in sequential[value]] == [
+            r["draw"] for r in parallel[value]
+        ]
+        assert [r["value"] for r in parallel[value]] == [value, value]
+    assert {r["pid"] for res in parallel.values() for r in res} != {os.getpid()}
+
+
+def test_runs_are_saved_and_resumed(fake_experiment, tmp_path, monkeypatch):
+    experiment.run_single_parameter_experiment(fake_experiment, runs_folder=tmp_path)
+    assert len(os.listdir(tmp_path)) == 6
+
+    os.remove(experiment._run_file_path(tmp_path, "2", 1))
+
+    calls = []
+
+    def _counting_iteration(value, random_state, **kwargs):
+        calls.append(value)
+        return _fake_iteration(value, random_state)
+
+    monkeypatch.setattr(experiment, "_run_parameter_iteration", _counting_iteration)
+    results = experiment.run_single_parameter_experiment(
+        fake_experiment, runs_folder=tmp_path, resume=True
+    )
+    assert calls == ["2"]
+    assert all(len(res) == 2 and None not in res for res in results.values())
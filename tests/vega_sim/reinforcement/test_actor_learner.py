@@ -0,0 +1,60 @@
+import queue
+from unittest.mock import MagicMock
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from vega_sim.reinforcement.actor_learner import (
+    ActorLearnerTrainer,
+    load_policy_state_dict,
+    policy_state_dict,
+)
+
+
+class _Agent:
+    def __init__(self):
+        self.q_func = torch.nn.Linear(3, 2)
+        self.policy_discr = torch.nn.Linear(3, 3)
+        self.discount_factor = 0.8
+        self.memory = []
+
+    def update_memory(self, result):
+        self.memory.extend(result)
+
+
+def test_policy_weights_round_trip():
+    learner, actor = _Agent(), _Agent()
+    weights = policy_state_dict(learner)
+    assert set(weights) == {"q_func", "policy_discr"}
+
+    load_policy_state_dict(actor, weights)
+    for name in weights:
+        for key, value in getattr(learner, name).state_dict().items():
+            assert torch.equal(getattr(actor, name).state_dict()[key], value)
+
+
+def test_ingest_waits_for_minimum_then_takes_what_has_arrived():
+    agent = _Agent()
+    trainer = ActorLearnerTrainer(
+        learning_agent=agent,
+        agent_factory=_Agent,
+        market_name="ETH",
+        asset_name="DAI",
+        num_workers=2,
+    )
+    trainer._workers = [MagicMock(is_alive=MagicMock(return_value=True))]
+    trainer._version = 3
+    experience = queue.Queue()
+    experience.put(("result", 0, 2, 1.5, [1, 2]))
+    experience.put(("error", 1, 1, 0, None))
+    experience.put(("result", 0, 3, 1.0, [3]))
+
+    assert trainer._ingest(experience, min_rollouts=1) == 2
+    assert agent.memory == [1, 2, 3]
+    assert trainer.stats.policy_lag == [1, 0]
+    assert trainer.stats.failed_workers == 1
+
+    trainer.stats.failed_workers = 2
+    with pytest.raises(RuntimeError):
+        trainer._ingest(experience, min_rollouts=1)
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+
+import vega_sim.reinforcement.v2.learning_environment as learning_environment
+from vega_sim.api.data import PartyMarketAccount
+from vega_sim.reinforcement.v2.agents.puppets import AgentType
+from vega_sim.reinforcement.v2.learning_environment import Environment
+from vega_sim.reinforcement.v2.rewards import Reward
+from vega_sim.scenario.common.agents import MarketManager
+
+
+class FakeVega:
+    KEY_NAME = "treasury"
+    WALLET_NAME = "treasury"
+
+    def __init__(self, **kwargs):
+        self.balance = 100.0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def wait_fn(self, num_steps):
+        pass
+
+    def wait_for_total_catchup(self):
+        pass
+
+    def mint(self, key_name, asset, amount):
+        self.balance += amount
+
+    def party_account(self, key_name, **kwargs):
+        return PartyMarketAccount(general=self.balance, margin=0, bond=0)
+
+    def cancel_order(self, trading_key, market_id):
+        pass
+
+    def positions_by_market(self, key_name):
+        # As the service does for a party without positions
+        return None
+
+    def network_parameter_from_feed(self, key):
+        return SimpleNamespace(value="0")
+
+
+class PathAgent:
+    """Follows a precomputed price path, as the scenario agents do."""
+
+    def __init__(self, price_process):
+        self.price_process = price_process
+        self.current_step = 0
+
+    def initialise(self, vega):
+        pass
+
+    def step(self, vega):
+        self.current_step += 1
+        self.price_process[self.current_step]
+
+
+class PathScenario:
+    num_steps = 8
+
+    def __init__(self):
+        self.num_setups = 0
+
+    def configure_agents(self, vega, tag, random_state):
+        self.num_setups += 1
+        manager = SimpleNamespace(
+            market_name="market",
+            market_id=f"market_{self.num_setups}",
+            asset_id="asset",
+        )
+        return {
+            MarketManager.name_from_tag(tag): manager,
+            "path": PathAgent(list(range(self.num_steps))),
+        }
+
+    def configure_environment(self, vega, tag):
+        agent = self.agents["path"]
+        return SimpleNamespace(agents=[agent], step=agent.step)
+
+
+class NoState:
+    @classmethod
+    def from_vega(cls, vega, for_key_name, market_id, asset_id):
+        return None
+
+
+@pytest.fixture
+def scenario(monkeypatch):
+    monkeypatch.setattr(learning_environment, "VegaServiceNull", FakeVega)
+    return PathScenario()
+
+
+def test_fast_reset_sets_up_again_before_price_paths_run_out(scenario):
+    env = Environment(
+        agents={"learner": AgentType.MARKET_ORDER},
+        agent_to_reward={"learner": Reward.PNL},
+        agent_to_state={"learner": NoState},
+        scenario=scenario,
+        fast_reset=True,
+    )
+
+    market_ids = []
+    for _ in range(4):
+        env.reset()
+        market_ids.append(env._market_id)
+        for _ in range(3):
+            env.step({"learner": None})
+
+    # Seven steps of the path are available after setup, enough for two runs
+    assert scenario.num_setups == 2
+    assert market_ids == ["market_1", "market_1", "market_2", "market_2"]
@@ -0,0 +1,99 @@
+import pickle
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from vega_sim.reinforcement.la_market_state import (
+    AbstractAction,
+    LAMarketState,
+    states_to_sarsa,
+    states_to_sarsa_arrays,
+)
+from vega_sim.reinforcement.replay_buffer import ReplayBuffer
+
+FIELDS = {"state": ((2,), np.float32), "action": ((1,), np.int64)}
+
+
+def _rows(start, stop):
+    return {
+        "state": np.stack([np.arange(start, stop)] * 2, axis=1),
+        "action": np.arange(start, stop).reshape(-1, 1),
+    }
+
+
+@pytest.mark.parametrize("use_memmap", [False, True])
+def test_replay_buffer_overwrites_oldest(tmp_path, use_memmap):
+    buffer = ReplayBuffer(
+        FIELDS, capacity=5, memmap_dir=str(tmp_path) if use_memmap else None
+    )
+    buffer.extend(**_rows(0, 3))
+    buffer.append(state=[3, 3], action=[3])
+    assert len(buffer) == 4
+
+    buffer.extend(**_rows(4, 7))
+    assert len(buffer) == 5
+    np.testing.assert_array_equal(buffer["action"].ravel(), [2, 3, 4, 5, 6])
+
+    # Batches larger than the buffer keep only the most recent rows
+    buffer.extend(**_rows(7, 20))
+    np.testing.assert_array_equal(buffer["action"].ravel(), [15, 16, 17, 18, 19])
+
+    restored = pickle.loads(pickle.dumps(buffer))
+    np.testing.assert_array_equal(restored["state"], buffer["state"])
+
+
+def test_prefetch_loader_visits_every_row():
+    buffer = ReplayBuffer(FIELDS, capacity=50)
+    buffer.extend(**_rows(0, 37))
+
+    loader = buffer.loader(fields=("action", "state"), batch_size=8)
+    assert len(loader) == 5
+    for _ in range(2):
+        batches = list(loader)
+        actions = torch.cat([b[0] for b in batches]).ravel()
+        assert sorted(actions.tolist()) == list(range(37))
+        assert batches[0][0].dtype == torch.int64
+        assert batches[0][1].dtype == torch.float32
+
+    ordered = buffer.loader(fields=("action",), batch_size=10, shuffle=False)
+    assert torch.cat([b[0] for b in ordered]).ravel().tolist() == list(range(37))
+
+    # Stopping early must not leave the prefetching thread blocked
+    for batch in loader:
+        break
+
+
+def _state(step, balance, position):
+    return LAMarketState(
+        step=step,
+        position=position,
+        full_balance=balance,
+        market_in_auction=False,
+        bid_prices=[0.99],
+        ask_prices=[1.01],
+        bid_volumes=[5],
+        ask_volumes=[4],
+        trading_fee=0.001,
+        next_price=np.nan,
+    )
+
+
+@pytest.mark.parametrize(
+    "balances", [[1.0, 1.1, 0.9, 1.2], [1.0, 1.1, -0.1, 1.2, 1.3], [1.0]]
+)
+def test_states_to_sarsa_arrays_matches_states_to_sarsa(balances):
+    states = [
+        (_state(i, balance, position=i - 1), AbstractAction())
+        for i, balance in enumerate(balances)
+    ]
+    expected = states_to_sarsa(states, inventory_penalty=0.5)
+    result = states_to_sarsa_arrays(states, inventory_penalty=0.5)
+
+    assert len(result.reward) == len(expected)
+    for i, (state, action, reward, next_state, _) in enumerate(expected):
+        np.testing.assert_allclose(result.state[i], state.to_array())
+        np.testing.assert_allclose(result.next_state[i], next_state.to_array())
+        assert result.reward[i] == pytest.approx(reward)
+        assert result.action[i] is action
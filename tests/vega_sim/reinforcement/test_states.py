@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+import vega_protos.protos.vega as vega_protos
+from vega_sim.api.data import AccountData
+from vega_sim.local_data_cache import LocalDataCache
+from vega_sim.reinforcement.v2.states import (
+    BatchStateExtractor,
+    PositionOnly,
+    PriceStateWithFees,
+    SimpleState,
+)
+
+MARKET_ID = "market1"
+ASSET_ID = "asset1"
+
+
+def _order(party_id, side, price, remaining):
+    return SimpleNamespace(
+        party_id=party_id,
+        side=side,
+        price=price,
+        remaining=remaining,
+        market_id=MARKET_ID,
+    )
+
+
+def _trade(buyer, seller, size, market_id=MARKET_ID):
+    return SimpleNamespace(buyer=buyer, seller=seller, size=size, market_id=market_id)
+
+
+@pytest.fixture
+def vega():
+    cache = LocalDataCache(None, None)
+    cache._market_from_feed[MARKET_ID] = vega_protos.markets.Market(
+        id=MARKET_ID,
+        fees=vega_protos.markets.Fees(
+            factors=vega_protos.markets.FeeFactors(
+                maker_fee="0.001", infrastructure_fee="0.002", liquidity_fee="0.003"
+            )
+        ),
+    )
+    cache.market_data_from_feed_store[MARKET_ID] = SimpleNamespace(
+        best_static_bid_price=99.0,
+        best_static_offer_price=101.0,
+        market_trading_mode=vega_protos.markets.Market.TradingMode.TRADING_MODE_CONTINUOUS,
+    )
+    buy, sell = vega_protos.vega.Side.SIDE_BUY, vega_protos.vega.Side.SIDE_SELL
+    cache._live_order_state_from_feed[MARKET_ID] = {
+        "mm": {
+            "o1": _order("mm", buy, 99.0, 2),
+            "o2": _order("mm", buy, 98.0, 3),
+            "o3": _order("mm", sell, 101.0, 4),
+        },
+        "other": {
+            "o4": _order("other", buy, 99.0, 1),
+            "o5": _order("other", sell, 103.0, 5),
+        },
+    }
+    for owner, account_type, balance, market_id in [
+        ("pk_a", vega_protos.vega.ACCOUNT_TYPE_GENERAL, 1000.0, ""),
+        ("pk_a", vega_protos.vega.ACCOUNT_TYPE_MARGIN, 50.0, MARKET_ID),
+        ("pk_b", vega_protos.vega.ACCOUNT_TYPE_GENERAL, 500.0, ""),
+        ("pk_b", vega_protos.vega.ACCOUNT_TYPE_BOND, 20.0, MARKET_ID),
+    ]:
+        account = AccountData(owner, balance, ASSET_ID, market_id, account_type)
+        cache._accounts_from_feed[account.account_id] = account
+        cache._account_keys_for_party.setdefault(owner, set()).add(account.account_id)
+        cache._account_keys_for_market.setdefault(market_id, set()).add(
+            account.account_id
+        )
+    cache._trades_from_feed.extend(
+        [
+            _trade("pk_a", "mm", 3),
+            _trade("mm", "pk_b", 2),
+            _trade("pk_a", "pk_b", 1),
+            _trade("pk_a", "mm", 10, market_id="another_market"),
+        ]
+    )
+
+    vega = MagicMock()
+    vega.data_cache = cache
+    vega.wallet.public_key.side_effect = lambda name, wallet_name=None: f"pk_{name}"
+    return vega
+
+
+def test_batch_extractor_matches_per_state_arrays(vega):
+    extractor = BatchStateExtractor(
+        vega,
+        agent_to_state={"a": PriceStateWithFees, "b": SimpleState, "c": PositionOnly},
+        market_id=MARKET_ID,
+        asset_id=ASSET_ID,
+        num_levels=3,
+    )
+    observations = extractor.extract()
+
+    expected_a = PriceStateWithFees(
+        position=4,
+        full_balance=1050.0,
+        market_in_auction=False,
+        bid_prices=[99.0, 98.0, 0],
+        ask_prices=[101.0, 103.0, 0],
+        bid_volumes=[3, 3, 0],
+        ask_volumes=[4, 5, 0],
+        trading_fee=0.006,
+    ).to_array()
+    expected_b = SimpleState(
+        balance=520.0, position=-3, best_bid=99.0, best_ask=101.0
+    ).to_array()
+
+    np.testing.assert_allclose(observations["a"], expected_a)
+    np.testing.assert_allclose(observations["b"], expected_b)
+    np.testing.assert_allclose(observations["c"], [0])
+    vega.get_latest_market_data.assert_not_called()
+
+
+def test_batch_extractor_consumes_new_trades_only(vega):
+    extractor = BatchStateExtractor(
+        vega,
+        agent_to_state={"a": PositionOnly, "b": PositionOnly},
+        market_id=MARKET_ID,
+        asset_id=ASSET_ID,
+    )
+    extractor.extract()
+    vega.data_cache._trades_from_feed.append(_trade("pk_b", "pk_a", 2))
+    observations = extractor.extract()
+
+    np.testing.assert_allclose(observations["a"], [2])
+    np.testing.assert_allclose(observations["b"], [-1])
+    assert observations["a"].base is extractor.observations[PositionOnly]
@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+import pytest
+
+gym = pytest.importorskip("gymnasium")
+pytest.importorskip("stable_baselines3")
+
+from vega_sim.reinforcement.v2.stable_baselines.vec_env import SharedMemoryVegaVecEnv
+
+
+class CountingEnv(gym.Env):
+    """Observation is [env id, step count], episodes last three steps."""
+
+    def __init__(self, env_id: int, step_delay: float = 0):
+        self.env_id = env_id
+        self.step_delay = step_delay
+        self.count = 0
+        self.observation_space = gym.spaces.Box(low=0, high=100, shape=(2,))
+        self.action_space = gym.spaces.Discrete(2)
+
+    def _obs(self):
+        return np.array([self.env_id, self.count], dtype=np.float32)
+
+    def step(self, action):
+        time.sleep(self.step_delay)
+        self.count += 1
+        return self._obs(), float(action), self.count >= 3, False, {}
+
+    def reset(self, seed=None, options=None):
+        self.count = 0
+        return self._obs(), {}
+
+
+def _make(env_id, step_delay=0):
+    return lambda: CountingEnv(env_id, step_delay)
+
+
+@pytest.fixture
+def vec_env():
+    env = SharedMemoryVegaVecEnv(
+        [_make(0), _make(1), _make(2, step_delay=1)], start_method="spawn"
+    )
+    yield env
+    env.close()
+
+
+def test_synchronous_steps_and_auto_reset(vec_env):
+    obs = vec_env.reset()
+    np.testing.assert_array_equal(obs, [[0, 0], [1, 0], [2, 0]])
+
+    for step in range(1, 3):
+        obs, rewards, dones, _ = vec_env.step(np.array([1, 0, 1]))
+        np.testing.assert_array_equal(obs[:, 1], [step] * 3)
+        np.testing.assert_array_equal(rewards, [1, 0, 1])
+        assert not dones.any()
+
+    obs, _, dones, infos = vec_env.step(np.array([0, 0, 0]))
+    assert dones.all()
+    np.testing.assert_array_equal(obs[:, 1], [0, 0, 0])
+    np.testing.assert_array_equal(infos[1]["terminal_observation"], [1, 3])
+    assert vec_env.get_attr("env_id", indices=[2]) == [2]
+
+
+def test_slow_env_does_not_block_fast_envs(vec_env):
+    vec_env.reset()
+    vec_env.send([1, 1, 1])
+
+    env_ids, obs, *_ = vec_env.recv(min_envs=2)
+    assert list(env_ids) == [0, 1]
+    # The fast envs can keep stepping whilst the slow one is still running
+    vec_env.send([1, 1], env_ids=[0, 1])
+    env_ids, obs, *_ = vec_env.recv(min_envs=3)
+    assert list(env_ids) == [0, 1, 2]
+    np.testing.assert_array_equal(obs[:, 1], [2, 2, 1])
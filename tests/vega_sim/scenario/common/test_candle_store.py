@@ -0,0 +1,69 @@
+import pytest
+
+from vega_sim.scenario.common.utils.candle_store import (
+    CandleStore,
+    MissingCandlesError,
+    _to_time,
+    _to_timestamp,
+)
+from vega_sim.scenario.common.utils.price_process import (
+    Granularity,
+    get_historic_price_series,
+)
+
+HOUR = 3600
+START = _to_timestamp("2023-01-01 00:00:00")
+
+
+class _Fetcher:
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, start, end):
+        self.requests.append((start, end))
+        return [
+            [t, 1.0, 3.0, 2.0, float(t - START) / HOUR, 10.0]
+            for t in range(_to_timestamp(start), _to_timestamp(end) + 1, HOUR)
+        ]
+
+
+def test_only_missing_ranges_are_fetched(tmp_path):
+    fetch = _Fetcher()
+    store = CandleStore(root=str(tmp_path))
+
+    candles = store.candles(
+        "ETH-USD", HOUR, fetch, "2023-01-01 05:00:00", "2023-01-01 09:00:00"
+    )
+    assert [c[4] for c in candles] == [5, 6, 7, 8, 9]
+
+    candles = store.candles(
+        "ETH-USD", HOUR, fetch, "2023-01-01 02:00:00", "2023-01-01 12:00:00"
+    )
+    assert [c[4] for c in candles] == list(range(2, 13))
+    assert fetch.requests == [
+        ("2023-01-01 05:00:00", "2023-01-01 09:00:00"),
+        ("2023-01-01 02:00:00", "2023-01-01 04:00:00"),
+        ("2023-01-01 10:00:00", "2023-01-01 12:00:00"),
+    ]
+
+    # A new offline store reads the same files without fetching
+    offline = CandleStore(root=str(tmp_path), offline=True)
+    assert (
+        offline.missing_ranges("ETH-USD", HOUR, START + 2 * HOUR, START + 12 * HOUR)
+        == []
+    )
+    series = get_historic_price_series(
+        "ETH-USD",
+        granularity=Granularity.HOUR,
+        start="2023-01-01 03:00:00",
+        end="2023-01-01 06:00:00",
+        candle_store=offline,
+    )
+    assert series.tolist() == [3, 4, 5, 6]
+    assert series.index[0].strftime("%Y-%m-%d %H:%M:%S") == _to_time(START + 3 * HOUR)
+
+    with pytest.raises(MissingCandlesError):
+        offline.candles(
+            "ETH-USD", HOUR, fetch, "2023-01-01 11:00:00", "2023-01-01 14:00:00"
+        )
+    assert len(fetch.requests) == 3
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from scipy.linalg import expm
+
+from vega_sim.scenario.common.utils import ideal_mm_models
+from vega_sim.scenario.common.utils.ideal_mm_models import GLFT_approx, a_s_mm_model
+
+PARAMS = dict(
+    T=180 / 60 / 24 / 365.25,
+    dt=1 / 60 / 24 / 365.25,
+    length=181,
+    mdp=3,
+    q_upper=20,
+    q_lower=-20,
+    kappa=50,
+    Lambda=5,
+    alpha=10**-4,
+    phi=5 * 10**-6,
+)
+
+
+def _reference_h(T, dt, length, q_upper, q_lower, kappa, Lambda, alpha, phi, **_):
+    T *= 60 * 24 * 365.25
+    dt *= 60 * 24 * 365.25
+    n = q_upper - q_lower + 1
+    A = np.zeros([n, n])
+    for i in range(n):
+        A[i, i] = -kappa * phi * (q_upper - i) ** 2
+        if i + 1 < n:
+            A[i, i + 1] = A[i + 1, i] = Lambda * np.e**-1
+    z = np.array(
+        [np.exp(-alpha * kappa * j**2) for j in range(q_upper, q_lower - 1, -1)]
+    )
+    w = np.array([expm(A * (T - i * dt)) @ z for i in range(length)])
+    return np.log(w) / kappa
+
+
+def _depth(depth, mdp):
+    # Rounded to the market's precision, with at least one tick
+    depth = np.round(depth, mdp)
+    return np.where(depth <= 0, 1 / 10**mdp, depth)
+
+
+# Large inventories with a large kappa, whose solution spans many orders of
+# magnitude across inventories
+LARGE_INVENTORY_PARAMS = dict(
+    PARAMS,
+    T=30 / 60 / 24 / 365.25,
+    length=31,
+    q_upper=100,
+    q_lower=-100,
+    kappa=500,
+)
+
+
+@pytest.mark.parametrize("params", [PARAMS, LARGE_INVENTORY_PARAMS])
+def test_a_s_mm_model_matches_matrix_exponential(params):
+    bid, ask, h = a_s_mm_model(**params)
+
+    expected_h = _reference_h(**params)
+    np.testing.assert_allclose(h, expected_h, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(
+        ask[:, 3], _depth(1 / params["kappa"] + h[:, 3] - h[:, 4], params["mdp"])
+    )
+    np.testing.assert_allclose(
+        bid[:, 3], _depth(1 / params["kappa"] + h[:, 4] - h[:, 3], params["mdp"])
+    )
+    num_depths = params["q_upper"] - params["q_lower"]
+    assert bid.shape == ask.shape == (params["length"], num_depths)
+    assert (bid > 0).all() and (ask > 0).all()
+
+
+def test_models_are_memoised_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setenv(ideal_mm_models.MODEL_CACHE_DIR_ENV, str(tmp_path))
+    ideal_mm_models._cached_tables.cache_clear()
+
+    bid, _ = GLFT_approx(q_upper=5, q_lower=-5, kappa=1, Lambda=5, alpha=1, phi=0.1)
+    assert len(list(tmp_path.glob("GLFT_approx_*.npz"))) == 1
+    # Callers get their own copy of the cached tables
+    bid[:] = 0
+
+    ideal_mm_models._cached_tables.cache_clear()
+    again, _ = GLFT_approx(q_upper=5, q_lower=-5, kappa=1, Lambda=5, alpha=1, phi=0.1)
+    assert again[0] == pytest.approx(1 + 9 * np.sqrt(0.1 * np.e / 5) / 2)
+    ideal_mm_models._cached_tables.cache_clear()
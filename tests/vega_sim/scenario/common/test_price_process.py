@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from vega_sim.scenario.common.utils.price_process import (
+    gbm_paths,
+    jump_diffusion_paths,
+    ou_paths,
+    random_walk,
+    random_walk_paths,
+)
+
+
+def test_random_walk_matches_first_batched_path():
+    paths = random_walk_paths(
+        num_paths=4,
+        num_steps=200,
+        random_state=np.random.RandomState(7),
+        sigma=0.5,
+        starting_price=50,
+        decimal_precision=2,
+    )
+    single = random_walk(
+        num_steps=200,
+        random_state=np.random.RandomState(7),
+        sigma=0.5,
+        starting_price=50,
+        decimal_precision=2,
+    )
+
+    assert paths.shape == (4, 201)
+    assert (paths[:, 0] == 50).all()
+    np.testing.assert_array_equal(paths[0], single)
+
+
+def test_ou_paths_follow_recurrence():
+    theta, mu, sigma, drift = 0.2, 3.0, 0.1, 0.01
+    paths = ou_paths(
+        num_paths=3,
+        num_steps=50,
+        random_state=np.random.RandomState(2),
+        theta=theta,
+        mu=mu,
+        sigma=sigma,
+        starting_price=1.0,
+        drift=drift,
+    )
+
+    noise = np.random.RandomState(2).normal(size=(3, 50))
+    expected = np.ones((3, 51))
+    for t in range(1, 51):
+        expected[:, t] = (
+            expected[:, t - 1]
+            + theta * (mu + t * drift - expected[:, t - 1])
+            + sigma * noise[:, t - 1]
+        )
+    np.testing.assert_allclose(paths, expected)
+
+
+@pytest.mark.parametrize("paths_fn", [gbm_paths, jump_diffusion_paths])
+def test_geometric_paths_keep_expected_return(paths_fn):
+    paths = paths_fn(
+        num_paths=20000,
+        num_steps=100,
+        random_state=np.random.RandomState(0),
+        drift=0.001,
+    )
+
+    assert (paths > 0).all()
+    assert paths[:, -1].mean() == pytest.approx(100 * np.exp(0.1), rel=0.01)
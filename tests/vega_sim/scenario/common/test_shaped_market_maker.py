@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock
+
+from vega_protos.protos.vega import vega as vega_protos
+
+from vega_sim.api.data import Order
+from vega_sim.scenario.common.agents import MMOrder, ShapedMarketMaker
+
+
+def _order(order_id, side, price, remaining):
+    return Order(
+        price=price,
+        size=remaining,
+        id=order_id,
+        reference="",
+        side=side,
+        status=vega_protos.Order.Status.STATUS_ACTIVE,
+        remaining=remaining,
+        time_in_force=vega_protos.Order.TimeInForce.TIME_IN_FORCE_GTC,
+        order_type=vega_protos.Order.Type.TYPE_LIMIT,
+        created_at=0,
+        expires_at=0,
+        party_id="party",
+        market_id="market",
+        updated_at=0,
+        version=1,
+        iceberg_order=None,
+    )
+
+
+def _market_maker(live_orders):
+    mm = ShapedMarketMaker(
+        key_name="mm",
+        price_process_generator=iter([]),
+        best_price_offset_fn=None,
+        shape_fn=None,
+        liquidity_commitment_fn=None,
+        reconcile_orders=True,
+    )
+    mm.market_id = "market"
+    mm.vega = MagicMock()
+    mm.vega.market_price_decimals = {"market": 2}
+    mm.vega.market_pos_decimals = {"market": 1}
+    mm.vega.data_cache.market_from_feed.return_value.tick_size = "1"
+    mm.vega.orders_for_party_from_feed.return_value = {
+        order.id: order for order in live_orders
+    }
+    return mm
+
+
+def test_reconcile_sends_only_the_difference():
+    mm = _market_maker(
+        [
+            _order("keep", vega_protos.SIDE_BUY, 99.0, 1.0),
+            _order("amend", vega_protos.SIDE_BUY, 98.0, 2.0),
+            _order("cancel", vega_protos.SIDE_SELL, 105.0, 1.0),
+        ]
+    )
+    mm._update_orders(
+        buys=[MMOrder(1.0, 99.0), MMOrder(3.0, 98.0)],
+        sells=[MMOrder(1.0, 101.0), MMOrder(1.0, 102.0)],
+    )
+
+    mm.vega.build_order_amendment.assert_called_once()
+    amendment = mm.vega.build_order_amendment.call_args.kwargs
+    assert amendment["order_id"] == "amend"
+    assert amendment["size_delta"] == 1.0
+    mm.vega.build_order_cancellation.assert_called_once_with(
+        order_id="cancel", market_id="market"
+    )
+    assert [
+        c.kwargs["price"] for c in mm.vega.build_order_submission.call_args_list
+    ] == [101.0, 102.0]
+
+    instructions = mm.vega.submit_instructions.call_args.kwargs
+    assert len(instructions["cancellations"]) == 1
+    assert len(instructions["amendments"]) == 1
+    assert len(instructions["submissions"]) == 2
+    # One cancellation and four submissions without reconciling
+    assert mm.last_transactions_saved == 1
+
+
+def test_reconcile_cancels_market_wide_when_nothing_is_kept():
+    mm = _market_maker(
+        [
+            _order("a", vega_protos.SIDE_BUY, 90.0, 1.0),
+            _order("b", vega_protos.SIDE_SELL, 110.0, 1.0),
+        ]
+    )
+    mm._update_orders(buys=[MMOrder(1.0, 99.0)], sells=[MMOrder(1.0, 101.0)])
+
+    mm.vega.build_order_cancellation.assert_called_once_with(market_id="market")
+    assert mm.last_transactions_saved == 0
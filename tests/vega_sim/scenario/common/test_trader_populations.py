@@ -0,0 +1,114 @@
+from collections import Counter
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from vega_protos.protos.vega import markets as markets_protos
+from vega_protos.protos.vega import vega as vega_protos
+
+from vega_sim.environment.agent import VegaState
+from vega_sim.environment.environment import MarketState
+from vega_sim.scenario.common.agents import (
+    LimitOrderTraderPopulation,
+    MarketOrderTraderPopulation,
+)
+
+
+def _state(orders=None):
+    return VegaState(
+        network_state=(),
+        market_state={
+            "market": MarketState(
+                state=markets_protos.Market.State.STATE_ACTIVE,
+                trading_mode=markets_protos.Market.TradingMode.TRADING_MODE_CONTINUOUS,
+                midprice=100,
+                indicative_price=0,
+                last_traded_price=100,
+                best_bid_price=99,
+                best_ask_price=101,
+                min_valid_price=0,
+                max_valid_price=1000,
+                orders=orders or {},
+            )
+        },
+        time=0,
+    )
+
+
+def _initialise(population):
+    vega = MagicMock()
+    vega.find_market_id.return_value = "market"
+    vega.wallet.public_key.side_effect = lambda wallet_name, name: f"pub_{name}"
+    vega.create_keys.side_effect = lambda names, wallet_name: [
+        f"pub_{name}" for name in names
+    ]
+    vega.build_order_submission.side_effect = lambda **kwargs: kwargs
+    vega.build_order_cancellation.side_effect = lambda **kwargs: kwargs
+    vega.get_blockchain_time.return_value = 0
+    population.initialise(vega=vega)
+    return vega
+
+
+def test_market_order_population_sends_one_batch_per_trader():
+    population = MarketOrderTraderPopulation(
+        key_names=[f"mo_{i}" for i in range(200)],
+        market_name="ETH",
+        buy_intensity=2,
+        sell_intensity=2,
+        base_order_size=0.1,
+        step_bias=0.5,
+        random_state=np.random.RandomState(0),
+    )
+    vega = _initialise(population)
+    vega.create_keys.assert_called_once()
+    assert population.public_keys[0] == "pub_mo_0"
+    # Settlement, base and quote assets all funded in one call
+    assert len(vega.mint_many.call_args.kwargs["mints"]) == 3 * 200
+
+    population.step(_state())
+
+    batches = [c.kwargs for c in vega.submit_instructions.call_args_list]
+    assert 50 < len(batches) < 150
+    assert len({b["key_name"] for b in batches}) == len(batches)
+    for batch in batches:
+        assert 1 <= len(batch["submissions"]) <= 2
+        for submission in batch["submissions"]:
+            assert submission["order_type"] == vega_protos.Order.Type.TYPE_MARKET
+            assert submission["size"] > 0
+
+
+def test_limit_order_population_prices_and_cancels():
+    population = LimitOrderTraderPopulation(
+        key_names=[f"lo_{i}" for i in range(100)],
+        market_name="ETH",
+        submit_bias=1,
+        cancel_bias=1,
+        price_process=[100] * 10,
+        spread=2,
+        mean=-5,
+        sigma=0.5,
+        random_state=np.random.RandomState(1),
+    )
+    vega = _initialise(population)
+    live = {"pub_lo_3": {"o1": MagicMock(id="o1"), "o2": MagicMock(id="o2")}}
+
+    population.step(_state(live))
+
+    batches = {
+        c.kwargs["key_name"]: c.kwargs for c in vega.submit_instructions.call_args_list
+    }
+    assert len(batches) == 100
+    assert [c["order_id"] for c in batches["lo_3"]["cancellations"]] in [["o1"], ["o2"]]
+    assert all(not b["cancellations"] for k, b in batches.items() if k != "lo_3")
+
+    submissions = [b["submissions"][0] for b in batches.values()]
+    sides = Counter(s["side"] for s in submissions)
+    assert set(sides) == {"SIDE_BUY", "SIDE_SELL"}
+    for submission in submissions:
+        if submission["side"] == "SIDE_BUY":
+            assert abs(submission["price"] - 99) < 0.1
+        else:
+            assert abs(submission["price"] - 101) < 0.1
+        assert (submission["expires_at"] is not None) == (
+            submission["time_in_force"] == "TIME_IN_FORCE_GTT"
+        )
@@ -0,0 +1,71 @@
+from vega_sim.scenario.fuzzing.campaign import (
+    FuzzingRunOutcome,
+    classify_failure,
+    group_failures,
+)
+
+PANIC_LOG = """2024-01-01T00:00:00.000Z	INFO	core	starting
+panic: invalid position size 1234 for party 4b1a2c3d4e5f60718293a4b5c6d7e8f9
+
+goroutine 712 [running]:
+code.vegaprotocol.io/vega/core/positions.(*Engine).Update(0xc000123456, {0x1, 0x2})
+	/src/core/positions/engine.go:312 +0x4d1
+code.vegaprotocol.io/vega/core/execution/future.(*Market).submitOrder(0xc000654321)
+	/src/core/execution/future/market.go:1871 +0x12
+"""
+
+
+def _raise(error):
+    raise error
+
+
+def check_book_not_crossed(price):
+    raise AssertionError(f"Market in continuous trading but {price} > {price - 1}")
+
+
+def test_core_panic_takes_precedence():
+    signature = classify_failure(ConnectionError("core went away"), PANIC_LOG)
+    assert signature.kind == "core_panic"
+    assert signature.message == "invalid position size <n> for party <id>"
+    assert signature.location.startswith(
+        "code.vegaprotocol.io/vega/core/positions.(*Engine).Update"
+    )
+
+
+def test_invariant_signatures_ignore_values():
+    signatures = []
+    for price in [10, 20]:
+        try:
+            check_book_not_crossed(price)
+        except AssertionError as e:
+            signatures.append(classify_failure(e))
+    assert signatures[0].kind == "invariant"
+    assert signatures[0].location == "check_book_not_crossed"
+    assert signatures[0].key == signatures[1].key
+
+
+def test_passing_run_has_no_signature():
+    assert classify_failure(None, "INFO all good") is None
+
+
+def test_group_failures_keeps_smallest_replay(tmp_path):
+    try:
+        _raise(ValueError("bad order 1"))
+    except ValueError as e:
+        signature = classify_failure(e)
+
+    outcomes = []
+    for seed, size in [(0, 30), (1, 10), (2, 20)]:
+        replay = tmp_path / f"replay_{seed}"
+        replay.write_bytes(b"x" * size)
+        outcomes.append(
+            FuzzingRunOutcome(
+                seed=seed, run_seconds=1, signature=signature, replay_path=str(replay)
+            )
+        )
+    outcomes.append(FuzzingRunOutcome(seed=3, run_seconds=1))
+
+    failures = group_failures(outcomes)
+    assert list(failures) == [signature.key]
+    assert failures[signature.key].seeds == [0, 1, 2]
+    assert failures[signature.key].replay_path == str(tmp_path / "replay_1")
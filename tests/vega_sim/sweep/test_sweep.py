@@ -0,0 +1,134 @@
+import os
+import time
+
+import pytest
+
+from vega_sim.sweep.coordinator import SweepCoordinator, build_jobs
+from vega_sim.sweep.job_queue import (
+    JobStatus,
+    LocalRedis,
+    RedisJobQueue,
+    SQLiteJobQueue,
+)
+from vega_sim.service import DatanodeSyncStats
+from vega_sim.sweep.worker import SweepWorker, _run_scenario
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobQueue(str(tmp_path / "sweep.db"))
+    return RedisJobQueue(LocalRedis())
+
+
+def test_build_jobs_covers_grid():
+    jobs = build_jobs("scenario", ["a", "b"], seeds=range(3), kwargs_grid={"x": [1, 2]})
+    assert len(jobs) == 12
+    assert {(j.name, j.seed, j.kwargs["x"]) for j in jobs} == {
+        (name, seed, x) for name in "ab" for seed in range(3) for x in [1, 2]
+    }
+
+
+def test_claim_is_fifo_and_exclusive(queue):
+    jobs = build_jobs("scenario", ["a"], seeds=range(3))
+    queue.put(jobs)
+
+    claimed = [queue.claim(f"w{i}") for i in range(4)]
+    assert [j.job_id for j in claimed[:3]] == [j.job_id for j in jobs]
+    assert claimed[3] is None
+    assert queue.counts()[JobStatus.RUNNING] == 3
+
+
+def test_failed_attempts_retry_until_exhausted(queue):
+    (job,) = build_jobs("scenario", ["a"], seeds=[0], max_attempts=2)
+    queue.put([job])
+
+    queue.fail(queue.claim("w1").job_id, "w1", "boom")
+    assert queue.counts()[JobStatus.PENDING] == 1
+    queue.fail(queue.claim("w2").job_id, "w2", "boom again")
+
+    assert queue.claim("w3") is None
+    (result,) = queue.results()
+    assert result.status == JobStatus.FAILED
+    assert result.attempts == 2
+    assert result.error == "boom again"
+
+
+def test_lost_jobs_are_requeued(queue):
+    (job,) = build_jobs("scenario", ["a"], seeds=[0])
+    queue.put([job])
+    queue.claim("w1")
+
+    assert queue.requeue_lost(timeout=60) == []
+    assert queue.heartbeat(job.job_id, "w1")
+    time.sleep(0.01)
+    assert queue.requeue_lost(timeout=0) == [job.job_id]
+    # The original worker has lost the job, but its result is still accepted
+    assert not queue.heartbeat(job.job_id, "w1")
+    assert queue.claim("w2").job_id == job.job_id
+    assert queue.complete(job.job_id, "w1", result=1)
+    assert not queue.complete(job.job_id, "w2", result=2)
+
+    (result,) = queue.results()
+    assert result.status == JobStatus.DONE
+    assert result.result == 1
+    assert result.attempts == 2
+
+
+def test_worker_runs_jobs_and_returns_artefacts(queue, tmp_path):
+    def _runner(job, vega_service_kwargs):
+        if job.seed == 1:
+            raise ValueError("bad seed")
+        with open("output.txt", "w") as f:
+            f.write(f"{job.name}-{job.seed}")
+        return job.seed * 10
+
+    coordinator = SweepCoordinator(queue)
+    coordinator.submit(build_jobs("fake", ["a"], seeds=range(3), max_attempts=1))
+    worker = SweepWorker(queue, worker_id="w1", runners={"fake": _runner})
+
+    assert worker.run(exit_when_empty=True) == 3
+
+    stats = coordinator.wait(poll_interval=0, timeout=1)
+    assert stats.counts[JobStatus.DONE] == 2
+    assert stats.counts[JobStatus.FAILED] == 1
+    assert stats.jobs_per_worker == {"w1": 2}
+
+    results = coordinator.collect(str(tmp_path / "out"))
+    for result in results:
+        job_dir = tmp_path / "out" / "fake" / "a" / result.job.job_id
+        if result.status == JobStatus.DONE:
+            assert result.result == result.job.seed * 10
+            with open(job_dir / "artefacts" / "output.txt") as f:
+                assert f.read() == f"a-{result.job.seed}"
+        else:
+            assert "bad seed" in result.error
+            assert os.path.exists(job_dir / "error.txt")
+
+
+def test_run_scenario_reports_startup_timings(monkeypatch):
+    service_kwargs = {}
+
+    class _FakeService:
+        def __init__(self, **kwargs):
+            service_kwargs.update(kwargs)
+            self.startup_timings = {"vega": 1.5, "services_ready": 3.0}
+            self.datanode_sync_stats = DatanodeSyncStats()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+    class _FakeScenario:
+        block_length_seconds = 1
+
+        def run_iteration(self, **kwargs):
+            pass
+
+    monkeypatch.setattr("vega_sim.null_service.VegaServiceNull", _FakeService)
+    result = _run_scenario(_FakeScenario(), seed=0, vega_service_kwargs={"seed": 5})
+
+    assert result["startup_seconds"] == {"vega": 1.5, "services_ready": 3.0}
+    assert service_kwargs["seed"] == 5
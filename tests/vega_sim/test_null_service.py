@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+
+import pytest
+
+from vega_sim.null_service import (
+    STARTUP_ERROR,
+    STARTUP_FAILED_STAGE,
+    VegaServiceNull,
+)
+from vega_sim.tools.startup import StartupStageError
+
+
+def test_headless_rejects_extra_processes():
+    with pytest.raises(ValueError):
+        VegaServiceNull(headless=True, use_full_vega_wallet=True)
+    with pytest.raises(ValueError):
+        VegaServiceNull(headless=True, run_with_console=True)
+
+
+def test_process_rss_reports_each_process():
+    vega = VegaServiceNull(headless=True)
+    try:
+        vega.process_pids = {"vega": os.getpid()}
+        rss = vega.process_rss()
+        assert set(rss.keys()) == {"vega", "python", "total"}
+        assert rss["python"] > 0
+        assert rss["total"] == rss["vega"] + rss["python"]
+    finally:
+        vega._port_reservation.release()
+
+
+def test_failed_startup_stage_is_raised_in_parent():
+    vega = VegaServiceNull(headless=True)
+    parent_conn, child_conn = multiprocessing.Pipe()
+    child_conn.send({STARTUP_FAILED_STAGE: "start_core", STARTUP_ERROR: "core exited"})
+
+    with pytest.raises(StartupStageError, match="core exited") as e:
+        vega._receive_startup_message(parent_conn)
+    assert e.value.stage == "start_core"
+    assert vega.stopped
@@ -1,8 +1,13 @@
 import json
+from types import SimpleNamespace
 from typing import Optional
+from unittest.mock import MagicMock
+
 import pytest
 import requests_mock
 
+import vega_protos.protos.vega as vega_protos
+
 from vega_sim.service import VegaService
 from vega_sim.wallet.vega_wallet import (
     WALLET_CREATION_URL,
@@ -93,3 +98,43 @@ def stub_service():
 #             stub_service.wallet.pub_keys["TEST_NAME"]["TEST_KEYNAME"]
 #             == "TEST_PUBLICKEY"
 #         )
+
+
+def test_mint_many_confirms_all_transfers_together(stub_service: StubService):
+    submitted = []
+    stub_service.wait_fn = MagicMock()
+    stub_service.wait_for_total_catchup = MagicMock()
+    stub_service.network_parameter_from_feed = MagicMock(
+        return_value=SimpleNamespace(value="0.1")
+    )
+    stub_service.party_account = MagicMock(return_value=SimpleNamespace(general=1e9))
+    stub_service.one_off_transfer = MagicMock(
+        side_effect=lambda **kwargs: submitted.append(kwargs)
+    )
+    # Transfers appear on the block after they are submitted
+    stub_service.list_transfers = MagicMock(
+        side_effect=lambda **_: [
+            SimpleNamespace(
+                reference=t["reference"],
+                status=vega_protos.events.v1.events.Transfer.Status.STATUS_DONE,
+                reason=None,
+            )
+            for t in submitted
+        ]
+    )
+
+    stub_service.mint_many(
+        [("a", "asset1", 10), ("b", "asset1", 20), ("c", "asset2", 5)],
+        wallet_name="wallet",
+        transfers_per_block=2,
+    )
+
+    assert [(t["to_key_name"], t["amount"]) for t in submitted] == [
+        ("a", 10),
+        ("b", 20),
+        ("c", 5),
+    ]
+    assert len({t["reference"] for t in submitted}) == 3
+    # One block to split the submissions, one to confirm them all
+    assert stub_service.wait_fn.call_count == 2
+    assert stub_service.list_transfers.call_count == 1
@@ -0,0 +1,84 @@
+import multiprocessing
+import socket
+
+import pytest
+
+from vega_sim.null_service import Ports, VegaServiceNull
+from vega_sim.tools.port_broker import (
+    PortBlockUnavailableError,
+    reserve_port_block,
+)
+
+
+def _reserve_in_child(lock_dir, min_port, max_port, conn):
+    try:
+        reservation = reserve_port_block(
+            8, min_port=min_port, max_port=max_port, block_size=8, lock_dir=lock_dir
+        )
+        conn.send(reservation.ports)
+    except PortBlockUnavailableError:
+        conn.send(None)
+
+
+def test_reservations_are_disjoint(tmp_path):
+    reservations = [
+        reserve_port_block(13, lock_dir=str(tmp_path), block_size=16) for _ in range(20)
+    ]
+    ports = [port for r in reservations for port in r.ports]
+    assert len(ports) == len(set(ports)) == 20 * 16
+    for r in reservations:
+        r.release()
+
+
+def test_multi_block_reservation_is_contiguous(tmp_path):
+    with reserve_port_block(20, lock_dir=str(tmp_path), block_size=8) as r:
+        assert r.size == 24
+        assert r.ports == list(range(r.start, r.start + 24))
+
+
+def test_release_makes_block_available(tmp_path):
+    kwargs = dict(min_port=20000, max_port=20015, block_size=16, lock_dir=str(tmp_path))
+    reservation = reserve_port_block(10, **kwargs)
+    with pytest.raises(PortBlockUnavailableError):
+        reserve_port_block(10, **kwargs)
+
+    reservation.release()
+    assert reservation.released
+    with reserve_port_block(10, **kwargs) as again:
+        assert again.start == 20000
+
+
+def test_reservation_excludes_other_processes(tmp_path):
+    with reserve_port_block(
+        8, min_port=21000, max_port=21015, block_size=8, lock_dir=str(tmp_path)
+    ) as held:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        proc = multiprocessing.get_context("spawn").Process(
+            target=_reserve_in_child, args=(str(tmp_path), 21000, 21015, child_conn)
+        )
+        proc.start()
+        child_ports = parent_conn.recv()
+        proc.join()
+    assert child_ports is not None
+    assert not set(child_ports) & set(held.ports)
+
+
+def test_ports_in_use_are_skipped(tmp_path):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("", 22003))
+        with reserve_port_block(
+            8, min_port=22000, max_port=22015, block_size=8, lock_dir=str(tmp_path)
+        ) as r:
+            assert r.start == 22008
+
+
+def test_service_ports_come_from_one_block():
+    vega = VegaServiceNull(port_config={Ports.WALLET: 1111})
+    try:
+        ports = vega._generate_port_config()
+        assert set(ports.keys()) == set(Ports)
+        assert ports[Ports.WALLET] == 1111
+        assert len(set(ports.values())) == len(Ports)
+        assert set(ports.values()) - {1111} <= set(vega._port_reservation.ports)
+    finally:
+        vega._port_reservation.release()
@@ -0,0 +1,44 @@
+import os
+import time
+from dataclasses import replace
+
+from vega_sim.tools.resource_sampler import SELF_PROCESS_NAME, ResourceSampler
+from vega_sim.tools.scenario_output import (
+    load_process_resource_df,
+    process_resources_per_step,
+    process_resources_standard_output,
+)
+
+
+def test_samples_are_taken_in_the_background_and_join_onto_steps(tmp_path):
+    with ResourceSampler({"vega": os.getpid()}, sample_hz=100) as sampler:
+        time.sleep(0.2)
+    samples = sampler.drain()
+
+    assert {s.process for s in samples} == {"vega", SELF_PROCESS_NAME}
+    assert len(samples) >= 10
+    assert all(s.mem_rss > 0 and s.num_threads >= 2 for s in samples)
+    assert sampler.drain() == []
+
+    # The first half of the samples were taken during one step, the rest during
+    # the next
+    joined = [
+        replace(s, at_time=(1 + 2 * i // len(samples)) * 1e9)
+        for i, s in enumerate(samples)
+    ]
+    paths = dict(run_name="run", output_path=str(tmp_path))
+    process_resources_standard_output(joined, **paths)
+    per_step = process_resources_per_step(load_process_resource_df(**paths))
+    assert len(per_step) == 4
+    assert per_step.groupby("process").io_bytes.first().tolist() == [0, 0]
+
+
+def test_oldest_samples_are_dropped_when_full():
+    sampler = ResourceSampler({}, max_samples=3)
+    for _ in range(5):
+        sampler.sample()
+
+    assert sampler.num_dropped == 2
+    samples = sampler.drain()
+    assert len(samples) == 3
+    assert [s.sampled_at for s in samples] == sorted(s.sampled_at for s in samples)
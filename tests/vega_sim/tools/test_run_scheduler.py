@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+from vega_sim.tools.run_scheduler import (
+    HostSnapshot,
+    ResourceAwareScheduler,
+    RunRecord,
+)
+
+GB = 1024**3
+
+
+class FakeInstance:
+    def __init__(self, rss=0):
+        self.rss = rss
+        self.paused = False
+        self.spec = SimpleNamespace(name="fake")
+        self.record = RunRecord(name="fake", admitted_at=0)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+
+def _scheduler(**kwargs):
+    defaults = dict(
+        max_concurrent=4,
+        cpu_limit=80,
+        memory_reserve=1 * GB,
+        initial_rss_estimate=2 * GB,
+        admission_interval=10,
+    )
+    return ResourceAwareScheduler(**{**defaults, **kwargs})
+
+
+def test_first_run_always_admitted():
+    assert _scheduler().has_headroom([], HostSnapshot(100, 0), now=0)
+
+
+def test_admission_respects_headroom():
+    scheduler = _scheduler()
+    running = [FakeInstance(rss=2 * GB)]
+    idle = HostSnapshot(cpu_percent=10, available_memory=8 * GB)
+
+    assert scheduler.has_headroom(running, idle, now=100)
+    # Too soon after the previous admission
+    scheduler._last_admission = 95
+    assert not scheduler.has_headroom(running, idle, now=100)
+    scheduler._last_admission = 0
+    # Host CPU is saturated
+    assert not scheduler.has_headroom(running, HostSnapshot(90, 8 * GB), now=100)
+    # The running instance has yet to reach the estimated peak memory
+    assert not scheduler.has_headroom(
+        [FakeInstance(rss=0)], HostSnapshot(10, 4 * GB), now=100
+    )
+    # Concurrency cap
+    assert not scheduler.has_headroom([FakeInstance(2 * GB)] * 4, idle, now=100)
+
+
+def test_lagging_runs_are_paused_and_resumed():
+    scheduler = _scheduler(pause_block_lag=50, resume_block_lag=5)
+    instance = FakeInstance()
+
+    scheduler.update_pause(instance, 20)
+    assert not instance.paused
+    scheduler.update_pause(instance, 60)
+    assert instance.paused
+    assert not scheduler.has_headroom([instance], HostSnapshot(0, 100 * GB), now=1000)
+    scheduler.update_pause(instance, 10)
+    assert instance.paused
+    scheduler.update_pause(instance, 3)
+    assert not instance.paused
+    assert instance.record.max_block_lag == 60
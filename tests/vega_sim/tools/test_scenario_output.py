@@ -0,0 +1,289 @@
+import datetime
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+
+from vega_sim.api.data import AccountData, MarketDepth, Position, PriceLevel
+from vega_sim.scenario.common.agents import MarketHistoryData, Snitch
+from vega_sim.tools.scenario_output import (
+    MARKET_CHAIN_FILE_NAME,
+    StreamingHistoryWriter,
+    convert_run_to_parquet,
+    load_accounts_df,
+    load_market_data_df,
+    load_order_book_df,
+    load_positions_df,
+    market_data_standard_output,
+)
+
+
+def _history(step: int) -> MarketHistoryData:
+    market_data = SimpleNamespace(
+        mark_price=100 + step,
+        mid_price=100 + step,
+        open_interest=step,
+        best_bid_price=99,
+        best_offer_price=101,
+        best_bid_volume=1,
+        best_offer_volume=1,
+        market_state=1,
+        market_trading_mode=1,
+        target_stake=0,
+        supplied_stake=0,
+        price_monitoring_bounds=[],
+        indicative_price=0,
+        trigger=0,
+        extension_trigger=0,
+    )
+    return MarketHistoryData(
+        at_time=step * 1e9,
+        market_info={"market": SimpleNamespace(parent_market_id="")},
+        market_data={"market": market_data},
+        accounts=[
+            SimpleNamespace(
+                owner="party", balance=step, market_id="", asset="asset", type=1
+            )
+        ],
+        market_depth={},
+        trades={},
+        positions=[],
+    )
+
+
+def _wait_for_rows(load_fn, num_rows, **kwargs):
+    for _ in range(200):
+        try:
+            df = load_fn(**kwargs)
+            if len(df) >= num_rows:
+                return df
+        except FileNotFoundError:
+            pass
+        time.sleep(0.01)
+    raise AssertionError(f"Expected {num_rows} rows to be written")
+
+
+def test_history_can_be_read_while_streaming(tmp_path):
+    paths = dict(run_name="run", output_path=str(tmp_path))
+    writer = StreamingHistoryWriter(flush_interval_seconds=0.01, **paths)
+
+    writer.write_history(_history(1))
+    df = _wait_for_rows(load_market_data_df, 1, **paths)
+    assert df.mark_price.tolist() == [101]
+
+    writer.write_history(_history(2))
+    writer.close()
+
+    assert load_market_data_df(**paths).mark_price.tolist() == [101, 102]
+    assert load_accounts_df(**paths).balance.tolist() == [1, 2]
+    with open(tmp_path / "run" / MARKET_CHAIN_FILE_NAME) as f:
+        assert json.load(f) == {"market": ["market"]}
+
+
+def test_partially_written_rows_are_skipped(tmp_path):
+    run_path = tmp_path / "run"
+    run_path.mkdir()
+    (run_path / "accounts.csv").write_text(
+        "time,party_id,balance\r\n2023-01-01,a,1\r\n2023-01-01,b,2\r\n2023-01-0"
+    )
+
+    df = load_accounts_df(run_name="run", output_path=str(tmp_path))
+    assert df.party_id.tolist() == ["a", "b"]
+
+
+def test_snitch_changes_are_rebuilt_on_load(tmp_path):
+    depths = [
+        MarketDepth(
+            buys=[PriceLevel(99, 1, 5), PriceLevel(98, 1, 5)],
+            sells=[PriceLevel(101, 1, 5)],
+        )
+    ] + 3 * [MarketDepth(buys=[PriceLevel(99, 1, 5)], sells=[PriceLevel(101, 1, 7)])]
+    accounts = [
+        AccountData("a", 10, "asset", "", 1),
+        AccountData("b", 10, "asset", "", 1),
+    ]
+    trade = MagicMock(id="trade", market_id="market", buyer="a", seller="b")
+
+    vega = MagicMock()
+    vega.get_blockchain_time.side_effect = [step * 1e9 for step in range(1, 5)]
+    vega.all_markets.return_value = [SimpleNamespace(id="market", parent_market_id="")]
+    vega.data_cache.market_ids_from_feed.return_value = ["market"]
+    vega.market_data_from_feed.return_value = _history(0).market_data["market"]
+    vega.market_depth.side_effect = depths
+    vega.get_trades_from_stream.side_effect = [[], [trade], [], []]
+    vega.list_accounts.return_value = accounts
+    vega.get_accounts_from_stream.return_value = [
+        accounts[0],
+        AccountData("b", 5, "asset", "", 1),
+    ]
+
+    snitch = Snitch(capture_deltas=True, keyframe_every=3)
+    snitch.initialise(vega)
+    for _ in range(4):
+        snitch.step(None)
+
+    assert [state.keyframe for state in snitch.states] == [True, False, False, True]
+    assert vega.all_markets.call_count == vega.list_accounts.call_count == 2
+    vega.list_all_positions.assert_any_call(party_ids=["a", "b"])
+    assert snitch.states[1].accounts == [AccountData("b", 5, "asset", "", 1)]
+    assert snitch.states[1].market_depth["market"] == MarketDepth(
+        buys=[PriceLevel(98, 0, 0)], sells=[PriceLevel(101, 1, 7)]
+    )
+    assert snitch.states[2].accounts == []
+
+    paths = dict(run_name="run", output_path=str(tmp_path))
+    market_data_standard_output(snitch.states, **paths)
+
+    accounts_df = load_accounts_df(**paths)
+    assert accounts_df.balance.tolist() == [10, 10, 10, 5, 10, 5, 10, 10]
+    assert "keyframe" not in accounts_df.columns
+    # Loading from a step between keyframes rebuilds from the keyframe before
+    start = datetime.datetime.fromtimestamp(3)
+    pd.testing.assert_frame_equal(
+        load_accounts_df(start=start, **paths), accounts_df[accounts_df.index >= start]
+    )
+    depth_df = load_order_book_df(**paths)
+    # The first capture is dropped on load
+    assert depth_df[["side", "price", "volume", "level"]].values.tolist() == 3 * [
+        ["ASK", 101, 7, 0],
+        ["BID", 99, 5, 0],
+    ]
+
+
+def test_snitch_captures_pnl_of_positions_repriced_without_trading(tmp_path):
+    def _position(unrealised_pnl):
+        return Position(
+            market_id="market",
+            party_id="holder",
+            open_volume=1,
+            realised_pnl=0,
+            unrealised_pnl=unrealised_pnl,
+            average_entry_price=100,
+            updated_at=0,
+            loss_socialisation_amount=0,
+            position_status=0,
+        )
+
+    vega = MagicMock()
+    vega.get_blockchain_time.side_effect = [step * 1e9 for step in range(1, 4)]
+    vega.all_markets.return_value = [SimpleNamespace(id="market", parent_market_id="")]
+    vega.data_cache.market_ids_from_feed.return_value = ["market"]
+    # The mark price moves on the second step only
+    vega.market_data_from_feed.side_effect = [
+        _history(step).market_data["market"] for step in (0, 1, 1)
+    ]
+    vega.market_depth.return_value = MarketDepth(buys=[], sells=[])
+    vega.get_trades_from_stream.return_value = []
+    vega.list_accounts.return_value = []
+    vega.get_accounts_from_stream.return_value = []
+    vega.list_all_positions.side_effect = [[_position(0)], [_position(1)]]
+
+    snitch = Snitch(capture_deltas=True, keyframe_every=10)
+    snitch.initialise(vega)
+    for _ in range(3):
+        snitch.step(None)
+
+    vega.list_all_positions.assert_called_with(market_ids=["market"])
+    assert vega.list_all_positions.call_count == 2
+    assert snitch.states[1].positions == [_position(1)]
+
+    paths = dict(run_name="run", output_path=str(tmp_path))
+    market_data_standard_output(snitch.states, **paths)
+    assert load_positions_df(**paths).unrealised_pnl.tolist() == [0, 1, 1]
+
+
+def test_parquet_output_loads_as_csv_does(tmp_path):
+    pytest.importorskip("pyarrow")
+    history = []
+    for step in range(1, 5):
+        data = _history(step)
+        data.market_data["market"].price_monitoring_bounds = [
+            SimpleNamespace(min_valid_price=90, max_valid_price=110 + step)
+        ]
+        data.market_info["other"] = SimpleNamespace(parent_market_id="")
+        data.market_data["other"] = SimpleNamespace(
+            **{**vars(data.market_data["market"]), "mark_price": 200 + step}
+        )
+        history.append(data)
+
+    csv_paths = dict(run_name="csv", output_path=str(tmp_path))
+    market_data_standard_output(history, **csv_paths)
+    parquet_paths = dict(run_name="parquet", output_path=str(tmp_path))
+    market_data_standard_output(history, output_format="parquet", **parquet_paths)
+    stream_paths = dict(run_name="stream", output_path=str(tmp_path))
+    with StreamingHistoryWriter(output_format="parquet", **stream_paths) as writer:
+        for data in history:
+            writer.write_history(data)
+
+    assert (tmp_path / "parquet" / "market_data.parquet").is_dir()
+    assert not (tmp_path / "parquet" / "market_data.csv").exists()
+    expected = {
+        load_fn: load_fn(**csv_paths)
+        for load_fn in [load_market_data_df, load_accounts_df]
+    }
+    assert expected[load_market_data_df].price_monitoring_bounds.iloc[0] == [(90, 111)]
+
+    # Tables without any rows are not written
+    assert not (tmp_path / "csv" / "trades.csv").exists()
+    assert convert_run_to_parquet(**csv_paths) == ["accounts.csv", "market_data.csv"]
+    for paths in [csv_paths, parquet_paths, stream_paths]:
+        for load_fn, df in expected.items():
+            pd.testing.assert_frame_equal(
+                load_fn(**paths), df, check_dtype=False, check_index_type=False
+            )
+
+    for paths in [csv_paths, parquet_paths]:
+        df = load_market_data_df(
+            columns=["mark_price"],
+            start=datetime.datetime.fromtimestamp(2),
+            end=datetime.datetime.fromtimestamp(3),
+            market_ids=["other"],
+            **paths,
+        )
+        assert df.columns.tolist() == ["mark_price"]
+        assert df.mark_price.tolist() == [202, 203]
+
+
+def test_streamed_parquet_parts_are_merged_on_close(tmp_path):
+    pytest.importorskip("pyarrow")
+    paths = dict(run_name="run", output_path=str(tmp_path))
+    writer = StreamingHistoryWriter(
+        output_format="parquet", flush_interval_seconds=0.01, **paths
+    )
+    for step in range(1, 4):
+        writer.write_history(_history(step))
+        _wait_for_rows(load_market_data_df, step, **paths)
+
+    parts_path = tmp_path / "run" / "market_data.parquet"
+    assert len(list(parts_path.glob("*.parquet"))) == 3
+    writer.close()
+
+    assert [p.name for p in parts_path.iterdir()] == ["part-00000.parquet"]
+    assert load_market_data_df(**paths).mark_price.tolist() == [101, 102, 103]
+
+
+def test_tables_without_rows_replace_earlier_output(tmp_path):
+    paths = dict(run_name="run", output_path=str(tmp_path))
+    history = [_history(1), _history(2)]
+    for data in history:
+        data.market_depth = {
+            "market": MarketDepth(
+                buys=[PriceLevel(99, 1, 5)], sells=[PriceLevel(101, 1, 5)]
+            )
+        }
+    market_data_standard_output(history, **paths)
+    assert len(load_order_book_df(**paths)) == 2
+
+    # A second run into the same directory, this time without any depth
+    market_data_standard_output([_history(3), _history(4)], **paths)
+    assert not (tmp_path / "run" / "depth_data.csv").exists()
+    assert load_market_data_df(**paths).mark_price.tolist() == [103, 104]
+
+    # Streamed runs open each table on its first row, so never open this one
+    market_data_standard_output(history, **paths)
+    with StreamingHistoryWriter(**paths) as writer:
+        writer.write_history(_history(5))
+    assert not (tmp_path / "run" / "depth_data.csv").exists()
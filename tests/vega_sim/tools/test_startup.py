@@ -0,0 +1,112 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+import toml
+
+from vega_sim import vega_home_path
+from vega_sim.null_service import Ports, _is_read_only_home_file, _update_node_config
+from vega_sim.tools.startup import (
+    PortNotReadyError,
+    StartupStage,
+    StartupStageError,
+    clone_home_dir,
+    run_startup_stages,
+    wait_for_port,
+)
+
+
+def test_startup_stages_respect_dependencies():
+    order = []
+
+    def record(name):
+        return lambda: order.append(name)
+
+    timings = run_startup_stages(
+        [
+            StartupStage("c", record("c"), ["a", "b"]),
+            StartupStage("a", record("a")),
+            StartupStage("b", record("b"), ["a"]),
+        ]
+    )
+    assert order == ["a", "b", "c"]
+    assert set(timings.keys()) == {"a", "b", "c"}
+    assert timings["c"].start >= timings["b"].end
+
+
+def test_independent_startup_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    run_startup_stages(
+        [StartupStage("a", barrier.wait), StartupStage("b", barrier.wait)]
+    )
+
+
+def test_startup_stage_failure_raises():
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(StartupStageError, match="boom") as e:
+        run_startup_stages([StartupStage("a", fail)])
+    assert e.value.stage == "a"
+
+
+def test_startup_stages_reject_cycles():
+    with pytest.raises(StartupStageError):
+        run_startup_stages(
+            [
+                StartupStage("a", lambda: None, ["b"]),
+                StartupStage("b", lambda: None, ["a"]),
+            ]
+        )
+
+
+def test_wait_for_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+
+        with pytest.raises(PortNotReadyError):
+            wait_for_port(port, timeout=0.05)
+
+        threading.Timer(0.05, s.listen).start()
+        start = time.perf_counter()
+        wait_for_port(port, timeout=5)
+        assert time.perf_counter() - start < 1
+
+
+def test_cloned_home_is_independent_of_template(tmp_path):
+    home = str(tmp_path / "vegahome")
+    clone_home_dir(str(vega_home_path), home, linkable=_is_read_only_home_file)
+
+    port_config = {port: 10000 + i for i, port in enumerate(Ports)}
+    _update_node_config(home, port_config=port_config, transactions_per_block=10)
+
+    node_config = toml.load(os.path.join(home, "config", "node", "config.toml"))
+    assert node_config["Blockchain"]["Null"]["TransactionsPerBlock"] == 10
+    assert node_config["API"]["Port"] == port_config[Ports.CORE_GRPC]
+
+    template_config = toml.load(
+        os.path.join(vega_home_path, "config", "node", "config.toml")
+    )
+    assert template_config["API"]["Port"] != port_config[Ports.CORE_GRPC]
+    assert not os.path.samefile(
+        os.path.join(home, "genesis.json"),
+        os.path.join(vega_home_path, "genesis.json"),
+    )
+
+
+def test_ephemeral_data_node_config(tmp_path):
+    home = str(tmp_path / "vegahome")
+    clone_home_dir(str(vega_home_path), home, linkable=_is_read_only_home_file)
+
+    port_config = {port: 10000 + i for i, port in enumerate(Ports)}
+    _update_node_config(home, port_config=port_config, ephemeral_data_node=True)
+
+    data_node_config = toml.load(
+        os.path.join(home, "config", "data-node", "config.toml")
+    )
+    assert data_node_config["SQLStore"]["RetentionPeriod"] == "lite"
+    assert data_node_config["NetworkHistory"]["Enabled"] is False
+    assert data_node_config["API"]["Port"] == port_config[Ports.DATA_NODE_GRPC]
@@ -1,7 +1,7 @@
 import json
 import logging
 import datetime
-from typing import Callable, Optional, Union, Dict
+from typing import Callable, Dict, List, Optional, Union
 
 import vega_sim.api.data_raw as data_raw
 import vega_sim.grpc.client as vac
@@ -93,30 +93,13 @@ def propose_market_from_config(
     governance_asset: Optional[str] = "VOTE",
     proposal_wallet_name: Optional[str] = None,
 ) -> str:
-    # Make sure Vega network has governance asset
-    vote_asset_id = find_asset_id(
-        governance_asset, raise_on_missing=True, data_client=data_client
-    )
     pub_key = wallet.public_key(
         wallet_name=proposal_wallet_name, name=proposal_key_name
     )
-
-    # Request accounts for party and check governance asset balance
-    party_accounts = data_raw.list_accounts(
-        data_client=data_client, asset_id=vote_asset_id, party_id=pub_key
+    _check_voting_balance(
+        pub_key=pub_key, data_client=data_client, governance_asset=governance_asset
     )
 
-    voting_balance = 0
-    for account in party_accounts:
-        if account.asset == vote_asset_id:
-            voting_balance = account.balance
-            break
-
-    if voting_balance == 0:
-        raise LowBalanceError(
-            f"Public key {pub_key} is missing governance token {governance_asset}"
-        )
-
     # Build NewMarketConfiguration proto
     changes = market_config.build(oracle_pubkey=pub_key)
 
@@ -143,6 +126,84 @@ def propose_market_from_config(
     ).proposal.id
 
 
+def propose_markets_from_config(
+    data_client: vac.VegaTradingDataClientV2,
+    wallet: Wallet,
+    proposal_key_name: str,
+    market_configs: List[Union[MarketConfig, SpotMarketConfig]],
+    closing_time: Union[str, int],
+    enactment_time: Union[str, int],
+    time_forward_fn: Optional[Callable[[], None]] = None,
+    sync_fn: Optional[Callable[[], None]] = None,
+    governance_asset: Optional[str] = "VOTE",
+    proposal_wallet_name: Optional[str] = None,
+) -> str:
+    """Proposes all the given markets in a single batch proposal, so they are
+    voted on and enacted together.
+
+    Returns:
+        str, the ID of the batch proposal
+    """
+    pub_key = wallet.public_key(
+        wallet_name=proposal_wallet_name, name=proposal_key_name
+    )
+    _check_voting_balance(
+        pub_key=pub_key, data_client=data_client, governance_asset=governance_asset
+    )
+
+    changes = []
+    for market_config in market_configs:
+        change = vega_protos.governance.BatchProposalTermsChange()
+        if isinstance(market_config, MarketConfig):
+            change.new_market.CopyFrom(market_config.build(oracle_pubkey=pub_key))
+        if isinstance(market_config, SpotMarketConfig):
+            change.new_spot_market.CopyFrom(market_config.build(oracle_pubkey=pub_key))
+        changes.append(change)
+
+    return _make_and_wait_for_proposal(
+        wallet=wallet,
+        wallet_name=proposal_wallet_name,
+        key_name=proposal_key_name,
+        proposal=_build_batch_proposal(
+            pub_key=pub_key,
+            data_client=data_client,
+            changes=changes,
+            closing_time=int(closing_time),
+            enactment_time=int(enactment_time),
+        ),
+        data_client=data_client,
+        time_forward_fn=time_forward_fn,
+        sync_fn=sync_fn,
+    ).proposal.id
+
+
+def _check_voting_balance(
+    pub_key: str,
+    data_client: vac.VegaTradingDataClientV2,
+    governance_asset: Optional[str] = "VOTE",
+) -> None:
+    # Make sure Vega network has governance asset
+    vote_asset_id = find_asset_id(
+        governance_asset, raise_on_missing=True, data_client=data_client
+    )
+
+    # Request accounts for party and check governance asset balance
+    party_accounts = data_raw.list_accounts(
+        data_client=data_client, asset_id=vote_asset_id, party_id=pub_key
+    )
+
+    voting_balance = 0
+    for account in party_accounts:
+        if account.asset == vote_asset_id:
+            voting_balance = account.balance
+            break
+
+    if voting_balance == 0:
+        raise LowBalanceError(
+            f"Public key {pub_key} is missing governance token {governance_asset}"
+        )
+
+
 def __propose_market(
     key_name: str,
     wallet: Wallet,
@@ -649,6 +710,48 @@ def propose_network_parameter_change(
     ).proposal.id
 
 
+def propose_network_parameter_changes(
+    parameters: Dict[str, str],
+    key_name: str,
+    wallet: Wallet,
+    closing_time: Optional[int] = None,
+    enactment_time: Optional[int] = None,
+    data_client: Optional[vac.VegaTradingDataClientV2] = None,
+    time_forward_fn: Optional[Callable[[], None]] = None,
+    sync_fn: Optional[Callable[[], None]] = None,
+    wallet_name: Optional[str] = None,
+) -> str:
+    """Proposes all the given network parameter changes in a single batch
+    proposal, so they are voted on and enacted together.
+
+    Returns:
+        str, the ID of the batch proposal
+    """
+    changes = [
+        vega_protos.governance.BatchProposalTermsChange(
+            update_network_parameter=vega_protos.governance.UpdateNetworkParameter(
+                changes=vega_protos.vega.NetworkParameter(key=parameter, value=value)
+            )
+        )
+        for parameter, value in parameters.items()
+    ]
+    return _make_and_wait_for_proposal(
+        wallet_name=wallet_name,
+        wallet=wallet,
+        proposal=_build_batch_proposal(
+            pub_key=wallet.public_key(wallet_name=wallet_name, name=key_name),
+            data_client=data_client,
+            changes=changes,
+            closing_time=closing_time,
+            enactment_time=enactment_time,
+        ),
+        data_client=data_client,
+        time_forward_fn=time_forward_fn,
+        sync_fn=sync_fn,
+        key_name=key_name,
+    ).proposal.id
+
+
 def propose_market_update(
     market_id: str,
     key_name: str,
@@ -820,9 +923,10 @@ def _build_generic_proposal(
 def _build_batch_proposal(
     pub_key: str,
     data_client: vac.VegaTradingDataClientV2,
+    changes: List[vega_protos.governance.BatchProposalTermsChange],
     closing_time: Optional[int] = None,
     enactment_time: Optional[int] = None,
-) -> commands_protos.commands.ProposalSubmission:
+) -> commands_protos.commands.BatchProposalSubmission:
     # Set closing/enactment timestamps to valid time offsets
     # from the current Vega blockchain time if not already set
     none_times = [i is None for i in [closing_time, enactment_time]]
@@ -841,16 +945,21 @@ def _build_batch_proposal(
     # Propose market
     proposal_ref = f"{pub_key}-{generate_id(6)}"
 
-    return commands_protos.commands.BatchProposalSubmission(
+    proposal = commands_protos.commands.BatchProposalSubmission(
         reference=proposal_ref,
-        terms=vega_protos.governance.BatchProposalTerms(
+        terms=commands_protos.commands.BatchProposalSubmissionTerms(
             closing_timestamp=closing_time,
-            enactment_timestamp=enactment_time,
+            changes=changes,
         ),
         rationale=vega_protos.governance.ProposalRationale(
             description="Making a proposal", title="This is a proposal"
         ),
     )
+    # Changes share the batch's enactment time unless given their own
+    for change in proposal.terms.changes:
+        if not change.enactment_timestamp:
+            change.enactment_timestamp = enactment_time
+    return proposal
 
 
 def _make_and_wait_for_proposal(
@@ -1,4 +1,4 @@
-from abc import ABC
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Any, Tuple, Dict, Optional, List, Union
 
@@ -104,3 +104,26 @@ class StateAgentWithWallet(AgentWithWallet):
 class StateAgent(Agent):
     def step(self, vega_state: VegaState):
         super().step()
+
+
+class TwoPhaseAgent(ABC):
+    """Mixin for agents whose step can be split into a decide phase and a
+    submit phase.
+
+    decide works out what the agent will do this step from the state and any
+    reads it needs from the service, but sends no transactions. It may run
+    concurrently with other agents' decide phases, so it must not draw from
+    random states shared with other agents. submit then sends the
+    transactions for that decision and is always called in agent order.
+    """
+
+    @abstractmethod
+    def decide(self, vega_state: VegaState) -> Any:
+        pass
+
+    @abstractmethod
+    def submit(self, decision: Any) -> None:
+        pass
+
+    def step(self, vega_state: VegaState):
+        self.submit(self.decide(vega_state))
@@ -28,12 +28,14 @@ import random
 import numpy as np
 
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Callable, List, Optional
 
 from vega_sim.environment.agent import (
     Agent,
     StateAgent,
     StateAgentWithWallet,
+    TwoPhaseAgent,
     VegaState,
 )
 from vega_sim.network_service import VegaServiceNetwork
@@ -319,6 +321,8 @@ class MarketEnvironmentWithState(MarketEnvironment):
         vega_service: Optional[VegaServiceNull] = None,
         pause_every_n_steps: Optional[int] = None,
         random_state: np.random.RandomState = None,
+        decide_concurrently: bool = False,
+        max_decide_workers: Optional[int] = None,
     ):
         """Set up a Vega protocol environment with some specified agents.
         Handles the entire Vega setup and environment lifetime process, allowing the
@@ -364,6 +368,15 @@ class MarketEnvironmentWithState(MarketEnvironment):
                 Optional[int], default None, If passed, simulation will pause every
                     time the passed number of steps elapses waiting on user to press
                     return. Allows inspection of the simulation at given frequency
+            decide_concurrently:
+                bool, default False, If True, agents implementing TwoPhaseAgent
+                    decide their actions for each step concurrently in a thread
+                    pool. Once all have decided, their decisions are submitted,
+                    along with the steps of any other agents, in the usual
+                    agent order.
+            max_decide_workers:
+                Optional[int], default None, Maximum number of threads deciding
+                    at once. Defaults to the ThreadPoolExecutor default.
         """
         super().__init__(
             agents=agents,
@@ -381,6 +394,10 @@ class MarketEnvironmentWithState(MarketEnvironment):
             state_func if state_func is not None else self._default_state_extraction
         )
 
+        self.decide_concurrently = decide_concurrently
+        self.max_decide_workers = max_decide_workers
+        self._decide_executor: Optional[ThreadPoolExecutor] = None
+
     def _default_state_extraction(self, vega: VegaService) -> VegaState:
         if not hasattr(self, "market_decimals_cache"):
             self.market_decimals_cache = {}
@@ -413,15 +430,45 @@ class MarketEnvironmentWithState(MarketEnvironment):
             time=vega.get_blockchain_time_from_feed(),
         )
 
+    def _run(self, vega: VegaServiceNull, *args, **kwargs) -> None:
+        try:
+            return super()._run(vega, *args, **kwargs)
+        finally:
+            if self._decide_executor is not None:
+                self._decide_executor.shutdown()
+                self._decide_executor = None
+
     def step(self, vega: VegaService) -> None:
         vega.wait_for_thread_catchup()
         state = self.state_func(vega)
-        for agent in (
+        agents = (
             sorted(self.agents, key=lambda _: self.random_state.random())
             if self.random_agent_ordering
             else self.agents
-        ):
-            agent.step(state)
+        )
+        if not self.decide_concurrently:
+            for agent in agents:
+                agent.step(state)
+            return
+
+        if self._decide_executor is None:
+            self._decide_executor = ThreadPoolExecutor(
+                max_workers=self.max_decide_workers,
+                thread_name_prefix="agent-decide",
+            )
+        futures = {
+            id(agent): self._decide_executor.submit(agent.decide, state)
+            for agent in agents
+            if isinstance(agent, TwoPhaseAgent)
+        }
+        decisions = {key: future.result() for key, future in futures.items()}
+        # Agents which can't split their step run once every decision is made,
+        # so they never send transactions while the others are still deciding
+        for agent in agents:
+            if id(agent) in decisions:
+                agent.submit(decisions[id(agent)])
+            else:
+                agent.step(state)
 
 
 class NetworkEnvironment(MarketEnvironmentWithState):
@@ -247,6 +247,11 @@ class LocalDataCache:
         """
         return self.market_data_from_feed_store[market_id]
 
+    def market_ids_from_feed(self) -> List[str]:
+        """IDs of all markets with market data on the feed."""
+        with self.market_data_lock:
+            return list(self.market_data_from_feed_store.keys())
+
     def order_status_from_feed(
         self, live_only: bool = True
     ) -> Dict[str, Dict[str, Dict[str, data.Order]]]:
@@ -644,6 +649,23 @@ class LocalDataCache:
                 results.append(trade)
         return results
 
+    def get_trades_from_stream_since(
+        self, cursor: int = 0
+    ) -> Tuple[List[data.Trade], int]:
+        """Returns the trades received after the first cursor trades along with
+        the cursor to pass next time, so callers can consume trades incrementally
+        rather than re-reading every trade seen.
+
+        Args:
+            cursor:
+                int, default 0, Number of trades already consumed
+
+        Returns:
+            Tuple[List[Trade], int], the new trades and the updated cursor
+        """
+        with self.trades_lock:
+            return self._trades_from_feed[cursor:], len(self._trades_from_feed)
+
     def get_accounts_from_stream(
         self,
         market_id: Optional[str] = None,
@@ -44,7 +44,7 @@ import webbrowser
 import multiprocessing
 import requests
 
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from os import getcwd, path, environ
 
@@ -701,6 +701,29 @@ class VegaServiceNetwork(VegaService):
                 wallet_name=wallet_name,
             )
 
+    def mint_many(
+        self,
+        mints: List[Tuple[str, str, float]],
+        wallet_name: Optional[str] = None,
+        transfers_per_block: int = 500,
+    ) -> None:
+        """Mints each requested amount in turn, as funds on a network come from
+        deposits and the faucet rather than from a treasury key.
+
+        Args:
+            mints:
+                List[Tuple[str, str, float]], The (key name, asset ID, amount) of
+                each mint to make
+            wallet_name:
+                str, optional, Name of wallet containing the keys to fund
+            transfers_per_block:
+                int, default 500, Unused, as each mint is made separately
+        """
+        for key_name, asset, amount in mints:
+            self.mint(
+                key_name=key_name, asset=asset, amount=amount, wallet_name=wallet_name
+            )
+
     def deposit(
         self,
         symbol: str,
@@ -26,6 +26,7 @@ from typing import Dict, List, Optional, Set
 
 import docker
 import grpc
+import psutil
 import requests
 import toml
 from urllib3.exceptions import MaxRetryError
@@ -35,7 +36,22 @@ import vega_sim.grpc.client as vac
 from vega_sim import vega_bin_path, vega_home_path
 from vega_sim.service import VegaService
 from vega_sim.tools.load_binaries import download_binaries
+from vega_sim.tools.port_broker import (
+    PortBlockReservation,
+    PortBlockUnavailableError,
+    reserve_port_block,
+)
 from vega_sim.tools.retry import retry
+from vega_sim.tools.startup import (
+    StartupStage,
+    StartupStageError,
+    clone_home_dir,
+    format_stage_timings,
+    replace_file_contents,
+    run_startup_stages,
+    wait_for_port,
+    wait_for_ready,
+)
 from vega_sim.wallet.base import DEFAULT_WALLET_NAME, Wallet
 from vega_sim.wallet.slim_wallet import SlimWallet
 from vega_sim.wallet.vega_wallet import VegaWallet
@@ -48,6 +64,44 @@ PortUpdateConfig = namedtuple(
 
 PORT_DIR_NAME = "market_sim_ports"
 
+# Seconds each startup stage may wait for a process to start serving requests
+STARTUP_TIMEOUT = 120
+
+# Directory used for ephemeral data-node storage. On Linux this is a tmpfs mount, so
+# database writes and fsyncs never reach disk.
+EPHEMERAL_STORAGE_ROOT = "/dev/shm"
+
+# Data-node config overrides applied when running with ephemeral storage. Keys are
+# the path to the value within the data-node config.toml.
+EPHEMERAL_DATA_NODE_CONFIG = {
+    ("SQLStore", "WipeOnStartup"): True,
+    ("SQLStore", "RetentionPeriod"): "lite",
+    ("NetworkHistory", "Enabled"): False,
+    ("Pprof", "Enabled"): False,
+}
+
+# Postgres flags for the docker data-node database when running with ephemeral
+# storage. Durability is traded for throughput as the data is thrown away anyway.
+EPHEMERAL_POSTGRES_ARGS = [
+    "-c",
+    "fsync=off",
+    "-c",
+    "synchronous_commit=off",
+    "-c",
+    "full_page_writes=off",
+    "-c",
+    "wal_level=minimal",
+    "-c",
+    "max_wal_senders=0",
+]
+
+_NOT_READY_EXCEPTIONS = (
+    MaxRetryError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.HTTPError,
+    requests.exceptions.Timeout,
+)
+
 
 class Ports(Enum):
     DATA_NODE_GRPC = auto()
@@ -228,6 +282,11 @@ class VegaStartupTimeoutError(Exception):
     pass
 
 
+# Keys of the message sent by the process manager when a startup stage fails
+STARTUP_FAILED_STAGE = "failed_stage"
+STARTUP_ERROR = "error"
+
+
 class ServiceNotStartedError(Exception):
     pass
 
@@ -309,15 +368,49 @@ def _update_node_config(
     transactions_per_block: int = 1,
     block_duration: str = "1s",
     use_docker_postgres: bool = False,
+    ephemeral_data_node: bool = False,
 ) -> None:
-    config_path = path.join(vega_home, "config", "node", "config.toml")
-    config_toml = toml.load(config_path)
+    _fill_port_config(port_config)
+
+    # Each config file is loaded and written once, however many values change
+    configs = {}
+
+    def _load(file_path: str) -> dict:
+        if file_path not in configs:
+            configs[file_path] = toml.load(file_path)
+        return configs[file_path]
+
+    config_toml = _load(path.join(vega_home, "config", "node", "config.toml"))
     config_toml["Blockchain"]["Null"]["GenesisFile"] = path.join(
         vega_home, "genesis.json"
     )
     config_toml["Blockchain"]["Null"]["BlockDuration"] = block_duration
     config_toml["Blockchain"]["Null"]["TransactionsPerBlock"] = transactions_per_block
 
+    for port_key, update_configs in PORT_UPDATERS.items():
+        for config in update_configs:
+            config_toml = _load(path.join(vega_home, *config.file_path))
+            elem = config_toml
+            for k in config.config_path:
+                elem = elem[k]
+            elem[config.key] = config.val_func(port_config[port_key])
+
+            if port_key == Ports.DATA_NODE_POSTGRES:
+                config_toml["SQLStore"]["UseEmbedded"] = not use_docker_postgres
+
+    if ephemeral_data_node:
+        config_toml = _load(path.join(vega_home, "config", "data-node", "config.toml"))
+        for config_path, value in EPHEMERAL_DATA_NODE_CONFIG.items():
+            elem = config_toml
+            for k in config_path[:-1]:
+                elem = elem.setdefault(k, {})
+            elem[config_path[-1]] = value
+
+    for file_path, config_toml in configs.items():
+        replace_file_contents(file_path, functools.partial(toml.dump, config_toml))
+
+
+def _fill_port_config(port_config: Dict[Ports, int]) -> None:
     existing_ports = set(port_config.values())
     for port in Ports:
         if port in port_config:
@@ -326,23 +419,91 @@ def _update_node_config(
         existing_ports.add(new_port)
         port_config[port] = new_port
 
-    with open(config_path, "w") as f:
-        toml.dump(config_toml, f)
 
-    for port_key, update_configs in PORT_UPDATERS.items():
-        for config in update_configs:
-            file_path = path.join(vega_home, *config.file_path)
-            config_toml = toml.load(file_path)
-            elem = config_toml
-            for k in config.config_path:
-                elem = elem[k]
-            elem[config.key] = config.val_func(port_config[port_key])
+def _is_read_only_home_file(rel_path: str) -> bool:
+    # Key material in the vegahome template is only ever read by the processes,
+    # so can be shared between instances rather than copied
+    parts = rel_path.split(os.sep)
+    return rel_path == "passphrase-file" or "wallets" in parts or "rsa-keys" in parts
 
-            if port_key == Ports.DATA_NODE_POSTGRES:
-                config_toml["SQLStore"]["UseEmbedded"] = not use_docker_postgres
 
-            with open(file_path, "w") as f:
-                toml.dump(config_toml, f)
+def _link_ephemeral_data_node_storage(vega_home: str) -> Optional[str]:
+    """Points the data-node storage directory (which holds the embedded postgres
+    database) at a fresh directory under EPHEMERAL_STORAGE_ROOT.
+
+    Returns:
+        Optional[str], The created directory, or None if no tmpfs is available
+    """
+    if not path.isdir(EPHEMERAL_STORAGE_ROOT):
+        logger.warning(
+            f"{EPHEMERAL_STORAGE_ROOT} not found, ephemeral data-node storage will be"
+            " written to disk"
+        )
+        return None
+    storage_dir = tempfile.mkdtemp(prefix="vega-sim-", dir=EPHEMERAL_STORAGE_ROOT)
+    data_node_state = path.join(vega_home, "state", "data-node")
+    os.makedirs(data_node_state, exist_ok=True)
+    os.symlink(storage_dir, path.join(data_node_state, "storage"))
+    return storage_dir
+
+
+def _start_docker_postgres(
+    docker_client, postgres_port: int, ephemeral_data_node: bool = False
+):
+    if ephemeral_data_node:
+        data_node_docker_volume = None
+        storage_kwargs = {"tmpfs": {"/var/lib/postgresql/data": "rw"}}
+    else:
+        data_node_docker_volume = docker_client.volumes.create()
+        storage_kwargs = {
+            "volumes": [f"{data_node_docker_volume.name}:/var/lib/postgresql/data"]
+        }
+    data_node_container = docker_client.containers.run(
+        "timescale/timescaledb:2.11.2-pg15",
+        command=[
+            "-c",
+            "max_connections=50",
+            "-c",
+            "log_destination=stderr",
+            "-c",
+            "work_mem=5MB",
+            "-c",
+            "huge_pages=off",
+            "-c",
+            "shared_memory_type=sysv",
+            "-c",
+            "dynamic_shared_memory_type=sysv",
+            "-c",
+            "shared_buffers=2GB",
+            "-c",
+            "temp_buffers=5MB",
+        ]
+        + (EPHEMERAL_POSTGRES_ARGS if ephemeral_data_node else []),
+        detach=True,
+        ports={5432: postgres_port},
+        environment={
+            "POSTGRES_USER": "vega",
+            "POSTGRES_PASSWORD": "vega",
+            "POSTGRES_DB": "vega",
+        },
+        remove=False,
+        **storage_kwargs,
+    )
+    return data_node_docker_volume, data_node_container
+
+
+def _faucet_args(vega_path: str, vega_home: str) -> List[str]:
+    return [
+        vega_path,
+        "faucet",
+        "run",
+        "--passphrase-file=" + vega_home + "/passphrase-file",
+        "--home=" + vega_home,
+    ]
+
+
+def _check_rest_endpoint(url: str) -> None:
+    requests.get(url, timeout=5).raise_for_status()
 
 
 def manage_vega_processes(
@@ -357,6 +518,7 @@ def manage_vega_processes(
     transactions_per_block: int = 1,
     block_duration: str = "1s",
     run_wallet: bool = False,
+    run_faucet: bool = True,
     retain_log_files: bool = False,
     log_dir: Optional[str] = None,
     replay_from_path: Optional[str] = None,
@@ -364,6 +526,7 @@ def manage_vega_processes(
     log_level: Optional[int] = None,
     genesis_time: Optional[datetime.datetime] = None,
     custom_vega_home_path: Optional[str] = None,
+    ephemeral_data_node: bool = False,
 ) -> None:
     logger.addHandler(QueueHandler(log_queue))
     logger.setLevel(log_level if log_level is not None else logging.INFO)
@@ -380,6 +543,9 @@ def manage_vega_processes(
     tmp_vega_dir = tempfile.mkdtemp(prefix="vega-sim-") if log_dir is None else log_dir
     logger.info(f"Running NullChain from vegahome of {tmp_vega_dir}")
 
+    # Ports are needed by several independent stages, so assign them up front
+    _fill_port_config(port_config)
+
     if port_config.get(Ports.CONSOLE):
         logger.info(f"Launching Console at port {port_config.get(Ports.CONSOLE)}")
     if port_config.get(Ports.DATA_NODE_REST):
@@ -397,152 +563,130 @@ def manage_vega_processes(
     if port_config.get(Ports.CORE_GRPC):
         logger.info(f"Launching Core GRPC at port {port_config.get(Ports.CORE_GRPC)}")
 
-    dest_dir = f"{tmp_vega_dir}/vegahome"
-    shutil.copytree(
-        custom_vega_home_path if custom_vega_home_path is not None else vega_home_path,
-        dest_dir,
-    )
-    for dirpath, _, filenames in os.walk(dest_dir):
-        os.utime(dirpath, None)
-        for file in filenames:
-            os.utime(os.path.join(dirpath, file), None)
-    if genesis_time is not None:
-        with open(f"{dest_dir}/genesis.json", "r") as file:
-            data = json.load(file)
-        data["genesis_time"] = genesis_time.isoformat() + "Z"
-        with open(f"{dest_dir}/genesis.json", "w") as file:
-            json.dump(data, file, indent=2)
-
     tmp_vega_home = tmp_vega_dir + "/vegahome"
-    _update_node_config(
-        tmp_vega_home,
-        port_config=port_config,
-        transactions_per_block=transactions_per_block,
-        block_duration=block_duration,
-        use_docker_postgres=use_docker_postgres,
-    )
+    processes = {}
+    docker_resources = {}
+    ephemeral_storage_dirs = []
+
+    def prepare_home() -> None:
+        clone_home_dir(
+            (
+                custom_vega_home_path
+                if custom_vega_home_path is not None
+                else vega_home_path
+            ),
+            tmp_vega_home,
+            linkable=_is_read_only_home_file,
+        )
+        if genesis_time is not None:
+            with open(f"{tmp_vega_home}/genesis.json", "r") as file:
+                data = json.load(file)
+            data["genesis_time"] = genesis_time.isoformat() + "Z"
+            replace_file_contents(
+                f"{tmp_vega_home}/genesis.json",
+                functools.partial(json.dump, data, indent=2),
+            )
 
-    if use_docker_postgres:
-        data_node_docker_volume = docker_client.volumes.create()
-        data_node_container = docker_client.containers.run(
-            "timescale/timescaledb:2.11.2-pg15",
-            command=[
-                "-c",
-                "max_connections=50",
-                "-c",
-                "log_destination=stderr",
-                "-c",
-                "work_mem=5MB",
-                "-c",
-                "huge_pages=off",
-                "-c",
-                "shared_memory_type=sysv",
-                "-c",
-                "dynamic_shared_memory_type=sysv",
-                "-c",
-                "shared_buffers=2GB",
-                "-c",
-                "temp_buffers=5MB",
+        _update_node_config(
+            tmp_vega_home,
+            port_config=port_config,
+            transactions_per_block=transactions_per_block,
+            block_duration=block_duration,
+            use_docker_postgres=use_docker_postgres,
+            ephemeral_data_node=ephemeral_data_node,
+        )
+        if ephemeral_data_node and not use_docker_postgres:
+            storage_dir = _link_ephemeral_data_node_storage(tmp_vega_home)
+            if storage_dir is not None:
+                ephemeral_storage_dirs.append(storage_dir)
+
+    def start_postgres() -> None:
+        (
+            docker_resources["volume"],
+            docker_resources["container"],
+        ) = _start_docker_postgres(
+            docker_client,
+            port_config[Ports.DATA_NODE_POSTGRES],
+            ephemeral_data_node=ephemeral_data_node,
+        )
+
+    def start_data_node() -> None:
+        processes["data-node"] = _popen_process(
+            [
+                data_node_path,
+                "start",
+                "--home=" + tmp_vega_home,
+                "--chainID=CUSTOM",
             ],
-            detach=True,
-            ports={5432: port_config[Ports.DATA_NODE_POSTGRES]},
-            volumes=[f"{data_node_docker_volume.name}:/var/lib/postgresql/data"],
-            environment={
-                "POSTGRES_USER": "vega",
-                "POSTGRES_PASSWORD": "vega",
-                "POSTGRES_DB": "vega",
-            },
-            remove=False,
+            dir_root=tmp_vega_dir,
+            log_name="data_node",
         )
 
-    dataNodeProcess = _popen_process(
-        [
-            data_node_path,
+    def start_core() -> None:
+        vega_args = [
+            vega_path,
             "start",
+            "--nodewallet-passphrase-file=" + tmp_vega_home + "/passphrase-file",
             "--home=" + tmp_vega_home,
-            "--chainID=CUSTOM",
-        ],
-        dir_root=tmp_vega_dir,
-        log_name="data_node",
-    )
+        ]
 
-    vega_args = [
-        vega_path,
-        "start",
-        "--nodewallet-passphrase-file=" + tmp_vega_home + "/passphrase-file",
-        "--home=" + tmp_vega_home,
-    ]
+        if store_transactions:
+            replay_file = (
+                replay_from_path
+                if replay_from_path is not None
+                else tmp_vega_home + "/replay"
+            )
+            vega_args.extend(
+                [
+                    f"--blockchain.nullchain.replay-file={replay_file}",
+                    "--blockchain.nullchain.record",
+                ]
+            )
+        if replay_from_path is not None:
+            vega_args.extend(
+                [
+                    f"--blockchain.nullchain.replay-file={replay_from_path}",
+                    "--blockchain.nullchain.replay",
+                ]
+            )
 
-    if store_transactions:
-        replay_file = (
-            replay_from_path
-            if replay_from_path is not None
-            else tmp_vega_home + "/replay"
-        )
-        vega_args.extend(
-            [
-                f"--blockchain.nullchain.replay-file={replay_file}",
-                "--blockchain.nullchain.record",
-            ]
-        )
-    if replay_from_path is not None:
-        vega_args.extend(
-            [
-                f"--blockchain.nullchain.replay-file={replay_from_path}",
-                "--blockchain.nullchain.replay",
-            ]
+        processes["vega"] = _popen_process(
+            vega_args,
+            dir_root=tmp_vega_dir,
+            log_name="node",
         )
 
-    vegaNodeProcess = _popen_process(
-        vega_args,
-        dir_root=tmp_vega_dir,
-        log_name="node",
-    )
-
-    for _ in range(500):
-        try:
-            requests.get(
-                f"http://localhost:{port_config[Ports.CORE_REST]}/blockchain/height"
-            ).raise_for_status()
-            break
-        except:
-            pass
-
-    vegaFaucetProcess = _popen_process(
-        [
-            vega_path,
-            "faucet",
-            "run",
-            "--passphrase-file=" + tmp_vega_home + "/passphrase-file",
-            "--home=" + tmp_vega_home,
-        ],
-        dir_root=tmp_vega_dir,
-        log_name="faucet",
-    )
+    def wait_for_core() -> None:
+        wait_for_port(port_config[Ports.CORE_REST], timeout=STARTUP_TIMEOUT)
+        wait_for_ready(
+            functools.partial(
+                _check_rest_endpoint,
+                f"http://localhost:{port_config[Ports.CORE_REST]}/blockchain/height",
+            ),
+            timeout=STARTUP_TIMEOUT,
+            exceptions=_NOT_READY_EXCEPTIONS,
+        )
 
-    processes = {
-        "data-node": dataNodeProcess,
-        "faucet": vegaFaucetProcess,
-        "vega": vegaNodeProcess,
-    }
+    def wait_for_data_node() -> None:
+        wait_for_port(port_config[Ports.DATA_NODE_REST], timeout=STARTUP_TIMEOUT)
+        wait_for_ready(
+            functools.partial(
+                _check_rest_endpoint,
+                f"http://localhost:{port_config[Ports.DATA_NODE_REST]}/time",
+            ),
+            timeout=STARTUP_TIMEOUT,
+            exceptions=_NOT_READY_EXCEPTIONS,
+        )
 
-    if run_wallet:
-        for _ in range(3000):
-            try:
-                requests.get(
-                    f"http://localhost:{port_config.get(Ports.DATA_NODE_REST)}/time"
-                ).raise_for_status()
-                requests.get(
-                    f"http://localhost:{port_config.get(Ports.CORE_REST)}/blockchain/height"
-                ).raise_for_status()
-                break
-            except (
-                MaxRetryError,
-                requests.exceptions.ConnectionError,
-                requests.exceptions.HTTPError,
-            ):
-                time.sleep(0.1)
+    def start_faucet() -> None:
+        processes["faucet"] = _popen_process(
+            _faucet_args(vega_path, tmp_vega_home),
+            dir_root=tmp_vega_dir,
+            log_name="faucet",
+        )
 
+    def init_wallet() -> None:
+        # These only touch files in the vegahome, so can run whilst nodes start
         subprocess.run(
             [
                 vega_wallet_path,
@@ -587,6 +731,7 @@ def manage_vega_processes(
             capture_output=True,
         )
 
+    def start_wallet() -> None:
         wallet_args = [
             vega_wallet_path,
             "wallet",
@@ -600,14 +745,13 @@ def manage_vega_processes(
             "--tokens-passphrase-file=" + tmp_vega_home + "/passphrase-file",
         ]
 
-        vegaWalletProcess = _popen_process(
+        processes["wallet"] = _popen_process(
             wallet_args,
             dir_root=tmp_vega_dir,
             log_name="vegawallet",
         )
-        processes["wallet"] = vegaWalletProcess
 
-    if run_with_console:
+    def start_console() -> None:
         env_copy = os.environ.copy()
         env_copy.update(
             {
@@ -621,7 +765,7 @@ def manage_vega_processes(
                 "NX_VEGA_NETWORKS": "{}",
             }
         )
-        console_process = _popen_process(
+        processes["console"] = _popen_process(
             [
                 "yarn",
                 "--cwd",
@@ -637,10 +781,57 @@ def manage_vega_processes(
             log_name="console",
             env=env_copy,
         )
-        processes["console"] = console_process
 
-    # Send process pid values for resource monitoring
-    child_conn.send({name: process.pid for name, process in processes.items()})
+    data_node_deps = ["prepare_home"]
+    stages = [
+        StartupStage("prepare_home", prepare_home),
+        StartupStage("start_core", start_core, ["prepare_home"]),
+        StartupStage("wait_for_core", wait_for_core, ["start_core"]),
+    ]
+    if run_faucet:
+        stages.append(StartupStage("start_faucet", start_faucet, ["wait_for_core"]))
+    if use_docker_postgres:
+        stages.append(StartupStage("start_postgres", start_postgres))
+        data_node_deps.append("start_postgres")
+    stages.append(StartupStage("start_data_node", start_data_node, data_node_deps))
+
+    if run_wallet:
+        stages.extend(
+            [
+                StartupStage(
+                    "wait_for_data_node", wait_for_data_node, ["start_data_node"]
+                ),
+                StartupStage("init_wallet", init_wallet, ["prepare_home"]),
+                StartupStage(
+                    "start_wallet",
+                    start_wallet,
+                    ["init_wallet", "wait_for_core", "wait_for_data_node"],
+                ),
+            ]
+        )
+    if run_with_console:
+        stages.append(StartupStage("start_console", start_console))
+
+    startup_error = None
+    try:
+        stage_timings = run_startup_stages(stages)
+        logger.info(f"NullChain startup stages: {format_stage_timings(stage_timings)}")
+    except StartupStageError as e:
+        logger.exception("Failed starting NullChain processes")
+        startup_error = {STARTUP_FAILED_STAGE: e.stage, STARTUP_ERROR: str(e)}
+
+    use_docker_postgres = "container" in docker_resources
+    data_node_container = docker_resources.get("container")
+    data_node_docker_volume = docker_resources.get("volume")
+
+    if startup_error is not None:
+        # The parent stops this process on receiving the error, which
+        # terminates any processes which did start
+        child_conn.send(startup_error)
+    else:
+        # Send process pid values for resource monitoring
+        child_conn.send({name: process.pid for name, process in processes.items()})
+        child_conn.send({name: t.duration for name, t in stage_timings.items()})
 
     # According to https://docs.oracle.com/cd/E19455-01/806-5257/gen-75415/index.html
     # There is no guarantee that signal will be catch by this thread. Usually the
@@ -712,9 +903,11 @@ def manage_vega_processes(
             logger_.debug(f"Stopping container {data_node_container.name}")
             retry(10, 1.0, kill_docker_container)
 
-            removed = False
-            logger_.debug(f"Removing volume {data_node_docker_volume.name}")
-            for _ in range(20):
+            # Ephemeral containers store data in a tmpfs rather than a volume
+            removed = data_node_docker_volume is None
+            if not removed:
+                logger_.debug(f"Removing volume {data_node_docker_volume.name}")
+            for _ in range(0 if removed else 20):
                 if data_node_container.status == "running":
                     time.sleep(3)
                     continue
@@ -738,6 +931,9 @@ def manage_vega_processes(
                 logger_.exception(
                     "Docker volume failed to cleanup, will require manual cleaning"
                 )
+        # Ephemeral storage lives in memory, so is never retained
+        for storage_dir in ephemeral_storage_dirs:
+            shutil.rmtree(storage_dir, ignore_errors=True)
         if not retain_log_files and os.path.exists(tmp_vega_dir):
             shutil.rmtree(tmp_vega_dir)
 
@@ -759,6 +955,7 @@ def manage_vega_processes(
 
 class VegaServiceNull(VegaService):
     PORT_TO_FIELD_MAP = {
+        Ports.BROKER: "broker_port",
         Ports.CONSOLE: "console_port",
         Ports.CORE_GRPC: "vega_node_grpc_port",
         Ports.CORE_REST: "vega_node_rest_port",
@@ -768,6 +965,7 @@ class VegaServiceNull(VegaService):
         Ports.DATA_NODE_REST: "data_node_rest_port",
         Ports.FAUCET: "faucet_port",
         Ports.METRICS: "metrics_port",
+        Ports.PPROF: "pprof_port",
         Ports.VEGA_NODE: "vega_node_port",
         Ports.WALLET: "wallet_port",
     }
@@ -794,7 +992,14 @@ class VegaServiceNull(VegaService):
         check_for_binaries: bool = False,
         genesis_time: Optional[datetime.datetime] = None,
         custom_vega_home_path: Optional[str] = None,
+        ephemeral_data_node: bool = False,
+        headless: bool = False,
     ):
+        if headless and (use_full_vega_wallet or run_with_console):
+            raise ValueError(
+                "A headless VegaServiceNull runs only core and data-node, so cannot"
+                " use the full vega wallet or console"
+            )
         super().__init__(
             can_control_time=True,
             warn_on_raw_data_access=warn_on_raw_data_access,
@@ -813,10 +1018,13 @@ class VegaServiceNull(VegaService):
             vega_bin_path, "console"
         )
         self.proc = None
+        self.queue = None
         self.run_with_console = run_with_console
         self.run_wallet_with_token_dapp = run_wallet_with_token_dapp
         self.genesis_time = genesis_time
         self.custom_vega_home_path = custom_vega_home_path
+        self.ephemeral_data_node = ephemeral_data_node
+        self.headless = headless
 
         self.transactions_per_block = transactions_per_block
         self.seconds_per_block = seconds_per_block
@@ -833,6 +1041,9 @@ class VegaServiceNull(VegaService):
 
         self.stopped = False
         self.logger_p = None
+        self.startup_timings: Dict[str, float] = {}
+        self._port_reservation: Optional[PortBlockReservation] = None
+        self.process_pids: Dict[str, int] = {}
 
         self._assign_ports(port_config)
 
@@ -877,6 +1088,7 @@ class VegaServiceNull(VegaService):
 
     def _generate_port_config(self) -> Dict[Ports, int]:
         return {
+            Ports.BROKER: self.broker_port,
             Ports.CONSOLE: self.console_port,
             Ports.CORE_GRPC: self.vega_node_grpc_port,
             Ports.CORE_REST: self.vega_node_rest_port,
@@ -886,13 +1098,15 @@ class VegaServiceNull(VegaService):
             Ports.DATA_NODE_REST: self.data_node_rest_port,
             Ports.FAUCET: self.faucet_port,
             Ports.METRICS: self.metrics_port,
+            Ports.PPROF: self.pprof_port,
             Ports.VEGA_NODE: self.vega_node_port,
             Ports.WALLET: self.wallet_port,
         }
 
-    # set ports from port_config or alternatively find a free port
-    # to use
+    # set ports from port_config or alternatively take them from a block of
+    # ports reserved for this instance
     def _assign_ports(self, port_config: Optional[Dict[Ports, int]]):
+        self.broker_port = 0
         self.console_port = 0
         self.data_node_grpc_port = 0
         self.data_node_metrics_port = 0
@@ -900,21 +1114,43 @@ class VegaServiceNull(VegaService):
         self.data_node_rest_port = 0
         self.faucet_port = 0
         self.metrics_port = 0
+        self.pprof_port = 0
         self.vega_node_grpc_port = 0
         self.vega_node_port = 0
         self.vega_node_rest_port = 0
         self.wallet_port = 0
 
+        port_config = port_config if port_config is not None else {}
+        missing = [key for key in self.PORT_TO_FIELD_MAP if key not in port_config]
+        free_ports = iter([])
+        if missing:
+            fixed_ports = set(port_config.values())
+            try:
+                self._port_reservation = reserve_port_block(
+                    len(missing) + len(fixed_ports)
+                )
+                free_ports = (
+                    port
+                    for port in self._port_reservation.ports
+                    if port not in fixed_ports
+                )
+            except PortBlockUnavailableError as e:
+                logger.warning(f"{e}. Falling back to finding ports individually.")
+
         for key, name in self.PORT_TO_FIELD_MAP.items():
-            if port_config is not None and key in port_config:
+            if key in port_config:
                 setattr(self, name, port_config[key])
-            else:
+                continue
+            port = next(free_ports, None)
+            if port is None:
                 curr_ports = set(
                     [getattr(self, port) for port in self.PORT_TO_FIELD_MAP.values()]
                 )
-                setattr(self, name, find_free_port(curr_ports))
+                port = find_free_port(curr_ports)
+            setattr(self, name, port)
 
     def start(self, block_on_startup: bool = True) -> None:
+        start_time = time.perf_counter()
         if self.check_for_binaries and not self._using_all_custom_paths:
             download_binaries()
         parent_conn, child_conn = multiprocessing.Pipe()
@@ -941,6 +1177,7 @@ class VegaServiceNull(VegaService):
                 "transactions_per_block": self.transactions_per_block,
                 "block_duration": f"{int(self.seconds_per_block)}s",
                 "run_wallet": self._use_full_vega_wallet,
+                "run_faucet": not self.headless,
                 "retain_log_files": self.retain_log_files,
                 "log_dir": self.log_dir,
                 "store_transactions": self.store_transactions,
@@ -948,6 +1185,7 @@ class VegaServiceNull(VegaService):
                 "log_level": logging.getLogger().level,
                 "genesis_time": self.genesis_time,
                 "custom_vega_home_path": self.custom_vega_home_path,
+                "ephemeral_data_node": self.ephemeral_data_node,
             },
         )
         self.proc.start()
@@ -959,9 +1197,13 @@ class VegaServiceNull(VegaService):
             )
 
         if block_on_startup:
-            # Wait for startup
+            # Wait for startup, failing as soon as the process manager reports
+            # a failed stage
             started = False
+            process_pids = None
             for _ in range(500):
+                if process_pids is None and parent_conn.poll():
+                    process_pids = self._receive_startup_message(parent_conn)
                 try:
                     channel = grpc.insecure_channel(
                         self.data_node_grpc_url,
@@ -984,9 +1226,10 @@ class VegaServiceNull(VegaService):
                     requests.get(
                         f"http://localhost:{self.vega_node_rest_port}/blockchain/height"
                     ).raise_for_status()
-                    requests.get(
-                        f"http://localhost:{self.faucet_port}/api/v1/health"
-                    ).raise_for_status()
+                    if not self.headless:
+                        requests.get(
+                            f"http://localhost:{self.faucet_port}/api/v1/health"
+                        ).raise_for_status()
 
                     if self._use_full_vega_wallet:
                         requests.get(
@@ -1004,14 +1247,32 @@ class VegaServiceNull(VegaService):
                 ):
                     time.sleep(0.1)
             if not started:
+                if process_pids is None and parent_conn.poll():
+                    self._receive_startup_message(parent_conn)
                 self.stop()
                 raise VegaStartupTimeoutError(
                     "Timed out waiting for Vega simulator to start up"
                 )
 
+            services_ready_time = time.perf_counter()
+
             # TODO: Remove this once datanode fixes up startup timing
             time.sleep(6)
-            self.process_pids = parent_conn.recv()
+            self.process_pids = (
+                process_pids
+                if process_pids is not None
+                else self._receive_startup_message(parent_conn)
+            )
+            self.startup_timings = parent_conn.recv()
+            self.startup_timings["services_ready"] = services_ready_time - start_time
+            if self.headless:
+                logger.info(
+                    "Headless NullChain process memory (MB): "
+                    + ", ".join(
+                        f"{name}: {rss / 1e6:.0f}"
+                        for name, rss in self.process_rss().items()
+                    )
+                )
 
         if self.run_with_console:
             webbrowser.open(f"http://localhost:{port_config[Ports.CONSOLE]}/", new=2)
@@ -1030,11 +1291,76 @@ class VegaServiceNull(VegaService):
         self.data_cache
         self.wallet.create_key(wallet_name=self.WALLET_NAME, name=self.KEY_NAME)
 
+    def top_up_treasury(self, asset_id: str) -> None:
+        if not self.headless:
+            return super().top_up_treasury(asset_id)
+
+        # Headless instances have no long running faucet. Treasury top-ups mint
+        # the asset's maximum faucet amount, so are rare enough that a faucet is
+        # started just for the top-up and stopped again afterwards.
+        faucet_proc = _popen_process(
+            _faucet_args(self.vega_path, path.join(self.log_dir, "vegahome")),
+            dir_root=self.log_dir,
+            log_name="faucet",
+        )
+        try:
+            wait_for_port(self.faucet_port, timeout=STARTUP_TIMEOUT)
+            wait_for_ready(
+                functools.partial(
+                    _check_rest_endpoint, f"{self.faucet_url}/api/v1/health"
+                ),
+                timeout=STARTUP_TIMEOUT,
+                exceptions=_NOT_READY_EXCEPTIONS,
+            )
+            super().top_up_treasury(asset_id)
+        finally:
+            faucet_proc.terminate()
+            faucet_proc.wait()
+
+    def process_rss(self) -> Dict[str, int]:
+        """Resident memory of each process making up this instance, in bytes.
+
+        Memory of child processes (e.g. embedded postgres under the data-node) is
+        included with their parent. The Python process running the service is
+        reported as "python", and the sum of everything as "total".
+        """
+        pids = dict(self.process_pids)
+        pids["python"] = os.getpid()
+
+        rss = {}
+        for name, pid in pids.items():
+            rss[name] = 0
+            try:
+                proc = psutil.Process(pid)
+                procs = [proc]
+                if name != "python":
+                    procs.extend(proc.children(recursive=True))
+            except psutil.NoSuchProcess:
+                continue
+            for p in procs:
+                try:
+                    rss[name] += p.memory_info().rss
+                except psutil.NoSuchProcess:
+                    pass
+        rss["total"] = sum(rss.values())
+        return rss
+
     # Class internal as at some point the host may vary as well as the port
     @staticmethod
     def _build_url(port: int, prefix: str = "http://"):
         return f"{prefix}localhost:{port}"
 
+    def _receive_startup_message(self, conn) -> Dict[str, int]:
+        """Receives the process pids from the process manager, or stops and
+        raises the error it sent if a startup stage failed."""
+        message = conn.recv()
+        if STARTUP_FAILED_STAGE in message:
+            self.stop()
+            raise StartupStageError(
+                message[STARTUP_ERROR], stage=message[STARTUP_FAILED_STAGE]
+            )
+        return message
+
     def stop(self) -> None:
         logger.debug("Calling stop for veganullchain")
         if self.stopped:
@@ -1063,8 +1389,12 @@ class VegaServiceNull(VegaService):
             self.queue.put(None)
             self.logger_p.join()
 
-        if isinstance(self.wallet, SlimWallet):
-            self.wallet.stop()
+        # A wallet which was never created needs no stopping, and creating one
+        # here would wait on a core node which may have failed to start
+        if isinstance(self._wallet, SlimWallet):
+            self._wallet.stop()
+        if self._port_reservation is not None:
+            self._port_reservation.release()
         super().stop()
 
     @property
@@ -1111,4 +1441,6 @@ class VegaServiceNull(VegaService):
             port_config=self._generate_port_config(),
             use_full_vega_wallet=self._use_full_vega_wallet,
             warn_on_raw_data_access=self.warn_on_raw_data_access,
+            ephemeral_data_node=self.ephemeral_data_node,
+            headless=self.headless,
         )
@@ -1,9 +1,13 @@
-import copy
 import csv
 import json
+import logging
+import multiprocessing
 import os
 import pathlib
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
+from itertools import product
 from random import random
 from typing import Any, Dict, List, Optional, Tuple, Union
 
@@ -18,6 +22,12 @@ PARAMETER_AMEND_WALLET = ("param", "amend")
 FILE_PATTERN = "NETP_{param_name}_{param_value}.csv"
 FILE_PATTERN_LOB = "NETP_{param_name}_{param_value}_LOB.csv"
 OUTPUT_DIR = "parameter_results"
+RUN_FILE_PATTERN = "run_{param_value}_{seed}.pkl"
+
+logger = logging.getLogger(__name__)
+
+# Experiment being run by a worker process, set once when the worker starts
+_WORKER_EXPERIMENT: Optional["SingleParameterExperiment"] = None
 
 
 @dataclass
@@ -63,13 +73,17 @@ def _run_parameter_iteration(
     additional_network_parameters_to_set: Optional[Dict[str, str]] = None,
     additional_market_parameters_to_set: Optional[Dict[str, str]] = None,
     random_state: Optional[np.random.RandomState] = None,
+    vega_service_kwargs: Optional[Dict[str, Any]] = None,
 ) -> Tuple[List[MarketHistoryData], Any]:
     with VegaServiceNull(
-        warn_on_raw_data_access=False,
-        retain_log_files=True,
-        run_with_console=False,
-        transactions_per_block=100,
-        use_full_vega_wallet=False,
+        **{
+            "warn_on_raw_data_access": False,
+            "retain_log_files": True,
+            "run_with_console": False,
+            "transactions_per_block": 100,
+            "use_full_vega_wallet": False,
+            **(vega_service_kwargs or {}),
+        }
     ) as vega:
         vega.create_key(PARAMETER_AMEND_WALLET[0])
         vega.mint(
@@ -79,16 +93,13 @@ def _run_parameter_iteration(
         )
 
         # Update additional network parameters and the parameter to vary if running a
-        # network parameter experiment.
-        if additional_network_parameters_to_set is not None:
-            for param, new_value in additional_network_parameters_to_set.items():
-                vega.update_network_parameter(
-                    PARAMETER_AMEND_WALLET[0], parameter=param, new_value=new_value
-                )
+        # network parameter experiment, all in a single proposal.
+        network_parameters = dict(additional_network_parameters_to_set or {})
         if parameter_type == "network":
-            vega.update_network_parameter(
-                PARAMETER_AMEND_WALLET[0], parameter=parameter_to_vary, new_value=value
-            )
+            network_parameters[parameter_to_vary] = value
+        vega.update_network_parameters(
+            PARAMETER_AMEND_WALLET[0], parameters=network_parameters
+        )
 
         # Create the MarketObject using vega-sim defaults
         market_config = MarketConfig("future")
@@ -108,27 +119,138 @@ def _run_parameter_iteration(
         return (scenario.get_run_data(), scenario.get_additional_run_data())
 
 
+def _run_experiment_iteration(
+    experiment: SingleParameterExperiment,
+    value: str,
+    seed: int,
+    vega_service_kwargs: Optional[Dict[str, Any]] = None,
+) -> Any:
+    _, res = _run_parameter_iteration(
+        parameter_type=experiment.parameter_type,
+        scenario=experiment.scenario,
+        parameter_to_vary=experiment.parameter_to_vary,
+        value=value,
+        random_state=np.random.RandomState(seed),
+        additional_network_parameters_to_set=experiment.additional_network_parameters_to_set,
+        additional_market_parameters_to_set=experiment.additional_market_parameters_to_set,
+        vega_service_kwargs=vega_service_kwargs,
+    )
+    return res
+
+
+def _init_worker(experiment: SingleParameterExperiment) -> None:
+    global _WORKER_EXPERIMENT
+    _WORKER_EXPERIMENT = experiment
+
+
+def _run_worker_iteration(value: str, seed: int) -> Any:
+    return _run_experiment_iteration(_WORKER_EXPERIMENT, value, seed)
+
+
+def _run_file_path(runs_folder: pathlib.Path, value: str, seed: int) -> pathlib.Path:
+    return runs_folder / RUN_FILE_PATTERN.format(
+        param_value=str(value).replace(os.sep, "_"), seed=seed
+    )
+
+
+def _save_run(file_path: pathlib.Path, result: Any) -> None:
+    # Written to a temporary file first so an interrupted write is never mistaken
+    # for a completed run when resuming
+    tmp_path = file_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(result, f)
+    os.replace(tmp_path, file_path)
+
+
 def run_single_parameter_experiment(
     experiment: SingleParameterExperiment,
+    num_workers: int = 1,
+    runs_folder: Optional[str] = None,
+    resume: bool = False,
 ) -> Dict[str, List[Any]]:
-    results = {}
-    random_seeds = [
-        np.random.RandomState(i) for i in range(experiment.runs_per_scenario)
-    ]
-    for value in experiment.values:
-        results[value] = []
-        for state in copy.deepcopy(random_seeds):
-            (_, res) = _run_parameter_iteration(
-                parameter_type=experiment.parameter_type,
-                scenario=experiment.scenario,
-                parameter_to_vary=experiment.parameter_to_vary,
-                value=value,
-                random_state=state,
-                additional_network_parameters_to_set=experiment.additional_network_parameters_to_set,
-                additional_market_parameters_to_set=experiment.additional_market_parameters_to_set,
+    """Runs the experiment's scenario once for every combination of tested value
+    and random seed.
+
+    Args:
+        experiment:
+            SingleParameterExperiment, The experiment to run
+        num_workers:
+            int, default 1, Number of runs to execute at once. Each run happens in
+            its own worker process with its own VegaServiceNull, which reserves
+            its own block of ports, so runs never contend for ports.
+        runs_folder:
+            Optional[str], If set, the result of each run is written to this
+            folder as soon as the run completes
+        resume:
+            bool, default False, Load results already written to runs_folder
+            rather than re-running those (value, seed) pairs
+
+    Returns:
+        Dict[str, List[Any]], For each tested value, the results of each seed
+    """
+    results = {
+        value: [None] * experiment.runs_per_scenario for value in experiment.values
+    }
+    to_run = list(product(experiment.values, range(experiment.runs_per_scenario)))
+
+    if runs_folder is not None:
+        runs_folder = pathlib.Path(runs_folder)
+        os.makedirs(runs_folder, exist_ok=True)
+        if resume:
+            remaining = []
+            for value, seed in to_run:
+                file_path = _run_file_path(runs_folder, value, seed)
+                if file_path.exists():
+                    with open(file_path, "rb") as f:
+                        results[value][seed] = pickle.load(f)
+                else:
+                    remaining.append((value, seed))
+            logger.info(
+                f"Resuming experiment {experiment.name}, {len(to_run) - len(remaining)}"
+                f" of {len(to_run)} runs already complete"
             )
-            results[value].append(res)
+            to_run = remaining
+
+    def _store(value: str, seed: int, result: Any) -> None:
+        results[value][seed] = result
+        if runs_folder is not None:
+            _save_run(_run_file_path(runs_folder, value, seed), result)
+
+    if num_workers <= 1:
+        for value, seed in to_run:
+            _store(value, seed, _run_experiment_iteration(experiment, value, seed))
+        return results
+
+    # Forked workers inherit the experiment, so scenarios holding lambdas or other
+    # unpicklable state can still be run in parallel
+    mp_context = multiprocessing.get_context(
+        "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    )
+    failures = []
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(experiment,),
+    ) as executor:
+        futures = {
+            executor.submit(_run_worker_iteration, value, seed): (value, seed)
+            for value, seed in to_run
+        }
+        for future in as_completed(futures):
+            value, seed = futures[future]
+            try:
+                _store(value, seed, future.result())
+                logger.info(f"Completed run for value {value} with seed {seed}")
+            except Exception as e:
+                logger.exception(f"Run for value {value} with seed {seed} failed")
+                failures.append((value, seed, e))
 
+    if failures:
+        raise RuntimeError(
+            f"{len(failures)} of {len(to_run)} runs failed:"
+            f" {[(value, seed) for value, seed, _ in failures]}"
+        ) from failures[0][2]
     return results
 
 
@@ -1,5 +1,6 @@
 import argparse
 import logging
+import os
 
 import vega_sim.parameter_test.parameter.experiment as experiment
 from vega_sim.parameter_test.parameter.configs import CONFIGS
@@ -9,13 +10,31 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
 
     parser.add_argument("-c", "--config")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=1,
+        type=int,
+        help="Number of scenario runs to execute in parallel",
+    )
+    parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="Skip runs whose results were saved by a previous invocation",
+    )
 
     args = parser.parse_args()
     logging.basicConfig(level=logging.INFO)
     config_map = {c.name: c for c in CONFIGS}
 
     experiment_to_run = config_map[args.config]
-    results = experiment.run_single_parameter_experiment(experiment_to_run)
+    results = experiment.run_single_parameter_experiment(
+        experiment_to_run,
+        num_workers=args.workers,
+        runs_folder=os.path.join(experiment.OUTPUT_DIR, experiment_to_run.name, "runs"),
+        resume=args.resume,
+    )
 
     experiment.output_logs(
         results, experiment_to_run.parameter_to_vary, experiment=experiment_to_run
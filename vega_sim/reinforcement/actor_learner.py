@@ -0,0 +1,279 @@
+"""Actor-learner training for the LearningAgent family.
+
+Rollout workers each run their own VegaServiceNull and a copy of the learning
+agent, repeatedly simulating the market with the latest policy they have been
+sent and streaming the resulting experience back. Meanwhile the learner adds
+that experience to its replay buffer, trains on it and periodically publishes
+its weights back to the workers, so neither simulation nor training waits on
+the other.
+
+Workers are spawned rather than forked, so the learning agent is built in each
+worker from a picklable factory, e.g. functools.partial(LearningAgentFixedVol,
+**kwargs).
+"""
+
+import logging
+import multiprocessing
+import queue
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+import torch.nn as nn
+
+from vega_sim.reinforcement.agents.learning_agent import LearningAgent
+
+logger = logging.getLogger(__name__)
+
+AgentFactory = Callable[[], LearningAgent]
+
+
+def policy_state_dict(agent: LearningAgent) -> Dict[str, Dict[str, torch.Tensor]]:
+    """Weights of each of the agent's networks, on the CPU."""
+    return {
+        name: {k: v.detach().cpu() for k, v in module.state_dict().items()}
+        for name, module in vars(agent).items()
+        if isinstance(module, nn.Module)
+    }
+
+
+def load_policy_state_dict(
+    agent: LearningAgent, state: Dict[str, Dict[str, torch.Tensor]]
+) -> None:
+    for name, module_state in state.items():
+        getattr(agent, name).load_state_dict(module_state)
+
+
+def _latest(weights_queue) -> Optional[Any]:
+    latest = None
+    while True:
+        try:
+            latest = weights_queue.get_nowait()
+        except queue.Empty:
+            return latest
+
+
+def _rollout_worker(
+    worker_id: int,
+    agent_factory: AgentFactory,
+    weights_queue,
+    experience_queue,
+    stop,
+    market_name: str,
+    asset_name: str,
+    recreate_vega_every_n_iterations: int,
+    seed: int,
+) -> None:
+    from vega_sim.null_service import VegaServiceNull
+    from vega_sim.reinforcement.helpers import set_seed
+    from vega_sim.reinforcement.run_rl_agent import run_iteration
+
+    set_seed(seed)
+    # The learner has the cores for training, each worker only needs one
+    torch.set_num_threads(1)
+    agent = agent_factory()
+    version = -1
+    step_tag = 0
+    try:
+        while not stop.is_set():
+            with VegaServiceNull(
+                warn_on_raw_data_access=False,
+                run_with_console=False,
+                retain_log_files=True,
+                store_transactions=True,
+            ) as vega:
+                for _ in range(recreate_vega_every_n_iterations):
+                    if stop.is_set():
+                        break
+                    published = _latest(weights_queue)
+                    if published is not None:
+                        version, weights = published
+                        load_policy_state_dict(agent, weights)
+                        agent.lerningIteration = version
+
+                    start = time.time()
+                    result = run_iteration(
+                        learning_agent=agent,
+                        step_tag=step_tag,
+                        vega=vega,
+                        market_name=market_name,
+                        asset_name=asset_name,
+                        update_memory=False,
+                    )
+                    experience_queue.put(
+                        ("result", worker_id, version, time.time() - start, result)
+                    )
+                    step_tag += 1
+    except Exception:
+        logger.exception(f"Rollout worker {worker_id} failed")
+        experience_queue.put(("error", worker_id, version, 0, None))
+
+
+@dataclass
+class ActorLearnerStats:
+    rollouts: int = 0
+    learning_steps: int = 0
+    failed_workers: int = 0
+    rollout_seconds: List[float] = field(default_factory=list)
+    policy_lag: List[int] = field(default_factory=list)
+    learning_seconds: List[float] = field(default_factory=list)
+
+
+class ActorLearnerTrainer:
+    def __init__(
+        self,
+        learning_agent: LearningAgent,
+        agent_factory: AgentFactory,
+        market_name: str,
+        asset_name: str,
+        num_workers: int = 2,
+        publish_every_n_steps: int = 1,
+        min_rollouts_per_step: int = 1,
+        recreate_vega_every_n_iterations: int = 100,
+        results_dir: Optional[str] = None,
+        seed: int = 1,
+    ):
+        """Trains a learning agent on experience from parallel rollout workers.
+
+        Args:
+            learning_agent:
+                LearningAgent, The agent to train, in this process
+            agent_factory:
+                AgentFactory, Picklable function building an agent of the same
+                type for each worker to run rollouts with
+            market_name:
+                str, Name of the market to simulate
+            asset_name:
+                str, Settlement asset of the market
+            num_workers:
+                int, default 2, Number of rollout workers, each with its own
+                nullchain
+            publish_every_n_steps:
+                int, default 1, Learning steps between sending the learner's
+                weights to the workers
+            min_rollouts_per_step:
+                int, default 1, Rollouts to wait for before each learning
+                step. Any further rollouts which have already arrived are
+                added too.
+            recreate_vega_every_n_iterations:
+                int, default 100, Rollouts each worker runs before restarting
+                its nullchain
+            results_dir:
+                Optional[str], If set, the agent is saved here after each
+                learning step
+            seed:
+                int, default 1, Base random seed. Worker i is seeded with
+                seed + i + 1.
+        """
+        self.learning_agent = learning_agent
+        self.agent_factory = agent_factory
+        self.market_name = market_name
+        self.asset_name = asset_name
+        self.num_workers = num_workers
+        self.publish_every_n_steps = publish_every_n_steps
+        self.min_rollouts_per_step = min_rollouts_per_step
+        self.recreate_vega_every_n_iterations = recreate_vega_every_n_iterations
+        self.results_dir = results_dir
+        self.seed = seed
+
+        self.stats = ActorLearnerStats()
+        self._version = 0
+        self._workers = []
+        self._ctx = multiprocessing.get_context("spawn")
+
+    def _publish(self, weights_queues) -> None:
+        weights = policy_state_dict(self.learning_agent)
+        for weights_queue in weights_queues:
+            weights_queue.put((self._version, weights))
+
+    def _ingest(self, experience_queue, min_rollouts: int) -> int:
+        """Adds worker experience to the learner's memory, blocking until at
+        least min_rollouts have arrived."""
+        received = 0
+        while True:
+            try:
+                if received < min_rollouts:
+                    message = experience_queue.get(timeout=1)
+                else:
+                    message = experience_queue.get_nowait()
+            except queue.Empty:
+                if received >= min_rollouts:
+                    return received
+                if self.stats.failed_workers >= self.num_workers or not any(
+                    w.is_alive() for w in self._workers
+                ):
+                    raise RuntimeError("All rollout workers have failed")
+                continue
+
+            kind, worker_id, version, seconds, result = message
+            if kind == "error":
+                self.stats.failed_workers += 1
+                logger.error(f"Rollout worker {worker_id} stopped after an error")
+                continue
+            self.learning_agent.update_memory(result)
+            self.stats.rollouts += 1
+            self.stats.rollout_seconds.append(seconds)
+            self.stats.policy_lag.append(self._version - version)
+            received += 1
+
+    def run(self, max_learning_steps: int) -> ActorLearnerStats:
+        """Starts the workers and runs max_learning_steps learning steps."""
+        experience_queue = self._ctx.Queue()
+        weights_queues = [self._ctx.Queue() for _ in range(self.num_workers)]
+        stop = self._ctx.Event()
+
+        self.learning_agent.move_to_cpu()
+        self._publish(weights_queues)
+        self._workers = workers = [
+            self._ctx.Process(
+                target=_rollout_worker,
+                args=(
+                    i,
+                    self.agent_factory,
+                    weights_queues[i],
+                    experience_queue,
+                    stop,
+                    self.market_name,
+                    self.asset_name,
+                    self.recreate_vega_every_n_iterations,
+                    self.seed + i + 1,
+                ),
+                daemon=True,
+            )
+            for i in range(self.num_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            for step in range(max_learning_steps):
+                self._ingest(experience_queue, self.min_rollouts_per_step)
+                start = time.time()
+                self.learning_agent.learning_step(results_dir=self.results_dir)
+                self.stats.learning_seconds.append(time.time() - start)
+                self.stats.learning_steps += 1
+
+                if (step + 1) % self.publish_every_n_steps == 0:
+                    self._version += 1
+                    self._publish(weights_queues)
+                logger.info(
+                    f"Learning step {step + 1}/{max_learning_steps} took"
+                    f" {self.stats.learning_seconds[-1]:.1f}s with"
+                    f" {len(self.learning_agent.memory)} transitions from"
+                    f" {self.stats.rollouts} rollouts"
+                )
+        finally:
+            stop.set()
+            deadline = time.time() + 600
+            while any(w.is_alive() for w in workers) and time.time() < deadline:
+                # Keep draining so workers are not blocked putting results
+                try:
+                    experience_queue.get(timeout=1)
+                except queue.Empty:
+                    pass
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+        return self.stats
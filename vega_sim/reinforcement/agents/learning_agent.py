@@ -1,6 +1,6 @@
 from abc import abstractmethod
 from collections import defaultdict, namedtuple
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -12,8 +12,9 @@ from vega_protos.protos.vega import markets as markets_protos
 from vega_sim.reinforcement.la_market_state import (
     AbstractAction,
     LAMarketState,
-    states_to_sarsa,
+    states_to_sarsa_arrays,
 )
+from vega_sim.reinforcement.replay_buffer import FieldSpec, ReplayBuffer
 
 WalletConfig = namedtuple("WalletConfig", ["name", "passphrase"])
 
@@ -46,6 +47,7 @@ class LearningAgent(StateAgentWithWallet):
         position_decimals: int,
         asset_name: str,
         inventory_penalty: float = 0.0,
+        memory_dir: Optional[str] = None,
     ):
         super().__init__(key_name=key_name)
 
@@ -56,8 +58,10 @@ class LearningAgent(StateAgentWithWallet):
         self.discount_factor = discount_factor
         self.initial_balance = initial_balance
 
-        self.memory = defaultdict(list)
         self.memory_capacity = 100_000
+        # Created on first use, as the state dimension is set by subclasses
+        self._memory: Optional[ReplayBuffer] = None
+        self.memory_dir = memory_dir
 
         # Coefficients for regularisation
         self.coefH_discr = 1.0
@@ -119,31 +123,59 @@ class LearningAgent(StateAgentWithWallet):
         )
         self.vega.wait_fn(2)
 
-    def _update_memory(
-        self,
-        state: LAMarketState,
-        action: AbstractAction,
-        reward: float,
-        next_state: LAMarketState,
-    ):
+    @property
+    def memory(self) -> ReplayBuffer:
+        if self._memory is None:
+            self._memory = ReplayBuffer(
+                fields=self.memory_fields(),
+                capacity=self.memory_capacity,
+                memmap_dir=self.memory_dir,
+            )
+        return self._memory
+
+    @memory.setter
+    def memory(self, memory: Union[ReplayBuffer, Dict[str, list]]):
+        if isinstance(memory, ReplayBuffer) and memory.memmap_dir == self.memory_dir:
+            self._memory = memory
+            return
+        # Copied into a buffer of this agent's own, e.g. for memory saved as
+        # lists of transitions by earlier versions, or saved without memmap
+        self._memory = None
+        self.memory.extend(**{k: np.asarray(memory[k]) for k in memory.keys()})
+
+    def memory_fields(self) -> Dict[str, FieldSpec]:
+        """Fields stored for each (s,a,r,s) transition. Subclasses add the fields
+        returned by actions_to_arrays."""
+        return {
+            "state": ((self.state_dim,), np.float32),
+            "reward": ((1,), np.float32),
+            "next_state": ((self.state_dim,), np.float32),
+        }
+
+    @abstractmethod
+    def actions_to_arrays(self, actions: List[AbstractAction]) -> Dict[str, np.ndarray]:
+        """Converts actions to the action fields of memory_fields, one row per
+        action."""
         pass
 
     def update_memory(self, states: List[Tuple[LAMarketState, AbstractAction]]):
         """
-        Updates memory of the agent, and removes old tuples (s,a,r,s) if memory exceeds its capacity
+        Updates memory of the agent. Once the memory is full the oldest tuples
+        (s,a,r,s) are overwritten.
         """
-        for res in states_to_sarsa(states, inventory_penalty=self.inventory_penalty):
-            self._update_memory(res[0], res[1], res[2], res[3])
-        # remove old tuples if memory exceeds its capaciy
-        for key, value in self.memory.items():
-            if len(self.memory[key]) > self.memory_capacity:
-                first_n = len(self.memory[key]) - self.memory_capacity
-                del self.memory[key][:first_n]
+        sarsa = states_to_sarsa_arrays(states, inventory_penalty=self.inventory_penalty)
+        if len(sarsa.reward) == 0:
+            return 0
+        self.memory.extend(
+            state=sarsa.state,
+            reward=sarsa.reward,
+            next_state=sarsa.next_state,
+            **self.actions_to_arrays(sarsa.action),
+        )
         return 0
 
     def clear_memory(self):
-        for key in self.memory.keys():
-            self.memory[key].clear()
+        self.memory.clear()
 
     @abstractmethod
     def create_dataloader(self, batch_size):
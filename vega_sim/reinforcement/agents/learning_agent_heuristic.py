@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 import numpy as np
 from collections import namedtuple, defaultdict
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 import os
 from functools import partial
 from tqdm import tqdm
@@ -10,6 +10,7 @@ import torch
 import torch.nn as nn
 from torch.distributions.categorical import Categorical
 from vega_sim.reinforcement.agents.learning_agent import AbstractAction, LearningAgent
+from vega_sim.reinforcement.replay_buffer import FieldSpec
 
 import pickle
 
@@ -71,6 +72,7 @@ class LearningAgentHeuristic(LearningAgent):
         initial_balance: int,
         position_decimals: int,
         inventory_penalty: float = 1.0,
+        memory_dir: Optional[str] = None,
     ):
         super().__init__(
             device=device,
@@ -84,6 +86,7 @@ class LearningAgentHeuristic(LearningAgent):
             initial_balance=initial_balance,
             position_decimals=position_decimals,
             inventory_penalty=inventory_penalty,
+            memory_dir=memory_dir,
         )
         self.volume = 10 ** (-self.position_decimals)
 
@@ -111,66 +114,30 @@ class LearningAgentHeuristic(LearningAgent):
     def move_to_cpu(self):
         self.q_func.to("cpu")
 
-    def _update_memory(
-        self,
-        state: LAMarketState,
-        action: Action,
-        reward: float,
-        next_state: LAMarketState,
-    ):
-        """
-        Ensure what is the input?
-        """
-        self.memory["state"].append(state.to_array())
+    def memory_fields(self) -> Dict[str, FieldSpec]:
+        return {
+            **super().memory_fields(),
+            "action_discrete": ((1,), np.int64),
+        }
+
+    def actions_to_arrays(self, actions: List[Action]) -> Dict[str, np.ndarray]:
         # action_discrete = 0 if sell
         # action_discrete = 1 if buy
         # action_discrete = 2 if they do not do anything
-        if action.sell:
-            self.memory["action_discrete"].append([0])
-        elif action.buy:
-            self.memory["action_discrete"].append([1])
-        else:
-            self.memory["action_discrete"].append([2])
-
-        self.memory["reward"].append([reward])
-        if next_state is not np.nan:
-            self.memory["next_state"].append(next_state.to_array())
-        else:
-            self.memory["next_state"].append(np.nan * np.ones_like(state.to_array()))
-
-        return 0
+        action_discrete = np.array(
+            [0 if a.sell else (1 if a.buy else 2) for a in actions], dtype=np.int64
+        )
+        return {"action_discrete": action_discrete.reshape(-1, 1)}
 
     def create_dataloader(self, batch_size):
         """
         creates dataset and dataloader for training.
         """
-        to_torch_device = partial(to_torch, device=self.device)
-        dataset_state = apply_funcs(
-            value=self.memory["state"], funcs=(np.stack, to_torch_device)
-        )
-        dataset_action_discrete = apply_funcs(
-            value=self.memory["action_discrete"],
-            funcs=(np.array, partial(to_torch, dtype=torch.int64, device=self.device)),
-        )
-        dataset_reward = apply_funcs(
-            value=self.memory["reward"], funcs=(np.array, to_torch_device)
-        )
-        dataset_next_state = apply_funcs(
-            value=self.memory["next_state"], funcs=(np.stack, to_torch_device)
-        )
-
-        dataset = torch.utils.data.TensorDataset(
-            *(
-                dataset_state,
-                dataset_action_discrete,
-                dataset_reward,
-                dataset_next_state,
-            )
-        )
-        dataloader = torch.utils.data.DataLoader(
-            dataset, batch_size=batch_size, shuffle=True
+        return self.memory.loader(
+            fields=("state", "action_discrete", "reward", "next_state"),
+            batch_size=batch_size,
+            device=self.device,
         )
-        return dataloader
 
     def empty_action(self) -> AbstractAction:
         return Action(False, False)
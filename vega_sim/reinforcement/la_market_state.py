@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, NamedTuple, Tuple
 import numpy as np
 
 
@@ -104,3 +104,71 @@ def states_to_sarsa(
         reward -= inventory_penalty * pres_state[0].position * pres_state[0].position
         res.append((pres_state[0], pres_state[1], reward, next_state[0], next_state[1]))
     return res
+
+
+def states_to_array(states: List[LAMarketState]) -> np.ndarray:
+    """Equivalent to stacking LAMarketState.to_array for each state, but with the
+    normalisation done for all states at once."""
+    arr = np.array(
+        [
+            [
+                s.step,
+                s.position,
+                s.full_balance,
+                int(s.market_in_auction),
+                s.trading_fee,
+                s.next_price,
+            ]
+            + list(s.bid_prices)
+            + list(s.ask_prices)
+            + list(s.bid_volumes)
+            + list(s.ask_volumes)
+            for s in states
+        ],
+        dtype=float,
+    )
+    arr = np.nan_to_num(arr)
+    arr /= np.maximum(np.linalg.norm(arr, axis=1, keepdims=True), 1e-12)
+    return arr
+
+
+class SarsaArrays(NamedTuple):
+    state: np.ndarray
+    action: List[AbstractAction]
+    reward: np.ndarray
+    next_state: np.ndarray
+    next_action: List[AbstractAction]
+
+
+def states_to_sarsa_arrays(
+    states: List[Tuple[LAMarketState, AbstractAction]],
+    inventory_penalty: float = 0.0,
+) -> SarsaArrays:
+    """Vectorised states_to_sarsa, with states in their to_array form.
+
+    Each state is converted to an array once, rather than once as the present
+    state and again as the next state.
+    """
+    if len(states) < 2:
+        return SarsaArrays(np.zeros((0, 0)), [], np.zeros(0), np.zeros((0, 0)), [])
+    market_states = [s[0] for s in states]
+    actions = [s[1] for s in states]
+    balance = np.array([s.full_balance for s in market_states], dtype=float)
+    position = np.array([s.position for s in market_states], dtype=float)
+
+    reward = np.diff(balance) - inventory_penalty * position[:-1] ** 2
+    # Stop at the first transition into bankruptcy
+    bankrupt = np.flatnonzero(balance[1:] <= 0)
+    num = bankrupt[0] + 1 if len(bankrupt) else len(states) - 1
+    reward = reward[:num]
+    if len(bankrupt):
+        reward[-1] = -1e12
+
+    arr = states_to_array(market_states[: num + 1])
+    return SarsaArrays(
+        state=arr[:-1],
+        action=actions[:num],
+        reward=reward,
+        next_state=arr[1:],
+        next_action=actions[1 : num + 1],
+    )
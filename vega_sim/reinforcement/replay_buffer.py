@@ -0,0 +1,223 @@
+"""Fixed size experience memory for the learning agents.
+
+Each field of a transition (state, action, reward etc.) is a preallocated NumPy
+array used as a circular buffer, so adding experience is a slice assignment
+rather than growing Python lists, and training batches are gathered from the
+arrays directly. For long histories the arrays can be memory mapped files.
+"""
+
+import os
+import queue
+import threading
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+FieldSpec = Tuple[Tuple[int, ...], np.dtype]
+
+
+class ReplayBuffer:
+    def __init__(
+        self,
+        fields: Dict[str, FieldSpec],
+        capacity: int,
+        memmap_dir: Optional[str] = None,
+    ):
+        """Circular buffer holding the most recent capacity transitions.
+
+        Args:
+            fields:
+                Dict[str, FieldSpec], Shape of a single entry and dtype of
+                each field, e.g. {"state": ((state_dim,), np.float32)}
+            capacity:
+                int, Maximum number of transitions held. Once full, new
+                transitions overwrite the oldest.
+            memmap_dir:
+                Optional[str], If set, each field is stored in a memory mapped
+                file in this directory rather than in memory
+        """
+        self.fields = {
+            name: (tuple(shape), np.dtype(dtype))
+            for name, (shape, dtype) in fields.items()
+        }
+        self.capacity = capacity
+        self.memmap_dir = memmap_dir
+        self._size = 0
+        self._head = 0
+        self._arrays = {name: self._allocate(name) for name in self.fields}
+
+    def _allocate(self, name: str) -> np.ndarray:
+        shape, dtype = self.fields[name]
+        if self.memmap_dir is None:
+            return np.zeros((self.capacity,) + shape, dtype=dtype)
+        os.makedirs(self.memmap_dir, exist_ok=True)
+        return np.lib.format.open_memmap(
+            os.path.join(self.memmap_dir, f"{name}.npy"),
+            mode="w+",
+            dtype=dtype,
+            shape=(self.capacity,) + shape,
+        )
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Returns the stored entries of a field, oldest first."""
+        arr = self._arrays[name]
+        if self._size < self.capacity:
+            return arr[: self._size]
+        return np.concatenate([arr[self._head :], arr[: self._head]])
+
+    def keys(self):
+        return self.fields.keys()
+
+    def extend(self, **values: np.ndarray) -> None:
+        """Adds a batch of transitions, one row per transition in each field."""
+        if set(values) != set(self.fields):
+            raise ValueError(
+                f"Expected values for {sorted(self.fields)}, got {sorted(values)}"
+            )
+        num = len(next(iter(values.values())))
+        if num == 0:
+            return
+        # Only the last capacity transitions would survive anyway
+        skip = max(num - self.capacity, 0)
+        positions = (self._head + skip + np.arange(num - skip)) % self.capacity
+        for name, value in values.items():
+            shape, _ = self.fields[name]
+            self._arrays[name][positions] = np.reshape(value, (num,) + shape)[skip:]
+        self._head = (self._head + num) % self.capacity
+        self._size = min(self._size + num, self.capacity)
+
+    def append(self, **value) -> None:
+        """Adds a single transition."""
+        self.extend(**{name: np.asarray(v)[np.newaxis] for name, v in value.items()})
+
+    def clear(self) -> None:
+        self._size = 0
+        self._head = 0
+
+    def loader(
+        self,
+        fields: Sequence[str],
+        batch_size: int,
+        shuffle: bool = True,
+        device: str = "cpu",
+        prefetch: int = 2,
+    ) -> "PrefetchLoader":
+        return PrefetchLoader(
+            self,
+            fields=fields,
+            batch_size=batch_size,
+            shuffle=shuffle,
+            device=device,
+            prefetch=prefetch,
+        )
+
+    def __getstate__(self):
+        # Memory maps are saved by value, so a pickled buffer is self-contained
+        return {
+            "fields": self.fields,
+            "capacity": self.capacity,
+            "arrays": {name: self[name] for name in self.fields},
+        }
+
+    def __setstate__(self, state):
+        self.__init__(fields=state["fields"], capacity=state["capacity"])
+        self.extend(**state["arrays"])
+
+
+class PrefetchLoader:
+    def __init__(
+        self,
+        buffer: ReplayBuffer,
+        fields: Sequence[str],
+        batch_size: int,
+        shuffle: bool = True,
+        device: str = "cpu",
+        prefetch: int = 2,
+    ):
+        """Iterates over a replay buffer in batches of tensors, preparing the next
+        batches in a background thread while the current one is trained on.
+
+        Each iteration is one pass over the transitions held when it started.
+
+        Args:
+            buffer:
+                ReplayBuffer, The buffer to load from
+            fields:
+                Sequence[str], Fields to return, in order, for each batch
+            batch_size:
+                int, Number of transitions per batch
+            shuffle:
+                bool, default True, Visit the transitions in a random order
+            device:
+                str, default "cpu", Device to place the tensors on
+            prefetch:
+                int, default 2, Number of batches to prepare ahead
+        """
+        self.buffer = buffer
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.device = device
+        self.prefetch = prefetch
+
+    def __len__(self) -> int:
+        return -(-len(self.buffer) // self.batch_size)
+
+    def _batch(self, arrays: Dict[str, np.ndarray], indices: np.ndarray):
+        pin = torch.device(self.device).type == "cuda"
+        batch = []
+        for name in self.fields:
+            tensor = torch.from_numpy(np.ascontiguousarray(arrays[name][indices]))
+            if pin:
+                tensor = tensor.pin_memory()
+            batch.append(tensor.to(self.device, non_blocking=pin))
+        return tuple(batch)
+
+    def _produce(self, out: queue.Queue, stop: threading.Event, num_rows: int) -> None:
+        try:
+            arrays = {name: self.buffer._arrays[name] for name in self.fields}
+            order = np.random.permutation(num_rows) if self.shuffle else None
+            for start in range(0, num_rows, self.batch_size):
+                if stop.is_set():
+                    return
+                if order is not None:
+                    indices = np.sort(order[start : start + self.batch_size])
+                else:
+                    indices = np.arange(start, min(start + self.batch_size, num_rows))
+                    # Oldest first once the buffer has wrapped
+                    if num_rows == self.buffer.capacity:
+                        indices = (indices + self.buffer._head) % num_rows
+                out.put(self._batch(arrays, indices))
+        except Exception as e:
+            out.put(e)
+        finally:
+            out.put(None)
+
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, ...]]:
+        out = queue.Queue(maxsize=max(self.prefetch, 1))
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(out, stop, len(self.buffer)), daemon=True
+        )
+        producer.start()
+        try:
+            while True:
+                batch = out.get()
+                if batch is None:
+                    return
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            stop.set()
+            # Unblock the producer if it is waiting on a full queue
+            while producer.is_alive():
+                try:
+                    out.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
@@ -2,11 +2,13 @@ import time
 import argparse
 import logging
 import os
+from functools import partial
 from logging import getLogger
 
 import torch
 
 from vega_sim.null_service import VegaServiceNull
+from vega_sim.reinforcement.actor_learner import ActorLearnerTrainer
 from vega_sim.reinforcement.agents.learning_agent import WALLET as LEARNING_WALLET
 from vega_sim.reinforcement.agents.learning_agent import LearningAgent, state_fn
 from vega_sim.reinforcement.agents.learning_agent_heuristic import (
@@ -32,6 +34,7 @@ def run_iteration(
     asset_name: str,
     run_with_console=False,
     pause_at_completion=False,
+    update_memory: bool = True,
 ):
     scenario = CurveMarketMaker(
         market_decimal=3,
@@ -80,7 +83,8 @@ def run_iteration(
     result = scenario.get_additional_run_data()
 
     # Update the memory of the learning agent with the simulated data
-    learning_agent.update_memory(result)
+    if update_memory:
+        learning_agent.update_memory(result)
 
     return result
 
@@ -93,6 +97,7 @@ def _run(
     plot_every_step: bool = False,
     device: str = "cpu",
     recreate_vega_every_n_iterations: int = 100,
+    num_rollout_workers: int = 0,
 ):
     # set seed for results replication
     set_seed(1)
@@ -110,7 +115,8 @@ def _run(
     logfile_pnl = os.path.join(results_dir, "learning_pnl.csv")
 
     # create the Learning Agent
-    learning_agent = LearningAgentFixedVol(
+    agent_factory = partial(
+        LearningAgentFixedVol,
         device=device,
         logfile_pol_imp=logfile_pol_imp,
         logfile_pol_eval=logfile_pol_eval,
@@ -124,6 +130,7 @@ def _run(
         inventory_penalty=0.1,
         asset_name=asset_name,
     )
+    learning_agent = agent_factory()
 
     if not evaluate_only:
         logger.info(f"Running training for {max_iterations} iterations")
@@ -139,6 +146,29 @@ def _run(
             with open(logfile_pnl, "w") as f:
                 f.write("iteration,pnl\n")
 
+        if num_rollout_workers > 0:
+            trainer = ActorLearnerTrainer(
+                learning_agent=learning_agent,
+                agent_factory=partial(agent_factory, device="cpu"),
+                market_name=market_name,
+                asset_name=asset_name,
+                num_workers=num_rollout_workers,
+                recreate_vega_every_n_iterations=recreate_vega_every_n_iterations,
+                results_dir=results_dir,
+            )
+            stats = trainer.run(max_learning_steps=max_iterations)
+            logger.info(
+                f"Ran {stats.rollouts} rollouts across {num_rollout_workers} workers"
+                f" for {stats.learning_steps} learning steps"
+            )
+            if plot_every_step:
+                plot_learning(
+                    results_dir=results_dir,
+                    logfile_pol_eval=logfile_pol_eval,
+                    logfile_pol_imp=logfile_pol_imp,
+                )
+            return
+
         it = 0
         while it <= max_iterations:
             with VegaServiceNull(
@@ -242,6 +272,15 @@ if __name__ == "__main__":
     parser.add_argument("--resume_training", action="store_true")
     parser.add_argument("--plot_every_step", action="store_true")
     parser.add_argument("--plot_only", action="store_true")
+    parser.add_argument(
+        "--rollout-workers",
+        default=0,
+        type=int,
+        help=(
+            "If set, simulate with this many parallel rollout workers, each with"
+            " its own nullchain, while the learner trains"
+        ),
+    )
 
     args = parser.parse_args()
 
@@ -281,4 +320,5 @@ if __name__ == "__main__":
         plot_every_step=args.plot_every_step,
         device=device,
         recreate_vega_every_n_iterations=1000,
+        num_rollout_workers=args.rollout_workers,
     )
@@ -1,6 +1,8 @@
 from abc import abstractmethod
 from collections import defaultdict, namedtuple
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
 
 
 from vega_sim.environment import VegaState
@@ -8,6 +10,7 @@ from vega_sim.environment.agent import Agent
 from vega_sim.null_service import VegaServiceNull
 
 
+from vega_sim.reinforcement.replay_buffer import FieldSpec, ReplayBuffer
 from vega_sim.reinforcement.v2.states import State
 from vega_sim.reinforcement.v2.agents.puppets import Action
 
@@ -64,6 +67,7 @@ class TorchLearningAgent(LearningAgent):
         logfile_pnl: str,
         discount_factor: float,
         inventory_penalty: float = 0.0,
+        memory_dir: Optional[str] = None,
     ):
         super().__init__()
 
@@ -73,8 +77,10 @@ class TorchLearningAgent(LearningAgent):
         self.device = device
         self.discount_factor = discount_factor
 
-        self.memory = defaultdict(list)
         self.memory_capacity = 100_000
+        # Created on first use, as the state dimension is set by subclasses
+        self._memory: Optional[ReplayBuffer] = None
+        self.memory_dir = memory_dir
 
         # Coefficients for regularisation
         self.coefH_discr = 1.0
@@ -100,6 +106,35 @@ class TorchLearningAgent(LearningAgent):
     def learning_step(self, results_dir: Optional[str] = None):
         pass
 
+    @property
+    def memory(self) -> ReplayBuffer:
+        if self._memory is None:
+            self._memory = ReplayBuffer(
+                fields=self.memory_fields(),
+                capacity=self.memory_capacity,
+                memmap_dir=self.memory_dir,
+            )
+        return self._memory
+
+    @memory.setter
+    def memory(self, memory: Union[ReplayBuffer, Dict[str, list]]):
+        if isinstance(memory, ReplayBuffer) and memory.memmap_dir == self.memory_dir:
+            self._memory = memory
+            return
+        # Copied into a buffer of this agent's own, e.g. for memory saved as
+        # lists of transitions by earlier versions, or saved without memmap
+        self._memory = None
+        self.memory.extend(**{k: np.asarray(memory[k]) for k in memory.keys()})
+
+    def memory_fields(self) -> Dict[str, FieldSpec]:
+        """Fields stored for each (s,a,r,s) transition. Subclasses add the fields
+        for their actions."""
+        return {
+            "state": ((self.state_dim,), np.float32),
+            "reward": ((1,), np.float32),
+            "next_state": ((self.state_dim,), np.float32),
+        }
+
     def _update_memory(
         self,
         state: State,
@@ -110,19 +145,14 @@ class TorchLearningAgent(LearningAgent):
 
     def update_memory(self, state: State, action: Action, reward: float):
         """
-        Updates memory of the agent, and removes old tuples (s,a,r,s) if memory exceeds its capacity
+        Updates memory of the agent. Once the memory is full the oldest tuples
+        (s,a,r,s) are overwritten.
         """
         self._update_memory(state, action, reward)
-        # remove old tuples if memory exceeds its capaciy
-        for key in self.memory.keys():
-            if len(self.memory[key]) > self.memory_capacity:
-                first_n = len(self.memory[key]) - self.memory_capacity
-                del self.memory[key][:first_n]
         return 0
 
     def clear_memory(self):
-        for key in self.memory.keys():
-            self.memory[key].clear()
+        self.memory.clear()
 
     @abstractmethod
     def create_dataloader(self, batch_size):
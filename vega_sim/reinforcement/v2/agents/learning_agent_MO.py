@@ -2,8 +2,7 @@ import os
 import pickle
 from collections import namedtuple
 from dataclasses import dataclass
-from functools import partial
-from typing import Optional
+from typing import Dict, Optional
 
 import numpy as np
 import torch
@@ -11,8 +10,9 @@ import torch.nn as nn
 from torch.distributions.categorical import Categorical
 from tqdm import tqdm
 
-from vega_sim.reinforcement.helpers import apply_funcs, to_torch, toggle
+from vega_sim.reinforcement.helpers import toggle
 from vega_sim.reinforcement.networks import FFN, FFN_fix_fol_Q, Softmax
+from vega_sim.reinforcement.replay_buffer import FieldSpec
 from vega_sim.reinforcement.v2.agents.learning_agent import TorchLearningAgent
 from vega_sim.reinforcement.v2.agents.puppets import (
     MarketOrderAction,
@@ -38,6 +38,7 @@ class LearningAgentFixedVol(TorchLearningAgent):
         discount_factor: float,
         num_levels: int,
         inventory_penalty: float = 1.0,
+        memory_dir: Optional[str] = None,
     ):
         super().__init__(
             device=device,
@@ -46,6 +47,7 @@ class LearningAgentFixedVol(TorchLearningAgent):
             logfile_pnl=logfile_pnl,
             discount_factor=discount_factor,
             inventory_penalty=inventory_penalty,
+            memory_dir=memory_dir,
         )
         self.volume = 1
 
@@ -88,6 +90,12 @@ class LearningAgentFixedVol(TorchLearningAgent):
             self.save(results_dir)
         self.move_to_cpu()
 
+    def memory_fields(self) -> Dict[str, FieldSpec]:
+        return {
+            **super().memory_fields(),
+            "action_discrete": ((1,), np.int64),
+        }
+
     def _update_memory(
         self,
         state: PriceStateWithFees,
@@ -102,19 +110,19 @@ class LearningAgentFixedVol(TorchLearningAgent):
             and self.prev_state_action_reward[1] is not NoAction
         ):
             prev_state, prev_action, prev_reward = self.prev_state_action_reward
-            self.memory["state"].append(prev_state.to_array())
-            # action_discrete = 0 if sell
-            # action_discrete = 1 if buy
-            # action_discrete = 2 if they do not do anything
-            self.memory["action_discrete"].append([prev_action.side.value])
-
-            self.memory["reward"].append([prev_reward])
-            if state is not np.nan:
-                self.memory["next_state"].append(state.to_array())
-            else:
-                self.memory["next_state"].append(
-                    np.nan * np.ones_like(state.to_array())
-                )
+            self.memory.append(
+                state=prev_state.to_array(),
+                # action_discrete = 0 if sell
+                # action_discrete = 1 if buy
+                # action_discrete = 2 if they do not do anything
+                action_discrete=[prev_action.side.value],
+                reward=[prev_reward],
+                next_state=(
+                    state.to_array()
+                    if state is not np.nan
+                    else np.full(self.state_dim, np.nan)
+                ),
+            )
 
         self.prev_state_action_reward = (state, action, reward)
 
@@ -122,33 +130,11 @@ class LearningAgentFixedVol(TorchLearningAgent):
         """
         creates dataset and dataloader for training.
         """
-        to_torch_device = partial(to_torch, device=self.device)
-        dataset_state = apply_funcs(
-            value=self.memory["state"], funcs=(np.stack, to_torch_device)
-        )
-        dataset_action_discrete = apply_funcs(
-            value=self.memory["action_discrete"],
-            funcs=(np.array, partial(to_torch, dtype=torch.int64, device=self.device)),
-        )
-        dataset_reward = apply_funcs(
-            value=self.memory["reward"], funcs=(np.array, to_torch_device)
-        )
-        dataset_next_state = apply_funcs(
-            value=self.memory["next_state"], funcs=(np.stack, to_torch_device)
-        )
-
-        dataset = torch.utils.data.TensorDataset(
-            *(
-                dataset_state,
-                dataset_action_discrete,
-                dataset_reward,
-                dataset_next_state,
-            )
-        )
-        dataloader = torch.utils.data.DataLoader(
-            dataset, batch_size=batch_size, shuffle=True
+        return self.memory.loader(
+            fields=("state", "action_discrete", "reward", "next_state"),
+            batch_size=batch_size,
+            device=self.device,
         )
-        return dataloader
 
     def step(self, state: PriceStateWithFees):
         self.step_num += 1
@@ -1,5 +1,9 @@
-from typing import Dict, Type, Optional, Union
+import logging
+import time
+from typing import Dict, List, Type, Optional, Union
 from dataclasses import dataclass
+
+import numpy as np
 from vega_sim.reinforcement.v2.agents.puppets import (
     AGENT_TYPE_TO_AGENT,
     AgentType,
@@ -11,16 +15,30 @@ from vega_sim.reinforcement.v2.agents.puppets import (
 from vega_sim.scenario.scenario import Scenario
 from vega_sim.scenario.common.agents import MarketManager
 from vega_sim.reinforcement.v2.rewards import BaseRewarder, REWARD_ENUM_TO_CLASS, Reward
-from vega_sim.reinforcement.v2.states import State, SimpleState
+from vega_sim.reinforcement.v2.states import (
+    BatchStateExtractor,
+    State,
+    SimpleState,
+)
 from vega_sim.null_service import VegaServiceNull
+import vega_protos.protos.vega as vega_protos
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
 class StepResult:
-    observation: State
+    observation: Union[State, np.ndarray]
     reward: float
 
 
+@dataclass
+class EnvironmentSnapshot:
+    market_id: str
+    asset_id: str
+    balances: Dict[str, float]
+
+
 class Environment:
     def __init__(
         self,
@@ -30,7 +48,45 @@ class Environment:
         scenario: Scenario,
         reset_vega_every_n_runs: int = 100,
         funds_per_run: float = 10_000,
+        fast_reset: bool = False,
+        batch_observations: bool = False,
+        num_levels_state: int = 5,
     ):
+        """Environment running a scenario with learning agents acting in it.
+
+        Args:
+            agents:
+                Dict[str, AgentType], Learning agents to add to the scenario
+            agent_to_reward:
+                Union[Reward, Dict[str, Reward]], Reward for each agent, or one
+                reward shared by all of them
+            agent_to_state:
+                Dict[str, Type[State]], State observed by each agent
+            scenario:
+                Scenario, The scenario providing the market and other agents
+            reset_vega_every_n_runs:
+                int, default 100, Number of resets between restarts of the
+                nullchain
+            funds_per_run:
+                float, default 10_000, Funds each learning agent starts a run with
+            fast_reset:
+                bool, default False, Rather than configuring the scenario from
+                scratch on every reset, snapshot the learning agents' state
+                after the first full setup and restore it on later resets.
+                Open orders are cancelled, positions closed and balances
+                returned to their snapshot values. The market itself carries on
+                from where the last run left it, as do the scenario's agents
+                and their price paths, so the scenario is set up from scratch
+                again whenever what is left of its num_steps is shorter than
+                the longest run so far.
+            batch_observations:
+                bool, default False, Build every learner's observation in one
+                pass from the data cache with a BatchStateExtractor. Step
+                results then hold each observation in its to_array form.
+            num_levels_state:
+                int, default 5, Order book levels per side in batched
+                observations
+        """
         self._agents = agents
         self._agent_to_state = agent_to_state
 
@@ -57,6 +113,18 @@ class Environment:
         self._reset_vega_every_n_runs = reset_vega_every_n_runs
         self._funds_per_run = funds_per_run
 
+        self._fast_reset = fast_reset
+        self._snapshot: Optional[EnvironmentSnapshot] = None
+        self.last_reset_seconds: Optional[float] = None
+        self.reset_latencies: List[float] = []
+        self._steps_since_setup = 0
+        self._steps_this_run = 0
+        self._longest_run_steps = 0
+
+        self._batch_observations = batch_observations
+        self._num_levels_state = num_levels_state
+        self._state_extractor: Optional[BatchStateExtractor] = None
+
         self._vega.start()
 
     def stop(self):
@@ -70,6 +138,21 @@ class Environment:
             asset_id=self._asset_id,
         )
 
+    def _extract_observation_arrays(self) -> Dict[str, np.ndarray]:
+        if self._state_extractor is None:
+            self._state_extractor = BatchStateExtractor(
+                self._vega,
+                agent_to_state=self._agent_to_state,
+                market_id=self._market_id,
+                asset_id=self._asset_id,
+                num_levels=self._num_levels_state,
+            )
+        # Copied, as the extractor overwrites its arrays on the next step
+        return {
+            agent_name: observation.copy()
+            for agent_name, observation in self._state_extractor.extract().items()
+        }
+
     def step(self, actions: Dict[str, Optional[Action]]) -> Dict[str, StepResult]:
         for agent_name, action in actions.items():
             if action is not None:
@@ -77,11 +160,20 @@ class Environment:
 
         self._scenario.env.step(self._vega)
         self._vega.wait_fn(1)
+        self._steps_since_setup += 1
+        self._steps_this_run += 1
         step_res = {}
 
+        observations = (
+            self._extract_observation_arrays() if self._batch_observations else None
+        )
         for agent_name, reward_gen in self._agent_to_reward.items():
             step_res[agent_name] = StepResult(
-                observation=self._extract_observation(agent_name),
+                observation=(
+                    observations[agent_name]
+                    if observations is not None
+                    else self._extract_observation(agent_name)
+                ),
                 reward=self.calculate_reward(reward_gen),
             )
         return step_res
@@ -101,11 +193,47 @@ class Environment:
         self._vega.start()
 
     def reset(self) -> None:
+        start = time.time()
         if self._runs_since_reset > self._reset_vega_every_n_runs:
             self._reset_vega()
             self._runs_since_reset = 0
+            self._snapshot = None
         self._runs_since_reset += 1
+        self._state_extractor = None
+        self._longest_run_steps = max(self._longest_run_steps, self._steps_this_run)
+        self._steps_this_run = 0
+
+        restored = (
+            self._fast_reset
+            and self._snapshot is not None
+            and self._scenario_steps_remaining() >= self._longest_run_steps
+        )
+        if restored:
+            self._restore_snapshot(self._snapshot)
+        else:
+            self._configure_scenario()
+            self._steps_since_setup = 0
+            if self._fast_reset:
+                self._snapshot = self._take_snapshot()
+
+        self._configure_rewarders()
+
+        self.last_reset_seconds = time.time() - start
+        self.reset_latencies.append(self.last_reset_seconds)
+        logger.info(
+            f"Environment {'restored' if restored else 'reset'} in"
+            f" {self.last_reset_seconds:.2f}s"
+        )
+
+    def _scenario_steps_remaining(self) -> float:
+        # Scenario agents follow price paths of num_steps prices, the first of
+        # which is the price at setup
+        num_steps = getattr(self._scenario, "num_steps", None)
+        if num_steps is None:
+            return float("inf")
+        return num_steps - 1 - self._steps_since_setup
 
+    def _configure_scenario(self) -> None:
         self._scenario.agents = self._scenario.configure_agents(
             vega=self._vega, tag=str(self._loop_tag), random_state=None
         )
@@ -139,14 +267,18 @@ class Environment:
                 amount=self._funds_per_run,
             )
 
+        self._market_id = manager.market_id
+        self._asset_id = manager.asset_id
+
+    def _configure_rewarders(self) -> None:
         self._agent_to_reward = {}
 
         if not self._is_single_reward:
             for agent, reward in self._agent_to_reward_enum.items():
                 self._agent_to_reward[agent] = REWARD_ENUM_TO_CLASS[reward](
                     agent_key=agent,
-                    asset_id=manager.asset_id,
-                    market_id=manager.market_id,
+                    asset_id=self._asset_id,
+                    market_id=self._market_id,
                 )
         else:
             for agent in self._agent_to_state.keys():
@@ -154,11 +286,74 @@ class Environment:
                     self._single_reward_base
                 ](
                     agent_keys=list(self._agent_to_state.keys()),
-                    asset_id=manager.asset_id,
-                    market_id=manager.market_id,
+                    asset_id=self._asset_id,
+                    market_id=self._market_id,
                 )
-        self._market_id = manager.market_id
-        self._asset_id = manager.asset_id
+
+    def _take_snapshot(self) -> EnvironmentSnapshot:
+        self._vega.wait_for_total_catchup()
+        return EnvironmentSnapshot(
+            market_id=self._market_id,
+            asset_id=self._asset_id,
+            balances={
+                agent_name: self._vega.party_account(
+                    key_name=agent_name, asset_id=self._asset_id
+                ).general
+                for agent_name in self._agents.keys()
+            },
+        )
+
+    def _restore_snapshot(self, snapshot: EnvironmentSnapshot) -> None:
+        """Returns each learning agent to its snapshot state: no open orders, no
+        position and the balance it had after setup."""
+        for agent_name in self._agents.keys():
+            self._puppets[agent_name].action = None
+            self._vega.cancel_order(
+                trading_key=agent_name, market_id=snapshot.market_id
+            )
+            # None rather than a dict when the agent holds no positions
+            position = (self._vega.positions_by_market(key_name=agent_name) or {}).get(
+                snapshot.market_id
+            )
+            if position is not None and position.open_volume != 0:
+                self._vega.submit_market_order(
+                    trading_key=agent_name,
+                    market_id=snapshot.market_id,
+                    side="SIDE_SELL" if position.open_volume > 0 else "SIDE_BUY",
+                    volume=abs(position.open_volume),
+                    wait=False,
+                )
+        # Let closed positions release their margin before reading balances
+        self._vega.wait_fn(1)
+        self._vega.wait_for_total_catchup()
+
+        transfer_fee = float(
+            self._vega.network_parameter_from_feed("transfer.fee.factor").value
+        )
+        for agent_name, target in snapshot.balances.items():
+            balance = self._vega.party_account(
+                key_name=agent_name, asset_id=snapshot.asset_id
+            ).general
+            if balance < target:
+                self._vega.mint(
+                    key_name=agent_name,
+                    asset=snapshot.asset_id,
+                    amount=target - balance,
+                )
+            elif balance > target:
+                # The fee is charged on top of the amount, so only part of the
+                # excess can be transferred
+                self._vega.one_off_transfer(
+                    from_key_name=agent_name,
+                    to_key_name=self._vega.KEY_NAME,
+                    to_wallet_name=self._vega.WALLET_NAME,
+                    from_account_type=vega_protos.vega.AccountType.ACCOUNT_TYPE_GENERAL,
+                    to_account_type=vega_protos.vega.AccountType.ACCOUNT_TYPE_GENERAL,
+                    asset=snapshot.asset_id,
+                    amount=(balance - target) / (1 + transfer_fee),
+                )
+        self._vega.wait_fn(1)
+        self._vega.wait_for_total_catchup()
 
 
 if __name__ == "__main__":
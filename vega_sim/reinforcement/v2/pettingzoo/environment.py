@@ -1,7 +1,9 @@
 import logging
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Optional, Type
+from typing import List, Optional, Type, Union
+
+import numpy as np
 
 from gymnasium import spaces
 from pettingzoo.utils.env import AgentID, ParallelEnv
@@ -44,6 +46,10 @@ class AgentConfig:
     terminal_reward_type: Optional[Reward] = None
 
 
+def _as_array(observation: Union[State, np.ndarray]) -> np.ndarray:
+    return observation.to_array() if isinstance(observation, State) else observation
+
+
 class MultiAgentVegaEnv(ParallelEnv):
     """Custom Environment that follows gym interface."""
 
@@ -56,6 +62,7 @@ class MultiAgentVegaEnv(ParallelEnv):
         trade_volume: float = 1,
         steps_per_trading_session: int = 1000,
         unified_reward: Optional[Reward] = None,
+        batch_observations: bool = True,
     ):
         super().__init__()
         self.num_levels_state = num_levels_state
@@ -117,6 +124,8 @@ class MultiAgentVegaEnv(ParallelEnv):
                 for (i, learner_name) in self.learner_names.items()
             },
             scenario=scenario,
+            batch_observations=batch_observations,
+            num_levels_state=num_levels_state,
         )
         self.agents = list(self.learner_names.keys())
         self.possible_agents = self.agents
@@ -171,7 +180,7 @@ class MultiAgentVegaEnv(ParallelEnv):
 
         for agent_id, agent_name in self.learner_names.items():
             agent_step_res = step_res[agent_name]
-            self.latest_observations[agent_id] = agent_step_res.observation.to_array()
+            self.latest_observations[agent_id] = _as_array(agent_step_res.observation)
 
             reward = agent_step_res.reward
             if (
@@ -207,7 +216,7 @@ class MultiAgentVegaEnv(ParallelEnv):
 
         self.current_step = 0
         return {
-            i: step_res[name].observation.to_array()
+            i: _as_array(step_res[name].observation)
             for (i, name) in self.learner_names.items()
         }, {i: {} for i in self.learner_names.keys()}
 
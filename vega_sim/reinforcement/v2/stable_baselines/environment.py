@@ -54,6 +54,8 @@ class SingleAgentVegaEnv(gym.Env):
         trade_volume: float = 1,
         steps_per_trading_session: int = 1000,
         terminal_reward_type: Optional[Reward] = None,
+        fast_reset: bool = False,
+        fast_reset_sessions: int = 10,
     ):
         super().__init__()
         self.num_levels_state = num_levels_state
@@ -85,7 +87,13 @@ class SingleAgentVegaEnv(gym.Env):
             buy_intensity=5,
             sell_intensity=5,
             market_name="ETH",
-            num_steps=self.steps_per_trading_session * 2,
+            # With fast_reset, the scenario's price paths cover several sessions
+            # (each with the step taken on reset) before it is set up again
+            num_steps=(
+                (self.steps_per_trading_session + 1) * fast_reset_sessions + 1
+                if fast_reset
+                else self.steps_per_trading_session * 2
+            ),
             random_agent_ordering=False,
             sigma=100,
             asset_name="DAI",
@@ -96,6 +104,7 @@ class SingleAgentVegaEnv(gym.Env):
             agent_to_reward={self.learner_name: reward_type},
             agent_to_state={self.learner_name: state_type},
             scenario=scenario,
+            fast_reset=fast_reset,
         )
 
     def _get_action_space(self, action_type: ActionType) -> spaces.Space:
@@ -1,21 +1,44 @@
+import argparse
+
 from stable_baselines3 import PPO, DQN
 
 import vega_sim.reinforcement.v2.stable_baselines.environment as env
+from vega_sim.reinforcement.v2.stable_baselines.vec_env import SharedMemoryVegaVecEnv
 from vega_sim.reinforcement.v2.states import PriceStateWithFees, PositionOnly
 
-if __name__ == "__main__":
-    e = env.SingleAgentVegaEnv(
+
+def _make_env() -> env.SingleAgentVegaEnv:
+    return env.SingleAgentVegaEnv(
         action_type=env.ActionType.AT_TOUCH_ONE_SIDE,
         steps_per_trading_session=200,
         reward_type=env.Reward.PNL,
         terminal_reward_type=env.Reward.SQ_INVENTORY_PENALTY,
         state_type=PriceStateWithFees,
     )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n",
+        "--num-envs",
+        default=1,
+        type=int,
+        help="Number of environments, each with its own nullchain, to collect from",
+    )
+    args = parser.parse_args()
+
+    e = (
+        SharedMemoryVegaVecEnv([_make_env] * args.num_envs)
+        if args.num_envs > 1
+        else _make_env()
+    )
     model = PPO(
         "MlpPolicy",
         e,
         verbose=1,
         tensorboard_log="./ppo_tensorboard/",
-        n_steps=600,
+        # Keep the rollout length per update the same however many envs there are
+        n_steps=max(600 // args.num_envs, 1),
         batch_size=50,
     ).learn(total_timesteps=1_000_000)
@@ -0,0 +1,287 @@
+"""Vectorised stable-baselines environment running each VegaEnv in a subprocess.
+
+Every subprocess owns its own environment and so its own VegaServiceNull, each
+of which reserves a separate block of ports. Observations are written by the
+workers straight into a shared memory buffer, so only actions, rewards and
+flags cross the pipes.
+
+As well as the synchronous VecEnv step_async/step_wait pair, environments can
+be driven asynchronously with send/recv, which return whichever environments
+have finished stepping. Slow environments, e.g. those resetting their market,
+then do not hold up the rest. Episodes ending in step are reset within the
+worker, following the VecEnv convention of returning the first observation of
+the next episode and the terminal observation in info["terminal_observation"].
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import (
+    CloudpickleWrapper,
+    VecEnv,
+    VecEnvIndices,
+    VecEnvObs,
+    VecEnvStepReturn,
+)
+
+
+def _attach_buffer(
+    name: str, shape: Tuple[int, ...], dtype: str
+) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _worker(remote, parent_remote, env_fn_wrapper: CloudpickleWrapper, index: int):
+    parent_remote.close()
+    env = env_fn_wrapper.var()
+    shm = None
+    obs_buffer = None
+    try:
+        while True:
+            try:
+                cmd, data = remote.recv()
+            except EOFError:
+                break
+            if cmd == "get_spaces":
+                remote.send((env.observation_space, env.action_space))
+            elif cmd == "attach":
+                shm, obs_buffer = _attach_buffer(*data)
+                remote.send(None)
+            elif cmd == "step":
+                observation, reward, terminated, truncated, info = env.step(data)
+                done = terminated or truncated
+                info["TimeLimit.truncated"] = truncated and not terminated
+                reset_info = {}
+                if done:
+                    info["terminal_observation"] = observation
+                    observation, reset_info = env.reset()
+                obs_buffer[index] = observation
+                remote.send((reward, done, info, reset_info))
+            elif cmd == "reset":
+                seed, options = data
+                kwargs = {"options": options} if options else {}
+                observation, reset_info = env.reset(seed=seed, **kwargs)
+                obs_buffer[index] = observation
+                remote.send(reset_info)
+            elif cmd == "env_method":
+                method = getattr(env, data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == "get_attr":
+                remote.send(getattr(env, data))
+            elif cmd == "has_attr":
+                remote.send(hasattr(env, data))
+            elif cmd == "set_attr":
+                setattr(env, data[0], data[1])
+                remote.send(None)
+            elif cmd == "is_wrapped":
+                from stable_baselines3.common.env_util import is_wrapped
+
+                remote.send(is_wrapped(env, data))
+            elif cmd == "render":
+                remote.send(env.render())
+            elif cmd == "close":
+                env.close()
+                remote.send(None)
+                break
+            else:
+                raise NotImplementedError(f"{cmd} is not implemented in the worker")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if shm is not None:
+            del obs_buffer
+            shm.close()
+        remote.close()
+
+
+class SharedMemoryVegaVecEnv(VecEnv):
+    def __init__(
+        self,
+        env_fns: List[Callable[[], gym.Env]],
+        start_method: Optional[str] = None,
+    ):
+        """Runs K environments, each in its own subprocess.
+
+        Args:
+            env_fns:
+                List[Callable[[], gym.Env]], Functions each creating one
+                environment, e.g. a SingleAgentVegaEnv. Called in the worker.
+            start_method:
+                Optional[str], multiprocessing start method for the workers.
+                Defaults to forkserver where available and spawn otherwise, as
+                the parent may hold state (e.g. gRPC or torch threads) which is
+                unsafe to fork.
+        """
+        if start_method is None:
+            start_method = (
+                "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+            )
+        ctx = mp.get_context(start_method)
+        n_envs = len(env_fns)
+
+        self.remotes, work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for index, (work_remote, remote, env_fn) in enumerate(
+            zip(work_remotes, self.remotes, env_fns)
+        ):
+            process = ctx.Process(
+                target=_worker,
+                args=(work_remote, remote, CloudpickleWrapper(env_fn), index),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(("get_spaces", None))
+        observation_space, action_space = self.remotes[0].recv()
+        if not isinstance(observation_space, spaces.Box):
+            raise ValueError(
+                "Shared memory observations require a Box observation space, got"
+                f" {observation_space}"
+            )
+
+        shape = (n_envs,) + observation_space.shape
+        dtype = np.dtype(observation_space.dtype)
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1)
+        )
+        self._obs = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        for remote in self.remotes:
+            remote.send(("attach", (self._shm.name, shape, dtype.str)))
+        for remote in self.remotes:
+            remote.recv()
+
+        self._in_flight: Dict[int, Any] = {}
+        self.closed = False
+        super().__init__(n_envs, observation_space, action_space)
+
+    @property
+    def waiting(self) -> bool:
+        return bool(self._in_flight)
+
+    def send(self, actions: Sequence[Any], env_ids: Optional[Sequence[int]] = None):
+        """Starts a step in each of the given environments without waiting for
+        it to finish. Each environment must not already be stepping."""
+        env_ids = list(range(self.num_envs)) if env_ids is None else list(env_ids)
+        if len(actions) != len(env_ids):
+            raise ValueError(f"Got {len(actions)} actions for {len(env_ids)} envs")
+        for env_id, action in zip(env_ids, actions):
+            if env_id in self._in_flight:
+                raise RuntimeError(f"Environment {env_id} is already stepping")
+            self.remotes[env_id].send(("step", action))
+            self._in_flight[env_id] = action
+
+    def recv(
+        self, min_envs: int = 1, timeout: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Dict]]:
+        """Waits for at least min_envs stepping environments to finish (or the
+        timeout to pass) and returns the results of every environment which has.
+
+        Returns:
+            Tuple of environment ids, observations, rewards, dones and infos,
+            each ordered by environment id
+        """
+        min_envs = max(min(min_envs, len(self._in_flight)), 1)
+        pending = {self.remotes[i]: i for i in self._in_flight}
+        results = {}
+
+        def _collect(conns) -> None:
+            for conn in conns:
+                env_id = pending.pop(conn)
+                results[env_id] = conn.recv()
+
+        while pending and len(results) < min_envs:
+            conns = wait(list(pending.keys()), timeout=timeout)
+            if not conns:
+                break
+            _collect(conns)
+        # Pick up anything else which finished in the meantime
+        if pending:
+            _collect(wait(list(pending.keys()), timeout=0))
+
+        env_ids = np.array(sorted(results), dtype=np.int64)
+        infos = []
+        rewards = np.zeros(len(env_ids), dtype=np.float32)
+        dones = np.zeros(len(env_ids), dtype=bool)
+        for i, env_id in enumerate(env_ids):
+            del self._in_flight[int(env_id)]
+            rewards[i], dones[i], info, self.reset_infos[env_id] = results[env_id]
+            infos.append(info)
+        return env_ids, self._obs[env_ids].copy(), rewards, dones, infos
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.send(actions)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        _, obs, rewards, dones, infos = self.recv(min_envs=self.num_envs)
+        return obs, rewards, dones, infos
+
+    def reset(self) -> VecEnvObs:
+        for env_id, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_id], self._options[env_id])))
+        self.reset_infos = [remote.recv() for remote in self.remotes]
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self._in_flight:
+            self.recv(min_envs=len(self._in_flight))
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for remote in self.remotes:
+            try:
+                remote.recv()
+            except EOFError:
+                pass
+        for process in self.processes:
+            process.join()
+        del self._obs
+        self._shm.close()
+        self._shm.unlink()
+        self.closed = True
+
+    def _call(self, cmd: str, data: Any, indices: VecEnvIndices) -> List[Any]:
+        remotes = [self.remotes[i] for i in self._get_indices(indices)]
+        for remote in remotes:
+            remote.send((cmd, data))
+        return [remote.recv() for remote in remotes]
+
+    def get_images(self) -> Sequence[Optional[np.ndarray]]:
+        return self._call("render", None, None)
+
+    def has_attr(self, attr_name: str) -> bool:
+        return all(self._call("has_attr", attr_name, None))
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        return self._call("get_attr", attr_name, indices)
+
+    def set_attr(
+        self, attr_name: str, value: Any, indices: VecEnvIndices = None
+    ) -> None:
+        self._call("set_attr", (attr_name, value), indices)
+
+    def env_method(
+        self,
+        method_name: str,
+        *method_args,
+        indices: VecEnvIndices = None,
+        **method_kwargs,
+    ) -> List[Any]:
+        return self._call(
+            "env_method", (method_name, method_args, method_kwargs), indices
+        )
+
+    def env_is_wrapped(
+        self, wrapper_class: type, indices: VecEnvIndices = None
+    ) -> List[bool]:
+        return self._call("is_wrapped", wrapper_class, indices)
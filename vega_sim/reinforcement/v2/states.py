@@ -1,12 +1,51 @@
 from abc import abstractmethod
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Optional, Type
 import numpy as np
 
 from vega_protos.protos.vega import markets as markets_protos
+from vega_protos.protos.vega import vega as vega_protos
+import vega_sim.api.data as data
 from vega_sim.service import VegaService
 
 
+@dataclass
+class MarketArrays:
+    """Market-wide values shared by every learner's observation."""
+
+    best_bid: float
+    best_ask: float
+    in_auction: bool
+    trading_fee: float
+    bid_prices: np.ndarray
+    bid_volumes: np.ndarray
+    ask_prices: np.ndarray
+    ask_volumes: np.ndarray
+
+
+@dataclass
+class PartyArrays:
+    """Per-learner values, one row per learner."""
+
+    general: np.ndarray
+    margin: np.ndarray
+    bond: np.ndarray
+    position: np.ndarray
+
+    def select(self, rows: np.ndarray) -> "PartyArrays":
+        return PartyArrays(
+            general=self.general[rows],
+            margin=self.margin[rows],
+            bond=self.bond[rows],
+            position=self.position[rows],
+        )
+
+
+def _normalise_rows(arr: np.ndarray) -> None:
+    np.nan_to_num(arr, copy=False)
+    arr /= np.maximum(np.linalg.norm(arr, axis=1, keepdims=True), 1e-12)
+
+
 @dataclass(frozen=True)
 class State:
     @classmethod
@@ -20,6 +59,19 @@ class State:
     def to_array(self) -> np.array:
         pass
 
+    @classmethod
+    def array_size(cls, num_levels: int = 5) -> int:
+        """Length of the array returned by to_array."""
+        raise NotImplementedError(f"{cls.__name__} does not support batching")
+
+    @classmethod
+    def fill_arrays(
+        cls, out: np.ndarray, parties: PartyArrays, market: MarketArrays
+    ) -> None:
+        """Writes the to_array form of the state for many learners at once into
+        out, one row per learner."""
+        raise NotImplementedError(f"{cls.__name__} does not support batching")
+
 
 @dataclass(frozen=True)
 class SimpleState(State):
@@ -59,6 +111,20 @@ class SimpleState(State):
         arr = arr / norm_factor
         return arr
 
+    @classmethod
+    def array_size(cls, num_levels: int = 5) -> int:
+        return 4
+
+    @classmethod
+    def fill_arrays(
+        cls, out: np.ndarray, parties: PartyArrays, market: MarketArrays
+    ) -> None:
+        out[:, 0] = parties.general + parties.margin + parties.bond
+        out[:, 1] = parties.position
+        out[:, 2] = market.best_bid
+        out[:, 3] = market.best_ask
+        _normalise_rows(out)
+
 
 @dataclass(frozen=True)
 class PriceStateWithFees(State):
@@ -90,6 +156,30 @@ class PriceStateWithFees(State):
         arr = arr / norm_factor
         return arr
 
+    @classmethod
+    def array_size(cls, num_levels: int = 5) -> int:
+        return 4 + 4 * num_levels
+
+    @classmethod
+    def fill_arrays(
+        cls, out: np.ndarray, parties: PartyArrays, market: MarketArrays
+    ) -> None:
+        num_levels = len(market.bid_prices)
+        out[:, 0] = parties.position
+        out[:, 1] = parties.general + parties.margin
+        out[:, 2] = int(market.in_auction)
+        out[:, 3] = market.trading_fee
+        for i, levels in enumerate(
+            [
+                market.bid_prices,
+                market.bid_volumes,
+                market.ask_prices,
+                market.ask_volumes,
+            ]
+        ):
+            out[:, 4 + i * num_levels : 4 + (i + 1) * num_levels] = levels
+        _normalise_rows(out)
+
     @classmethod
     def from_vega(
         cls,
@@ -157,6 +247,16 @@ class PositionOnly(State):
             )
         )
 
+    @classmethod
+    def array_size(cls, num_levels: int = 5) -> int:
+        return 1
+
+    @classmethod
+    def fill_arrays(
+        cls, out: np.ndarray, parties: PartyArrays, market: MarketArrays
+    ) -> None:
+        out[:, 0] = np.nan_to_num(parties.position)
+
     @classmethod
     def from_vega(
         cls,
@@ -173,3 +273,192 @@ class PositionOnly(State):
         return cls(
             position=position.open_volume if position else 0,
         )
+
+
+def _book_levels(
+    prices: np.ndarray, volumes: np.ndarray, num_levels: int, descending: bool
+):
+    """Aggregates orders into the best num_levels price levels, zero padded."""
+    level_prices = np.zeros(num_levels)
+    level_volumes = np.zeros(num_levels)
+    if len(prices) == 0:
+        return level_prices, level_volumes
+    unique_prices, inverse = np.unique(prices, return_inverse=True)
+    unique_volumes = np.bincount(inverse, weights=volumes)
+    if descending:
+        unique_prices, unique_volumes = unique_prices[::-1], unique_volumes[::-1]
+    num = min(num_levels, len(unique_prices))
+    level_prices[:num] = unique_prices[:num]
+    level_volumes[:num] = unique_volumes[:num]
+    return level_prices, level_volumes
+
+
+class BatchStateExtractor:
+    def __init__(
+        self,
+        vega: VegaService,
+        agent_to_state: Dict[str, Type[State]],
+        market_id: str,
+        asset_id: str,
+        num_levels: int = 5,
+        agent_to_wallet: Optional[Dict[str, Optional[str]]] = None,
+    ):
+        """Builds the observation arrays of many learners in one pass.
+
+        Rather than the per-learner gRPC calls of State.from_vega, everything is
+        read from the service's LocalDataCache: balances from the accounts feed,
+        the order book from the live orders feed and market state from the
+        market data feed. Positions are the learners' net traded volume, kept up
+        to date from the trades feed, so the cache must have been running before
+        the learners first traded.
+
+        Observations are written into one preallocated matrix per state type,
+        and are overwritten by the next call to extract.
+
+        Args:
+            vega:
+                VegaService, The service the learners are trading on
+            agent_to_state:
+                Dict[str, Type[State]], State type of each learner, by key name
+            market_id:
+                str, Market the learners trade on
+            asset_id:
+                str, Settlement asset of the market
+            num_levels:
+                int, default 5, Number of order book levels on each side for
+                states which include the book
+            agent_to_wallet:
+                Optional[Dict[str, Optional[str]]], Wallet of each learner's key,
+                if not the default wallet
+        """
+        self._vega = vega
+        self._market_id = market_id
+        self._asset_id = asset_id
+        self._num_levels = num_levels
+
+        agent_to_wallet = agent_to_wallet or {}
+        self._agent_names = list(agent_to_state.keys())
+        self._party_ids = [
+            vega.wallet.public_key(
+                name=agent_name, wallet_name=agent_to_wallet.get(agent_name)
+            )
+            for agent_name in self._agent_names
+        ]
+        self._party_index = {party_id: i for i, party_id in enumerate(self._party_ids)}
+        self._positions = np.zeros(len(self._party_ids))
+        self._trade_cursor = 0
+
+        self.observations: Dict[Type[State], np.ndarray] = {}
+        self._rows: Dict[Type[State], np.ndarray] = {}
+        self._agent_rows: Dict[str, np.ndarray] = {}
+        for state_type in set(agent_to_state.values()):
+            agents = [
+                i
+                for i, agent_name in enumerate(self._agent_names)
+                if agent_to_state[agent_name] == state_type
+            ]
+            self._rows[state_type] = np.array(agents, dtype=np.int64)
+            self.observations[state_type] = np.zeros(
+                (len(agents), state_type.array_size(num_levels=num_levels))
+            )
+            for row, i in enumerate(agents):
+                self._agent_rows[self._agent_names[i]] = self.observations[state_type][
+                    row
+                ]
+
+    def _update_positions(self) -> None:
+        trades, self._trade_cursor = self._vega.data_cache.get_trades_from_stream_since(
+            self._trade_cursor
+        )
+        for trade in trades:
+            if trade.market_id != self._market_id:
+                continue
+            buyer = self._party_index.get(trade.buyer)
+            if buyer is not None:
+                self._positions[buyer] += trade.size
+            seller = self._party_index.get(trade.seller)
+            if seller is not None:
+                self._positions[seller] -= trade.size
+
+    def _party_arrays(self) -> PartyArrays:
+        accounts = np.array(
+            [
+                data.account_list_to_party_account(
+                    self._vega.data_cache.get_accounts_from_stream(
+                        market_id=self._market_id,
+                        party_id=party_id,
+                        asset_id=self._asset_id,
+                    )
+                )
+                for party_id in self._party_ids
+            ],
+            dtype=float,
+        ).reshape(-1, 3)
+        return PartyArrays(
+            general=accounts[:, 0],
+            margin=accounts[:, 1],
+            bond=accounts[:, 2],
+            position=self._positions,
+        )
+
+    def _market_arrays(self) -> MarketArrays:
+        cache = self._vega.data_cache
+        with cache.market_data_lock:
+            market_data = cache.market_data_from_feed_store.get(self._market_id)
+        if market_data is None:
+            market_data = self._vega.get_latest_market_data(self._market_id)
+        fees = cache.market_from_feed(self._market_id).fees.factors
+
+        with cache.orders_lock:
+            orders = [
+                order
+                for party_orders in cache.order_status_from_feed()
+                .get(self._market_id, {})
+                .values()
+                for order in party_orders.values()
+            ]
+        is_buy = np.array(
+            [order.side == vega_protos.Side.SIDE_BUY for order in orders], dtype=bool
+        )
+        prices = np.array([order.price for order in orders], dtype=float)
+        volumes = np.array([order.remaining for order in orders], dtype=float)
+        bid_prices, bid_volumes = _book_levels(
+            prices[is_buy], volumes[is_buy], self._num_levels, descending=True
+        )
+        ask_prices, ask_volumes = _book_levels(
+            prices[~is_buy], volumes[~is_buy], self._num_levels, descending=False
+        )
+
+        return MarketArrays(
+            best_bid=market_data.best_static_bid_price,
+            best_ask=market_data.best_static_offer_price,
+            in_auction=(
+                market_data.market_trading_mode
+                != markets_protos.Market.TradingMode.TRADING_MODE_CONTINUOUS
+            ),
+            trading_fee=(
+                float(fees.liquidity_fee)
+                + float(fees.maker_fee)
+                + float(fees.infrastructure_fee)
+            ),
+            bid_prices=bid_prices,
+            bid_volumes=bid_volumes,
+            ask_prices=ask_prices,
+            ask_volumes=ask_volumes,
+        )
+
+    def extract(self) -> Dict[str, np.ndarray]:
+        """Updates the observation matrices from the data cache.
+
+        Returns:
+            Dict[str, np.ndarray], each learner's observation, as a view of its
+                row in the matching observation matrix
+        """
+        self._update_positions()
+        parties = self._party_arrays()
+        market = self._market_arrays()
+        for state_type, rows in self._rows.items():
+            state_type.fill_arrays(
+                self.observations[state_type], parties.select(rows), market
+            )
+        return self._agent_rows
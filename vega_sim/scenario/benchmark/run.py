@@ -6,6 +6,7 @@ import argparse
 
 
 from vega_sim.null_service import VegaServiceNull, Ports
+from vega_sim.service import DatanodeSyncStats
 from vega_sim.scenario.constants import Network
 from vega_sim.scenario.benchmark.scenario import BenchmarkScenario
 from vega_sim.scenario.benchmark.registry import REGISTRY
@@ -25,7 +26,8 @@ def _run(
     output_dir: str = "plots",
     core_metrics_port: int = 2723,
     data_node_metrics_port: int = 3651,
-):
+    ephemeral_data_node: bool = False,
+) -> DatanodeSyncStats:
 
     with VegaServiceNull(
         warn_on_raw_data_access=False,
@@ -38,6 +40,7 @@ def _run(
             Ports.METRICS: core_metrics_port,
             Ports.DATA_NODE_METRICS: data_node_metrics_port,
         },
+        ephemeral_data_node=ephemeral_data_node,
     ) as vega:
         scenario.run_iteration(
             vega=vega,
@@ -142,6 +145,32 @@ def _run(
         if pause:
             input("Waiting after run finished.")
 
+        logging.info(
+            f"Data-node sync ({'ephemeral' if ephemeral_data_node else 'standard'}"
+            f" storage): {vega.datanode_sync_stats}"
+        )
+        return vega.datanode_sync_stats
+
+
+def _compare_data_node_storage(scenario: BenchmarkScenario, **kwargs) -> None:
+    """Runs the scenario with standard and then ephemeral data-node storage and
+    logs how long each spent waiting for the data-node to catch up with core."""
+    results = {
+        label: _run(scenario=scenario, ephemeral_data_node=ephemeral, **kwargs)
+        for label, ephemeral in [("standard", False), ("ephemeral", True)]
+    }
+    lines = [
+        f"{'storage':<10} {'syncs':>8} {'total (s)':>10} {'mean (ms)':>10}"
+        f" {'max (ms)':>10} {'max lag':>8}"
+    ]
+    for label, stats in results.items():
+        lines.append(
+            f"{label:<10} {stats.count:>8} {stats.total_seconds:>10.2f}"
+            f" {stats.mean_seconds * 1e3:>10.2f} {stats.max_seconds * 1e3:>10.2f}"
+            f" {stats.max_block_lag:>8}"
+        )
+    logging.info("Data-node lag benchmark\n" + "\n".join(lines))
+
 
 if __name__ == "__main__":
 
@@ -155,6 +184,16 @@ if __name__ == "__main__":
     parser.add_argument("-w", "--wallet", action="store_true")
     parser.add_argument("--core-metrics-port", default=2723, type=int)
     parser.add_argument("--data-node-metrics-port", default=3651, type=int)
+    parser.add_argument(
+        "--ephemeral-data-node",
+        action="store_true",
+        help="Run the data-node with throwaway in-memory storage",
+    )
+    parser.add_argument(
+        "--compare-data-node-storage",
+        action="store_true",
+        help="Run with standard and ephemeral data-node storage and compare lag",
+    )
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -167,7 +206,7 @@ if __name__ == "__main__":
     scenario = REGISTRY[args.scenario]
     scenario.num_steps = args.steps
 
-    _run(
+    run_kwargs = dict(
         scenario=scenario,
         wallet=args.wallet,
         console=args.console,
@@ -176,3 +215,7 @@ if __name__ == "__main__":
         core_metrics_port=args.core_metrics_port,
         data_node_metrics_port=args.data_node_metrics_port,
     )
+    if args.compare_data_node_storage:
+        _compare_data_node_storage(**run_kwargs)
+    else:
+        _run(ephemeral_data_node=args.ephemeral_data_node, **run_kwargs)
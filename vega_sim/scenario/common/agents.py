@@ -4,7 +4,7 @@ import datetime
 import logging
 import platform
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from math import exp
 from queue import Queue
 
@@ -17,30 +17,66 @@ except ImportError:
     pass  # TA-Lib not installed, but most agents don't need
 
 import time
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from enum import Enum
-from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from numpy.typing import ArrayLike
 from numpy.random import RandomState
 
 import vega_sim.api.faucet as faucet
 import vega_sim.builders as build
-from vega_sim.api.data import AccountData, MarketDepth, Order, Trade, Position
-from vega_sim.api.helpers import get_enum
+from vega_sim.api.data import (
+    AccountData,
+    MarketDepth,
+    Order,
+    Position,
+    PriceLevel,
+    Trade,
+)
+from vega_sim.api.helpers import (
+    get_enum,
+    num_from_padded_int,
+    num_to_padded_int,
+    round_to_tick,
+)
 from vega_sim.api.trading import OrderRejectedError
 from vega_sim.environment import VegaState
-from vega_sim.environment.agent import Agent, StateAgent, StateAgentWithWallet
+from vega_sim.environment.agent import (
+    Agent,
+    StateAgent,
+    StateAgentWithWallet,
+    TwoPhaseAgent,
+)
 from vega_sim.network_service import VegaServiceNetwork
 from vega_sim.null_service import VegaService, VegaServiceNull
 from vega_protos.protos.vega import markets as markets_protos
 from vega_protos.protos.vega import vega as vega_protos
 from vega_protos.protos.vega.events.v1 import events as vega_protos_events
 from vega_sim.scenario.common.utils.ideal_mm_models import GLFT_approx, a_s_mm_model
-from vega_sim.service import PeggedOrder
+from vega_sim.tools.resource_sampler import ProcessResourceData, ResourceSampler
+from vega_sim.service import (
+    OrderAmendment,
+    OrderCancellation,
+    OrderSubmission,
+    PeggedOrder,
+)
 
 import vega_protos as protos
 
+if TYPE_CHECKING:
+    from vega_sim.tools.scenario_output import StreamingHistoryWriter
+
 WalletConfig = namedtuple("WalletConfig", ["name", "passphrase"])
 
 
@@ -53,6 +89,9 @@ class MarketHistoryData:
     market_depth: Dict[str, MarketDepth]
     trades: Dict[str, List[Trade]]
     positions: List[Position]
+    # False when accounts, positions and depth hold only what changed since
+    # the previous step, see Snitch's capture_deltas
+    keyframe: bool = True
 
 
 # Send selling/buying MOs to hit LP orders
@@ -129,14 +168,12 @@ class NetworkParameterManager(StateAgentWithWallet):
             amount=1e4,
             key_name=self.key_name,
         )
-        for key, value in self.network_parameters.items():
-            self.vega.wait_for_total_catchup()
-            self.vega.update_network_parameter(
-                proposal_key=self.key_name,
-                wallet_name=self.wallet_name,
-                parameter=key,
-                new_value=str(value),
-            )
+        self.vega.wait_for_total_catchup()
+        self.vega.update_network_parameters(
+            proposal_key=self.key_name,
+            wallet_name=self.wallet_name,
+            parameters=self.network_parameters,
+        )
 
 
 class MarketOrderTrader(StateAgentWithWallet):
@@ -1102,7 +1139,21 @@ class MarketManager(StateAgentWithWallet):
             self.vega.wait_for_total_catchup()
 
 
-class ShapedMarketMaker(StateAgentWithWallet):
+# Cancellations, amendments and submissions for one batch of market instructions
+OrderInstructions = Tuple[
+    List[OrderCancellation], List[OrderAmendment], List[OrderSubmission]
+]
+
+
+@dataclass
+class ShapedMarketMakerDecision:
+    update_margin_mode: bool
+    order_instructions: Optional[OrderInstructions] = None
+    liquidity: Optional[LiquidityProvision] = None
+    top_up: bool = False
+
+
+class ShapedMarketMaker(TwoPhaseAgent, StateAgentWithWallet):
     """Utilises the Ideal market maker formulation from
         Algorithmic and High-Frequency Trading by Cartea, Jaimungal and Penalva.
 
@@ -1144,6 +1195,7 @@ class ShapedMarketMaker(StateAgentWithWallet):
         order_validity_length: Optional[float] = None,
         auto_top_up: bool = False,
         isolated_margin_factor: Optional[float] = None,
+        reconcile_orders: bool = False,
     ):
         super().__init__(wallet_name=wallet_name, key_name=key_name, tag=tag)
         self.price_process_generator = price_process_generator
@@ -1181,6 +1233,13 @@ class ShapedMarketMaker(StateAgentWithWallet):
             supplied_amount if supplied_amount is not None else commitment_amount
         )
 
+        # When reconciling, only the difference between the live orders and
+        # the new shape is sent each step rather than cancelling and
+        # resubmitting the whole shape
+        self.reconcile_orders = reconcile_orders
+        self.last_transactions_saved = 0
+        self.transactions_saved = 0
+
     def initialise(
         self,
         vega: Union[VegaServiceNull, VegaServiceNetwork],
@@ -1235,38 +1294,17 @@ class ShapedMarketMaker(StateAgentWithWallet):
                 key_name=self.key_name,
             )
 
-    def step(self, vega_state: VegaState):
+    def decide(self, vega_state: VegaState) -> ShapedMarketMakerDecision:
         self.current_step += 1
         self.prev_price = self.curr_price
         self.curr_price = next(self.price_process_generator)
 
         self._update_state(current_step=self.current_step)
 
-        if (self.update_margin_mode) and (
+        update_margin_mode = (self.update_margin_mode) and (
             vega_state.market_state[self.market_id].trading_mode
             != markets_protos.Market.TradingMode.TRADING_MODE_OPENING_AUCTION
-        ):
-            self.vega.update_margin_mode(
-                key_name=self.key_name,
-                wallet_name=self.wallet_name,
-                margin_mode="MODE_ISOLATED_MARGIN",
-                margin_factor=self.isolated_margin_factor,
-                market_id=self.market_id,
-            )
-            party_margin_mode = self.vega.party_margin_mode(
-                key_name=self.key_name,
-                wallet_name=self.wallet_name,
-                market_id=self.market_id,
-            )
-            # If no party margin mode information exists, leave unchanged
-            self.update_margin_mode = (
-                (
-                    party_margin_mode.margin_mode
-                    != vega_protos.MarginMode.MARGIN_MODE_ISOLATED_MARGIN
-                )
-                if party_margin_mode is not None
-                else self.update_margin_mode
-            )
+        )
 
         # Each step, MM posts optimal bid/ask depths
         position = self.vega.positions_by_market(
@@ -1282,7 +1320,7 @@ class ShapedMarketMaker(StateAgentWithWallet):
             current_position, self.current_step
         )
         if (self.bid_depth is None) or (self.ask_depth is None):
-            return
+            return ShapedMarketMakerDecision(update_margin_mode=update_margin_mode)
 
         new_buy_shape, new_sell_shape = self.shape_fn(self.bid_depth, self.ask_depth)
         scaled_buy_shape, scaled_sell_shape = self._scale_orders(
@@ -1290,32 +1328,68 @@ class ShapedMarketMaker(StateAgentWithWallet):
         )
 
         # Cancel all orders on the book then submit new scaled shape
-        self._update_orders(buys=scaled_buy_shape, sells=scaled_sell_shape)
+        order_instructions = self._order_instructions(
+            buys=scaled_buy_shape, sells=scaled_sell_shape
+        )
 
-        if (
-            liq := (
-                self.liquidity_commitment_fn(vega_state)
-                if self.liquidity_commitment_fn is not None
-                else None
+        liq = (
+            self.liquidity_commitment_fn(vega_state)
+            if self.liquidity_commitment_fn is not None
+            else None
+        )
+        top_up = False
+        if liq is not None and self.auto_top_up and self.mint_key:
+            account = self.vega.party_account(
+                key_name=self.key_name,
+                wallet_name=self.wallet_name,
+                market_id=self.market_id,
             )
-        ) is not None:
-            if self.auto_top_up and self.mint_key:
+            top_up = account.general < 3 * liq.amount
+
+        return ShapedMarketMakerDecision(
+            update_margin_mode=update_margin_mode,
+            order_instructions=order_instructions,
+            liquidity=liq,
+            top_up=top_up,
+        )
+
+    def submit(self, decision: ShapedMarketMakerDecision) -> None:
+        if decision.update_margin_mode:
+            self.vega.update_margin_mode(
+                key_name=self.key_name,
+                wallet_name=self.wallet_name,
+                margin_mode="MODE_ISOLATED_MARGIN",
+                margin_factor=self.isolated_margin_factor,
+                market_id=self.market_id,
+            )
+            party_margin_mode = self.vega.party_margin_mode(
+                key_name=self.key_name,
+                wallet_name=self.wallet_name,
+                market_id=self.market_id,
+            )
+            # If no party margin mode information exists, leave unchanged
+            self.update_margin_mode = (
+                (
+                    party_margin_mode.margin_mode
+                    != vega_protos.MarginMode.MARGIN_MODE_ISOLATED_MARGIN
+                )
+                if party_margin_mode is not None
+                else self.update_margin_mode
+            )
+
+        if decision.order_instructions is not None:
+            self._submit_order_instructions(*decision.order_instructions)
+
+        if (liq := decision.liquidity) is not None:
+            if decision.top_up:
                 # Top up asset
-                account = self.vega.party_account(
-                    key_name=self.key_name,
+                self.vega.mint(
                     wallet_name=self.wallet_name,
-                    market_id=self.market_id,
+                    asset=self.asset_id,
+                    amount=self.initial_asset_mint,
+                    key_name=self.key_name,
                 )
-
-                if account.general < 3 * liq.amount:
-                    # Top up asset
-                    self.vega.mint(
-                        wallet_name=self.wallet_name,
-                        asset=self.asset_id,
-                        amount=self.initial_asset_mint,
-                        key_name=self.key_name,
-                    )
-                    self.vega.wait_for_total_catchup()
+                self.vega.wait_for_total_catchup()
 
             if self.commitment_amount > 0:
                 self.vega.submit_liquidity(
@@ -1379,6 +1453,32 @@ class ShapedMarketMaker(StateAgentWithWallet):
         buys: List[MMOrder],
         sells: List[MMOrder],
     ) -> None:
+        self._submit_order_instructions(
+            *self._order_instructions(buys=buys, sells=sells)
+        )
+
+    def _submit_order_instructions(
+        self,
+        cancellations: List[OrderCancellation],
+        amendments: List[OrderAmendment],
+        submissions: List[OrderSubmission],
+    ) -> None:
+        if cancellations or amendments or submissions:
+            self.vega.submit_instructions(
+                wallet_name=self.wallet_name,
+                key_name=self.key_name,
+                cancellations=cancellations,
+                amendments=amendments,
+                submissions=submissions,
+            )
+
+    def _order_instructions(
+        self,
+        buys: List[MMOrder],
+        sells: List[MMOrder],
+    ) -> OrderInstructions:
+        if self.reconcile_orders:
+            return self._reconcile_orders(buys=buys, sells=sells)
 
         # Firstly, cancel all existing orders on the market
         cancellations = [self.vega.build_order_cancellation(market_id=self.market_id)]
@@ -1391,47 +1491,156 @@ class ShapedMarketMaker(StateAgentWithWallet):
             else None
         )
         for order in buys:
-            transaction = self.vega.build_order_submission(
-                market_id=self.market_id,
-                price=order.price,
-                size=order.size,
-                order_type="TYPE_LIMIT",
-                time_in_force=(
-                    "TIME_IN_FORCE_GTT"
-                    if self.order_validity_length is not None
-                    else "TIME_IN_FORCE_GTC"
-                ),
-                side=vega_protos.SIDE_BUY,
-                expires_at=(
-                    expires_at if self.order_validity_length is not None else None
-                ),
+            transaction = self._build_submission(
+                order=order, side=vega_protos.SIDE_BUY, expires_at=expires_at
             )
             submissions.append(transaction)
         for order in sells:
-            transaction = self.vega.build_order_submission(
-                market_id=self.market_id,
-                price=order.price,
-                size=order.size,
-                order_type="TYPE_LIMIT",
-                time_in_force=(
-                    "TIME_IN_FORCE_GTT"
-                    if self.order_validity_length is not None
-                    else "TIME_IN_FORCE_GTC"
-                ),
-                side=vega_protos.SIDE_SELL,
-                expires_at=(
-                    expires_at if self.order_validity_length is not None else None
-                ),
+            transaction = self._build_submission(
+                order=order, side=vega_protos.SIDE_SELL, expires_at=expires_at
             )
             submissions.append(transaction)
 
-        if submissions is not []:
-            self.vega.submit_instructions(
-                wallet_name=self.wallet_name,
-                key_name=self.key_name,
-                cancellations=cancellations,
-                submissions=submissions,
-            )
+        return cancellations, [], submissions
+
+    def _build_submission(
+        self,
+        order: MMOrder,
+        side: vega_protos.Side,
+        expires_at: Optional[int],
+    ):
+        return self.vega.build_order_submission(
+            market_id=self.market_id,
+            price=order.price,
+            size=order.size,
+            order_type="TYPE_LIMIT",
+            time_in_force=(
+                "TIME_IN_FORCE_GTT"
+                if self.order_validity_length is not None
+                else "TIME_IN_FORCE_GTC"
+            ),
+            side=side,
+            expires_at=(expires_at if self.order_validity_length is not None else None),
+        )
+
+    def _reconcile_orders(
+        self,
+        buys: List[MMOrder],
+        sells: List[MMOrder],
+    ) -> OrderInstructions:
+        """Moves the MM's live orders to the new shape with as few instructions
+        as possible.
+
+        Live orders already at a target price are kept, amending their size if
+        it differs from the target. Targets at a price with no live order are
+        submitted and any live orders left unmatched are cancelled. Prices and
+        sizes are compared as the integers the orders would be submitted with,
+        so a target is matched to an order it would have been identical to.
+        """
+        price_decimals = self.vega.market_price_decimals[self.market_id]
+        pos_decimals = self.vega.market_pos_decimals[self.market_id]
+        tick_size = self.vega.data_cache.market_from_feed(self.market_id).tick_size
+
+        now = (
+            self.vega.get_blockchain_time()
+            if self.order_validity_length is not None
+            else None
+        )
+        expires_at = (
+            int(now + self.order_validity_length * 1e9)
+            if self.order_validity_length is not None
+            else None
+        )
+        # GTT orders are kept until they are within half their validity of expiry
+        refresh_before = (
+            int(now + self.order_validity_length * 1e9 / 2)
+            if self.order_validity_length is not None
+            else None
+        )
+
+        live_orders = self.vega.orders_for_party_from_feed(
+            key_name=self.key_name,
+            wallet_name=self.wallet_name,
+            market_id=self.market_id,
+            live_only=True,
+        )
+        resting = defaultdict(list)
+        for order in live_orders.values():
+            resting[
+                (order.side, num_to_padded_int(order.price, price_decimals))
+            ].append(order)
+
+        cancellations, amendments, submissions = [], [], []
+        num_targets = 0
+        for side, targets in [
+            (vega_protos.SIDE_BUY, buys),
+            (vega_protos.SIDE_SELL, sells),
+        ]:
+            for target in targets:
+                price = round_to_tick(
+                    price=num_to_padded_int(target.price, price_decimals),
+                    tick_size=tick_size,
+                    side=side,
+                )
+                size = num_to_padded_int(target.size, pos_decimals)
+                if price <= 0 or size <= 0:
+                    continue
+                num_targets += 1
+
+                matches = resting.get((side, price))
+                if not matches:
+                    submissions.append(
+                        self._build_submission(
+                            order=target, side=side, expires_at=expires_at
+                        )
+                    )
+                    continue
+
+                order = matches.pop(0)
+                size_delta = size - num_to_padded_int(order.remaining, pos_decimals)
+                refresh = (
+                    refresh_before is not None and order.expires_at < refresh_before
+                )
+                if size_delta != 0 or refresh:
+                    amendments.append(
+                        self.vega.build_order_amendment(
+                            order_id=order.id,
+                            market_id=self.market_id,
+                            size_delta=(
+                                num_from_padded_int(size_delta, pos_decimals)
+                                if size_delta != 0
+                                else None
+                            ),
+                            expires_at=expires_at if refresh else None,
+                            round_to_tick=False,
+                        )
+                    )
+
+        unmatched = [order for orders in resting.values() for order in orders]
+        if len(unmatched) > 1 and len(unmatched) == len(live_orders):
+            # Nothing is kept so a single market wide cancellation suffices
+            cancellations = [
+                self.vega.build_order_cancellation(market_id=self.market_id)
+            ]
+        else:
+            cancellations = [
+                self.vega.build_order_cancellation(
+                    order_id=order.id, market_id=self.market_id
+                )
+                for order in unmatched
+            ]
+
+        # A full refresh is one market wide cancellation plus every target
+        num_instructions = len(cancellations) + len(amendments) + len(submissions)
+        self.last_transactions_saved = 1 + num_targets - num_instructions
+        self.transactions_saved += self.last_transactions_saved
+        logger.debug(
+            f"{self.key_name} reconciled {len(live_orders)} live orders to"
+            f" {num_targets} targets with {len(cancellations)} cancellations,"
+            f" {len(amendments)} amendments and {len(submissions)} submissions,"
+            f" saving {self.last_transactions_saved} instructions"
+        )
+        return cancellations, amendments, submissions
 
     def _update_state(self, current_step: int):
         if self.state_update_freq and current_step % self.state_update_freq == 0:
@@ -1495,6 +1704,7 @@ class ExponentialShapedMarketMaker(ShapedMarketMaker):
         max_order_size: float = 10000,
         order_validity_length: Optional[float] = None,
         isolated_margin_factor: Optional[float] = None,
+        reconcile_orders: bool = False,
     ):
         super().__init__(
             wallet_name=wallet_name,
@@ -1514,6 +1724,7 @@ class ExponentialShapedMarketMaker(ShapedMarketMaker):
             max_order_size=max_order_size,
             order_validity_length=order_validity_length,
             isolated_margin_factor=isolated_margin_factor,
+            reconcile_orders=reconcile_orders,
         )
         self.kappa = kappa
         self.tick_spacing = tick_spacing
@@ -1902,8 +2113,8 @@ class HedgedMarketMaker(ExponentialShapedMarketMaker):
             delay=delay,
         )
 
-    def step(self, vega_state: VegaState):
-        super().step(vega_state=vega_state)
+    def submit(self, decision: ShapedMarketMakerDecision) -> None:
+        super().submit(decision)
         self._balance_positions()
         self._balance_accounts()
 
@@ -2144,6 +2355,322 @@ class LimitOrderTrader(StateAgentWithWallet):
             )
 
 
+class TraderPopulation(StateAgent):
+    """Base for agents representing many homogeneous traders at once.
+
+    Each trader has its own key but the population draws the decisions of all
+    of them in single vectorised calls each step, only looping in Python to
+    send each trader's instructions as one batch.
+    """
+
+    NAME_BASE = "trader_population"
+
+    def __init__(
+        self,
+        key_names: List[str],
+        market_name: str,
+        initial_asset_mint: float = 1000000,
+        tag: str = "",
+        random_state: Optional[np.random.RandomState] = None,
+        wallet_name: Optional[str] = None,
+    ):
+        super().__init__(tag=tag)
+        self.key_names = key_names
+        self.num_traders = len(key_names)
+        self.market_name = market_name
+        self.initial_asset_mint = initial_asset_mint
+        self.wallet_name = wallet_name
+        self.random_state = (
+            random_state if random_state is not None else np.random.RandomState()
+        )
+
+    def initialise(
+        self,
+        vega: Union[VegaServiceNull, VegaServiceNetwork],
+        create_key: bool = True,
+        mint_key: bool = True,
+    ):
+        super().initialise(vega=vega)
+        if create_key:
+            self.public_keys = self.vega.create_keys(
+                names=self.key_names, wallet_name=self.wallet_name
+            )
+        else:
+            self.public_keys = [
+                self.vega.wallet.public_key(wallet_name=self.wallet_name, name=key_name)
+                for key_name in self.key_names
+            ]
+
+        self.market_id = self.vega.find_market_id(name=self.market_name)
+        self.asset_id = self.vega.market_to_asset[self.market_id]
+        asset_ids = [
+            self.vega.market_to_settlement_asset[self.market_id],
+            self.vega.market_to_base_asset[self.market_id],
+            self.vega.market_to_quote_asset[self.market_id],
+        ]
+        if mint_key:
+            self.vega.mint_many(
+                mints=[
+                    (key_name, asset_id, self.initial_asset_mint)
+                    for asset_id in asset_ids
+                    if asset_id is not None
+                    for key_name in self.key_names
+                ],
+                wallet_name=self.wallet_name,
+            )
+            self.vega.wait_for_total_catchup()
+
+    def _market_open(self, vega_state: VegaState) -> bool:
+        market_state = vega_state.market_state[self.market_id]
+        return (
+            market_state.trading_mode
+            == markets_protos.Market.TradingMode.TRADING_MODE_CONTINUOUS
+            and market_state.state == markets_protos.Market.State.STATE_ACTIVE
+        )
+
+    def _submit_batch(
+        self,
+        trader: int,
+        cancellations: Optional[List[OrderCancellation]] = None,
+        submissions: Optional[List[OrderSubmission]] = None,
+    ) -> None:
+        # Orders with no size or price are not built
+        submissions = [s for s in (submissions or []) if s is not None]
+        if not cancellations and not submissions:
+            return
+        self.vega.submit_instructions(
+            wallet_name=self.wallet_name,
+            key_name=self.key_names[trader],
+            cancellations=cancellations,
+            submissions=submissions,
+        )
+
+
+class MarketOrderTraderPopulation(TraderPopulation):
+    """Many MarketOrderTraders with the same parameters.
+
+    Each step every trader independently trades with probability step_bias,
+    sending a buy and a sell market order of Poisson distributed sizes in a
+    random order, as MarketOrderTrader does.
+    """
+
+    NAME_BASE = "mo_trader_population"
+
+    def __init__(
+        self,
+        key_names: List[str],
+        market_name: str,
+        initial_asset_mint: float = 1000000,
+        buy_intensity: float = 1,
+        sell_intensity: float = 1,
+        tag: str = "",
+        random_state: Optional[np.random.RandomState] = None,
+        base_order_size: float = 1,
+        wallet_name: Optional[str] = None,
+        step_bias: Optional[float] = 1,
+    ):
+        super().__init__(
+            key_names=key_names,
+            market_name=market_name,
+            initial_asset_mint=initial_asset_mint,
+            tag=tag,
+            random_state=random_state,
+            wallet_name=wallet_name,
+        )
+        self.buy_intensity = buy_intensity
+        self.sell_intensity = sell_intensity
+        self.base_order_size = base_order_size
+        self.step_bias = step_bias
+
+    def step(self, vega_state: VegaState):
+        n = self.num_traders
+        trading = self.random_state.rand(n) <= self.step_bias
+        buy_first = self.random_state.randint(0, 2, size=n).astype(bool)
+        buy_vol = self.random_state.poisson(self.buy_intensity, size=n)
+        sell_vol = self.random_state.poisson(self.sell_intensity, size=n)
+
+        if not self._market_open(vega_state):
+            return
+
+        for trader in np.flatnonzero(trading & ((buy_vol > 0) | (sell_vol > 0))):
+            orders = [
+                (vega_protos.SIDE_BUY, buy_vol[trader]),
+                (vega_protos.SIDE_SELL, sell_vol[trader]),
+            ]
+            if not buy_first[trader]:
+                orders.reverse()
+            self._submit_batch(
+                trader,
+                submissions=[
+                    self.vega.build_order_submission(
+                        market_id=self.market_id,
+                        size=volume * self.base_order_size,
+                        side=side,
+                        order_type=vega_protos.Order.Type.TYPE_MARKET,
+                        time_in_force=vega_protos.Order.TimeInForce.TIME_IN_FORCE_IOC,
+                        round_to_tick=False,
+                    )
+                    for side, volume in orders
+                    if volume > 0
+                ],
+            )
+
+
+class LimitOrderTraderPopulation(TraderPopulation):
+    """Many LimitOrderTraders with the same parameters.
+
+    Each step every trader independently submits a limit order with
+    probability submit_bias, priced with a lognormal offset from the
+    reference price, and then with probability cancel_bias cancels one of its
+    live orders at random, as LimitOrderTrader does.
+    """
+
+    NAME_BASE = "lo_trader_population"
+
+    def __init__(
+        self,
+        key_names: List[str],
+        market_name: str,
+        initial_asset_mint: float = 1000000,
+        buy_volume: float = 1.0,
+        sell_volume: float = 1.0,
+        buy_intensity: float = 5,
+        sell_intensity: float = 5,
+        tag: str = "",
+        random_state: Optional[np.random.RandomState] = None,
+        submit_bias: float = 0.5,
+        cancel_bias: float = 0.5,
+        side_opts: Optional[dict] = None,
+        time_in_force_opts: Optional[dict] = None,
+        duration: Optional[float] = 120,
+        price_process: Optional[list] = None,
+        spread: Optional[float] = None,
+        mean: Optional[float] = 2.0,
+        sigma: Optional[float] = 1.0,
+        wallet_name: str = None,
+    ):
+        super().__init__(
+            key_names=key_names,
+            market_name=market_name,
+            initial_asset_mint=initial_asset_mint,
+            tag=tag,
+            random_state=random_state,
+            wallet_name=wallet_name,
+        )
+        self.current_step = 0
+
+        self.buy_intensity = buy_intensity
+        self.sell_intensity = sell_intensity
+        self.buy_volume = buy_volume
+        self.sell_volume = sell_volume
+        self.submit_bias = submit_bias
+        self.cancel_bias = cancel_bias
+        self.side_opts = (
+            side_opts if side_opts is not None else {"SIDE_BUY": 0.5, "SIDE_SELL": 0.5}
+        )
+        self.time_in_force_opts = (
+            time_in_force_opts
+            if time_in_force_opts is not None
+            else {
+                "TIME_IN_FORCE_GTC": 0.4,
+                "TIME_IN_FORCE_GTT": 0.3,
+                "TIME_IN_FORCE_IOC": 0.2,
+                "TIME_IN_FORCE_FOK": 0.1,
+            }
+        )
+        self.duration = duration
+        self.price_process = price_process
+        self.spread = spread
+        self.mean = mean
+        self.sigma = sigma
+
+    def step(self, vega_state: VegaState):
+        self.current_step += 1
+        n = self.num_traders
+
+        submitting = self.random_state.rand(n) <= self.submit_bias
+        cancelling = submitting & (self.random_state.rand(n) <= self.cancel_bias)
+        sides = np.array(list(self.side_opts.keys()))[
+            self.random_state.choice(
+                len(self.side_opts), size=n, p=list(self.side_opts.values())
+            )
+        ]
+        times_in_force = np.array(list(self.time_in_force_opts.keys()))[
+            self.random_state.choice(
+                len(self.time_in_force_opts),
+                size=n,
+                p=list(self.time_in_force_opts.values()),
+            )
+        ]
+        is_buy = sides == "SIDE_BUY"
+        offsets = self.random_state.lognormal(
+            mean=self.mean, sigma=self.sigma, size=n
+        ) - exp(self.mean + self.sigma**2 / 2)
+        volumes = np.where(
+            is_buy,
+            self.buy_volume * self.random_state.poisson(self.buy_intensity, size=n),
+            self.sell_volume * self.random_state.poisson(self.sell_intensity, size=n),
+        )
+        # Index of the live order each cancelling trader cancels, as a fraction
+        # of however many live orders it has
+        cancel_choice = self.random_state.rand(n)
+
+        if not submitting.any():
+            return
+
+        # Calculate reference_buy_price and reference_sell_price of price distribution
+        if (self.spread is None) or (self.price_process is None):
+            # Without price_process data, offset orders from best bid/ask
+            reference_buy_price, reference_sell_price = self.vega.best_prices(
+                market_id=self.market_id
+            )
+        else:
+            reference_buy_price = (
+                self.price_process[self.current_step] - self.spread / 2
+            )
+            reference_sell_price = (
+                self.price_process[self.current_step] + self.spread / 2
+            )
+        prices = np.where(
+            is_buy, reference_buy_price + offsets, reference_sell_price - offsets
+        )
+        expires_at = self.vega.get_blockchain_time() + self.duration * 1e9
+
+        market_state = vega_state.market_state.get(self.market_id)
+        live_orders = market_state.orders if market_state is not None else {}
+
+        for trader in np.flatnonzero(submitting):
+            cancellations = []
+            if cancelling[trader]:
+                orders = list(live_orders.get(self.public_keys[trader], {}).values())
+                if orders:
+                    order = orders[int(cancel_choice[trader] * len(orders))]
+                    cancellations.append(
+                        self.vega.build_order_cancellation(
+                            order_id=order.id, market_id=self.market_id
+                        )
+                    )
+            self._submit_batch(
+                trader,
+                cancellations=cancellations,
+                submissions=[
+                    self.vega.build_order_submission(
+                        market_id=self.market_id,
+                        price=prices[trader],
+                        size=volumes[trader],
+                        side=str(sides[trader]),
+                        order_type=vega_protos.Order.Type.TYPE_LIMIT,
+                        time_in_force=str(times_in_force[trader]),
+                        expires_at=(
+                            int(expires_at)
+                            if times_in_force[trader] == "TIME_IN_FORCE_GTT"
+                            else None
+                        ),
+                    )
+                ],
+            )
+
+
 class InformedTrader(StateAgentWithWallet):
     NAME_BASE = "informed_trader"
 
@@ -2880,6 +3407,21 @@ class MomentumTrader(StateAgentWithWallet):
         return signal
 
 
+def _changed_levels(
+    previous: List[PriceLevel], current: List[PriceLevel]
+) -> List[PriceLevel]:
+    # Levels no longer in the book are recorded with zero volume
+    previous_by_price = {level.price: level for level in previous}
+    current_prices = {level.price for level in current}
+    return [
+        level for level in current if previous_by_price.get(level.price) != level
+    ] + [
+        PriceLevel(price=level.price, number_of_orders=0, volume=0)
+        for level in previous
+        if level.price not in current_prices
+    ]
+
+
 class Snitch(StateAgent):
     NAME_BASE = "snitch"
 
@@ -2893,7 +3435,48 @@ class Snitch(StateAgent):
             Callable[[VegaService, Dict[str, Agent]], Any]
         ] = None,
         only_extract_additional: bool = False,
+        history_writer: Optional[StreamingHistoryWriter] = None,
+        capture_deltas: bool = False,
+        keyframe_every: int = 100,
+        resource_sample_hz: Optional[float] = None,
     ):
+        """Agent recording the state of the network at each step.
+
+        By default every step records all markets, the top 50 levels of each
+        order book, all accounts and all positions. With capture_deltas only
+        every keyframe_every-th step does, and the steps in between record just
+        the book levels, accounts and positions which changed since the step
+        before. Those steps read accounts and markets from the live feed and
+        only fetch positions for parties which traded and for markets whose
+        mark price moved, which changes the PnL of every open position in
+        them. The scenario_output
+        loaders rebuild the full series when reading the output.
+
+        Args:
+            agents:
+                Optional[Dict[str, Agent]], Agents passed to the additional
+                state and finalise functions
+            additional_state_fn:
+                Optional[Callable], Extracts additional data at each step
+            additional_finalise_fn:
+                Optional[Callable], Extracts additional data once the run ends
+            only_extract_additional:
+                bool, default False, Only record the additional data
+            history_writer:
+                Optional[StreamingHistoryWriter], If set, market history and
+                resource data are handed to the writer each step rather than
+                kept in states and resources, so memory use does not grow
+                with the length of the run
+            capture_deltas:
+                bool, default False, Record only changes between keyframes
+            keyframe_every:
+                int, default 100, Number of steps from one full capture to the
+                next when capturing deltas
+            resource_sample_hz:
+                Optional[float], If set, the vega processes and this one are
+                also sampled this many times a second on a background thread,
+                with each sample joined onto the step it was taken during
+        """
         self.tag = None
         self.states = []
         self.resources = []
@@ -2903,13 +3486,31 @@ class Snitch(StateAgent):
         self.additional_finalise_fn = additional_finalise_fn
         self.seen_trades = set()
         self.only_extract_additional = only_extract_additional
+        self.history_writer = history_writer
+        self.capture_deltas = capture_deltas
+        self.keyframe_every = keyframe_every
+        self._num_steps = 0
+        self._market_infos: Dict[str, vega_protos.markets.Market] = {}
+        self._last_depths: Dict[str, MarketDepth] = {}
+        self._last_balances: Dict[str, float] = {}
+        self._last_positions: Dict[Tuple[str, str], Position] = {}
+        self._last_mark_prices: Dict[str, float] = {}
         self.process_map: Dict[str, psutil.Process] = {}
         self.platform = platform.system()
+        self.resource_sample_hz = resource_sample_hz
+        self.process_resources: List[ProcessResourceData] = []
+        self._resource_sampler: Optional[ResourceSampler] = None
+        self._last_step_time: Optional[int] = None
 
     def initialise(self, vega: VegaService, **kwargs):
         self.vega = vega
         if not isinstance(vega, VegaServiceNetwork):
             self._create_process_map()
+            if self.resource_sample_hz is not None:
+                self._resource_sampler = ResourceSampler(
+                    self.vega.process_pids, sample_hz=self.resource_sample_hz
+                )
+                self._resource_sampler.start()
 
     def step(self, vega_state: VegaState):
         if not self.only_extract_additional:
@@ -2919,13 +3520,25 @@ class Snitch(StateAgent):
             market_trades = {}
 
             start_time = self.vega.get_blockchain_time()
+            self._record_process_resources(start_time)
+
+            keyframe = (
+                not self.capture_deltas or self._num_steps % self.keyframe_every == 0
+            )
+            self._num_steps += 1
 
-            all_markets = self.vega.all_markets()
-            for market in all_markets:
-                market_infos[market.id] = market
-                market_datas[market.id] = self.vega.market_data_from_feed(market.id)
-                market_depths[market.id] = self.vega.market_depth(
-                    market.id, num_levels=50
+            if keyframe:
+                market_infos = {market.id: market for market in self.vega.all_markets()}
+            else:
+                market_infos = dict(self._market_infos)
+                for market_id in self.vega.data_cache.market_ids_from_feed():
+                    if market_id not in market_infos:
+                        market_infos[market_id] = self.vega.market_info(market_id)
+            self._market_infos = market_infos
+            for market_id in market_infos:
+                market_datas[market_id] = self.vega.market_data_from_feed(market_id)
+                market_depths[market_id] = self.vega.market_depth(
+                    market_id, num_levels=50
                 )
 
             all_trades = self.vega.get_trades_from_stream(
@@ -2934,22 +3547,67 @@ class Snitch(StateAgent):
             for trade in all_trades:
                 if trade.id not in self.seen_trades:
                     self.seen_trades.add(trade.id)
-                    market_trades.setdefault(market.id, []).append(trade)
+                    market_trades.setdefault(trade.market_id, []).append(trade)
 
-            positions = self.vega.list_all_positions()
+            if keyframe:
+                positions = self.vega.list_all_positions()
+                accounts = self.vega.list_accounts()
+            else:
+                # Positions change when a party trades, and their PnL whenever
+                # the mark price of their market moves. Anything else, such as
+                # settlement, is caught at the next keyframe
+                repriced_markets = {
+                    market_id
+                    for market_id, market_data in market_datas.items()
+                    if self._last_mark_prices.get(market_id) != market_data.mark_price
+                }
+                traded_parties = {
+                    party
+                    for trades in market_trades.values()
+                    for trade in trades
+                    for party in (trade.buyer, trade.seller)
+                }
+                positions = (
+                    self.vega.list_all_positions(market_ids=sorted(repriced_markets))
+                    if repriced_markets
+                    else []
+                )
+                if traded_parties:
+                    positions += [
+                        position
+                        for position in self.vega.list_all_positions(
+                            party_ids=sorted(traded_parties)
+                        )
+                        if position.market_id not in repriced_markets
+                    ]
+                accounts = self.vega.get_accounts_from_stream()
+            self._last_mark_prices = {
+                market_id: market_data.mark_price
+                for market_id, market_data in market_datas.items()
+            }
 
-            accounts = self.vega.list_accounts()
-            self.states.append(
-                MarketHistoryData(
-                    at_time=start_time,
-                    market_info=market_infos,
-                    market_data=market_datas,
+            if self.capture_deltas:
+                market_depths, accounts, positions = self._changes(
+                    keyframe=keyframe,
+                    market_depths=market_depths,
                     accounts=accounts,
-                    market_depth=market_depths,
-                    trades=market_trades,
                     positions=positions,
                 )
+
+            history = MarketHistoryData(
+                at_time=start_time,
+                market_info=market_infos,
+                market_data=market_datas,
+                accounts=accounts,
+                market_depth=market_depths,
+                trades=market_trades,
+                positions=positions,
+                keyframe=keyframe,
             )
+            if self.history_writer is not None:
+                self.history_writer.write_history(history)
+            else:
+                self.states.append(history)
 
             if not isinstance(self.vega, VegaServiceNetwork):
                 if self.platform == "Linux":
@@ -2981,39 +3639,116 @@ class Snitch(StateAgent):
                         "Unable to record memory usage, unsupported operating system"
                     )
 
-                self.resources.append(
-                    ResourceData(
-                        at_time=start_time,
-                        vega_cpu_per=(
-                            self.process_map["vega"].cpu_percent()
-                            if "vega" in self.process_map
-                            else 0
-                        ),
-                        vega_mem_rss=mem_vega.rss if mem_vega is not None else 0,
-                        vega_mem_vms=mem_vega.vms if mem_vega is not None else 0,
-                        datanode_cpu_per=(
-                            self.process_map["data-node"].cpu_percent()
-                            if "data-node" in self.process_map
-                            else 0
-                        ),
-                        datanode_mem_rss=(
-                            mem_datanode.rss if mem_datanode is not None else 0
-                        ),
-                        datanode_mem_vms=(
-                            mem_datanode.vms if mem_datanode is not None else 0
-                        ),
-                    )
+                resources = ResourceData(
+                    at_time=start_time,
+                    vega_cpu_per=(
+                        self.process_map["vega"].cpu_percent()
+                        if "vega" in self.process_map
+                        else 0
+                    ),
+                    vega_mem_rss=mem_vega.rss if mem_vega is not None else 0,
+                    vega_mem_vms=mem_vega.vms if mem_vega is not None else 0,
+                    datanode_cpu_per=(
+                        self.process_map["data-node"].cpu_percent()
+                        if "data-node" in self.process_map
+                        else 0
+                    ),
+                    datanode_mem_rss=(
+                        mem_datanode.rss if mem_datanode is not None else 0
+                    ),
+                    datanode_mem_vms=(
+                        mem_datanode.vms if mem_datanode is not None else 0
+                    ),
                 )
+                if self.history_writer is not None:
+                    self.history_writer.write_resources(resources)
+                else:
+                    self.resources.append(resources)
         if self.additional_state_fn is not None:
             self.additional_states.append(
                 self.additional_state_fn(self.vega, self.agents)
             )
 
+    def _changes(
+        self,
+        keyframe: bool,
+        market_depths: Dict[str, MarketDepth],
+        accounts: List[AccountData],
+        positions: List[Position],
+    ) -> Tuple[Dict[str, MarketDepth], List[AccountData], List[Position]]:
+        """Reduces a step's captures to what changed since the previous step,
+        or leaves them whole on a keyframe, updating the last seen values."""
+        depth_changes = {}
+        for market_id, depth in market_depths.items():
+            previous = self._last_depths.get(market_id)
+            self._last_depths[market_id] = depth
+            depth_changes[market_id] = (
+                depth
+                if keyframe or previous is None
+                else MarketDepth(
+                    buys=_changed_levels(previous.buys, depth.buys),
+                    sells=_changed_levels(previous.sells, depth.sells),
+                )
+            )
+
+        if keyframe:
+            self._last_balances = {}
+            self._last_positions = {}
+        changed_accounts = [
+            account
+            for account in accounts
+            if self._last_balances.get(account.account_id) != account.balance
+        ]
+        self._last_balances.update(
+            {account.account_id: account.balance for account in changed_accounts}
+        )
+        changed_positions = [
+            position
+            for position in positions
+            if self._last_positions.get((position.market_id, position.party_id))
+            != position
+        ]
+        self._last_positions.update(
+            {
+                (position.market_id, position.party_id): position
+                for position in changed_positions
+            }
+        )
+        return depth_changes, changed_accounts, changed_positions
+
     def _create_process_map(self):
         for name, p in self.vega.process_pids.items():
             self.process_map[name] = psutil.Process(self.vega.process_pids[name])
 
+    def _record_process_resources(self, step_time: Optional[int]) -> None:
+        """Joins the samples taken since the last step onto that step, or onto
+        this one for samples taken before the first step."""
+        if self._resource_sampler is None:
+            return
+        joined_time = (
+            self._last_step_time if self._last_step_time is not None else step_time
+        )
+        self._last_step_time = step_time
+        samples = [
+            replace(sample, at_time=joined_time)
+            for sample in self._resource_sampler.drain()
+        ]
+        if not samples:
+            return
+        if self.history_writer is not None:
+            self.history_writer.write_process_resources(samples)
+        else:
+            self.process_resources.extend(samples)
+
     def finalise(self):
+        if self._resource_sampler is not None:
+            self._resource_sampler.stop()
+            self._record_process_resources(self._last_step_time)
+            if self._resource_sampler.num_dropped:
+                logger.warning(
+                    f"Dropped {self._resource_sampler.num_dropped} resource samples"
+                    " which were not recorded before the sample buffer filled"
+                )
         self.assets = self.vega.list_assets()
         if self.additional_finalise_fn is not None:
             self.additional_states.append(
@@ -0,0 +1,290 @@
+"""Local on-disk store of historic exchange candles.
+
+Candles are kept in one file per product and granularity alongside a record
+of the time ranges which have been fetched, so a range is only ever
+downloaded once and later requests fetch just the parts they are missing. A
+store can also be used fully offline, e.g. on CI or air-gapped hosts with a
+store directory populated from fixtures, in which case any missing range is
+an error rather than a download.
+
+Files are Parquet when pyarrow (or fastparquet) is installed and gzipped CSV
+otherwise.
+"""
+
+import calendar
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CANDLE_STORE_DIR_ENV = "VEGA_SIM_CANDLE_STORE_DIR"
+CANDLE_STORE_OFFLINE_ENV = "VEGA_SIM_CANDLE_STORE_OFFLINE"
+
+# Coinbase's layout, matching price_process.CoinbaseCandle
+CANDLE_COLUMNS = ["time", "low", "high", "open", "close", "volume"]
+# Number of candles returned when no range is requested
+LATEST_CANDLES = 300
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+Candle = List[Union[int, float]]
+# Fetches the candles between two TIME_FORMAT times, both inclusive
+CandleFetcher = Callable[[Optional[str], Optional[str]], List[Candle]]
+
+
+class MissingCandlesError(Exception):
+    pass
+
+
+def _has_parquet() -> bool:
+    for engine in ["pyarrow", "fastparquet"]:
+        try:
+            __import__(engine)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+def _to_timestamp(when: str) -> int:
+    return calendar.timegm(datetime.datetime.strptime(when, TIME_FORMAT).timetuple())
+
+
+def _to_time(timestamp: int) -> str:
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime(
+        TIME_FORMAT
+    )
+
+
+def _merge(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+_env_stores: Dict[Tuple[str, bool], "CandleStore"] = {}
+_env_stores_lock = threading.Lock()
+
+
+class CandleStore:
+    def __init__(self, root: str, offline: bool = False):
+        """On-disk store of candles for any number of products.
+
+        Args:
+            root:
+                str, Directory holding the store
+            offline:
+                bool, default False, Never fetch candles. Requests for ranges
+                not already held raise a MissingCandlesError.
+        """
+        self.root = root
+        self.offline = offline
+        self.suffix = ".parquet" if _has_parquet() else ".csv.gz"
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, Tuple[pd.DataFrame, List[Tuple[int, int]]]] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["CandleStore"]:
+        """The store configured by the environment, if there is one."""
+        root = os.environ.get(CANDLE_STORE_DIR_ENV)
+        if not root:
+            return None
+        offline = os.environ.get(CANDLE_STORE_OFFLINE_ENV, "").lower() in [
+            "1",
+            "true",
+            "yes",
+        ]
+        # Shared so candles loaded by one scenario are in memory for the next
+        with _env_stores_lock:
+            if (root, offline) not in _env_stores:
+                _env_stores[(root, offline)] = cls(root=root, offline=offline)
+            return _env_stores[(root, offline)]
+
+    def _path(self, product_id: str, granularity: int) -> str:
+        safe_product = re.sub(r"[^A-Za-z0-9_.-]", "_", product_id)
+        return os.path.join(self.root, safe_product, f"{granularity}s")
+
+    def _load(
+        self, product_id: str, granularity: int
+    ) -> Tuple[pd.DataFrame, List[Tuple[int, int]]]:
+        path = self._path(product_id, granularity)
+        if path not in self._loaded:
+            try:
+                with open(path + ".ranges.json") as f:
+                    ranges = [tuple(r) for r in json.load(f)]
+                if self.suffix == ".parquet" and os.path.exists(path + ".parquet"):
+                    candles = pd.read_parquet(path + ".parquet")
+                else:
+                    candles = pd.read_csv(path + ".csv.gz")
+            except FileNotFoundError:
+                candles, ranges = pd.DataFrame(columns=CANDLE_COLUMNS), []
+            self._loaded[path] = (candles, ranges)
+        return self._loaded[path]
+
+    def _save(
+        self,
+        product_id: str,
+        granularity: int,
+        candles: pd.DataFrame,
+        ranges: List[Tuple[int, int]],
+    ) -> None:
+        path = self._path(product_id, granularity)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under temporary names so concurrent readers never see a
+        # partial file. The ranges go last so they never cover unsaved rows.
+        tmp = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}")
+        if self.suffix == ".parquet":
+            candles.to_parquet(tmp, index=False)
+        else:
+            candles.to_csv(tmp, index=False, compression="gzip")
+        os.replace(tmp, path + self.suffix)
+        with open(tmp, "w") as f:
+            json.dump(ranges, f)
+        os.replace(tmp, path + ".ranges.json")
+        self._loaded[path] = (candles, ranges)
+
+    def missing_ranges(
+        self, product_id: str, granularity: int, start: int, end: int
+    ) -> List[Tuple[int, int]]:
+        """Candle start times between start and end, inclusive, not yet covered
+        by the store, as half-open ranges aligned to the granularity."""
+        start = start - start % granularity
+        end = end - end % granularity + granularity
+        _, ranges = self._load(product_id, granularity)
+
+        missing = []
+        cursor = start
+        for covered_start, covered_end in ranges:
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    def add(
+        self,
+        product_id: str,
+        granularity: int,
+        candles: List[Candle],
+        start: int,
+        end: int,
+    ) -> None:
+        """Stores candles and records [start, end) as fetched, including any
+        periods within it which have no candles.
+
+        Candles which may not have closed yet are stored but their time is not
+        recorded as fetched, so they are fetched again when next requested.
+        """
+        held, ranges = self._load(product_id, granularity)
+        now = int(time.time())
+        end = min(end, now - now % granularity)
+        if end > start:
+            ranges = ranges + [(int(start), int(end))]
+        new = pd.DataFrame(candles, columns=CANDLE_COLUMNS)
+        merged = (
+            pd.concat([held, new] if len(held) else [new])
+            .drop_duplicates(subset="time", keep="last")
+            .sort_values("time")
+            .reset_index(drop=True)
+        )
+        self._save(
+            product_id,
+            granularity,
+            merged,
+            _merge(ranges),
+        )
+
+    def candles(
+        self,
+        product_id: str,
+        granularity: int,
+        fetch: CandleFetcher,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Candle]:
+        """Returns the candles between start and end, oldest first, fetching
+        only the ranges the store does not hold yet.
+
+        Without a start and end this is the latest candles, which online are
+        always fetched (and then stored) and offline are the latest held.
+
+        Args:
+            product_id:
+                str, Product to return candles for
+            granularity:
+                int, Candle length in seconds
+            fetch:
+                CandleFetcher, Called to download the candles in a range
+            start:
+                Optional[str], Start time in TIME_FORMAT, UTC
+            end:
+                Optional[str], End time in TIME_FORMAT, UTC
+
+        Returns:
+            List[Candle], Candles in CANDLE_COLUMNS order
+        """
+        with self._lock:
+            if start is None and end is None:
+                return self._latest(product_id, granularity, fetch)
+
+            start_ts, end_ts = _to_timestamp(start), _to_timestamp(end)
+            missing = self.missing_ranges(product_id, granularity, start_ts, end_ts)
+            if missing and self.offline:
+                raise MissingCandlesError(
+                    f"No stored {product_id} candles at {granularity}s for"
+                    f" {[(_to_time(s), _to_time(e)) for s, e in missing]}"
+                )
+            for missing_start, missing_end in missing:
+                logger.debug(
+                    f"Fetching {product_id} candles from {_to_time(missing_start)}"
+                    f" to {_to_time(missing_end)}"
+                )
+                fetched = fetch(
+                    _to_time(missing_start), _to_time(missing_end - granularity)
+                )
+                self.add(product_id, granularity, fetched, missing_start, missing_end)
+
+            held, _ = self._load(product_id, granularity)
+            in_range = held[(held["time"] >= start_ts) & (held["time"] <= end_ts)]
+            return in_range.values.tolist()
+
+    def _latest(
+        self, product_id: str, granularity: int, fetch: CandleFetcher
+    ) -> List[Candle]:
+        if not self.offline:
+            fetched = fetch(None, None)
+            if fetched:
+                times = [candle[0] for candle in fetched]
+                self.add(
+                    product_id,
+                    granularity,
+                    fetched,
+                    min(times),
+                    max(times) + granularity,
+                )
+            return sorted(fetched)
+
+        held, _ = self._load(product_id, granularity)
+        if not len(held):
+            raise MissingCandlesError(
+                f"No stored {product_id} candles at {granularity}s"
+            )
+        return held.iloc[-LATEST_CANDLES:].values.tolist()
@@ -1,6 +1,60 @@
+"""Optimal quoting strategies for the ideal market makers.
+
+The strategy tables only depend on the model parameters, so they are memoised
+in memory and, if the VEGA_SIM_MM_MODEL_CACHE_DIR environment variable is set,
+on disk in that directory, letting repeated scenario runs and parameter sweeps
+reuse them rather than recomputing for every agent.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import uuid
+from typing import Callable, Tuple
+
 import numpy as np
 from scipy.linalg import expm
 
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_DIR_ENV = "VEGA_SIM_MM_MODEL_CACHE_DIR"
+# Part of the key of tables cached on disk, changed whenever the tables
+# computed for the same parameters change
+_MODEL_CACHE_VERSION = 2
+
+
+def _memoised(name: str, compute: Callable[..., Tuple[np.ndarray, ...]], *params):
+    # Copies so callers can't modify the cached tables
+    return tuple(np.array(table) for table in _cached_tables(name, compute, params))
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_tables(
+    name: str, compute: Callable[..., Tuple[np.ndarray, ...]], params: tuple
+) -> Tuple[np.ndarray, ...]:
+    cache_dir = os.environ.get(MODEL_CACHE_DIR_ENV)
+    if not cache_dir:
+        return compute(*params)
+
+    key = hashlib.sha1(repr((name, _MODEL_CACHE_VERSION) + params).encode()).hexdigest()
+    path = os.path.join(cache_dir, f"{name}_{key}.npz")
+    try:
+        with np.load(path) as stored:
+            return tuple(stored[f"arr_{i}"] for i in range(len(stored.files)))
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.warning(f"Ignoring unreadable market maker model cache {path}")
+
+    tables = compute(*params)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Written under a temporary name so concurrent runs never read a partial file
+    tmp_path = os.path.join(cache_dir, f".{uuid.uuid4().hex}.npz")
+    np.savez(tmp_path, *tables)
+    os.replace(tmp_path, path)
+    return tables
+
 
 def a_s_mm_model(
     T: float,
@@ -40,52 +94,81 @@ def a_s_mm_model(
         phi:
             float, risk aversion parameter to represnet running penalty coefficient
     """
+    optimal_depth_bid, optimal_depth_ask, h = _memoised(
+        "a_s_mm_model",
+        _a_s_mm_tables,
+        T,
+        dt,
+        length,
+        mdp,
+        q_upper,
+        q_lower,
+        kappa,
+        Lambda,
+        alpha,
+        phi,
+    )
+    return optimal_depth_bid, optimal_depth_ask, h
+
+
+def _a_s_mm_tables(
+    T: float,
+    dt: float,
+    length: int,
+    mdp: int,
+    q_upper: int,
+    q_lower: int,
+    kappa: int,
+    Lambda: int,
+    alpha: float,
+    phi: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     # Unify unit to minute in MM Model
     T *= 60 * 24 * 365.25
     dt *= 60 * 24 * 365.25
 
-    # Initialize 2-d arrays to store optimal strategy
-    optimal_depth_bid = np.zeros([length, q_upper - q_lower])
-    optimal_depth_ask = np.zeros([length, q_upper - q_lower])
-
-    # Let A be a (q_upper-q_lower+1)-square matrix
-    A = np.zeros([q_upper - q_lower + 1, q_upper - q_lower + 1])
-    # w, time * (q_upper-q_lower+1)-dim matrix, to store the solution of ODE
-    #   row corresponds to time_step, column corresponds to inventory q
-    w = np.zeros([length, q_upper - q_lower + 1])
-
-    # A is the coefficient matrix of ODE
-    for i in range(q_upper - q_lower + 1):
-        for j in range(q_upper - q_lower + 1):
-            # i denotes row/ j denotes column
-            if j == i:
-                A[i, j] = -kappa * phi * (q_upper - i) ** 2
-            elif j == i + 1:
-                A[i, j] = Lambda * np.e**-1
-            elif j == i - 1:
-                A[i, j] = Lambda * np.e**-1
+    # A, the (q_upper-q_lower+1)-square coefficient matrix of the ODE, is
+    #   tridiagonal with row i for inventory q_upper - i
+    inventory = q_upper - np.arange(q_upper - q_lower + 1)
+    off_diagonal = Lambda * np.e**-1 * np.ones(len(inventory) - 1)
+    A = (
+        np.diag(-kappa * phi * inventory**2)
+        + np.diag(off_diagonal, k=1)
+        + np.diag(off_diagonal, k=-1)
+    )
 
     # z, (q_upper-q_lower+1)-dim vector, denotes the terminal condition of ODE
-    z = np.array(
-        [np.exp(-alpha * kappa * j**2) for j in range(q_upper, q_lower - 1, -1)]
-    )
+    z = np.exp(-alpha * kappa * inventory**2)
 
-    for i in range(length):
-        # at each time_step
-        w[i, :] = np.dot(expm(A * (T - i * dt)), z)
+    # w, time * (q_upper-q_lower+1)-dim matrix, is the solution of the ODE
+    #   expm(A * (T - t)) z, row corresponds to time_step, column to inventory q.
+    #   Rather than taking expm for every time step, each row is stepped back
+    #   from the next with the propagator expm(A * dt). A's off-diagonal
+    #   entries are non-negative, so the propagator's entries are too and no
+    #   row can lose precision to cancellation. Rows are rescaled by their
+    #   largest entry, the scale kept as a log, so long horizons don't overflow.
+    time_to_go = T - np.arange(length) * dt
+    propagator = expm(A * dt)
+    log_w = np.empty([length, len(inventory)])
+    w = expm(A * time_to_go[-1]) @ z
+    log_scale = 0.0
+    for i in range(length - 1, -1, -1):
+        if i < length - 1:
+            w = propagator @ w
+        scale = w.max()
+        w /= scale
+        log_scale += np.log(scale)
+        log_w[i] = np.log(w) + log_scale
 
     # h is the transformation of solution from ODE
     #   also the key term of value function
-    h = np.log(w) / kappa
+    h = log_w / kappa
 
     # Calculate optimal strategy
-    for i in range(q_upper - q_lower):
-        # column corresponds to Q, Q-1,..., -Q+1
-        optimal_depth_ask[:, i] = 1 / kappa + h[:, i] - h[:, i + 1]
-
-    for i in range(1, q_upper - q_lower + 1):
-        # column corresponds to Q-1, Q-2,..., -Q
-        optimal_depth_bid[:, i - 1] = 1 / kappa + h[:, i] - h[:, i - 1]
+    #   ask columns correspond to Q, Q-1,..., -Q+1
+    #   bid columns correspond to Q-1, Q-2,..., -Q
+    optimal_depth_ask = 1 / kappa + h[:, :-1] - h[:, 1:]
+    optimal_depth_bid = 1 / kappa + h[:, 1:] - h[:, :-1]
 
     # In A_S model, optimal depth can be negative, however, in Vega,
     #   offset must be positive and notice the market precision
@@ -127,15 +210,34 @@ def GLFT_approx(
             float, risk aversion parameter to represnet running penalty coefficient
     """
 
+    return _memoised(
+        "GLFT_approx",
+        _glft_tables,
+        q_upper,
+        q_lower,
+        kappa,
+        Lambda,
+        alpha,
+        phi,
+    )
+
+
+def _glft_tables(
+    q_upper: int,
+    q_lower: int,
+    kappa: int,
+    Lambda: int,
+    alpha: float,
+    phi: float,
+) -> Tuple[np.ndarray, np.ndarray]:
     # approximation method
-    delta_buy_approx = [
-        1 / kappa + (2 * i + 1) * np.sqrt(phi * np.e / Lambda / kappa) / 2
-        for i in range(q_upper - 1, q_lower - 1, -1)
-    ]
-    delta_sell_approx = [
-        1 / kappa - (2 * i - 1) * np.sqrt(phi * np.e / Lambda / kappa) / 2
-        for i in range(q_upper, q_lower, -1)
-    ]
+    half_spread = np.sqrt(phi * np.e / Lambda / kappa) / 2
+    delta_buy_approx = (
+        1 / kappa + (2 * np.arange(q_upper - 1, q_lower - 1, -1) + 1) * half_spread
+    )
+    delta_sell_approx = (
+        1 / kappa - (2 * np.arange(q_upper, q_lower, -1) - 1) * half_spread
+    )
 
     return delta_buy_approx, delta_sell_approx
 
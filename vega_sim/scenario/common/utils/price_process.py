@@ -2,12 +2,14 @@ import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional, Union
 from vega_sim.api.helpers import num_from_padded_int
+from vega_sim.scenario.common.utils.candle_store import CandleStore
 import time
 import os
 import logging
 
 import numpy as np
 import pandas as pd
+from scipy.signal import lfilter
 import requests
 import json
 import threading
@@ -48,25 +50,20 @@ def random_walk(
     random_state_set = random_state is not None
     random_state = random_state if random_state_set else np.random.RandomState()
 
-    S = np.zeros(num_steps + 1)
-    S[0] = starting_price
-
     for _ in range(100):
-        dW = random_state.randn(num_steps + 1)
-        # Simulate external midprice
-        for i in range(1, len(S)):
-            S[i] = S[i - 1] + drift + sigma * dW[i]
-
-        # market decimal place
-        if decimal_precision:
-            S = np.round(S, decimal_precision)
+        S = random_walk_paths(
+            num_paths=1,
+            num_steps=num_steps,
+            random_state=random_state,
+            sigma=sigma,
+            drift=drift,
+            starting_price=starting_price,
+            decimal_precision=decimal_precision,
+            trim_to_min=trim_to_min,
+        )[0]
 
         # If random state is passed then error if it generates a negative price
         # Otherwise retry with a new seed
-
-        if trim_to_min is not None:
-            S[S < trim_to_min] = trim_to_min
-
         if (S > 0).all():
             break
         else:
@@ -81,6 +78,255 @@ def random_walk(
     return S
 
 
+def _finalise_paths(
+    paths: np.ndarray,
+    decimal_precision: Optional[int] = None,
+    trim_to_min: Optional[float] = None,
+) -> np.ndarray:
+    # market decimal place
+    if decimal_precision:
+        paths = np.round(paths, decimal_precision)
+    if trim_to_min is not None:
+        paths[paths < trim_to_min] = trim_to_min
+    return paths
+
+
+def random_walk_paths(
+    num_paths: int,
+    num_steps: int = 100,
+    random_state: Optional[np.random.RandomState] = None,
+    sigma: float = 1,
+    drift: float = 0,
+    starting_price: float = 100,
+    decimal_precision: Optional[int] = None,
+    trim_to_min: Optional[float] = None,
+) -> np.ndarray:
+    """Generates independent arithmetic random walks in one go.
+
+    Unlike random_walk, paths with non-positive prices are returned as they are
+    rather than regenerated.
+
+    Args:
+        num_paths:
+            int, Number of paths to generate
+        num_steps:
+            int, default 100, Number of steps after the starting price
+        random_state:
+            Optional[np.random.RandomState], Source of randomness. The first
+            path matches random_walk with an identically seeded state.
+        sigma:
+            float, default 1, Standard deviation of each step
+        drift:
+            float, default 0, Change in price each step
+        starting_price:
+            float, default 100, Price at step zero of every path
+        decimal_precision:
+            Optional[int], If set, prices are rounded to this many decimals
+        trim_to_min:
+            Optional[float], If set, prices below this are raised to it
+
+    Returns:
+        np.ndarray, Prices of shape (num_paths, num_steps + 1)
+    """
+    random_state = random_state if random_state is not None else np.random.RandomState()
+
+    increments = drift + sigma * random_state.randn(num_paths, num_steps + 1)
+    increments[:, 0] = starting_price
+    return _finalise_paths(
+        np.cumsum(increments, axis=1),
+        decimal_precision=decimal_precision,
+        trim_to_min=trim_to_min,
+    )
+
+
+def gbm_paths(
+    num_paths: int,
+    num_steps: int = 100,
+    random_state: Optional[np.random.RandomState] = None,
+    sigma: float = 0.01,
+    drift: float = 0,
+    starting_price: float = 100,
+    dt: float = 1,
+    decimal_precision: Optional[int] = None,
+    trim_to_min: Optional[float] = None,
+) -> np.ndarray:
+    """Generates geometric Brownian motion paths in one go.
+
+    Args:
+        num_paths:
+            int, Number of paths to generate
+        num_steps:
+            int, default 100, Number of steps after the starting price
+        random_state:
+            Optional[np.random.RandomState], Source of randomness
+        sigma:
+            float, default 0.01, Volatility per unit time
+        drift:
+            float, default 0, Expected return per unit time
+        starting_price:
+            float, default 100, Price at step zero of every path
+        dt:
+            float, default 1, Length of each step
+        decimal_precision:
+            Optional[int], If set, prices are rounded to this many decimals
+        trim_to_min:
+            Optional[float], If set, prices below this are raised to it
+
+    Returns:
+        np.ndarray, Prices of shape (num_paths, num_steps + 1)
+    """
+    random_state = random_state if random_state is not None else np.random.RandomState()
+
+    log_returns = (drift - sigma**2 / 2) * dt + sigma * np.sqrt(
+        dt
+    ) * random_state.randn(num_paths, num_steps)
+    return _finalise_paths(
+        _paths_from_log_returns(log_returns, starting_price),
+        decimal_precision=decimal_precision,
+        trim_to_min=trim_to_min,
+    )
+
+
+def jump_diffusion_paths(
+    num_paths: int,
+    num_steps: int = 100,
+    random_state: Optional[np.random.RandomState] = None,
+    sigma: float = 0.01,
+    drift: float = 0,
+    jump_intensity: float = 0.01,
+    jump_mean: float = 0,
+    jump_std: float = 0.05,
+    starting_price: float = 100,
+    dt: float = 1,
+    decimal_precision: Optional[int] = None,
+    trim_to_min: Optional[float] = None,
+) -> np.ndarray:
+    """Generates Merton jump diffusion paths in one go.
+
+    Between jumps prices follow a geometric Brownian motion. Jumps arrive as a
+    Poisson process and each multiplies the price by exp(N(jump_mean,
+    jump_std^2)). The drift is compensated for the jumps so it remains the
+    expected return.
+
+    Args:
+        num_paths:
+            int, Number of paths to generate
+        num_steps:
+            int, default 100, Number of steps after the starting price
+        random_state:
+            Optional[np.random.RandomState], Source of randomness
+        sigma:
+            float, default 0.01, Diffusive volatility per unit time
+        drift:
+            float, default 0, Expected return per unit time
+        jump_intensity:
+            float, default 0.01, Expected number of jumps per unit time
+        jump_mean:
+            float, default 0, Mean of the log size of a jump
+        jump_std:
+            float, default 0.05, Standard deviation of the log size of a jump
+        starting_price:
+            float, default 100, Price at step zero of every path
+        dt:
+            float, default 1, Length of each step
+        decimal_precision:
+            Optional[int], If set, prices are rounded to this many decimals
+        trim_to_min:
+            Optional[float], If set, prices below this are raised to it
+
+    Returns:
+        np.ndarray, Prices of shape (num_paths, num_steps + 1)
+    """
+    random_state = random_state if random_state is not None else np.random.RandomState()
+
+    compensator = jump_intensity * (np.exp(jump_mean + jump_std**2 / 2) - 1)
+    log_returns = (drift - compensator - sigma**2 / 2) * dt + sigma * np.sqrt(
+        dt
+    ) * random_state.randn(num_paths, num_steps)
+    # The sum of n normal jumps is itself normal
+    num_jumps = random_state.poisson(jump_intensity * dt, size=(num_paths, num_steps))
+    log_returns += num_jumps * jump_mean + np.sqrt(
+        num_jumps
+    ) * jump_std * random_state.randn(num_paths, num_steps)
+    return _finalise_paths(
+        _paths_from_log_returns(log_returns, starting_price),
+        decimal_precision=decimal_precision,
+        trim_to_min=trim_to_min,
+    )
+
+
+def ou_paths(
+    num_paths: int,
+    num_steps: int = 100,
+    random_state: Optional[np.random.RandomState] = None,
+    theta: float = 0.15,
+    mu: float = 0.0,
+    sigma: float = 0.2,
+    starting_price: float = 1.0,
+    drift: float = 0.0,
+    decimal_precision: Optional[int] = None,
+    trim_to_min: Optional[float] = None,
+) -> np.ndarray:
+    """Generates mean reverting Ornstein–Uhlenbeck paths in one go.
+
+    Each step is x[t] = x[t-1] + theta * (mu + t * drift - x[t-1]) + sigma * dW,
+    a first order linear recurrence which is run over all paths at once as a
+    filter.
+
+    Args:
+        num_paths:
+            int, Number of paths to generate
+        num_steps:
+            int, default 100, Number of steps after the starting price
+        random_state:
+            Optional[np.random.RandomState], Source of randomness
+        theta:
+            float, default 0.15, Speed of reversion to the mean
+        mu:
+            float, default 0.0, Long-term mean level
+        sigma:
+            float, default 0.2, Volatility of the process
+        starting_price:
+            float, default 1.0, Price at step zero of every path
+        drift:
+            float, default 0.0, Change in the mean level each step
+        decimal_precision:
+            Optional[int], If set, prices are rounded to this many decimals
+        trim_to_min:
+            Optional[float], If set, prices below this are raised to it
+
+    Returns:
+        np.ndarray, Prices of shape (num_paths, num_steps + 1)
+    """
+    random_state = random_state if random_state is not None else np.random.RandomState()
+
+    decay = 1 - theta
+    steps = np.arange(1, num_steps + 1)
+    inputs = theta * (mu + steps * drift) + sigma * random_state.normal(
+        size=(num_paths, num_steps)
+    )
+    paths = np.empty((num_paths, num_steps + 1))
+    paths[:, 0] = starting_price
+    paths[:, 1:], _ = lfilter(
+        [1.0],
+        [1.0, -decay],
+        inputs,
+        axis=1,
+        zi=np.full((num_paths, 1), decay * starting_price),
+    )
+    return _finalise_paths(
+        paths, decimal_precision=decimal_precision, trim_to_min=trim_to_min
+    )
+
+
+def _paths_from_log_returns(
+    log_returns: np.ndarray, starting_price: float
+) -> np.ndarray:
+    log_prices = np.zeros((log_returns.shape[0], log_returns.shape[1] + 1))
+    np.cumsum(log_returns, axis=1, out=log_prices[:, 1:])
+    return starting_price * np.exp(log_prices)
+
+
 def get_trading_pairs() -> List[Dict[str, Any]]:
     headers = {"Accept": "application/json"}
     return requests.get(COINBASE_REQUEST_BASE, headers=headers).json()
@@ -149,13 +395,30 @@ def get_historic_price_series(
     interpolation: str = None,
     start: Optional[str] = None,
     end: Optional[str] = None,
+    candle_store: Optional[CandleStore] = None,
 ) -> pd.Series:
-    ohlcv = get_historic_candles(
-        product_id=product_id,
-        granularity=granularity,
-        start=start,
-        end=end,
-    )
+    # Unless one is passed, a store is used if configured by the environment
+    candle_store = candle_store if candle_store is not None else CandleStore.from_env()
+    if candle_store is not None and granularity is not None:
+        ohlcv = candle_store.candles(
+            product_id=product_id,
+            granularity=granularity.value,
+            fetch=lambda fetch_start, fetch_end: get_historic_candles(
+                product_id=product_id,
+                granularity=granularity,
+                start=fetch_start,
+                end=fetch_end,
+            ),
+            start=start,
+            end=end,
+        )
+    else:
+        ohlcv = get_historic_candles(
+            product_id=product_id,
+            granularity=granularity,
+            start=start,
+            end=end,
+        )
     s = (
         pd.Series(
             data=[o[price_component.value] for o in ohlcv],
@@ -315,7 +578,15 @@ def get_live_price(
         return _live_prices[feed_key]
 
 
-def ou_price_process(n, theta=0.15, mu=0.0, sigma=0.2, x0=1.0, drift=0.0):
+def ou_price_process(
+    n,
+    theta=0.15,
+    mu=0.0,
+    sigma=0.2,
+    x0=1.0,
+    drift=0.0,
+    random_state: Optional[np.random.RandomState] = None,
+):
     """
     Generates a mean-reverting price series using the Ornstein–Uhlenbeck
     process with an optional drift term.
@@ -327,20 +598,23 @@ def ou_price_process(n, theta=0.15, mu=0.0, sigma=0.2, x0=1.0, drift=0.0):
         sigma (float): Volatility of the process.
         x0 (float): Initial value of the series.
         drift (float): Optional drift term to model a constant trend.
+        random_state (Optional[np.random.RandomState]): Source of randomness,
+            defaults to NumPy's global random state.
 
     Returns:
         np.ndarray: Mean-reverting price series of length n.
     """
-    dt = 1.0  # Assuming a time step of 1
-    x = np.zeros(n)
-    x[0] = x0
-    for t in range(1, n):
-        dx = (
-            theta * ((mu + t * drift) - x[t - 1]) * dt
-            + sigma * np.sqrt(dt) * np.random.normal()
-        )
-        x[t] = x[t - 1] + dx
-    return x
+    return ou_paths(
+        num_paths=1,
+        num_steps=n - 1,
+        # The module level functions draw from the global random state
+        random_state=random_state if random_state is not None else np.random,
+        theta=theta,
+        mu=mu,
+        sigma=sigma,
+        starting_price=x0,
+        drift=drift,
+    )[0]
 
 
 if __name__ == "__main__":
@@ -19,7 +19,9 @@ from vega_sim.scenario.common.agents import (
     MarketManager,
     SimpleLiquidityProvider,
     MarketOrderTrader,
+    MarketOrderTraderPopulation,
     LimitOrderTrader,
+    LimitOrderTraderPopulation,
     MomentumTrader,
     OpenAuctionPass,
     StateAgent,
@@ -70,6 +72,7 @@ class ComprehensiveMarket(Scenario):
         num_mo_agents: int = 5,
         num_lo_agents: int = 20,
         num_momentum_agents: int = 1,
+        use_trader_populations: bool = False,
     ):
         super().__init__(state_extraction_fn=state_extraction_fn)
         self.num_steps = num_steps
@@ -90,6 +93,8 @@ class ComprehensiveMarket(Scenario):
         self.price_process_fn = price_process_fn
         self.opening_auction_trade_amount = opening_auction_trade_amount
         self.settle_at_end = settle_at_end
+        # Run the market and limit order traders as one vectorised agent each
+        self.use_trader_populations = use_trader_populations
 
         # MarketOrderTraderOptions
         self.market_order_trader_order_intensity = market_order_trader_order_intensity
@@ -184,42 +189,77 @@ class ComprehensiveMarket(Scenario):
             for i in range(len(self.lp_wallets))
         ]
 
-        mo_agents = [
-            MarketOrderTrader(
-                key_name=self.mo_wallets[i].name,
-                initial_asset_mint=self.initial_asset_mint,
-                market_name=market_name,
-                tag=f"{i}_{tag}",
-                buy_intensity=self.market_order_trader_order_intensity,
-                sell_intensity=self.market_order_trader_order_intensity,
-                base_order_size=self.market_order_trader_order_size,
-                random_state=random_state,
-            )
-            for i in range(len(self.mo_wallets))
-        ]
+        if self.use_trader_populations:
+            mo_agents = [
+                MarketOrderTraderPopulation(
+                    key_names=[wallet.name for wallet in self.mo_wallets],
+                    initial_asset_mint=self.initial_asset_mint,
+                    market_name=market_name,
+                    tag=str(tag),
+                    buy_intensity=self.market_order_trader_order_intensity,
+                    sell_intensity=self.market_order_trader_order_intensity,
+                    base_order_size=self.market_order_trader_order_size,
+                    random_state=random_state,
+                )
+            ]
+            lo_agents = [
+                LimitOrderTraderPopulation(
+                    key_names=[wallet.name for wallet in self.lo_wallets],
+                    initial_asset_mint=self.initial_asset_mint,
+                    market_name=market_name,
+                    tag=str(tag),
+                    spread=self.spread,
+                    price_process=price_process,
+                    buy_intensity=self.limit_order_trader_order_intensity,
+                    sell_intensity=self.limit_order_trader_order_intensity,
+                    buy_volume=self.limit_order_trader_order_size,
+                    sell_volume=self.limit_order_trader_order_size,
+                    submit_bias=self.limit_order_trader_submit_bias,
+                    cancel_bias=self.limit_order_trader_cancel_bias,
+                    duration=self.limit_order_trader_duration,
+                    time_in_force_opts=self.limit_order_trader_time_in_force_opts,
+                    mean=self.limit_order_trader_mean,
+                    sigma=self.limit_order_trader_sigma,
+                    random_state=random_state,
+                )
+            ]
+        else:
+            mo_agents = [
+                MarketOrderTrader(
+                    key_name=self.mo_wallets[i].name,
+                    initial_asset_mint=self.initial_asset_mint,
+                    market_name=market_name,
+                    tag=f"{i}_{tag}",
+                    buy_intensity=self.market_order_trader_order_intensity,
+                    sell_intensity=self.market_order_trader_order_intensity,
+                    base_order_size=self.market_order_trader_order_size,
+                    random_state=random_state,
+                )
+                for i in range(len(self.mo_wallets))
+            ]
 
-        lo_agents = [
-            LimitOrderTrader(
-                key_name=self.lo_wallets[i].name,
-                initial_asset_mint=self.initial_asset_mint,
-                market_name=market_name,
-                tag=f"{i}_{tag}",
-                spread=self.spread,
-                price_process=price_process,
-                buy_intensity=self.limit_order_trader_order_intensity,
-                sell_intensity=self.limit_order_trader_order_intensity,
-                buy_volume=self.limit_order_trader_order_size,
-                sell_volume=self.limit_order_trader_order_size,
-                submit_bias=self.limit_order_trader_submit_bias,
-                cancel_bias=self.limit_order_trader_cancel_bias,
-                duration=self.limit_order_trader_duration,
-                time_in_force_opts=self.limit_order_trader_time_in_force_opts,
-                mean=self.limit_order_trader_mean,
-                sigma=self.limit_order_trader_sigma,
-                random_state=random_state,
-            )
-            for i in range(len(self.lo_wallets))
-        ]
+            lo_agents = [
+                LimitOrderTrader(
+                    key_name=self.lo_wallets[i].name,
+                    initial_asset_mint=self.initial_asset_mint,
+                    market_name=market_name,
+                    tag=f"{i}_{tag}",
+                    spread=self.spread,
+                    price_process=price_process,
+                    buy_intensity=self.limit_order_trader_order_intensity,
+                    sell_intensity=self.limit_order_trader_order_intensity,
+                    buy_volume=self.limit_order_trader_order_size,
+                    sell_volume=self.limit_order_trader_order_size,
+                    submit_bias=self.limit_order_trader_submit_bias,
+                    cancel_bias=self.limit_order_trader_cancel_bias,
+                    duration=self.limit_order_trader_duration,
+                    time_in_force_opts=self.limit_order_trader_time_in_force_opts,
+                    mean=self.limit_order_trader_mean,
+                    sigma=self.limit_order_trader_sigma,
+                    random_state=random_state,
+                )
+                for i in range(len(self.lo_wallets))
+            ]
 
         momentum_agents = [
             MomentumTrader(
@@ -99,9 +99,10 @@ class ConfigurableMarketManager(StateAgentWithWallet):
         self.vega.wait_for_total_catchup()
 
         if self.network_parameters is not None:
-            for key, item in self.network_parameters.items():
-                self.vega.update_network_parameter(self.key_name, key, item)
-                vega.wait_for_total_catchup()
+            self.vega.update_network_parameters(
+                self.key_name, parameters=self.network_parameters
+            )
+            vega.wait_for_total_catchup()
 
         if self.vega.find_asset_id(symbol=self.asset_name) is None:
             self.vega.create_asset(
@@ -0,0 +1,381 @@
+"""Fuzzing campaigns: many seeds of a fuzzing scenario run concurrently, each in
+its own nullchain, with failures grouped by signature.
+
+A failure's signature is taken, in order of precedence, from:
+    - a panic in the core node's log, as a crashed core is the root cause of
+        whatever errors the scenario then hit
+    - a failed invariant, i.e. an exception raised from within a check_* function
+    - any other exception, identified by its type and the innermost vega_sim
+        function it was raised from
+
+Messages are normalised (ids, numbers and addresses replaced with placeholders)
+so the same bug hit with different values shares a signature. For each unique
+failure the smallest recorded transaction replay file is kept, which can be
+re-run with VegaServiceNull(replay_from_path=...).
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INVARIANT_CHECKS = [
+    "check_market_states_consistent",
+    "check_book_not_crossed",
+]
+
+CORE_LOG_FILES = ["node.err", "node.out"]
+REPLAY_FILE_NAME = "replay"
+
+_PANIC_RE = re.compile(r"^panic: (.*)$", re.MULTILINE)
+_GO_FRAME_RE = re.compile(r"^(code\.vegaprotocol\.io/.+)\([^()]*\)$", re.MULTILINE)
+_NORMALISE_RES = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"\b[0-9a-fA-F]{16,}\b"), "<id>"),
+    (re.compile(r"\d+(\.\d+)?"), "<n>"),
+]
+_MAX_PANIC_FRAMES = 3
+
+
+@dataclass
+class FailureSignature:
+    kind: str
+    error_type: str
+    location: str
+    message: str
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha1(
+            "|".join([self.kind, self.error_type, self.location, self.message]).encode()
+        ).hexdigest()[:12]
+
+
+@dataclass
+class FuzzingRunOutcome:
+    seed: int
+    run_seconds: float
+    signature: Optional[FailureSignature] = None
+    details: Optional[str] = None
+    replay_path: Optional[str] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.signature is not None
+
+
+@dataclass
+class UniqueFailure:
+    signature: FailureSignature
+    seeds: List[int] = field(default_factory=list)
+    replay_path: Optional[str] = None
+    details: Optional[str] = None
+
+
+def _normalise(message: str) -> str:
+    for pattern, placeholder in _NORMALISE_RES:
+        message = pattern.sub(placeholder, message)
+    return message.strip()
+
+
+def _core_panic_signature(node_log: str) -> Optional[FailureSignature]:
+    match = _PANIC_RE.search(node_log)
+    if match is None:
+        return None
+    frames = _GO_FRAME_RE.findall(node_log[match.end() :])[:_MAX_PANIC_FRAMES]
+    return FailureSignature(
+        kind="core_panic",
+        error_type="panic",
+        location=" < ".join(frames),
+        message=_normalise(match.group(1)),
+    )
+
+
+def classify_failure(
+    error: Optional[BaseException], node_log: str = ""
+) -> Optional[FailureSignature]:
+    """Returns the signature of a failed run, or None if the run passed.
+
+    Args:
+        error:
+            Optional[BaseException], The exception the run raised, if any
+        node_log:
+            str, default "", Contents of the core node's log files
+    """
+    panic = _core_panic_signature(node_log)
+    if panic is not None:
+        return panic
+    if error is None:
+        return None
+
+    frames = traceback.extract_tb(error.__traceback__)
+    checks = [frame.name for frame in frames if frame.name.startswith("check_")]
+    if checks:
+        return FailureSignature(
+            kind="invariant",
+            error_type=type(error).__name__,
+            location=checks[-1],
+            message=_normalise(str(error)),
+        )
+
+    own_frames = [
+        frame for frame in frames if f"{os.sep}vega_sim{os.sep}" in frame.filename
+    ]
+    frame = own_frames[-1] if own_frames else (frames[-1] if frames else None)
+    location = (
+        f"{os.path.basename(frame.filename)}:{frame.name}"
+        if frame is not None
+        else "unknown"
+    )
+    return FailureSignature(
+        kind="exception",
+        error_type=type(error).__name__,
+        location=location,
+        message=_normalise(str(error)),
+    )
+
+
+def group_failures(outcomes: Iterable[FuzzingRunOutcome]) -> Dict[str, UniqueFailure]:
+    """De-duplicates failed runs by signature. Each unique failure keeps the
+    smallest replay file of the runs which hit it, as the shortest reproducer."""
+    failures: Dict[str, UniqueFailure] = {}
+    replay_sizes: Dict[str, int] = {}
+    for outcome in sorted(outcomes, key=lambda o: o.seed):
+        if not outcome.failed:
+            continue
+        key = outcome.signature.key
+        failure = failures.setdefault(
+            key, UniqueFailure(signature=outcome.signature, details=outcome.details)
+        )
+        failure.seeds.append(outcome.seed)
+        if outcome.replay_path is None or not os.path.exists(outcome.replay_path):
+            continue
+        size = os.path.getsize(outcome.replay_path)
+        if key not in replay_sizes or size < replay_sizes[key]:
+            replay_sizes[key] = size
+            failure.replay_path = outcome.replay_path
+            failure.details = outcome.details
+    return failures
+
+
+def check_invariants(vega) -> None:
+    """Runs the VegaService consistency checks, raising on the first violation.
+
+    The service methods are wrapped to only log failures, so the undecorated
+    functions are called instead.
+    """
+    for name in INVARIANT_CHECKS:
+        check = getattr(type(vega), name)
+        getattr(check, "__wrapped__", check)(vega)
+
+
+def _read_node_log(log_dir: str) -> str:
+    contents = []
+    for file_name in CORE_LOG_FILES:
+        file_path = os.path.join(log_dir, file_name)
+        if os.path.exists(file_path):
+            with open(file_path, errors="replace") as f:
+                contents.append(f.read())
+    return "\n".join(contents)
+
+
+def run_fuzzing_seed(
+    scenario_name: str,
+    seed: int,
+    output_dir: str,
+    num_steps: Optional[int] = None,
+    run_invariant_checks: bool = True,
+) -> FuzzingRunOutcome:
+    """Runs a fuzzing scenario from the registry with the given seed.
+
+    On failure the node logs, traceback and replay file are kept in
+    output_dir/seed_<seed>. Everything else the run wrote is removed.
+    """
+    from vega_sim.null_service import VegaServiceNull
+    from vega_sim.scenario.fuzzing.registry import REGISTRY
+
+    scenario = copy.copy(REGISTRY[scenario_name])
+    if num_steps is not None:
+        scenario.num_steps = num_steps
+
+    vega = VegaServiceNull(
+        warn_on_raw_data_access=False,
+        seconds_per_block=scenario.block_length_seconds,
+        transactions_per_block=scenario.transactions_per_block,
+        retain_log_files=True,
+        store_transactions=True,
+        use_full_vega_wallet=False,
+        run_with_console=False,
+    )
+    start = time.time()
+    error = None
+    try:
+        with vega:
+            scenario.run_iteration(
+                vega=vega,
+                random_state=np.random.RandomState(seed),
+                output_data=False,
+                run_with_snitch=False,
+            )
+            if run_invariant_checks:
+                check_invariants(vega)
+    except Exception as e:
+        error = e
+
+    outcome = FuzzingRunOutcome(seed=seed, run_seconds=time.time() - start)
+    try:
+        node_log = _read_node_log(vega.log_dir)
+        outcome.signature = classify_failure(error, node_log)
+        if outcome.failed:
+            outcome.details = (
+                "".join(traceback.format_exception(error))
+                if error is not None
+                else None
+            )
+            seed_dir = os.path.join(output_dir, f"seed_{seed}")
+            os.makedirs(seed_dir, exist_ok=True)
+            for file_name in CORE_LOG_FILES:
+                if os.path.exists(os.path.join(vega.log_dir, file_name)):
+                    shutil.copy(os.path.join(vega.log_dir, file_name), seed_dir)
+            if outcome.details is not None:
+                with open(os.path.join(seed_dir, "traceback.txt"), "w") as f:
+                    f.write(outcome.details)
+            replay = os.path.join(vega.log_dir, "vegahome", REPLAY_FILE_NAME)
+            if os.path.exists(replay):
+                outcome.replay_path = shutil.copy(replay, seed_dir)
+    finally:
+        shutil.rmtree(vega.log_dir, ignore_errors=True)
+    return outcome
+
+
+@dataclass
+class CampaignReport:
+    scenario: str
+    outcomes: List[FuzzingRunOutcome]
+    failures: Dict[str, UniqueFailure]
+
+    def summary(self) -> str:
+        num_failed = sum(o.failed for o in self.outcomes)
+        lines = [
+            f"Fuzzing campaign {self.scenario}: {len(self.outcomes)} seeds,"
+            f" {num_failed} failed, {len(self.failures)} unique failures"
+        ]
+        for key, failure in self.failures.items():
+            sig = failure.signature
+            lines.append(
+                f"  [{key}] {sig.kind} {sig.error_type} at {sig.location}:"
+                f" {sig.message[:120]} (seeds {failure.seeds}, replay"
+                f" {failure.replay_path})"
+            )
+        return "\n".join(lines)
+
+
+def run_campaign(
+    scenario_name: str,
+    seeds: Iterable[int],
+    output_dir: str,
+    num_workers: int = 1,
+    num_steps: Optional[int] = None,
+    run_invariant_checks: bool = True,
+) -> CampaignReport:
+    """Runs a fuzzing scenario once per seed, num_workers at a time.
+
+    Each run has its own VegaServiceNull, which reserves its own port block, so
+    runs never clash. Results are written to output_dir/campaign.json, and only
+    the smallest replay file of each unique failure is kept.
+
+    Args:
+        scenario_name:
+            str, Key of the scenario in the fuzzing REGISTRY
+        seeds:
+            Iterable[int], Random seeds to run
+        output_dir:
+            str, Directory to write failure artefacts and the report to
+        num_workers:
+            int, default 1, Number of runs to execute at once
+        num_steps:
+            Optional[int], Overrides the scenario's number of steps
+        run_invariant_checks:
+            bool, default True, Check market state and order book consistency
+            once each run completes
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    seeds = list(seeds)
+    outcomes = []
+
+    # Workers are spawned rather than forked, as the parent may hold gRPC state
+    # which is unsafe to fork. Runs only need picklable arguments.
+    with ProcessPoolExecutor(
+        max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(
+                run_fuzzing_seed,
+                scenario_name,
+                seed,
+                output_dir,
+                num_steps,
+                run_invariant_checks,
+            ): seed
+            for seed in seeds
+        }
+        for future in as_completed(futures):
+            seed = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                # The worker process itself died, so nothing was recorded
+                outcome = FuzzingRunOutcome(
+                    seed=seed,
+                    run_seconds=0,
+                    signature=classify_failure(e),
+                    details="".join(traceback.format_exception(e)),
+                )
+            outcomes.append(outcome)
+            logger.info(
+                f"Seed {seed} "
+                + (
+                    f"failed with {outcome.signature.kind} [{outcome.signature.key}]"
+                    if outcome.failed
+                    else "passed"
+                )
+                + f" after {outcome.run_seconds:.0f}s"
+            )
+
+    failures = group_failures(outcomes)
+    kept = {f.replay_path for f in failures.values()}
+    for outcome in outcomes:
+        if outcome.replay_path is not None and outcome.replay_path not in kept:
+            os.remove(outcome.replay_path)
+            outcome.replay_path = None
+
+    report = CampaignReport(
+        scenario=scenario_name,
+        outcomes=sorted(outcomes, key=lambda o: o.seed),
+        failures=failures,
+    )
+    with open(os.path.join(output_dir, "campaign.json"), "w") as f:
+        json.dump(
+            {
+                "scenario": scenario_name,
+                "outcomes": [asdict(o) for o in report.outcomes],
+                "failures": {k: asdict(v) for k, v in failures.items()},
+            },
+            f,
+            indent=4,
+        )
+    logger.info(report.summary())
+    return report
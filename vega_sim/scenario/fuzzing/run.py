@@ -9,6 +9,7 @@ from vega_sim.null_service import VegaServiceNull, Ports
 from vega_sim.scenario.constants import Network
 from vega_sim.scenario.fuzzing.scenario import FuzzingScenario
 from vega_sim.scenario.fuzzing.registry import REGISTRY
+from vega_sim.scenario.fuzzing.campaign import run_campaign
 
 from vega_query.service.service import Service
 from vega_query.service.networks.constants import Network
@@ -27,13 +28,13 @@ def _run(
     data_node_metrics_port: Optional[int] = None,
 ):
 
+    # Metrics ports are only fixed when explicitly requested, otherwise they are
+    # taken from the block reserved for the instance so parallel runs don't clash.
     port_config = {}
-    ## Temporarily disable metrics ports whilst running multiple
-    ## fuzzing runs in parallel to avoid port conflicts.
-    # if core_metrics_port is not None:
-    #     port_config[Ports.METRICS] = core_metrics_port
-    # if data_node_metrics_port is not None:
-    #     port_config[Ports.DATA_NODE_METRICS] = data_node_metrics_port
+    if core_metrics_port is not None:
+        port_config[Ports.METRICS] = core_metrics_port
+    if data_node_metrics_port is not None:
+        port_config[Ports.DATA_NODE_METRICS] = data_node_metrics_port
 
     with VegaServiceNull(
         warn_on_raw_data_access=False,
@@ -158,8 +159,19 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output", action="store_true")
     parser.add_argument("-c", "--console", action="store_true")
     parser.add_argument("-w", "--wallet", action="store_true")
-    parser.add_argument("--core-metrics-port", default=2723, type=int)
-    parser.add_argument("--data-node-metrics-port", default=3651, type=int)
+    parser.add_argument("--core-metrics-port", default=None, type=int)
+    parser.add_argument("--data-node-metrics-port", default=None, type=int)
+    parser.add_argument(
+        "--seeds",
+        default=None,
+        type=int,
+        help="Run a campaign of this many seeds rather than a single run",
+    )
+    parser.add_argument("--first-seed", default=0, type=int)
+    parser.add_argument(
+        "--workers", default=1, type=int, help="Campaign runs to execute at once"
+    )
+    parser.add_argument("--campaign-dir", default="fuzzing_campaign", type=str)
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -169,15 +181,24 @@ if __name__ == "__main__":
 
     if args.scenario not in REGISTRY:
         raise ValueError(f"Market {args.scenario} not found")
-    scenario = REGISTRY[args.scenario]
-    scenario.num_steps = args.steps
-
-    _run(
-        scenario=scenario,
-        wallet=args.wallet,
-        console=args.console,
-        pause=args.pause,
-        output=args.output,
-        core_metrics_port=args.core_metrics_port,
-        data_node_metrics_port=args.data_node_metrics_port,
-    )
+    if args.seeds is not None:
+        run_campaign(
+            scenario_name=args.scenario,
+            seeds=range(args.first_seed, args.first_seed + args.seeds),
+            output_dir=args.campaign_dir,
+            num_workers=args.workers,
+            num_steps=args.steps,
+        )
+    else:
+        scenario = REGISTRY[args.scenario]
+        scenario.num_steps = args.steps
+
+        _run(
+            scenario=scenario,
+            wallet=args.wallet,
+            console=args.console,
+            pause=args.pause,
+            output=args.output,
+            core_metrics_port=args.core_metrics_port,
+            data_node_metrics_port=args.data_node_metrics_port,
+        )
@@ -14,10 +14,13 @@ from vega_sim.scenario.common.agents import (
 from vega_sim.tools.scenario_output import (
     agents_standard_output,
     resources_standard_output,
+    process_resources_standard_output,
     market_data_standard_output,
     assets_standard_output,
     market_chain_standard_output,
+    StreamingHistoryWriter,
 )
+from vega_sim.tools.resource_sampler import ProcessResourceData
 
 import vega_protos.protos.vega as vega_protos
 
@@ -85,6 +88,10 @@ class Scenario(abc.ABC):
         tag: Optional[str] = None,
         output_data: bool = False,
         log_every_n_steps: Optional[int] = None,
+        stream_output: bool = False,
+        capture_deltas: bool = False,
+        output_format: str = "csv",
+        resource_sample_hz: Optional[float] = None,
         **kwargs,
     ):
         tag = tag if tag is not None else ""
@@ -92,33 +99,56 @@ class Scenario(abc.ABC):
             vega=vega, tag=tag, random_state=random_state, **kwargs
         )
 
+        # When streaming, market data is written as the run goes rather than
+        # held by the snitch until the end
+        history_writer = (
+            StreamingHistoryWriter(output_format=output_format)
+            if output_data and stream_output
+            else None
+        )
         if run_with_snitch or output_data:
             self.agents["snitch"] = Snitch(
                 agents=self.agents,
                 additional_state_fn=self.state_extraction_fn,
                 additional_finalise_fn=self.final_extraction_fn,
+                history_writer=history_writer,
+                capture_deltas=capture_deltas,
+                resource_sample_hz=resource_sample_hz,
             )
 
         self.env = self.configure_environment(
             vega=vega, tag=tag, random_state=random_state, **kwargs
         )
 
-        outputs = self.env.run(
-            pause_at_completion=pause_at_completion,
-            run_with_console=run_with_console,
-            log_every_n_steps=log_every_n_steps,
-            step_end_callback=self._step_end_callback,
-        )
+        try:
+            outputs = self.env.run(
+                pause_at_completion=pause_at_completion,
+                run_with_console=run_with_console,
+                log_every_n_steps=log_every_n_steps,
+                step_end_callback=self._step_end_callback,
+            )
+        finally:
+            if history_writer is not None:
+                history_writer.close()
         if output_data:
             agents_standard_output(self.agents)
-            resources_standard_output(self.get_resource_data())
             assets_standard_output(self.get_assets())
-            market_data_standard_output(self.get_run_data())
-            market_chain_standard_output(self.get_run_data())
+            if history_writer is None:
+                resources_standard_output(
+                    self.get_resource_data(), output_format=output_format
+                )
+                process_resources_standard_output(
+                    self.get_process_resource_data(), output_format=output_format
+                )
+                market_data_standard_output(
+                    self.get_run_data(), output_format=output_format
+                )
+                market_chain_standard_output(self.get_run_data())
             if self.additional_data_output_fns is not None:
                 market_data_standard_output(
                     self.get_additional_run_data(),
                     custom_output_fns=self.additional_data_output_fns,
+                    output_format=output_format,
                 )
 
         return outputs
@@ -130,6 +160,10 @@ class Scenario(abc.ABC):
         snitch = self.get_snitch()
         return snitch.resources if snitch is not None else []
 
+    def get_process_resource_data(self) -> List[ProcessResourceData]:
+        snitch = self.get_snitch()
+        return snitch.process_resources if snitch is not None else []
+
     def get_assets(self) -> List[vega_protos.assets.Asset]:
         snitch = self.get_snitch()
         return snitch.assets if snitch is not None else []
@@ -95,6 +95,26 @@ class PeggedOrder:
     offset: float
 
 
+@dataclass
+class DatanodeSyncStats:
+    """Running totals of time spent waiting for the data-node to catch up to core."""
+
+    count: int = 0
+    total_seconds: float = 0
+    max_seconds: float = 0
+    max_block_lag: int = 0
+
+    def record(self, seconds: float, block_lag: int) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.max_block_lag = max(self.max_block_lag, block_lag)
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0
+
+
 class LoginError(Exception):
     pass
 
@@ -228,6 +248,7 @@ class VegaService(ABC):
         self.seconds_per_block = seconds_per_block
 
         self.governance_symbol = governance_symbol
+        self.datanode_sync_stats = DatanodeSyncStats()
 
     @property
     def market_price_decimals(self) -> int:
@@ -409,12 +430,14 @@ class VegaService(ABC):
     def wait_for_datanode_sync(
         self, max_attempts: int = 115, raise_errors: bool = False
     ) -> None:
+        start_time = time.perf_counter()
         core_block_height = int(
             requests.get(f"{self.vega_node_rest_url}/blockchain/height").json()[
                 "height"
             ]
         )
         data_node_block_height = 0
+        initial_block_lag = None
         attempts = 0
         while core_block_height > data_node_block_height:
             data_node_block_height = int(
@@ -422,6 +445,8 @@ class VegaService(ABC):
                     "X-Block-Height"
                 )
             )
+            if initial_block_lag is None:
+                initial_block_lag = max(core_block_height - data_node_block_height, 0)
             if attempts == 80:
                 logger.warning(
                     f"Data node sync taking longer then (~10s). Core block height: {core_block_height}, Data node block height: {data_node_block_height}"
@@ -430,6 +455,9 @@ class VegaService(ABC):
                 e = DatanodeBehindError(
                     f"Data node is behind core node after {attempts} attempts. Core block height: {core_block_height}, Data node block height: {data_node_block_height}"
                 )
+                self.datanode_sync_stats.record(
+                    time.perf_counter() - start_time, initial_block_lag
+                )
                 if raise_errors:
                     raise e
                 else:
@@ -437,6 +465,9 @@ class VegaService(ABC):
                     return
             time.sleep(0.0005 * 1.1**attempts)
             attempts += 1
+        self.datanode_sync_stats.record(
+            time.perf_counter() - start_time, initial_block_lag or 0
+        )
 
     def wait_for_core_catchup(self) -> None:
         wait_for_core_catchup(self.core_client)
@@ -491,6 +522,26 @@ class VegaService(ABC):
         """
         return self.wallet.create_key(wallet_name=wallet_name, name=name)
 
+    def create_keys(
+        self, names: List[str], wallet_name: Optional[str] = None
+    ) -> List[str]:
+        """Creates many keys within a wallet at once.
+
+        Args:
+            names:
+                List[str], The names of the keys to create
+            wallet_name:
+                str, optional, Name of wallet to create the keys in. Defaults to the
+                default wallet.
+        Returns:
+            List[str], public keys of the created keys, in the order of names
+        """
+        for name in names:
+            self.wallet.create_key(wallet_name=wallet_name, name=name)
+        return [
+            self.wallet.public_key(wallet_name=wallet_name, name=name) for name in names
+        ]
+
     def top_up_treasury(self, asset_id: str) -> None:
 
         def get_treasury_balance(asset_id: str) -> float:
@@ -535,31 +586,7 @@ class VegaService(ABC):
         amount: float,
         wallet_name: Optional[str] = None,
     ) -> None:
-
-        # Calculate the required funds including any transfer fee.
-        required_treasury_funds = amount * (
-            1 + float(self.network_parameter_from_feed("transfer.fee.factor").value)
-        )
-
-        # Iteratively check whether the treasury has sufficient balance
-        # to top up the party. If not, top up the treasury first with
-        # the assets maximum faucet amount.
-        i = 0
-        while (
-            self.party_account(
-                key_name=self.KEY_NAME, wallet_name=self.WALLET_NAME, asset_id=asset
-            ).general
-            < required_treasury_funds
-        ):
-            if i > 100:
-                raise VegaTopUpError(
-                    f"Attempted to top up treasury too many times. Unable to top up party with {required_treasury_funds} funds."
-                )
-            logger.debug(
-                f"Insufficient funds in treasury to top up party (with {required_treasury_funds}). Topping up treasury."
-            )
-            self.top_up_treasury(asset)
-            i += 1
+        self._ensure_treasury_funds(asset=asset, amount=amount)
 
         # Create a transfer with a unique reference to top up the party.
         reference = str(uuid.uuid4())
@@ -596,6 +623,120 @@ class VegaService(ABC):
             f"Internal 'top-up' transfer ({reference}) never reached network."
         )
 
+    def mint_many(
+        self,
+        mints: List[Tuple[str, str, float]],
+        wallet_name: Optional[str] = None,
+        transfers_per_block: int = 500,
+    ) -> None:
+        """Funds many keys from the treasury at once.
+
+        Rather than waiting for each transfer to complete before sending the
+        next, as repeated calls to mint do, the treasury is topped up once per
+        asset, all transfers are submitted together (up to transfers_per_block in
+        each block) and they are then confirmed together from the treasury's
+        transfers, so funding a large population of keys takes a handful of
+        blocks rather than several per key.
+
+        Args:
+            mints:
+                List[Tuple[str, str, float]], The (key name, asset ID, amount) of
+                each transfer to make
+            wallet_name:
+                str, optional, Name of wallet containing the keys to fund
+            transfers_per_block:
+                int, default 500, Maximum number of transfers to submit in a
+                single block
+        """
+        total_by_asset = defaultdict(float)
+        for _, asset, amount in mints:
+            total_by_asset[asset] += amount
+        for asset, total in total_by_asset.items():
+            self._ensure_treasury_funds(asset=asset, amount=total)
+
+        pending = {}
+        for i, (key_name, asset, amount) in enumerate(mints):
+            if i > 0 and i % transfers_per_block == 0:
+                self.wait_fn(1)
+            reference = str(uuid.uuid4())
+            self.one_off_transfer(
+                from_wallet_name=self.WALLET_NAME,
+                from_key_name=self.KEY_NAME,
+                to_wallet_name=wallet_name,
+                to_key_name=key_name,
+                from_account_type=vega_protos.vega.AccountType.ACCOUNT_TYPE_GENERAL,
+                to_account_type=vega_protos.vega.AccountType.ACCOUNT_TYPE_GENERAL,
+                asset=asset,
+                amount=amount,
+                reference=reference,
+            )
+            pending[reference] = key_name
+
+        for _ in range(100):
+            if not pending:
+                return
+            self.wait_fn(1)
+            self.wait_for_total_catchup()
+            for transfer in self._treasury_transfers():
+                if transfer.reference not in pending:
+                    continue
+                if (
+                    transfer.status
+                    != vega_protos.events.v1.events.Transfer.Status.STATUS_DONE
+                ):
+                    raise VegaTopUpError(
+                        f"Internal 'top-up' transfer ({transfer.reference}) to key '{pending[transfer.reference]}' failed with status '{vega_protos.events.v1.events.Transfer.Status.Name(transfer.status)}' and reason '{transfer.reason}'."
+                    )
+                pending.pop(transfer.reference)
+        if pending:
+            raise VegaTopUpError(
+                f"{len(pending)} internal 'top-up' transfers never reached network."
+                f" Unfunded keys: {sorted(set(pending.values()))}"
+            )
+
+    def _treasury_transfers(self) -> List[data.Transfer]:
+        # The transfer feed is only streamed alongside the other high volume
+        # updates, otherwise a single query covers every transfer
+        if self._listen_for_high_volume_stream_updates:
+            return [
+                transfer
+                for party_transfers in self.transfer_status_from_feed(
+                    live_only=False
+                ).values()
+                for transfer in party_transfers.values()
+            ]
+        return self.list_transfers(
+            wallet_name=self.WALLET_NAME,
+            key_name=self.KEY_NAME,
+            direction=data_node_protos_v2.trading_data.TransferDirection.TRANSFER_DIRECTION_TRANSFER_FROM,
+        )
+
+    def _ensure_treasury_funds(self, asset: str, amount: float) -> None:
+        # Calculate the required funds including any transfer fee.
+        required_treasury_funds = amount * (
+            1 + float(self.network_parameter_from_feed("transfer.fee.factor").value)
+        )
+
+        # Iteratively check whether the treasury has sufficient balance
+        # to top up the party. If not, top up the treasury first with
+        # the assets maximum faucet amount.
+        i = 0
+        while (
+            self.party_account(
+                key_name=self.KEY_NAME, wallet_name=self.WALLET_NAME, asset_id=asset
+            ).general
+            < required_treasury_funds
+        ):
+            if i > 100:
+                raise VegaTopUpError(
+                    f"Attempted to top up treasury too many times. Unable to top up party with {required_treasury_funds} funds."
+                )
+            logger.debug(
+                f"Insufficient funds in treasury to top up party (with {required_treasury_funds}). Topping up treasury."
+            )
+            self.top_up_treasury(asset)
+            i += 1
+
     def forward(self, time: str) -> None:
         """Steps chain forward a given amount of time, either with an amount of time or
             until a specified time.
@@ -721,6 +862,89 @@ class VegaService(ABC):
         self.wait_for_thread_catchup()
         return proposal_id
 
+    def create_markets_from_config(
+        self,
+        proposal_key_name: str,
+        market_configs: List[Union[market.MarketConfig, market.SpotMarketConfig]],
+        proposal_wallet_name: Optional[str] = None,
+        vote_closing_time: Optional[datetime.datetime] = None,
+        vote_enactment_time: Optional[datetime.datetime] = None,
+        approve_proposal: bool = True,
+        forward_time_to_closing: bool = True,
+        forward_time_to_enactment: bool = True,
+    ) -> str:
+        """Creates many markets with a single batch proposal.
+
+        All markets are proposed, voted on and enacted together, so the time
+        taken does not grow with the number of markets as it does when calling
+        create_market_from_config once per market.
+
+        Args:
+            proposal_key_name:
+                str, The key proposing the markets
+            market_configs:
+                List[Union[MarketConfig, SpotMarketConfig]], Configs of the
+                markets to create
+            proposal_wallet_name:
+                str, optional, The wallet proposing the markets
+            vote_closing_time:
+                Optional[datetime], The time at which the vote should close
+            vote_enactment_time:
+                Optional[datetime], The time at which the markets should enact
+            approve_proposal:
+                bool, default True, Whether to automatically approve the proposal
+            forward_time_to_closing:
+                bool, default True, Whether to forward time to closing of the vote
+            forward_time_to_enactment:
+                bool, default True, Whether to forward time to enactment of the
+                    markets
+
+        Returns:
+            str, the ID of the batch proposal
+        """
+        blockchain_time_seconds = self.get_blockchain_time(in_seconds=True)
+
+        closing_time = (
+            blockchain_time_seconds + self.seconds_per_block * 40
+            if vote_closing_time is None
+            else int(vote_closing_time.timestamp())
+        )
+        enactment_time = (
+            blockchain_time_seconds + self.seconds_per_block * 50
+            if vote_enactment_time is None
+            else int(vote_enactment_time.timestamp())
+        )
+
+        proposal_id = gov.propose_markets_from_config(
+            wallet=self.wallet,
+            data_client=self.trading_data_client_v2,
+            proposal_wallet_name=proposal_wallet_name,
+            proposal_key_name=proposal_key_name,
+            market_configs=market_configs,
+            closing_time=closing_time,
+            enactment_time=enactment_time,
+            time_forward_fn=lambda: self.wait_fn(2),
+            sync_fn=lambda: self.wait_for_total_catchup(),
+        )
+        if approve_proposal:
+            gov.approve_proposal(
+                proposal_id=proposal_id,
+                wallet=self.wallet,
+                wallet_name=proposal_wallet_name,
+                key_name=proposal_key_name,
+            )
+
+        if forward_time_to_closing:
+            time_to_closing = closing_time - self.get_blockchain_time(in_seconds=True)
+            self.wait_fn(int(time_to_closing / self.seconds_per_block) + 5)
+        if forward_time_to_enactment:
+            time_to_enactment = enactment_time - self.get_blockchain_time(
+                in_seconds=True
+            )
+            self.wait_fn(int(time_to_enactment / self.seconds_per_block) + 5)
+        self.wait_for_thread_catchup()
+        return proposal_id
+
     def try_enable_perp_markets(
         self, proposal_key: str, wallet_name: str = None, raise_on_failure: bool = False
     ):
@@ -1501,6 +1725,86 @@ class VegaService(ABC):
 
         return proposal_id
 
+    def update_network_parameters(
+        self,
+        proposal_key: str,
+        parameters: Dict[str, str],
+        wallet_name: str = None,
+        closing_time: Optional[datetime.datetime] = None,
+        enactment_time: Optional[datetime.datetime] = None,
+        approve_proposal: bool = True,
+        forward_time_to_enactment: bool = True,
+    ) -> Optional[str]:
+        """Updates many network parameters with a single batch proposal.
+
+        All changes are proposed, voted on and enacted together, so the time
+        taken does not grow with the number of parameters as it does when
+        calling update_network_parameter once per parameter.
+
+        Args:
+            proposal_key:
+                str, the key proposing the changes
+            parameters:
+                Dict[str, str], new values keyed by the parameters to change
+            wallet_name:
+                str, optional, the wallet proposing the changes
+            closing_time:
+                Optional[datetime], The time at which the vote should close
+            enactment_time:
+                Optional[datetime], The time at which the changes should enact
+            approve_proposal:
+                bool, default True, Whether to automatically approve the proposal
+            forward_time_to_enactment:
+                bool, default True, Whether to forward time to enactment of the
+                    changes
+
+        Returns:
+            Optional[str], the ID of the batch proposal, or None if there were no
+                parameters to change
+        """
+        if not parameters:
+            return None
+        blockchain_time_seconds = self.get_blockchain_time(in_seconds=True)
+
+        enactment_time = (
+            blockchain_time_seconds + self.seconds_per_block * 50
+            if enactment_time is None
+            else int(enactment_time.timestamp())
+        )
+
+        proposal_id = gov.propose_network_parameter_changes(
+            parameters={
+                parameter: str(value) for parameter, value in parameters.items()
+            },
+            wallet=self.wallet,
+            wallet_name=wallet_name,
+            data_client=self.trading_data_client_v2,
+            closing_time=(
+                blockchain_time_seconds + self.seconds_per_block * 40
+                if closing_time is None
+                else int(closing_time.timestamp())
+            ),
+            enactment_time=enactment_time,
+            time_forward_fn=lambda: self.wait_fn(2),
+            key_name=proposal_key,
+        )
+
+        if approve_proposal:
+            gov.approve_proposal(
+                proposal_id=proposal_id,
+                wallet=self.wallet,
+                wallet_name=wallet_name,
+                key_name=proposal_key,
+            )
+
+        if forward_time_to_enactment:
+            time_to_enactment = enactment_time - self.get_blockchain_time(
+                in_seconds=True
+            )
+            self.wait_fn(int(time_to_enactment / self.seconds_per_block) + 1)
+
+        return proposal_id
+
     def update_market_state(
         self,
         market_id: str,
@@ -0,0 +1,193 @@
+"""Coordinator side of a sweep: builds and enqueues jobs, requeues jobs whose
+worker has stopped sending heartbeats and reports progress and throughput."""
+
+import logging
+import os
+import pickle
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional
+
+from vega_sim.sweep.job_queue import (
+    DEFAULT_MAX_ATTEMPTS,
+    Job,
+    JobQueue,
+    JobResult,
+    JobStatus,
+)
+from vega_sim.sweep.worker import unpack_artefacts
+
+logger = logging.getLogger(__name__)
+
+
+def build_jobs(
+    kind: str,
+    names: Iterable[str],
+    seeds: Iterable[int],
+    kwargs_grid: Optional[Dict[str, List[Any]]] = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> List[Job]:
+    """Creates a job for every combination of name, seed and kwargs.
+
+    Args:
+        kind:
+            str, Kind of job, one of the keys of worker.JOB_RUNNERS
+        names:
+            Iterable[str], Scenario, benchmark or experiment names
+        seeds:
+            Iterable[int], Random seeds to run each combination with
+        kwargs_grid:
+            Optional[Dict[str, List[Any]]], Values to try for each kwarg. Every
+            combination of values is run. Values must be JSON serialisable.
+        max_attempts:
+            int, default 3, Number of times a job is tried before it is
+            recorded as failed
+    """
+    kwargs_grid = kwargs_grid or {}
+    kwargs_list = [
+        dict(zip(kwargs_grid.keys(), values))
+        for values in product(*kwargs_grid.values())
+    ]
+    seeds = list(seeds)
+    return [
+        Job(kind=kind, name=name, seed=seed, kwargs=kwargs, max_attempts=max_attempts)
+        for name in names
+        for kwargs in kwargs_list
+        for seed in seeds
+    ]
+
+
+@dataclass
+class SweepStats:
+    counts: Dict[JobStatus, int]
+    elapsed_seconds: float
+    mean_job_seconds: Optional[float]
+    jobs_per_worker: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def finished(self) -> int:
+        return self.counts[JobStatus.DONE] + self.counts[JobStatus.FAILED]
+
+    @property
+    def jobs_per_hour(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.counts[JobStatus.DONE] * 3600 / self.elapsed_seconds
+
+    def __str__(self) -> str:
+        mean = (
+            f"{self.mean_job_seconds:.1f}s"
+            if self.mean_job_seconds is not None
+            else "n/a"
+        )
+        return (
+            f"{self.finished}/{self.total} finished"
+            f" ({self.counts[JobStatus.DONE]} done,"
+            f" {self.counts[JobStatus.FAILED]} failed,"
+            f" {self.counts[JobStatus.RUNNING]} running,"
+            f" {self.counts[JobStatus.PENDING]} pending),"
+            f" {self.jobs_per_hour:.1f} jobs/hour, mean job time {mean},"
+            f" {len(self.jobs_per_worker)} workers"
+        )
+
+
+def compute_stats(
+    counts: Dict[JobStatus, int],
+    results: List[JobResult],
+    now: Optional[float] = None,
+) -> SweepStats:
+    done = [r for r in results if r.status == JobStatus.DONE]
+    durations = [r.duration for r in done if r.duration is not None]
+    enqueued = [r.enqueued_at for r in results if r.enqueued_at is not None]
+    if counts[JobStatus.PENDING] or counts[JobStatus.RUNNING]:
+        end = now if now is not None else time.time()
+    else:
+        end = max((r.finished_at or 0 for r in results), default=0)
+    return SweepStats(
+        counts=counts,
+        elapsed_seconds=end - min(enqueued) if enqueued else 0.0,
+        mean_job_seconds=sum(durations) / len(durations) if durations else None,
+        jobs_per_worker=dict(Counter(r.worker_id for r in done)),
+    )
+
+
+class SweepCoordinator:
+    def __init__(self, queue: JobQueue, lost_job_timeout: float = 60):
+        """Submits jobs to a queue and supervises their progress.
+
+        Args:
+            queue:
+                JobQueue, The queue workers are pulling from
+            lost_job_timeout:
+                float, default 60, Seconds without a heartbeat after which a
+                running job's worker is assumed dead and the job is retried
+        """
+        self.queue = queue
+        self.lost_job_timeout = lost_job_timeout
+
+    def submit(self, jobs: List[Job]) -> List[str]:
+        self.queue.put(jobs)
+        logger.info(f"Submitted {len(jobs)} jobs")
+        return [job.job_id for job in jobs]
+
+    def stats(self) -> SweepStats:
+        return compute_stats(
+            self.queue.counts(), self.queue.results(include_payload=False)
+        )
+
+    def poll(self) -> SweepStats:
+        """Requeues lost jobs and returns the current progress."""
+        for job_id in self.queue.requeue_lost(self.lost_job_timeout):
+            logger.warning(
+                f"Job {job_id} had no heartbeat for {self.lost_job_timeout}s,"
+                " treating the attempt as failed"
+            )
+        return self.stats()
+
+    def wait(
+        self, poll_interval: float = 10, timeout: Optional[float] = None
+    ) -> SweepStats:
+        """Polls until no job is pending or running, logging progress whenever
+        it changes.
+
+        Raises:
+            TimeoutError: If timeout seconds pass before the sweep finishes
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        last_finished = None
+        while True:
+            stats = self.poll()
+            if stats.finished != last_finished:
+                logger.info(f"Sweep progress: {stats}")
+                last_finished = stats.finished
+            if stats.finished == stats.total:
+                return stats
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Sweep not finished after {timeout}s: {stats}")
+            time.sleep(poll_interval)
+
+    def collect(self, output_dir: str) -> List[JobResult]:
+        """Writes the result, error and artefacts of every finished job to
+        output_dir/<kind>/<name>/<job_id>."""
+        results = self.queue.results()
+        for result in results:
+            job = result.job
+            job_dir = os.path.join(output_dir, job.kind, job.name, job.job_id)
+            os.makedirs(job_dir, exist_ok=True)
+            with open(os.path.join(job_dir, "job.json"), "w") as f:
+                f.write(job.to_json())
+            if result.status == JobStatus.DONE:
+                with open(os.path.join(job_dir, "result.pkl"), "wb") as f:
+                    pickle.dump(result.result, f)
+            if result.error is not None:
+                with open(os.path.join(job_dir, "error.txt"), "w") as f:
+                    f.write(result.error)
+            if result.artefacts is not None:
+                unpack_artefacts(result.artefacts, os.path.join(job_dir, "artefacts"))
+        return results
@@ -0,0 +1,664 @@
+"""Work queues shared between a sweep coordinator and its workers.
+
+A job is a (kind, name, kwargs, seed) tuple identifying a single scenario run.
+The coordinator puts jobs on a queue and workers, possibly on other hosts, claim
+them one at a time, send heartbeats while they run and report back a result and
+an archive of artefacts.
+
+Two backends are provided. SQLiteJobQueue keeps everything in a single SQLite
+file, so needs nothing beyond a filesystem visible to every worker.
+RedisJobQueue accepts any client exposing the subset of the redis-py API listed
+on the class, which includes redis.Redis itself and LocalRedis, an in-process
+stand-in.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    kind: str
+    name: str
+    seed: int
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "name": self.name,
+                "seed": self.seed,
+                "kwargs": self.kwargs,
+                "max_attempts": self.max_attempts,
+            },
+            sort_keys=True,
+        )
+
+    @classmethod
+    def from_json(cls, data: Union[str, bytes]) -> Job:
+        return cls(**json.loads(data))
+
+
+@dataclass
+class JobResult:
+    job: Job
+    status: JobStatus
+    attempts: int
+    worker_id: Optional[str] = None
+    enqueued_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Any = None
+    artefacts: Optional[bytes] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class JobQueue(ABC):
+    """Interface shared by the queue backends.
+
+    Timestamps are taken from time.time() on whichever host performs the
+    operation, so lost job timeouts should comfortably exceed any clock skew
+    between hosts.
+    """
+
+    @abstractmethod
+    def put(self, jobs: Iterable[Job]) -> None:
+        """Adds jobs to the back of the queue."""
+
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """Takes the job at the front of the queue, or None if it is empty."""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Records that the worker is still running the job. Returns False if
+        the job is no longer assigned to the worker, e.g. because it was deemed
+        lost and requeued."""
+
+    @abstractmethod
+    def complete(
+        self,
+        job_id: str,
+        worker_id: str,
+        result: Any = None,
+        artefacts: Optional[bytes] = None,
+    ) -> bool:
+        """Stores a job's result. The first result reported for a job wins,
+        returns False if the job had already finished."""
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> None:
+        """Reports a failed attempt. The job is requeued unless it has used up
+        all of its attempts, in which case it is marked as failed."""
+
+    @abstractmethod
+    def requeue_lost(self, timeout: float) -> List[str]:
+        """Treats running jobs with no heartbeat for timeout seconds as failed
+        attempts. Returns the ids of those jobs."""
+
+    @abstractmethod
+    def counts(self) -> Dict[JobStatus, int]:
+        """Number of jobs in each status."""
+
+    @abstractmethod
+    def results(self, include_payload: bool = True) -> List[JobResult]:
+        """Every finished job. Results and artefacts are only loaded when
+        include_payload is True."""
+
+
+class SQLiteJobQueue(JobQueue):
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            spec TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            worker_id TEXT,
+            enqueued_at REAL,
+            started_at REAL,
+            finished_at REAL,
+            heartbeat_at REAL,
+            error TEXT,
+            result BLOB,
+            artefacts BLOB
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 30):
+        """Job queue stored in a SQLite database file.
+
+        Every operation runs in its own short transaction on a fresh
+        connection, so a queue object may be shared between threads and is
+        safe to use after forking. Sharing the file between hosts requires a
+        network filesystem with working locks.
+
+        Args:
+            path:
+                str, Database file, created if it does not exist
+            busy_timeout:
+                float, default 30, Seconds to wait for another process's lock
+                on the database before raising
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+        try:
+            conn.executescript(self._SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_timeout, isolation_level=None
+        )
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def put(self, jobs: Iterable[Job]) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO jobs (job_id, spec, status, max_attempts, enqueued_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        job.job_id,
+                        job.to_json(),
+                        JobStatus.PENDING.value,
+                        job.max_attempts,
+                        now,
+                    )
+                    for job in jobs
+                ],
+            )
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, spec FROM jobs WHERE status = ? ORDER BY rowid LIMIT 1",
+                (JobStatus.PENDING.value,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, attempts = attempts + 1,"
+                " started_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                (JobStatus.RUNNING.value, worker_id, now, now, row[0]),
+            )
+        return Job.from_json(row[1])
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ?"
+                " WHERE job_id = ? AND worker_id = ? AND status = ?",
+                (time.time(), job_id, worker_id, JobStatus.RUNNING.value),
+            )
+            return cursor.rowcount == 1
+
+    def complete(
+        self,
+        job_id: str,
+        worker_id: str,
+        result: Any = None,
+        artefacts: Optional[bytes] = None,
+    ) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, finished_at = ?,"
+                " result = ?, artefacts = ?, error = NULL"
+                " WHERE job_id = ? AND status IN (?, ?)",
+                (
+                    JobStatus.DONE.value,
+                    worker_id,
+                    time.time(),
+                    pickle.dumps(result),
+                    artefacts,
+                    job_id,
+                    JobStatus.PENDING.value,
+                    JobStatus.RUNNING.value,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def _fail_attempt(self, conn, job_id: str, error: str) -> None:
+        conn.execute(
+            "UPDATE jobs SET error = ?, finished_at = ?, status = CASE"
+            " WHEN attempts >= max_attempts THEN ? ELSE ? END"
+            " WHERE job_id = ? AND status = ?",
+            (
+                error,
+                time.time(),
+                JobStatus.FAILED.value,
+                JobStatus.PENDING.value,
+                job_id,
+                JobStatus.RUNNING.value,
+            ),
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> None:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT worker_id FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is not None and row[0] == worker_id:
+                self._fail_attempt(conn, job_id, error)
+
+    def requeue_lost(self, timeout: float) -> List[str]:
+        with self._transaction() as conn:
+            lost = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT job_id FROM jobs WHERE status = ? AND heartbeat_at < ?",
+                    (JobStatus.RUNNING.value, time.time() - timeout),
+                )
+            ]
+            for job_id in lost:
+                self._fail_attempt(conn, job_id, f"No heartbeat for {timeout}s")
+        return lost
+
+    def counts(self) -> Dict[JobStatus, int]:
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in JobStatus}
+        counts.update({JobStatus(status): count for status, count in rows})
+        return counts
+
+    def results(self, include_payload: bool = True) -> List[JobResult]:
+        payload = "result, artefacts" if include_payload else "NULL, NULL"
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT spec, status, attempts, worker_id, enqueued_at, started_at,"
+                f" finished_at, error, {payload} FROM jobs WHERE status IN (?, ?)"
+                " ORDER BY rowid",
+                (JobStatus.DONE.value, JobStatus.FAILED.value),
+            ).fetchall()
+        return [
+            JobResult(
+                job=Job.from_json(spec),
+                status=JobStatus(status),
+                attempts=attempts,
+                worker_id=worker_id,
+                enqueued_at=enqueued_at,
+                started_at=started_at,
+                finished_at=finished_at,
+                error=error,
+                result=pickle.loads(result) if result is not None else None,
+                artefacts=artefacts,
+            )
+            for (
+                spec,
+                status,
+                attempts,
+                worker_id,
+                enqueued_at,
+                started_at,
+                finished_at,
+                error,
+                result,
+                artefacts,
+            ) in rows
+        ]
+
+
+def _decode(value: Optional[Union[str, bytes]]) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisJobQueue(JobQueue):
+    def __init__(self, client: Any, prefix: str = "vega_sim_sweep"):
+        """Job queue stored in Redis, or anything speaking enough of its API.
+
+        The client must provide lpush, rpoplpush, lrem, llen, hset, hget,
+        hgetall, hdel, hincrby, zadd, zrem and zrangebyscore with redis-py
+        semantics, and must return raw bytes (i.e. redis-py's default of
+        decode_responses=False) as results are stored pickled.
+
+        Keys used, all under prefix:
+            pending, running: Lists of job ids waiting for and being run by a
+                worker. Claims atomically move an id from one to the other.
+            heartbeats: Sorted set of running job ids scored by last heartbeat
+            spec: Hash of job id to the job's JSON specification
+            state:<job_id>: Hash of a job's status, attempts, worker and times
+            results, artefacts: Hashes of job id to pickled result and archive
+
+        Args:
+            client:
+                Any, A redis.Redis instance or compatible object
+            prefix:
+                str, default "vega_sim_sweep", Prefix for every key, allowing
+                several sweeps to share a server
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def _state(self, job_id: str) -> Dict[str, str]:
+        return {
+            _decode(k): _decode(v)
+            for k, v in self.client.hgetall(self._key("state", job_id)).items()
+        }
+
+    def put(self, jobs: Iterable[Job]) -> None:
+        now = time.time()
+        for job in jobs:
+            self.client.hset(self._key("spec"), job.job_id, job.to_json())
+            self.client.hset(
+                self._key("state", job.job_id),
+                mapping={
+                    "status": JobStatus.PENDING.value,
+                    "attempts": 0,
+                    "enqueued_at": now,
+                },
+            )
+            self.client.lpush(self._key("pending"), job.job_id)
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        job_id = _decode(
+            self.client.rpoplpush(self._key("pending"), self._key("running"))
+        )
+        if job_id is None:
+            return None
+        now = time.time()
+        state_key = self._key("state", job_id)
+        self.client.hincrby(state_key, "attempts", 1)
+        self.client.hset(
+            state_key,
+            mapping={
+                "status": JobStatus.RUNNING.value,
+                "worker_id": worker_id,
+                "started_at": now,
+            },
+        )
+        self.client.zadd(self._key("heartbeats"), {job_id: now})
+        return Job.from_json(self.client.hget(self._key("spec"), job_id))
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        state = self._state(job_id)
+        if (
+            state.get("status") != JobStatus.RUNNING.value
+            or state.get("worker_id") != worker_id
+        ):
+            return False
+        self.client.zadd(self._key("heartbeats"), {job_id: time.time()})
+        return True
+
+    def complete(
+        self,
+        job_id: str,
+        worker_id: str,
+        result: Any = None,
+        artefacts: Optional[bytes] = None,
+    ) -> bool:
+        if self._state(job_id).get("status") not in (
+            JobStatus.PENDING.value,
+            JobStatus.RUNNING.value,
+        ):
+            return False
+        self.client.hset(self._key("results"), job_id, pickle.dumps(result))
+        if artefacts is not None:
+            self.client.hset(self._key("artefacts"), job_id, artefacts)
+        self.client.hset(
+            self._key("state", job_id),
+            mapping={
+                "status": JobStatus.DONE.value,
+                "worker_id": worker_id,
+                "finished_at": time.time(),
+            },
+        )
+        self.client.hdel(self._key("state", job_id), "error")
+        self.client.zrem(self._key("heartbeats"), job_id)
+        self.client.lrem(self._key("running"), 0, job_id)
+        self.client.lrem(self._key("pending"), 0, job_id)
+        return True
+
+    def _fail_attempt(self, job_id: str, error: str) -> None:
+        # Removing the id from the running list is the atomic step, so only one
+        # of several concurrent callers goes on to requeue the job
+        if not self.client.lrem(self._key("running"), 0, job_id):
+            return
+        self.client.zrem(self._key("heartbeats"), job_id)
+        state = self._state(job_id)
+        job = Job.from_json(self.client.hget(self._key("spec"), job_id))
+        exhausted = int(state.get("attempts", 0)) >= job.max_attempts
+        self.client.hset(
+            self._key("state", job_id),
+            mapping={
+                "status": (
+                    JobStatus.FAILED.value if exhausted else JobStatus.PENDING.value
+                ),
+                "error": error,
+                "finished_at": time.time(),
+            },
+        )
+        if not exhausted:
+            self.client.lpush(self._key("pending"), job_id)
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> None:
+        if self._state(job_id).get("worker_id") == worker_id:
+            self._fail_attempt(job_id, error)
+
+    def requeue_lost(self, timeout: float) -> List[str]:
+        lost = [
+            _decode(job_id)
+            for job_id in self.client.zrangebyscore(
+                self._key("heartbeats"), "-inf", time.time() - timeout
+            )
+        ]
+        for job_id in lost:
+            self._fail_attempt(job_id, f"No heartbeat for {timeout}s")
+        return lost
+
+    def counts(self) -> Dict[JobStatus, int]:
+        counts = {status: 0 for status in JobStatus}
+        for job_id in self.client.hgetall(self._key("spec")):
+            counts[JobStatus(self._state(_decode(job_id))["status"])] += 1
+        return counts
+
+    def results(self, include_payload: bool = True) -> List[JobResult]:
+        results = []
+        for job_id, spec in self.client.hgetall(self._key("spec")).items():
+            job_id = _decode(job_id)
+            state = self._state(job_id)
+            status = JobStatus(state["status"])
+            if status not in (JobStatus.DONE, JobStatus.FAILED):
+                continue
+            result = artefacts = None
+            if include_payload and status == JobStatus.DONE:
+                result = pickle.loads(self.client.hget(self._key("results"), job_id))
+                artefacts = self.client.hget(self._key("artefacts"), job_id)
+            results.append(
+                JobResult(
+                    job=Job.from_json(spec),
+                    status=status,
+                    attempts=int(state["attempts"]),
+                    worker_id=state.get("worker_id"),
+                    enqueued_at=_optional_float(state.get("enqueued_at")),
+                    started_at=_optional_float(state.get("started_at")),
+                    finished_at=_optional_float(state.get("finished_at")),
+                    error=state.get("error"),
+                    result=result,
+                    artefacts=artefacts,
+                )
+            )
+        return sorted(results, key=lambda r: r.enqueued_at or 0)
+
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class LocalRedis:
+    """In-process stand-in for the parts of redis.Redis used by RedisJobQueue.
+
+    Values are stored and returned as bytes, as with a real server. It is only
+    shared between threads of one process, so is suited to tests and to running
+    a coordinator and workers in a single process.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._lists: Dict[bytes, List[bytes]] = defaultdict(list)
+        self._hashes: Dict[bytes, Dict[bytes, bytes]] = defaultdict(dict)
+        self._zsets: Dict[bytes, Dict[bytes, float]] = defaultdict(dict)
+
+    def lpush(self, name: str, *values: Any) -> int:
+        with self._lock:
+            items = self._lists[_encode(name)]
+            for value in values:
+                items.insert(0, _encode(value))
+            return len(items)
+
+    def rpoplpush(self, src: str, dst: str) -> Optional[bytes]:
+        with self._lock:
+            items = self._lists[_encode(src)]
+            if not items:
+                return None
+            value = items.pop()
+            self._lists[_encode(dst)].insert(0, value)
+            return value
+
+    def lrem(self, name: str, count: int, value: Any) -> int:
+        # Only count == 0 (remove every occurrence) is used by RedisJobQueue
+        with self._lock:
+            items = self._lists[_encode(name)]
+            kept = [item for item in items if item != _encode(value)]
+            removed = len(items) - len(kept)
+            self._lists[_encode(name)] = kept
+            return removed
+
+    def llen(self, name: str) -> int:
+        with self._lock:
+            return len(self._lists[_encode(name)])
+
+    def hset(
+        self,
+        name: str,
+        key: Optional[str] = None,
+        value: Any = None,
+        mapping: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        with self._lock:
+            items = dict(mapping or {})
+            if key is not None:
+                items[key] = value
+            hash_ = self._hashes[_encode(name)]
+            added = 0
+            for k, v in items.items():
+                added += _encode(k) not in hash_
+                hash_[_encode(k)] = _encode(v)
+            return added
+
+    def hget(self, name: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._hashes[_encode(name)].get(_encode(key))
+
+    def hgetall(self, name: str) -> Dict[bytes, bytes]:
+        with self._lock:
+            return dict(self._hashes[_encode(name)])
+
+    def hdel(self, name: str, *keys: str) -> int:
+        with self._lock:
+            hash_ = self._hashes[_encode(name)]
+            return sum(hash_.pop(_encode(k), None) is not None for k in keys)
+
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        with self._lock:
+            hash_ = self._hashes[_encode(name)]
+            value = int(hash_.get(_encode(key), b"0")) + amount
+            hash_[_encode(key)] = _encode(value)
+            return value
+
+    def zadd(self, name: str, mapping: Dict[str, float]) -> int:
+        with self._lock:
+            zset = self._zsets[_encode(name)]
+            added = sum(_encode(k) not in zset for k in mapping)
+            zset.update({_encode(k): float(v) for k, v in mapping.items()})
+            return added
+
+    def zrem(self, name: str, *values: str) -> int:
+        with self._lock:
+            zset = self._zsets[_encode(name)]
+            return sum(zset.pop(_encode(v), None) is not None for v in values)
+
+    def zrangebyscore(
+        self, name: str, min: Union[float, str], max: Union[float, str]
+    ) -> List[bytes]:
+        with self._lock:
+            zset = self._zsets[_encode(name)]
+            return [
+                member
+                for member, score in sorted(zset.items(), key=lambda kv: kv[1])
+                if float(min) <= score <= float(max)
+            ]
+
+
+def open_queue(location: str) -> JobQueue:
+    """Opens a queue from a location string: a redis:// or rediss:// URL for
+    RedisJobQueue (requiring the redis package), "local" for a RedisJobQueue
+    backed by LocalRedis, and otherwise the path of a SQLiteJobQueue file."""
+    if location.startswith(("redis://", "rediss://")):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis package is required for redis:// sweep queues")
+        return RedisJobQueue(redis.Redis.from_url(location))
+    if location == "local":
+        return RedisJobQueue(LocalRedis())
+    return SQLiteJobQueue(location)
@@ -0,0 +1,99 @@
+"""Command line entry point for sweeps.
+
+Submit jobs and wait for them (the queue is a SQLite file on shared storage):
+
+    python -m vega_sim.sweep.run --queue /shared/sweep.db submit \
+        --kind scenario --names market_maker --seeds 8 \
+        --kwargs '{"num_steps": [600, 1200]}' --wait --output-dir sweep_results
+
+Then on each host, start as many workers as it has capacity for:
+
+    python -m vega_sim.sweep.run --queue /shared/sweep.db worker
+"""
+
+import argparse
+import json
+import logging
+
+from vega_sim.sweep.coordinator import SweepCoordinator, build_jobs
+from vega_sim.sweep.job_queue import open_queue
+from vega_sim.sweep.worker import JOB_RUNNERS, SweepWorker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-q",
+        "--queue",
+        default="sweep.db",
+        help="SQLite queue file, or a redis:// URL",
+    )
+    parser.add_argument("-d", "--debug", action="store_true")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit = subparsers.add_parser("submit", help="Enqueue a sweep")
+    submit.add_argument("--kind", choices=list(JOB_RUNNERS.keys()), required=True)
+    submit.add_argument("--names", nargs="+", required=True)
+    submit.add_argument("--seeds", default=1, type=int, help="Seeds per combination")
+    submit.add_argument("--first-seed", default=0, type=int)
+    submit.add_argument(
+        "--kwargs",
+        default="{}",
+        type=json.loads,
+        help="JSON object mapping each kwarg to a list of values to sweep",
+    )
+    submit.add_argument("--max-attempts", default=3, type=int)
+    submit.add_argument("--wait", action="store_true")
+    submit.add_argument("--lost-job-timeout", default=60, type=float)
+    submit.add_argument("--output-dir", default=None)
+
+    status = subparsers.add_parser("status", help="Report progress of a sweep")
+    status.add_argument("--lost-job-timeout", default=60, type=float)
+    status.add_argument("--output-dir", default=None)
+
+    worker = subparsers.add_parser("worker", help="Run jobs from the queue")
+    worker.add_argument("--max-jobs", default=None, type=int)
+    worker.add_argument("--exit-when-empty", action="store_true")
+    worker.add_argument("--heartbeat-interval", default=10, type=float)
+    worker.add_argument("--ephemeral-data-node", action="store_true")
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    queue = open_queue(args.queue)
+
+    if args.command == "worker":
+        SweepWorker(
+            queue,
+            heartbeat_interval=args.heartbeat_interval,
+            vega_service_kwargs={"ephemeral_data_node": args.ephemeral_data_node},
+        ).run(max_jobs=args.max_jobs, exit_when_empty=args.exit_when_empty)
+        return
+
+    coordinator = SweepCoordinator(queue, lost_job_timeout=args.lost_job_timeout)
+    if args.command == "submit":
+        coordinator.submit(
+            build_jobs(
+                kind=args.kind,
+                names=args.names,
+                seeds=range(args.first_seed, args.first_seed + args.seeds),
+                kwargs_grid=args.kwargs,
+                max_attempts=args.max_attempts,
+            )
+        )
+        if not args.wait:
+            return
+        stats = coordinator.wait()
+    else:
+        stats = coordinator.poll()
+
+    logging.info(f"Sweep status: {stats}")
+    if args.output_dir is not None:
+        coordinator.collect(args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Worker side of a sweep: claims jobs from a queue and runs each of them against
+a fresh VegaServiceNull.
+
+Each VegaServiceNull reserves its own block of ports, so any number of workers
+can share a host. Artefacts are whatever a job writes beneath its working
+directory (e.g. the run_logs output of a scenario run with output_data), and are
+sent back to the queue as a gzipped tar archive.
+"""
+
+import copy
+import io
+import logging
+import os
+import platform
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from vega_sim.sweep.job_queue import Job, JobQueue
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[Job, Dict[str, Any]], Any]
+
+
+class UnknownJobError(Exception):
+    pass
+
+
+def _configure_scenario(scenario: Any, kwargs: Dict[str, Any]) -> Any:
+    for attr, value in kwargs.items():
+        if not hasattr(scenario, attr):
+            raise UnknownJobError(
+                f"Scenario {scenario.__class__.__name__} has no attribute {attr}"
+            )
+        setattr(scenario, attr, value)
+    return scenario
+
+
+def _run_scenario(
+    scenario: Any,
+    seed: int,
+    vega_service_kwargs: Dict[str, Any],
+    output_data: bool = True,
+) -> Dict[str, Any]:
+    from vega_sim.null_service import VegaServiceNull
+
+    start = time.time()
+    with VegaServiceNull(
+        **{
+            "warn_on_raw_data_access": False,
+            "seconds_per_block": scenario.block_length_seconds,
+            "transactions_per_block": getattr(scenario, "transactions_per_block", 100),
+            "use_full_vega_wallet": False,
+            "run_with_console": False,
+            **vega_service_kwargs,
+        }
+    ) as vega:
+        scenario.run_iteration(
+            vega=vega,
+            random_state=np.random.RandomState(seed),
+            output_data=output_data,
+            run_with_snitch=output_data,
+        )
+        return {
+            "run_seconds": time.time() - start,
+            "startup_seconds": dict(vega.startup_timings),
+            "datanode_sync_stats": asdict(vega.datanode_sync_stats),
+        }
+
+
+def run_scenario_job(job: Job, vega_service_kwargs: Dict[str, Any]) -> Any:
+    """Runs an entry of vega_sim.scenario.registry.SCENARIOS. The job's kwargs
+    are set as attributes of the scenario before it is run."""
+    from vega_sim.scenario.registry import SCENARIOS
+
+    if job.name not in SCENARIOS:
+        raise UnknownJobError(f"Scenario {job.name} not found")
+    scenario = _configure_scenario(SCENARIOS[job.name](), job.kwargs)
+    return _run_scenario(scenario, job.seed, vega_service_kwargs)
+
+
+def run_benchmark_job(job: Job, vega_service_kwargs: Dict[str, Any]) -> Any:
+    """Runs an entry of vega_sim.scenario.benchmark.registry.REGISTRY. The job's
+    kwargs are set as attributes of a copy of the registered scenario."""
+    from vega_sim.scenario.benchmark.registry import REGISTRY
+
+    if job.name not in REGISTRY:
+        raise UnknownJobError(f"Benchmark {job.name} not found")
+    scenario = _configure_scenario(copy.copy(REGISTRY[job.name]), job.kwargs)
+    return _run_scenario(scenario, job.seed, vega_service_kwargs, output_data=False)
+
+
+def run_parameter_job(job: Job, vega_service_kwargs: Dict[str, Any]) -> Any:
+    """Runs one (value, seed) pair of a parameter experiment from
+    vega_sim.parameter_test.parameter.configs.CONFIGS, with the value to test
+    given by the "value" kwarg."""
+    from vega_sim.parameter_test.parameter.configs import CONFIGS
+    from vega_sim.parameter_test.parameter.experiment import (
+        _run_experiment_iteration,
+    )
+
+    config_map = {c.name: c for c in CONFIGS}
+    if job.name not in config_map:
+        raise UnknownJobError(f"Parameter experiment {job.name} not found")
+    if "value" not in job.kwargs:
+        raise UnknownJobError("Parameter jobs require a value kwarg")
+    return _run_experiment_iteration(
+        config_map[job.name],
+        job.kwargs["value"],
+        job.seed,
+        vega_service_kwargs=vega_service_kwargs,
+    )
+
+
+JOB_RUNNERS: Dict[str, JobRunner] = {
+    "scenario": run_scenario_job,
+    "benchmark": run_benchmark_job,
+    "parameter": run_parameter_job,
+}
+
+
+def default_worker_id() -> str:
+    return f"{platform.node()}-{os.getpid()}"
+
+
+def pack_artefacts(directory: str) -> Optional[bytes]:
+    """Archives the contents of a directory as a gzipped tar, or returns None if
+    the directory is empty."""
+    if not os.listdir(directory):
+        return None
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for entry in sorted(os.listdir(directory)):
+            tar.add(os.path.join(directory, entry), arcname=entry)
+    return buffer.getvalue()
+
+
+def unpack_artefacts(artefacts: bytes, directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with tarfile.open(fileobj=io.BytesIO(artefacts), mode="r:gz") as tar:
+        tar.extractall(directory)
+
+
+@contextmanager
+def _working_directory(directory: str):
+    previous = os.getcwd()
+    os.chdir(directory)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+class SweepWorker:
+    def __init__(
+        self,
+        queue: JobQueue,
+        worker_id: Optional[str] = None,
+        heartbeat_interval: float = 10,
+        poll_interval: float = 5,
+        runners: Optional[Dict[str, JobRunner]] = None,
+        vega_service_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        """Pulls jobs from a queue and runs them one at a time.
+
+        Args:
+            queue:
+                JobQueue, The queue to take jobs from and report results to
+            worker_id:
+                Optional[str], Identifier reported with heartbeats and results.
+                Defaults to hostname and process id.
+            heartbeat_interval:
+                float, default 10, Seconds between heartbeats for a running
+                job. Must be well below the coordinator's lost job timeout.
+            poll_interval:
+                float, default 5, Seconds to wait before checking an empty
+                queue again
+            runners:
+                Optional[Dict[str, JobRunner]], Functions running each kind of
+                job, called with the job and vega_service_kwargs. Defaults to
+                JOB_RUNNERS.
+            vega_service_kwargs:
+                Optional[Dict[str, Any]], Extra arguments for every
+                VegaServiceNull the worker starts
+        """
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.runners = runners if runners is not None else JOB_RUNNERS
+        self.vega_service_kwargs = vega_service_kwargs or {}
+
+    def _heartbeat(self, job: Job, stop: threading.Event) -> None:
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                if not self.queue.heartbeat(job.job_id, self.worker_id):
+                    logger.warning(
+                        f"Job {job.job_id} was reassigned while still running here"
+                    )
+                    return
+            except Exception:
+                logger.exception(f"Failed to send heartbeat for job {job.job_id}")
+
+    def run_job(self, job: Job) -> None:
+        """Runs a claimed job and reports its outcome to the queue."""
+        if job.kind not in self.runners:
+            self.queue.fail(job.job_id, self.worker_id, f"Unknown job kind {job.kind}")
+            return
+
+        logger.info(
+            f"Worker {self.worker_id} running {job.kind} {job.name} with seed"
+            f" {job.seed} and kwargs {job.kwargs}"
+        )
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job, stop), daemon=True
+        )
+        heartbeat.start()
+        artefact_dir = tempfile.mkdtemp(prefix=f"sweep-{job.job_id}-")
+        try:
+            with _working_directory(artefact_dir):
+                result = self.runners[job.kind](job, self.vega_service_kwargs)
+            artefacts = pack_artefacts(artefact_dir)
+        except Exception:
+            logger.exception(f"Job {job.job_id} failed")
+            self.queue.fail(job.job_id, self.worker_id, traceback.format_exc())
+            return
+        finally:
+            stop.set()
+            heartbeat.join()
+            shutil.rmtree(artefact_dir, ignore_errors=True)
+
+        if not self.queue.complete(job.job_id, self.worker_id, result, artefacts):
+            logger.info(f"Job {job.job_id} had already been completed elsewhere")
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_empty: bool = False) -> int:
+        """Claims and runs jobs until max_jobs have been run or, if
+        exit_when_empty, the queue has no pending jobs.
+
+        Returns:
+            int, The number of jobs run
+        """
+        num_run = 0
+        while max_jobs is None or num_run < max_jobs:
+            job = self.queue.claim(self.worker_id)
+            if job is None:
+                if exit_when_empty:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self.run_job(job)
+            num_run += 1
+        return num_run
@@ -0,0 +1,178 @@
+"""Cross-process allocation of blocks of contiguous ports.
+
+The port range is split into fixed size blocks, each guarded by a lock file in a
+shared temporary directory. Holding an exclusive lock on a block's file reserves
+every port in the block. Locks are held for as long as the reservation is open,
+and are dropped by the operating system if the owning process dies, so
+reservations never expire while in use and are never leaked by crashed runs.
+
+Blocks are allocated below the usual ephemeral port range so ports handed out
+here are not also handed out by the kernel for outgoing connections.
+"""
+
+import logging
+import os
+import random
+import socket
+import tempfile
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PORT_BROKER_DIR_NAME = "market_sim_port_blocks"
+
+DEFAULT_MIN_PORT = 10000
+DEFAULT_MAX_PORT = 32000
+DEFAULT_BLOCK_SIZE = 16
+
+
+class PortBlockUnavailableError(Exception):
+    pass
+
+
+class PortBlockReservation:
+    def __init__(self, start: int, size: int, lock_fds: List[int]):
+        """A reserved block of contiguous ports, [start, start + size).
+
+        Args:
+            start:
+                int, The first port in the block
+            size:
+                int, The number of ports in the block
+            lock_fds:
+                List[int], Open file descriptors holding the locks on the block
+        """
+        self.start = start
+        self.size = size
+        self._lock_fds = lock_fds
+
+    @property
+    def ports(self) -> List[int]:
+        return list(range(self.start, self.start + self.size))
+
+    @property
+    def released(self) -> bool:
+        return not self._lock_fds
+
+    def release(self) -> None:
+        _unlock(self._lock_fds)
+        self._lock_fds = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.release()
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def __repr__(self) -> str:
+        return f"PortBlockReservation({self.start}-{self.start + self.size - 1})"
+
+
+def _unlock(fds: List[int]) -> None:
+    for fd in fds:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def _try_lock(lock_path: str) -> Optional[int]:
+    fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _ports_bindable(ports: List[int]) -> bool:
+    for port in ports:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            try:
+                s.bind(("", port))
+            except OSError:
+                return False
+    return True
+
+
+def reserve_port_block(
+    num_ports: int,
+    min_port: int = DEFAULT_MIN_PORT,
+    max_port: int = DEFAULT_MAX_PORT,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    lock_dir: Optional[str] = None,
+) -> PortBlockReservation:
+    """Reserves a block of at least num_ports contiguous, currently unused ports.
+
+    The reservation holds until PortBlockReservation.release is called or the
+    process exits. Other processes on the host using the same lock_dir will not
+    be given any port within the block in the meantime.
+
+    Args:
+        num_ports:
+            int, Number of ports required
+        min_port:
+            int, Lowest port which may be handed out
+        max_port:
+            int, Highest port which may be handed out
+        block_size:
+            int, Granularity of the blocks the range is divided into. Requests
+            for more ports than this span several consecutive blocks.
+        lock_dir:
+            Optional[str], Directory holding the lock files. Defaults to a
+            directory within the system temporary directory.
+
+    Returns:
+        PortBlockReservation, The reserved block
+    """
+    if fcntl is None:
+        raise PortBlockUnavailableError("Port blocks require fcntl file locking")
+
+    blocks_needed = -(-num_ports // block_size)
+    span = blocks_needed * block_size
+    num_blocks = (max_port - min_port + 1) // block_size - blocks_needed + 1
+    if num_blocks < 1:
+        raise PortBlockUnavailableError(
+            f"Port range {min_port}-{max_port} cannot fit {num_ports} ports"
+        )
+
+    lock_dir = lock_dir or os.path.join(tempfile.gettempdir(), PORT_BROKER_DIR_NAME)
+    os.makedirs(lock_dir, exist_ok=True)
+
+    # Start from a random block so concurrent callers rarely contend on a lock
+    offset = random.randrange(num_blocks)
+    for i in range(num_blocks):
+        start = min_port + ((offset + i) % num_blocks) * block_size
+
+        # Every block within the span is locked, always in ascending order
+        fds = []
+        for block_start in range(start, start + span, block_size):
+            fd = _try_lock(os.path.join(lock_dir, f"{block_size}-{block_start}.lock"))
+            if fd is None:
+                break
+            fds.append(fd)
+        if len(fds) < blocks_needed:
+            _unlock(fds)
+            continue
+
+        if not _ports_bindable(list(range(start, start + span))):
+            # Something outside the broker is using a port in this block
+            _unlock(fds)
+            continue
+
+        logger.debug(f"Reserved ports {start}-{start + span - 1}")
+        return PortBlockReservation(start=start, size=span, lock_fds=fds)
+
+    raise PortBlockUnavailableError(
+        f"No free block of {num_ports} ports in range {min_port}-{max_port}"
+    )
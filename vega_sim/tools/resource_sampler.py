@@ -0,0 +1,175 @@
+"""Samples the resource use of the processes making up a simulation on a
+background thread, at a fixed rate independent of how long each step takes.
+
+Each sample records the CPU, memory, IO, open file descriptors and threads of
+one process. Samples are held in a ring buffer until they are drained, so a
+consumer which falls behind loses the oldest samples rather than growing
+memory without bound.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, TypeVar
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+SELF_PROCESS_NAME = "python"
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ProcessResourceData:
+    # Wall clock time of the sample in seconds since the epoch
+    sampled_at: float
+    process: str
+    pid: int
+    cpu_per: float
+    mem_rss: int
+    # Unavailable values, such as the IO counters on macOS or the USS of
+    # another user's process, are None
+    mem_uss: Optional[int]
+    read_bytes: Optional[int]
+    write_bytes: Optional[int]
+    num_fds: Optional[int]
+    num_threads: int
+    # Time of the simulation step the sample was taken during, in
+    # nanoseconds of vega time, once joined onto the step timeline
+    at_time: Optional[int] = None
+
+
+def _optional(fn: Callable[[], T]) -> Optional[T]:
+    try:
+        return fn()
+    except (psutil.AccessDenied, AttributeError, NotImplementedError):
+        return None
+
+
+def sample_process(name: str, process: psutil.Process) -> ProcessResourceData:
+    """Takes a single sample of a process.
+
+    CPU use is measured since the previous sample of the same Process object,
+    so the first sample of each process reads zero.
+
+    Raises:
+        psutil.NoSuchProcess:
+            If the process has exited
+    """
+    sampled_at = time.time()
+    with process.oneshot():
+        io = _optional(process.io_counters)
+        return ProcessResourceData(
+            sampled_at=sampled_at,
+            process=name,
+            pid=process.pid,
+            cpu_per=process.cpu_percent(),
+            mem_rss=process.memory_info().rss,
+            mem_uss=_optional(lambda: process.memory_full_info().uss),
+            read_bytes=io.read_bytes if io is not None else None,
+            write_bytes=io.write_bytes if io is not None else None,
+            num_fds=_optional(process.num_fds),
+            num_threads=process.num_threads(),
+        )
+
+
+class ResourceSampler:
+    def __init__(
+        self,
+        process_pids: Dict[str, int],
+        sample_hz: float = 10,
+        max_samples: int = 100_000,
+        include_self: bool = True,
+    ):
+        """Samples a set of processes at sample_hz on a background thread.
+
+        Args:
+            process_pids:
+                Dict[str, int], Processes to sample keyed by name, such as a
+                VegaServiceNull's process_pids
+            sample_hz:
+                float, default 10, Samples of each process per second
+            max_samples:
+                int, default 100_000, Samples held before the oldest are
+                dropped
+            include_self:
+                bool, default True, Also sample this Python process, named
+                SELF_PROCESS_NAME
+        """
+        if sample_hz <= 0:
+            raise ValueError("sample_hz must be positive")
+        self.sample_hz = sample_hz
+        self.num_dropped = 0
+
+        self._processes: Dict[str, psutil.Process] = {}
+        for name, pid in process_pids.items():
+            try:
+                self._processes[name] = psutil.Process(pid)
+            except psutil.NoSuchProcess:
+                logger.warning(f"Not sampling {name}, process {pid} has exited")
+        if include_self:
+            self._processes[SELF_PROCESS_NAME] = psutil.Process(os.getpid())
+
+        self._samples: Deque[ProcessResourceData] = deque(maxlen=max_samples)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="resource-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling. Samples already taken can still be drained."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "ResourceSampler":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def drain(self) -> List[ProcessResourceData]:
+        """Removes and returns the samples taken since the last drain, oldest
+        first."""
+        samples = []
+        while self._samples:
+            samples.append(self._samples.popleft())
+        return samples
+
+    def sample(self) -> None:
+        """Samples every process once."""
+        for name, process in list(self._processes.items()):
+            try:
+                sample = sample_process(name, process)
+            except psutil.NoSuchProcess:
+                logger.debug(f"Stopped sampling {name}, process has exited")
+                del self._processes[name]
+                continue
+            if len(self._samples) == self._samples.maxlen:
+                self.num_dropped += 1
+            self._samples.append(sample)
+
+    def _run(self) -> None:
+        interval = 1 / self.sample_hz
+        next_sample = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Failed to sample process resources")
+            # Sample on a fixed schedule, skipping ahead rather than sampling
+            # in bursts after falling behind
+            next_sample = max(next_sample + interval, time.monotonic())
+            self._stop.wait(next_sample - time.monotonic())
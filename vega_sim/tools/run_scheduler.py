@@ -0,0 +1,365 @@
+"""Runs many VegaServiceNull-backed jobs on one host, admitting new runs only while
+the host has headroom for them.
+
+Each run executes in its own child process. Once its nullchain is up the child
+reports the process_pids of its components, which the scheduler then samples
+for CPU time and resident memory. A new run is only admitted when host CPU use
+is below a limit, there is enough free memory for another instance (estimated
+from the peak memory of instances seen so far) and no running instance is
+struggling.
+
+An instance is struggling when its data-node falls behind core. As the
+nullchain only produces blocks when the Python driver moves time forward,
+suspending the driver lets the data-node catch up, so the driver is paused when
+the lag passes one threshold and resumed once it drops below another.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import psutil
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RSS_ESTIMATE = 2 * 1024**3
+DEFAULT_MEMORY_RESERVE = 1024**3
+
+
+@dataclass
+class RunSpec:
+    name: str
+    func: Callable[[Any], Any]
+    vega_service_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class RunRecord:
+    name: str
+    admitted_at: float
+    finished_at: Optional[float] = None
+    pids: Dict[str, int] = field(default_factory=dict)
+    peak_rss: int = 0
+    cpu_seconds: float = 0
+    max_block_lag: int = 0
+    paused_seconds: float = 0
+    times_paused: int = 0
+    result: Any = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.admitted_at
+
+    @property
+    def mean_cpu_percent(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.time()
+        elapsed = end - self.admitted_at
+        return 100 * self.cpu_seconds / elapsed if elapsed > 0 else 0.0
+
+
+@dataclass
+class SchedulerReport:
+    records: List[RunRecord]
+    elapsed_seconds: float
+
+    @property
+    def runs_per_hour(self) -> float:
+        completed = sum(r.error is None for r in self.records)
+        return 3600 * completed / self.elapsed_seconds if self.elapsed_seconds else 0
+
+    def __str__(self) -> str:
+        lines = [
+            f"{len(self.records)} runs in {self.elapsed_seconds:.0f}s"
+            f" ({self.runs_per_hour:.1f} runs/hour,"
+            f" {sum(r.error is not None for r in self.records)} failed)",
+            f"{'run':<30} {'secs':>8} {'cpu %':>6} {'peak rss MB':>12}"
+            f" {'max lag':>8} {'paused s':>9}",
+        ]
+        for r in self.records:
+            lines.append(
+                f"{r.name[:30]:<30} {r.duration or 0:>8.0f} {r.mean_cpu_percent:>6.0f}"
+                f" {r.peak_rss / 1024**2:>12.0f} {r.max_block_lag:>8}"
+                f" {r.paused_seconds:>9.0f}"
+            )
+        return "\n".join(lines)
+
+
+@dataclass
+class HostSnapshot:
+    cpu_percent: float
+    available_memory: int
+
+
+def _run_child(spec: RunSpec, conn) -> None:
+    from vega_sim.null_service import VegaServiceNull
+
+    try:
+        with VegaServiceNull(**spec.vega_service_kwargs) as vega:
+            conn.send(
+                (
+                    "started",
+                    {
+                        "pids": dict(vega.process_pids),
+                        "core_rest_url": vega.vega_node_rest_url,
+                        "data_node_rest_url": vega.data_node_rest_url,
+                    },
+                )
+            )
+            result = spec.func(vega)
+        conn.send(("result", result))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+
+
+def block_lag(core_rest_url: str, data_node_rest_url: str) -> Optional[int]:
+    """Number of blocks the data-node is behind core, or None if either could not
+    be reached."""
+    try:
+        core_height = int(
+            requests.get(f"{core_rest_url}/blockchain/height", timeout=1).json()[
+                "height"
+            ]
+        )
+        data_node_height = int(
+            requests.get(f"{data_node_rest_url}/statistics", timeout=1).headers[
+                "X-Block-Height"
+            ]
+        )
+    except (requests.RequestException, KeyError, ValueError):
+        return None
+    return max(core_height - data_node_height, 0)
+
+
+class _RunningInstance:
+    def __init__(self, spec: RunSpec, process, conn):
+        self.spec = spec
+        self.process = process
+        self.conn = conn
+        self.record = RunRecord(name=spec.name, admitted_at=time.time())
+        self.rest_urls: Optional[Dict[str, str]] = None
+        self.rss = 0
+        self.paused_since: Optional[float] = None
+        self._cpu_by_pid: Dict[int, float] = {}
+
+    @property
+    def paused(self) -> bool:
+        return self.paused_since is not None
+
+    def receive(self) -> bool:
+        """Handles messages from the child, returning True once it has finished."""
+        while self.conn.poll():
+            try:
+                kind, payload = self.conn.recv()
+            except EOFError:
+                break
+            if kind == "started":
+                self.record.pids = payload["pids"]
+                self.rest_urls = {
+                    "core_rest_url": payload["core_rest_url"],
+                    "data_node_rest_url": payload["data_node_rest_url"],
+                }
+            elif kind == "result":
+                self.record.result = payload
+                return True
+            elif kind == "error":
+                self.record.error = payload
+                return True
+        if not self.process.is_alive():
+            if self.record.error is None and self.record.result is None:
+                self.record.error = f"Run exited with code {self.process.exitcode}"
+            return True
+        return False
+
+    def _processes(self) -> List[psutil.Process]:
+        procs = []
+        for pid in [self.process.pid] + list(self.record.pids.values()):
+            try:
+                proc = psutil.Process(pid)
+                procs.append(proc)
+                procs.extend(proc.children(recursive=True))
+            except psutil.NoSuchProcess:
+                continue
+        return list({p.pid: p for p in procs}.values())
+
+    def sample(self) -> None:
+        """Updates the instance's memory and accumulated CPU time."""
+        rss = 0
+        for proc in self._processes():
+            try:
+                rss += proc.memory_info().rss
+                cpu_times = proc.cpu_times()
+            except psutil.NoSuchProcess:
+                continue
+            total = cpu_times.user + cpu_times.system
+            self.record.cpu_seconds += total - self._cpu_by_pid.get(proc.pid, 0)
+            self._cpu_by_pid[proc.pid] = total
+        self.rss = rss
+        self.record.peak_rss = max(self.record.peak_rss, rss)
+
+    def pause(self) -> None:
+        psutil.Process(self.process.pid).suspend()
+        self.paused_since = time.time()
+        self.record.times_paused += 1
+
+    def resume(self) -> None:
+        try:
+            psutil.Process(self.process.pid).resume()
+        except psutil.NoSuchProcess:
+            pass
+        self.record.paused_seconds += time.time() - self.paused_since
+        self.paused_since = None
+
+
+class ResourceAwareScheduler:
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        cpu_limit: float = 85,
+        memory_reserve: int = DEFAULT_MEMORY_RESERVE,
+        initial_rss_estimate: int = DEFAULT_RSS_ESTIMATE,
+        admission_interval: float = 10,
+        sample_interval: float = 2,
+        pause_block_lag: int = 50,
+        resume_block_lag: int = 5,
+    ):
+        """Schedules runs onto the host as resources allow.
+
+        Args:
+            max_concurrent:
+                Optional[int], Hard cap on simultaneous runs. Defaults to half
+                the CPU count, as each run has a core and a data-node.
+            cpu_limit:
+                float, default 85, Host CPU percentage above which no new runs
+                are admitted
+            memory_reserve:
+                int, Bytes of memory to always leave free
+            initial_rss_estimate:
+                int, Assumed peak memory of a run, in bytes, until one has been
+                measured
+            admission_interval:
+                float, default 10, Minimum seconds between admitting runs, so
+                the load of the last startup is visible before the next
+            sample_interval:
+                float, default 2, Seconds between resource samples
+            pause_block_lag:
+                int, default 50, Data-node lag in blocks at which a run's driver
+                is paused
+            resume_block_lag:
+                int, default 5, Data-node lag in blocks at which a paused run is
+                resumed
+        """
+        self.max_concurrent = max_concurrent or max((os.cpu_count() or 2) // 2, 1)
+        self.cpu_limit = cpu_limit
+        self.memory_reserve = memory_reserve
+        self.initial_rss_estimate = initial_rss_estimate
+        self.admission_interval = admission_interval
+        self.sample_interval = sample_interval
+        self.pause_block_lag = pause_block_lag
+        self.resume_block_lag = resume_block_lag
+
+        self._peak_rss_seen = 0
+        self._last_admission = 0.0
+        # Forked where possible so run functions need not be picklable. The
+        # scheduler process itself only talks REST, so has no gRPC state.
+        self._mp_context = multiprocessing.get_context(
+            "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        )
+
+    @property
+    def rss_estimate(self) -> int:
+        return self._peak_rss_seen or self.initial_rss_estimate
+
+    def has_headroom(
+        self, running: List[_RunningInstance], host: HostSnapshot, now: float
+    ) -> bool:
+        if not running:
+            return True
+        if len(running) >= self.max_concurrent:
+            return False
+        if now - self._last_admission < self.admission_interval:
+            return False
+        if any(instance.paused for instance in running):
+            return False
+        if host.cpu_percent >= self.cpu_limit:
+            return False
+        # Runs still ramping up will take more memory than they hold right now
+        growth = sum(max(self.rss_estimate - i.rss, 0) for i in running)
+        return host.available_memory - growth - self.memory_reserve >= self.rss_estimate
+
+    def update_pause(self, instance: _RunningInstance, lag: Optional[int]) -> None:
+        if lag is None:
+            return
+        instance.record.max_block_lag = max(instance.record.max_block_lag, lag)
+        if not instance.paused and lag >= self.pause_block_lag:
+            logger.info(
+                f"Pausing run {instance.spec.name}, data-node is {lag} blocks behind"
+            )
+            instance.pause()
+        elif instance.paused and lag <= self.resume_block_lag:
+            logger.info(f"Resuming run {instance.spec.name}")
+            instance.resume()
+
+    def _admit(self, spec: RunSpec) -> _RunningInstance:
+        parent_conn, child_conn = self._mp_context.Pipe()
+        process = self._mp_context.Process(
+            target=_run_child, args=(spec, child_conn), daemon=False
+        )
+        process.start()
+        self._last_admission = time.time()
+        logger.info(f"Admitted run {spec.name}")
+        return _RunningInstance(spec, process, parent_conn)
+
+    def _finish(self, instance: _RunningInstance) -> RunRecord:
+        if instance.paused:
+            instance.resume()
+        instance.process.join()
+        record = instance.record
+        record.finished_at = time.time()
+        self._peak_rss_seen = max(self._peak_rss_seen, record.peak_rss)
+        if record.error is not None:
+            logger.error(f"Run {record.name} failed: {record.error}")
+        else:
+            logger.info(f"Run {record.name} finished in {record.duration:.0f}s")
+        return record
+
+    def run(self, specs: Iterable[RunSpec]) -> SchedulerReport:
+        """Runs every spec, returning once all have finished."""
+        start = time.time()
+        pending = deque(specs)
+        running: List[_RunningInstance] = []
+        records = []
+        psutil.cpu_percent()
+
+        while pending or running:
+            for instance in list(running):
+                if instance.receive():
+                    running.remove(instance)
+                    records.append(self._finish(instance))
+                    continue
+                instance.sample()
+                self._peak_rss_seen = max(self._peak_rss_seen, instance.rss)
+                if instance.rest_urls is not None:
+                    self.update_pause(instance, block_lag(**instance.rest_urls))
+
+            host = HostSnapshot(
+                cpu_percent=psutil.cpu_percent(),
+                available_memory=psutil.virtual_memory().available,
+            )
+            if pending and self.has_headroom(running, host, time.time()):
+                running.append(self._admit(pending.popleft()))
+
+            if pending or running:
+                time.sleep(self.sample_interval)
+
+        report = SchedulerReport(records=records, elapsed_seconds=time.time() - start)
+        logger.info(f"Scheduler finished\n{report}")
+        return report
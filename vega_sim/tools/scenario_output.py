@@ -1,15 +1,25 @@
+import ast
 import csv
+import functools
+import io
+import itertools
 import json
+import logging
 import os
 import datetime
 import os.path
-from typing import Callable, Dict, List, Optional
+import shutil
+import threading
+import time
+from queue import Empty, Queue
+from typing import Callable, Dict, List, Optional, TextIO, Tuple, Union
 
 import pandas as pd
 
 import vega_protos.protos.vega as vega_protos
 from vega_sim.environment.agent import Agent, StateAgentWithWallet
 from vega_sim.scenario.common.agents import MarketHistoryData, ResourceData
+from vega_sim.tools.resource_sampler import ProcessResourceData
 
 DEFAULT_PATH = "./run_logs"
 DEFAULT_RUN_NAME = "latest"
@@ -21,11 +31,318 @@ TRADES_FILE_NAME = "trades.csv"
 ACCOUNTS_FILE_NAME = "accounts.csv"
 FUZZING_FILE_NAME = "additional_data.csv"
 RESOURCES_FILE_NAME = "resources.csv"
+PROCESS_RESOURCES_FILE_NAME = "process_resources.csv"
 ASSETS_FILE_NAME = "assets.csv"
 MARKET_CHAIN_FILE_NAME = "market_chain.json"
 LEDGER_ENTRIES_FILE_NAME = "ledger_entries.csv"
 POSITIONS_FILE_NAME = "positions.csv"
 
+OUTPUT_FORMATS = ["csv", "parquet"]
+# A Parquet table is a directory of part files named after the CSV it replaces
+PARQUET_EXTENSION = ".parquet"
+PARQUET_COMPRESSION = "zstd"
+# Rows held in memory per table before they are written out as a part file
+PARQUET_ROWS_PER_PART = 1_000_000
+PARQUET_ROW_GROUP_SIZE = 100_000
+
+logger = logging.getLogger(__name__)
+
+TimeLike = Union[datetime.datetime, str]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The pyarrow package is required for Parquet run output")
+    return pyarrow
+
+
+def _parquet_schemas() -> Dict[str, "pyarrow.Schema"]:
+    """Column types of the standard output tables, keyed by file name. Tables
+    without a schema, such as custom outputs, have their types inferred."""
+    pa = _pyarrow()
+    time = pa.timestamp("us")
+    return {
+        DATA_FILE_NAME: pa.schema(
+            [
+                ("time", time),
+                ("mark_price", pa.float64()),
+                ("market_id", pa.string()),
+                ("mid_price", pa.float64()),
+                ("open_interest", pa.float64()),
+                ("best_bid", pa.float64()),
+                ("best_offer", pa.float64()),
+                ("best_bid_volume", pa.float64()),
+                ("best_offer_volume", pa.float64()),
+                ("market_state", pa.int32()),
+                ("market_trading_mode", pa.int32()),
+                ("target_stake", pa.float64()),
+                ("supplied_stake", pa.float64()),
+                (
+                    "price_monitoring_bounds",
+                    pa.list_(
+                        pa.struct(
+                            [
+                                ("min_valid_price", pa.float64()),
+                                ("max_valid_price", pa.float64()),
+                            ]
+                        )
+                    ),
+                ),
+                ("indicative_price", pa.float64()),
+                ("trigger", pa.int32()),
+                ("extension_trigger", pa.int32()),
+                ("keyframe", pa.bool_()),
+            ]
+        ),
+        ORDER_BOOK_FILE_NAME: pa.schema(
+            [
+                ("time", time),
+                ("side", pa.string()),
+                ("price", pa.float64()),
+                ("volume", pa.float64()),
+                ("level", pa.int32()),
+                ("market_id", pa.string()),
+                ("keyframe", pa.bool_()),
+            ]
+        ),
+        TRADES_FILE_NAME: pa.schema(
+            [
+                ("time", time),
+                ("seen_at", time),
+                ("id", pa.string()),
+                ("price", pa.float64()),
+                ("size", pa.float64()),
+                ("buyer", pa.string()),
+                ("seller", pa.string()),
+                ("aggressor", pa.int32()),
+                ("buy_order", pa.string()),
+                ("sell_order", pa.string()),
+                ("market_id", pa.string()),
+                ("trade_type", pa.int32()),
+                ("buyer_fee_infrastructure", pa.float64()),
+                ("buyer_fee_liquidity", pa.float64()),
+                ("buyer_fee_maker", pa.float64()),
+                ("seller_fee_infrastructure", pa.float64()),
+                ("seller_fee_liquidity", pa.float64()),
+                ("seller_fee_maker", pa.float64()),
+                ("buyer_auction_batch", pa.int64()),
+                ("seller_auction_batch", pa.int64()),
+            ]
+        ),
+        ACCOUNTS_FILE_NAME: pa.schema(
+            [
+                ("time", time),
+                ("party_id", pa.string()),
+                ("balance", pa.float64()),
+                ("market_id", pa.string()),
+                ("asset", pa.string()),
+                ("type", pa.int32()),
+                ("keyframe", pa.bool_()),
+            ]
+        ),
+        POSITIONS_FILE_NAME: pa.schema(
+            [
+                ("time", time),
+                ("market_id", pa.string()),
+                ("party_id", pa.string()),
+                ("open_volume", pa.float64()),
+                ("realised_pnl", pa.float64()),
+                ("unrealised_pnl", pa.float64()),
+                ("average_entry_price", pa.float64()),
+                ("updated_at", time),
+                ("loss_socialisation_amount", pa.float64()),
+                ("position_status", pa.int32()),
+                ("keyframe", pa.bool_()),
+            ]
+        ),
+        RESOURCES_FILE_NAME: pa.schema(
+            [
+                ("time", time),
+                ("vega_cpu_per", pa.float64()),
+                ("vega_mem_rss", pa.float64()),
+                ("vega_mem_vms", pa.float64()),
+                ("datanode_cpu_per", pa.float64()),
+                ("datanode_mem_rss", pa.float64()),
+                ("datanode_mem_vms", pa.float64()),
+            ]
+        ),
+        PROCESS_RESOURCES_FILE_NAME: pa.schema(
+            [
+                ("time", time),
+                ("sampled_at", time),
+                ("process", pa.string()),
+                ("pid", pa.int64()),
+                ("cpu_per", pa.float64()),
+                ("mem_rss", pa.int64()),
+                ("mem_uss", pa.int64()),
+                ("read_bytes", pa.int64()),
+                ("write_bytes", pa.int64()),
+                ("num_fds", pa.int64()),
+                ("num_threads", pa.int64()),
+            ]
+        ),
+    }
+
+
+def _parquet_path(path: str) -> str:
+    return os.path.splitext(path)[0] + PARQUET_EXTENSION
+
+
+def _remove_output(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _write_parquet_part(path: str, table: "pyarrow.Table") -> None:
+    import pyarrow.parquet as pq
+
+    # Rows are sorted and each market written as its own row groups, so the
+    # row group statistics let readers skip other markets and times entirely
+    sort_keys = [c for c in ["market_id", "time"] if c in table.column_names]
+    if sort_keys:
+        table = table.sort_by([(c, "ascending") for c in sort_keys])
+    market_ids = (
+        table.column("market_id").to_pylist()
+        if "market_id" in table.column_names
+        else [None] * table.num_rows
+    )
+
+    # Written under a hidden name, which datasets ignore, so readers never see
+    # a partial file
+    tmp = os.path.join(os.path.dirname(path), "." + os.path.basename(path))
+    with pq.ParquetWriter(tmp, table.schema, compression=PARQUET_COMPRESSION) as writer:
+        offset = 0
+        for _, rows in itertools.groupby(market_ids):
+            num_rows = sum(1 for _ in rows)
+            writer.write_table(
+                table.slice(offset, num_rows), row_group_size=PARQUET_ROW_GROUP_SIZE
+            )
+            offset += num_rows
+    os.replace(tmp, path)
+
+
+class _CsvTableWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[TextIO] = None
+        self._writer: Optional[csv.DictWriter] = None
+        # Earlier output of the same table is removed even if this run never
+        # writes a row to it, so loaders can't mistake it for this run's
+        _remove_output(path)
+        _remove_output(_parquet_path(path))
+
+    def write(self, row: dict) -> None:
+        if self._writer is None:
+            self._file = open(self.path, "w")
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row.keys()))
+            self._writer.writeheader()
+        self._writer.writerow(row)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        # Tables which never had a row are not written at all
+        if self._file is not None:
+            self._file.close()
+
+
+class _ParquetTableWriter:
+    def __init__(self, path: str, rows_per_part: int = PARQUET_ROWS_PER_PART):
+        self.directory = _parquet_path(path)
+        self.schema = _parquet_schemas().get(os.path.basename(path))
+        self.rows_per_part = rows_per_part
+        self._rows: List[dict] = []
+        self._num_parts = 0
+        _remove_output(path)
+        _remove_output(self.directory)
+        os.makedirs(self.directory)
+
+    def write(self, row: dict) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.rows_per_part:
+            self.flush()
+
+    def write_table(self, table: "pyarrow.Table") -> None:
+        # Later parts keep the types of the first, including inferred ones
+        self.schema = table.schema
+        _write_parquet_part(self._part_path(self._num_parts), table)
+        self._num_parts += 1
+
+    def _part_path(self, part: int, hidden: bool = False) -> str:
+        return os.path.join(
+            self.directory, ("." if hidden else "") + f"part-{part:05d}.parquet"
+        )
+
+    def flush(self) -> None:
+        if self._rows:
+            pa = _pyarrow()
+            self.write_table(pa.Table.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self._compact()
+
+    def _compact(self) -> None:
+        """Merges runs of consecutive parts holding fewer than rows_per_part rows
+        between them, such as those written by each flush of a streaming run,
+        into single parts."""
+        import pyarrow.parquet as pq
+
+        pa = _pyarrow()
+        groups: List[List[str]] = []
+        group_rows = 0
+        for part in range(self._num_parts):
+            path = self._part_path(part)
+            num_rows = pq.read_metadata(path).num_rows
+            if groups and group_rows + num_rows <= self.rows_per_part:
+                groups[-1].append(path)
+                group_rows += num_rows
+            else:
+                groups.append([path])
+                group_rows = num_rows
+        if len(groups) == self._num_parts:
+            return
+
+        # Merged parts are written under hidden names, which readers ignore,
+        # before any of the parts they replace are removed
+        for part, paths in enumerate(groups):
+            if len(paths) > 1:
+                _write_parquet_part(
+                    self._part_path(part, hidden=True),
+                    pa.concat_tables(pq.read_table(path) for path in paths),
+                )
+        for paths in groups:
+            if len(paths) > 1:
+                for path in paths:
+                    os.remove(path)
+        # Parts only move to earlier numbers, whose own part has already moved
+        for part, paths in enumerate(groups):
+            os.replace(
+                self._part_path(part, hidden=True) if len(paths) > 1 else paths[0],
+                self._part_path(part),
+            )
+        self._num_parts = len(groups)
+
+
+def _table_writer(path: str, output_format: str):
+    if output_format == "csv":
+        return _CsvTableWriter(path)
+    if output_format == "parquet":
+        return _ParquetTableWriter(path)
+    raise ValueError(
+        f"Unknown output format {output_format}, expected one of {OUTPUT_FORMATS}"
+    )
+
 
 def resource_data_to_row(data: ResourceData):
     return [
@@ -41,6 +358,23 @@ def resource_data_to_row(data: ResourceData):
     ]
 
 
+def process_resource_data_to_rows(data: List[ProcessResourceData]) -> List[dict]:
+    for sample in data:
+        yield {
+            "time": datetime.datetime.fromtimestamp(sample.at_time / 1e9),
+            "sampled_at": datetime.datetime.fromtimestamp(sample.sampled_at),
+            "process": sample.process,
+            "pid": sample.pid,
+            "cpu_per": sample.cpu_per,
+            "mem_rss": sample.mem_rss,
+            "mem_uss": sample.mem_uss,
+            "read_bytes": sample.read_bytes,
+            "write_bytes": sample.write_bytes,
+            "num_fds": sample.num_fds,
+            "num_threads": sample.num_threads,
+        }
+
+
 def history_data_to_row(data: MarketHistoryData) -> List[pd.Series]:
     for market_id in data.market_info.keys():
         market_data = data.market_data[market_id]
@@ -67,6 +401,7 @@ def history_data_to_row(data: MarketHistoryData) -> List[pd.Series]:
             "indicative_price": market_data.indicative_price,
             "trigger": market_data.trigger,
             "extension_trigger": market_data.extension_trigger,
+            "keyframe": data.keyframe,
         }
 
 
@@ -81,6 +416,7 @@ def history_data_to_order_book_rows(data: MarketHistoryData) -> List[dict]:
                     "volume": level_data.volume,
                     "level": i,
                     "market_id": market_id,
+                    "keyframe": data.keyframe,
                 }
 
 
@@ -120,6 +456,7 @@ def history_data_to_account_rows(data: MarketHistoryData) -> List[dict]:
             "market_id": account.market_id,
             "asset": account.asset,
             "type": account.type,
+            "keyframe": data.keyframe,
         }
 
 
@@ -136,6 +473,7 @@ def history_data_to_position_rows(data: MarketHistoryData) -> List[dict]:
             "updated_at": position.updated_at,
             "loss_socialisation_amount": position.loss_socialisation_amount,
             "position_status": position.position_status,
+            "keyframe": data.keyframe,
         }
 
 
@@ -144,21 +482,18 @@ def _market_data_standard_output(
     file_name: str,
     output_path: str = DEFAULT_PATH,
     data_to_row_fn: Callable[[MarketHistoryData], dict] = history_data_to_row,
+    output_format: str = "csv",
 ):
     if len(market_history_data) == 0:
         return
 
     os.makedirs(output_path, exist_ok=True)
-    with open(os.path.join(output_path, file_name), "w") as f:
-        writer = None
-
-        for step_data in market_history_data:
-            for row_data in data_to_row_fn(data=step_data):
-                if row_data:
-                    if writer is None:
-                        writer = csv.DictWriter(f, fieldnames=list(row_data.keys()))
-                        writer.writeheader()
-                    writer.writerow(row_data)
+    writer = _table_writer(os.path.join(output_path, file_name), output_format)
+    for step_data in market_history_data:
+        for row_data in data_to_row_fn(data=step_data):
+            if row_data:
+                writer.write(row_data)
+    writer.close()
 
 
 def market_data_standard_output(
@@ -168,6 +503,7 @@ def market_data_standard_output(
     custom_output_fns: Optional[
         Dict[str, List[Callable[[MarketHistoryData], pd.Series]]]
     ] = None,
+    output_format: str = "csv",
 ):
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
     full_path = os.path.join(output_path, run_name)
@@ -188,6 +524,7 @@ def market_data_standard_output(
             file_name=file_name,
             output_path=full_path,
             data_to_row_fn=data_fn,
+            output_format=output_format,
         )
 
 
@@ -198,6 +535,7 @@ def resources_standard_output(
     custom_output_fns: Optional[
         Dict[str, List[Callable[[MarketHistoryData], pd.Series]]]
     ] = None,
+    output_format: str = "csv",
 ):
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
     full_path = os.path.join(output_path, run_name)
@@ -214,9 +552,28 @@ def resources_standard_output(
             file_name=file_name,
             output_path=full_path,
             data_to_row_fn=data_fn,
+            output_format=output_format,
         )
 
 
+def process_resources_standard_output(
+    process_resource_data: List[ProcessResourceData],
+    run_name: str = DEFAULT_RUN_NAME,
+    output_path: str = DEFAULT_PATH,
+    output_format: str = "csv",
+):
+    if len(process_resource_data) == 0:
+        return
+    run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
+    _market_data_standard_output(
+        market_history_data=[process_resource_data],
+        file_name=PROCESS_RESOURCES_FILE_NAME,
+        output_path=os.path.join(output_path, run_name),
+        data_to_row_fn=process_resource_data_to_rows,
+        output_format=output_format,
+    )
+
+
 def agents_standard_output(
     agents: Dict[str, Agent],
     run_name: str = DEFAULT_RUN_NAME,
@@ -277,6 +634,18 @@ def assets_standard_output(
     )
 
 
+def _update_market_chains(
+    market_chains: Dict[str, List[str]], history_data: MarketHistoryData
+) -> None:
+    for market_id, market_info in history_data.market_info.items():
+        if not market_info.parent_market_id:
+            market_chains.setdefault(market_id, [market_id])
+        else:
+            for _, market_chain in market_chains.items():
+                if market_chain[-1] == market_info.parent_market_id:
+                    market_chain.append(market_id)
+
+
 def market_chain_standard_output(
     market_history_data: List[MarketHistoryData],
     run_name: str = DEFAULT_RUN_NAME,
@@ -287,13 +656,7 @@ def market_chain_standard_output(
 
     market_chains: Dict[str, List[str]] = {}
     for history_data in market_history_data:
-        for market_id, market_info in history_data.market_info.items():
-            if not market_info.parent_market_id:
-                market_chains.setdefault(market_id, [market_id])
-            else:
-                for _, market_chain in market_chains.items():
-                    if market_chain[-1] == market_info.parent_market_id:
-                        market_chain.append(market_id)
+        _update_market_chains(market_chains, history_data)
 
     os.makedirs(output_path, exist_ok=True)
 
@@ -301,6 +664,453 @@ def market_chain_standard_output(
         json.dump(market_chains, f, indent=4)
 
 
+_STOP = object()
+
+
+class StreamingHistoryWriter:
+    def __init__(
+        self,
+        run_name: str = DEFAULT_RUN_NAME,
+        output_path: str = DEFAULT_PATH,
+        custom_output_fns: Optional[
+            Dict[str, Callable[[MarketHistoryData], List[dict]]]
+        ] = None,
+        max_queued_steps: int = 100,
+        flush_interval_seconds: float = 5,
+        output_format: str = "csv",
+    ):
+        """Writes the history of a run to the standard output files as it is
+        produced, rather than holding it all in memory until the run ends.
+
+        Each step's data is handed to a background thread which converts it to
+        rows and appends them to the same files market_data_standard_output,
+        resources_standard_output and market_chain_standard_output write. At
+        most max_queued_steps steps are held waiting to be written, beyond
+        which writes block until the thread catches up. Files are flushed to
+        disk every flush_interval_seconds and on close, so a crashed run keeps
+        everything up to its last flush and the load_*_df functions can read
+        the output of a run which is still going. With Parquet output each
+        flush writes a new part file to each table, and on close runs of small
+        parts are merged into parts of up to PARQUET_ROWS_PER_PART rows.
+
+        Args:
+            run_name:
+                str, default DEFAULT_RUN_NAME, Name of the run's output directory
+            output_path:
+                str, default DEFAULT_PATH, Directory holding run outputs
+            custom_output_fns:
+                Optional[Dict[str, Callable]], Row functions for market history
+                keyed by file name. Defaults to the standard market data files.
+            max_queued_steps:
+                int, default 100, Maximum steps of data waiting to be written
+            flush_interval_seconds:
+                float, default 5, Seconds between flushes to disk
+            output_format:
+                str, default "csv", One of OUTPUT_FORMATS. Parquet requires
+                the pyarrow package.
+        """
+        run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
+        self.full_path = os.path.join(output_path, run_name)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.output_format = output_format
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unknown output format {output_format}, expected one of"
+                f" {OUTPUT_FORMATS}"
+            )
+        if output_format == "parquet":
+            _pyarrow()
+        self._history_fns = (
+            custom_output_fns
+            if custom_output_fns is not None
+            else {
+                DATA_FILE_NAME: history_data_to_row,
+                ORDER_BOOK_FILE_NAME: history_data_to_order_book_rows,
+                TRADES_FILE_NAME: history_data_to_trade_rows,
+                ACCOUNTS_FILE_NAME: history_data_to_account_rows,
+                POSITIONS_FILE_NAME: history_data_to_position_rows,
+            }
+        )
+        self._resource_fns = {RESOURCES_FILE_NAME: resource_data_to_row}
+        self._process_resource_fns = {
+            PROCESS_RESOURCES_FILE_NAME: process_resource_data_to_rows
+        }
+
+        self._writers: Dict[str, Union[_CsvTableWriter, _ParquetTableWriter]] = {}
+        self._market_chains: Dict[str, List[str]] = {}
+        self._market_chains_changed = False
+        self._error: Optional[Exception] = None
+        self._closed = False
+
+        os.makedirs(self.full_path, exist_ok=True)
+        # Writers are only opened once a table has a row, so earlier output
+        # of tables this run may never write is removed up front
+        for file_name in [
+            *self._history_fns,
+            *self._resource_fns,
+            *self._process_resource_fns,
+        ]:
+            path = os.path.join(self.full_path, file_name)
+            _remove_output(path)
+            _remove_output(_parquet_path(path))
+        self._queue = Queue(maxsize=max_queued_steps)
+        self._thread = threading.Thread(
+            target=self._run, name="history-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write_history(self, data: MarketHistoryData) -> None:
+        self._put((self._history_fns, data))
+
+    def write_resources(self, data: ResourceData) -> None:
+        self._put((self._resource_fns, data))
+
+    def write_process_resources(self, data: List[ProcessResourceData]) -> None:
+        self._put((self._process_resource_fns, data))
+
+    def _put(self, item) -> None:
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise ValueError("Cannot write to a closed StreamingHistoryWriter")
+        self._queue.put(item)
+
+    def close(self) -> None:
+        """Writes any queued data, flushes and closes the files."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "StreamingHistoryWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval_seconds)
+            except Empty:
+                item = None
+            if item is _STOP:
+                break
+            # After a failure keep draining the queue so writers never block,
+            # the error is raised on their next write instead
+            if item is not None and self._error is None:
+                try:
+                    self._write(*item)
+                except Exception as e:
+                    logger.exception("Failed to write run history")
+                    self._error = e
+            if time.monotonic() - last_flush >= self.flush_interval_seconds:
+                self._flush()
+                last_flush = time.monotonic()
+        self._flush()
+        for writer in self._writers.values():
+            try:
+                writer.close()
+            except Exception as e:
+                logger.exception("Failed to close run history")
+                if self._error is None:
+                    self._error = e
+
+    def _write(self, data_fns: Dict[str, Callable], data) -> None:
+        for file_name, data_fn in data_fns.items():
+            for row_data in data_fn(data=data):
+                if not row_data:
+                    continue
+                if file_name not in self._writers:
+                    self._writers[file_name] = _table_writer(
+                        os.path.join(self.full_path, file_name), self.output_format
+                    )
+                self._writers[file_name].write(row_data)
+        if isinstance(data, MarketHistoryData):
+            num_markets = sum(len(chain) for chain in self._market_chains.values())
+            _update_market_chains(self._market_chains, data)
+            self._market_chains_changed |= num_markets != sum(
+                len(chain) for chain in self._market_chains.values()
+            )
+
+    def _flush(self) -> None:
+        try:
+            for writer in self._writers.values():
+                writer.flush()
+            if self._market_chains_changed:
+                path = os.path.join(self.full_path, MARKET_CHAIN_FILE_NAME)
+                with open(path + ".tmp", "w") as f:
+                    json.dump(self._market_chains, f, indent=4)
+                os.replace(path + ".tmp", path)
+                self._market_chains_changed = False
+        except Exception as e:
+            logger.exception("Failed to flush run history")
+            if self._error is None:
+                self._error = e
+
+
+def _read_csv(path: str, **kwargs) -> pd.DataFrame:
+    # Files still being written by a streaming run may be empty or end part
+    # way through a row, in which case only the complete rows are read
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return pd.DataFrame()
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return pd.read_csv(path, **kwargs)
+        f.seek(0)
+        content = f.read()
+    complete = content[: content.rfind(b"\n") + 1]
+    return pd.read_csv(io.BytesIO(complete), **kwargs) if complete else pd.DataFrame()
+
+
+def _read_parquet(
+    path: str,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    market_ids: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    pa = _pyarrow()
+    dataset = pa.dataset.dataset(path, format="parquet")
+    if not dataset.files:
+        return pd.DataFrame()
+
+    schema = dataset.schema
+    conditions = []
+    if "time" in schema.names:
+        time_type = schema.field("time").type
+        if start is not None:
+            conditions.append(
+                pa.dataset.field("time")
+                >= pa.scalar(pd.Timestamp(start).to_pydatetime(), type=time_type)
+            )
+        if end is not None:
+            conditions.append(
+                pa.dataset.field("time")
+                <= pa.scalar(pd.Timestamp(end).to_pydatetime(), type=time_type)
+            )
+    if market_ids is not None and "market_id" in schema.names:
+        conditions.append(pa.dataset.field("market_id").isin(list(market_ids)))
+
+    table = dataset.to_table(
+        columns=(
+            None if columns is None else [c for c in schema.names if c in columns]
+        ),
+        filter=(
+            None if not conditions else functools.reduce(lambda a, b: a & b, conditions)
+        ),
+    )
+    df = table.to_pandas()
+    # Empty strings, such as a general account's market, load as missing from
+    # CSV so they do here too
+    for name in df.columns:
+        if pa.types.is_string(table.schema.field(name).type):
+            df[name] = df[name].mask(df[name] == "")
+    # Rows are stored by market, they are returned in time order as CSVs are
+    if "time" in df.columns:
+        df = df.sort_values("time", kind="stable", ignore_index=True)
+    return df
+
+
+def _read_table(
+    path: str,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    market_ids: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Reads an output table, from its Parquet directory if it has one or
+    else its CSV, with the time column parsed.
+
+    Parquet reads only the requested columns and skips any row groups outside
+    of the requested times and markets. CSV reads parse the whole file and
+    then filter it.
+
+    Args:
+        path:
+            str, Path of the table's CSV file
+        columns:
+            Optional[List[str]], Columns to read, as well as time. Defaults
+            to all columns.
+        start:
+            Optional[TimeLike], Read rows at or after this time
+        end:
+            Optional[TimeLike], Read rows at or before this time
+        market_ids:
+            Optional[List[str]], Read rows for only these markets
+    """
+    if columns is not None:
+        columns = ["time"] + [c for c in columns if c != "time"]
+    parquet_path = _parquet_path(path)
+    if os.path.isdir(parquet_path):
+        df = _read_parquet(
+            parquet_path,
+            columns=columns,
+            start=start,
+            end=end,
+            market_ids=market_ids,
+        )
+    else:
+        df = _read_csv(
+            path, usecols=None if columns is None else lambda c: c in columns
+        )
+    if df.empty:
+        return df
+
+    if "time" in df.columns:
+        df["time"] = pd.to_datetime(df.time)
+    keep = pd.Series(True, index=df.index)
+    if start is not None and "time" in df.columns:
+        keep &= df["time"] >= pd.Timestamp(start)
+    if end is not None and "time" in df.columns:
+        keep &= df["time"] <= pd.Timestamp(end)
+    if market_ids is not None and "market_id" in df.columns:
+        keep &= df["market_id"].isin(market_ids)
+    return df if keep.all() else df[keep].reset_index(drop=True)
+
+
+def _with_columns(
+    columns: Optional[List[str]], required: List[str]
+) -> Optional[List[str]]:
+    return None if columns is None else list(dict.fromkeys(required + columns))
+
+
+def _select(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+) -> pd.DataFrame:
+    if start is not None and not df.empty:
+        df = df[df["time"] >= pd.Timestamp(start)].reset_index(drop=True)
+    if columns is not None:
+        df = df[["time"] + [c for c in columns if c in df.columns and c != "time"]]
+    return df
+
+
+def _parse_bounds(bounds) -> List[Tuple[float, float]]:
+    # CSV holds the bounds as the string of a list of tuples and Parquet as a
+    # list of structs
+    if isinstance(bounds, str):
+        return ast.literal_eval(bounds)
+    return [(bound["min_valid_price"], bound["max_valid_price"]) for bound in bounds]
+
+
+def _load_step_keyframes(
+    output_path: str, run_name: str, end: Optional[TimeLike] = None
+) -> Optional[pd.Series]:
+    path = os.path.join(output_path, run_name, DATA_FILE_NAME)
+    if not os.path.exists(path) and not os.path.isdir(_parquet_path(path)):
+        return None
+    df = _read_table(path, columns=["keyframe"], end=end)
+    if df.empty or "keyframe" not in df.columns:
+        return None
+    return df.groupby("time")["keyframe"].all()
+
+
+def _state_read_start(
+    output_path: str, run_name: str, start: Optional[TimeLike]
+) -> Optional[pd.Timestamp]:
+    """The time from which to read output captured with a Snitch's
+    capture_deltas to rebuild the state from start, which is the last keyframe
+    at or before start."""
+    if start is None:
+        return None
+    step_keyframes = _load_step_keyframes(output_path, run_name, end=start)
+    if step_keyframes is None or not step_keyframes.any():
+        return None
+    return step_keyframes[step_keyframes].index.max()
+
+
+def _changes_step_keyframes(
+    df: pd.DataFrame,
+    output_path: str,
+    run_name: str,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+) -> Optional[pd.Series]:
+    """Whether each step from start to end is a keyframe, for output captured
+    with a Snitch's capture_deltas, or None when every step is a keyframe and
+    there are no changes to rebuild from.
+
+    Args:
+        df:
+            pd.DataFrame, Loaded output with a parsed time column
+        output_path:
+            str, Directory holding run outputs
+        run_name:
+            str, Name of the run
+        start:
+            Optional[TimeLike], Time of the keyframe the output was read from
+        end:
+            Optional[TimeLike], Time the output was read up to
+    """
+    if df.empty or "keyframe" not in df.columns:
+        return None
+    # Every step's time and type comes from the market data, which has rows at
+    # every step even when nothing else changed
+    step_keyframes = _load_step_keyframes(output_path, run_name, end=end)
+    if step_keyframes is None:
+        step_keyframes = df.groupby("time")["keyframe"].all()
+    if start is not None:
+        step_keyframes = step_keyframes[step_keyframes.index >= pd.Timestamp(start)]
+    if step_keyframes.all() and df["keyframe"].all():
+        return None
+    return step_keyframes
+
+
+def _rebuild_from_changes(
+    df: pd.DataFrame,
+    key_columns: List[str],
+    step_keyframes: Optional[pd.Series],
+    is_removed: Optional[Callable[[dict], bool]] = None,
+) -> pd.DataFrame:
+    """Rebuilds the full state at every step from output captured with a
+    Snitch's capture_deltas, where only keyframe steps hold the full state and
+    the steps in between hold what changed. Output without changes is
+    returned as it is.
+
+    Args:
+        df:
+            pd.DataFrame, Loaded output with a parsed time column
+        key_columns:
+            List[str], Columns identifying a single item of state
+        step_keyframes:
+            Optional[pd.Series], Whether each step is a keyframe, as given by
+            _changes_step_keyframes
+        is_removed:
+            Optional[Callable[[dict], bool]], Whether a row marks its item as
+            no longer present
+    """
+    if step_keyframes is None:
+        return df.drop(columns="keyframe", errors="ignore")
+
+    steps = {time: rows for time, rows in df.groupby("time")}
+
+    rows = []
+    state = {}
+    for time, keyframe in step_keyframes.sort_index().items():
+        if keyframe:
+            state = {}
+        if time in steps:
+            for record in steps[time].to_dict("records"):
+                # Empty fields, such as a general account's market, load as NaN
+                # which never compares equal
+                key = tuple(
+                    None if pd.isna(record[c]) else record[c] for c in key_columns
+                )
+                state[key] = record
+            if is_removed is not None:
+                state = {k: r for k, r in state.items() if not is_removed(r)}
+        rows.extend({**record, "time": time} for record in state.values())
+    return pd.DataFrame(rows, columns=df.columns).drop(columns="keyframe")
+
+
 def load_agents_df(
     run_name: Optional[str] = None,
     output_path: str = DEFAULT_PATH,
@@ -324,37 +1134,121 @@ def load_assets_df(
 def load_market_data_df(
     run_name: Optional[str] = None,
     output_path: str = DEFAULT_PATH,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    market_ids: Optional[List[str]] = None,
 ) -> pd.DataFrame:
+    """Loads the market data of a run, indexed by time. The other market
+    history loaders take the same arguments.
+
+    Args:
+        run_name:
+            Optional[str], Name of the run, defaults to DEFAULT_RUN_NAME
+        output_path:
+            str, default DEFAULT_PATH, Directory holding run outputs
+        columns:
+            Optional[List[str]], Columns to load, defaults to all of them
+        start:
+            Optional[TimeLike], Load from this time, inclusive
+        end:
+            Optional[TimeLike], Load up to this time, inclusive
+        market_ids:
+            Optional[List[str]], Load only these markets, defaults to all
+    """
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
-    df = pd.read_csv(os.path.join(output_path, run_name, DATA_FILE_NAME))
+    df = _read_table(
+        os.path.join(output_path, run_name, DATA_FILE_NAME),
+        columns=columns,
+        start=start,
+        end=end,
+        market_ids=market_ids,
+    )
     if not df.empty:
-        df["time"] = pd.to_datetime(df.time)
+        if "price_monitoring_bounds" in df.columns:
+            df["price_monitoring_bounds"] = df["price_monitoring_bounds"].map(
+                _parse_bounds
+            )
         df = df.set_index("time")
-    return df
+    return df.drop(columns="keyframe", errors="ignore")
 
 
 def load_order_book_df(
     run_name: Optional[str] = None,
     output_path: str = DEFAULT_PATH,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    market_ids: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
-    depth_df = pd.read_csv(os.path.join(output_path, run_name, ORDER_BOOK_FILE_NAME))
+    read_start = _state_read_start(output_path, run_name, start)
+    depth_df = _read_table(
+        os.path.join(output_path, run_name, ORDER_BOOK_FILE_NAME),
+        columns=_with_columns(
+            columns, ["keyframe", "market_id", "side", "price", "volume", "level"]
+        ),
+        start=read_start,
+        end=end,
+        market_ids=market_ids,
+    )
     if not depth_df.empty:
-        depth_df["time"] = pd.to_datetime(depth_df.time)
-        depth_df = depth_df[depth_df["time"] != depth_df["time"].min()].set_index(
-            "time"
+        step_keyframes = _changes_step_keyframes(
+            depth_df, output_path, run_name, start=read_start, end=end
         )
+        if step_keyframes is not None:
+            depth_df = _rebuild_from_changes(
+                depth_df,
+                key_columns=["market_id", "side", "price"],
+                step_keyframes=step_keyframes,
+                is_removed=lambda row: row["volume"] == 0,
+            )
+            # Levels are ranked from the best price at each step
+            depth_df = (
+                depth_df.assign(
+                    rank_price=depth_df["price"].where(
+                        depth_df["side"] != "BID", -depth_df["price"]
+                    )
+                )
+                .sort_values(["time", "market_id", "side", "rank_price"])
+                .drop(columns="rank_price")
+                .reset_index(drop=True)
+            )
+            depth_df["level"] = depth_df.groupby(
+                ["time", "market_id", "side"]
+            ).cumcount()
+        depth_df = depth_df.drop(columns="keyframe", errors="ignore")
+        # The book at the first step of the run is dropped
+        if start is None:
+            first_time = depth_df["time"].min()
+        else:
+            step_keyframes = _load_step_keyframes(output_path, run_name, end=start)
+            first_time = (
+                step_keyframes.index.min() if step_keyframes is not None else None
+            )
+        depth_df = _select(
+            depth_df[depth_df["time"] != first_time], columns=columns, start=start
+        ).set_index("time")
     return depth_df
 
 
 def load_trades_df(
     run_name: Optional[str] = None,
     output_path: str = DEFAULT_PATH,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    market_ids: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
-    df = pd.read_csv(os.path.join(output_path, run_name, TRADES_FILE_NAME))
+    df = _read_table(
+        os.path.join(output_path, run_name, TRADES_FILE_NAME),
+        columns=columns,
+        start=start,
+        end=end,
+        market_ids=market_ids,
+    )
     if not df.empty:
-        df["time"] = pd.to_datetime(df.time)
         df = df.set_index("time")
     return df
 
@@ -362,12 +1256,30 @@ def load_trades_df(
 def load_accounts_df(
     run_name: Optional[str] = None,
     output_path: str = DEFAULT_PATH,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    market_ids: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
-    df = pd.read_csv(os.path.join(output_path, run_name, ACCOUNTS_FILE_NAME))
+    key_columns = ["party_id", "type", "market_id", "asset"]
+    read_start = _state_read_start(output_path, run_name, start)
+    df = _read_table(
+        os.path.join(output_path, run_name, ACCOUNTS_FILE_NAME),
+        columns=_with_columns(columns, ["keyframe"] + key_columns),
+        start=read_start,
+        end=end,
+        market_ids=market_ids,
+    )
     if not df.empty:
-        df["time"] = pd.to_datetime(df.time)
-        df = df.set_index("time")
+        df = _rebuild_from_changes(
+            df,
+            key_columns=key_columns,
+            step_keyframes=_changes_step_keyframes(
+                df, output_path, run_name, start=read_start, end=end
+            ),
+        )
+        df = _select(df, columns=columns, start=start).set_index("time")
     return df
 
 
@@ -376,9 +1288,8 @@ def load_fuzzing_df(
     output_path: str = DEFAULT_PATH,
 ) -> pd.DataFrame:
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
-    df = pd.read_csv(os.path.join(output_path, run_name, FUZZING_FILE_NAME))
+    df = _read_table(os.path.join(output_path, run_name, FUZZING_FILE_NAME))
     if not df.empty:
-        df["time"] = pd.to_datetime(df.time)
         df = df.set_index("time")
     return df
 
@@ -386,15 +1297,66 @@ def load_fuzzing_df(
 def load_resource_df(
     run_name: Optional[str] = None,
     output_path: str = DEFAULT_PATH,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
 ) -> pd.DataFrame:
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
-    df = pd.read_csv(os.path.join(output_path, run_name, RESOURCES_FILE_NAME))
+    df = _read_table(
+        os.path.join(output_path, run_name, RESOURCES_FILE_NAME),
+        columns=columns,
+        start=start,
+        end=end,
+    )
     if not df.empty:
-        df["time"] = pd.to_datetime(df.time)
         df = df.set_index("time")
     return df
 
 
+def load_process_resource_df(
+    run_name: Optional[str] = None,
+    output_path: str = DEFAULT_PATH,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+) -> pd.DataFrame:
+    run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
+    df = _read_table(
+        os.path.join(output_path, run_name, PROCESS_RESOURCES_FILE_NAME),
+        columns=columns,
+        start=start,
+        end=end,
+    )
+    if not df.empty:
+        if "sampled_at" in df.columns:
+            df["sampled_at"] = pd.to_datetime(df.sampled_at)
+        df = df.set_index("time")
+    return df
+
+
+def process_resources_per_step(process_df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates the resource samples taken during each step, indexed by the
+    step's time with a row per process."""
+    per_step = (
+        process_df.reset_index()
+        .groupby(["time", "process"])
+        .agg(
+            cpu_per=("cpu_per", "mean"),
+            mem_rss=("mem_rss", "max"),
+            mem_uss=("mem_uss", "max"),
+            read_bytes=("read_bytes", "max"),
+            write_bytes=("write_bytes", "max"),
+            num_fds=("num_fds", "max"),
+            num_threads=("num_threads", "max"),
+        )
+        .reset_index(level="process")
+    )
+    # IO counters are cumulative, so a step's IO is the change since the last
+    io = per_step.groupby("process")[["read_bytes", "write_bytes"]].diff()
+    per_step["io_bytes"] = io["read_bytes"].fillna(0) + io["write_bytes"].fillna(0)
+    return per_step
+
+
 def load_market_chain(
     run_name: Optional[str] = None,
     output_path: str = DEFAULT_PATH,
@@ -414,18 +1376,138 @@ def load_ledger_entries_df(
     output_path: str = DEFAULT_PATH,
 ) -> pd.DataFrame:
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
-    df = pd.read_csv(os.path.join(output_path, run_name, LEDGER_ENTRIES_FILE_NAME))
-    if not df.empty:
-        df["time"] = pd.to_datetime(df.time)
+    df = _read_table(os.path.join(output_path, run_name, LEDGER_ENTRIES_FILE_NAME))
     return df.drop_duplicates()
 
 
 def load_positions_df(
     run_name: Optional[str] = None,
     output_path: str = DEFAULT_PATH,
+    columns: Optional[List[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    market_ids: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
-    df = pd.read_csv(os.path.join(output_path, run_name, POSITIONS_FILE_NAME))
+    key_columns = ["market_id", "party_id"]
+    read_start = _state_read_start(output_path, run_name, start)
+    df = _read_table(
+        os.path.join(output_path, run_name, POSITIONS_FILE_NAME),
+        columns=_with_columns(columns, ["keyframe"] + key_columns),
+        start=read_start,
+        end=end,
+        market_ids=market_ids,
+    )
     if not df.empty:
-        df["time"] = pd.to_datetime(df.time)
+        df = _rebuild_from_changes(
+            df,
+            key_columns=key_columns,
+            step_keyframes=_changes_step_keyframes(
+                df, output_path, run_name, start=read_start, end=end
+            ),
+        )
+        df = _select(df, columns=columns, start=start)
     return df.drop_duplicates()
+
+
+def convert_run_to_parquet(
+    run_name: Optional[str] = None,
+    output_path: str = DEFAULT_PATH,
+    remove_csv: bool = False,
+    rows_per_part: int = PARQUET_ROWS_PER_PART,
+) -> List[str]:
+    """Converts the history tables of a finished run from CSV to Parquet.
+
+    Each table is read in chunks of rows_per_part rows, so runs far larger than
+    memory can be converted, and written with the same types, compression and
+    row groups as Parquet run output. The loaders read the Parquet tables in
+    preference to the CSVs from then on. The agents and assets tables are small
+    and left as CSV.
+
+    Args:
+        run_name:
+            Optional[str], Name of the run, defaults to DEFAULT_RUN_NAME
+        output_path:
+            str, default DEFAULT_PATH, Directory holding run outputs
+        remove_csv:
+            bool, default False, Delete each CSV once it has been converted
+        rows_per_part:
+            int, default PARQUET_ROWS_PER_PART, Rows per Parquet part file
+
+    Returns:
+        List[str], File names of the converted tables
+    """
+    pa = _pyarrow()
+    run_name = run_name if run_name is not None else DEFAULT_RUN_NAME
+    full_path = os.path.join(output_path, run_name)
+    schemas = _parquet_schemas()
+
+    converted = []
+    for file_name in sorted(os.listdir(full_path)):
+        if not file_name.endswith(".csv") or file_name in [
+            AGENTS_FILE_NAME,
+            ASSETS_FILE_NAME,
+        ]:
+            continue
+        path = os.path.join(full_path, file_name)
+        schema = schemas.get(file_name)
+        string_columns = (
+            {}
+            if schema is None
+            else {f.name: str for f in schema if pa.types.is_string(f.type)}
+        )
+        # Kept aside and moved into place once complete, as writing the
+        # table replaces any existing output of the same name
+        tmp_path = os.path.join(full_path, "." + file_name)
+        os.replace(path, tmp_path)
+        try:
+            writer = _ParquetTableWriter(path, rows_per_part=rows_per_part)
+            if os.path.getsize(tmp_path) > 0:
+                for chunk in pd.read_csv(
+                    tmp_path, chunksize=rows_per_part, dtype=string_columns
+                ):
+                    writer.write_table(_csv_chunk_to_table(chunk, writer.schema))
+        except Exception:
+            _remove_output(_parquet_path(path))
+            os.replace(tmp_path, path)
+            raise
+        if remove_csv:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+        converted.append(file_name)
+    return converted
+
+
+def _csv_chunk_to_table(
+    chunk: pd.DataFrame, schema: Optional["pyarrow.Schema"]
+) -> "pyarrow.Table":
+    pa = _pyarrow()
+    if schema is None:
+        if "time" in chunk.columns:
+            chunk["time"] = pd.to_datetime(chunk["time"])
+        return pa.Table.from_pandas(chunk, preserve_index=False)
+
+    for field in schema:
+        if field.name not in chunk.columns:
+            continue
+        if pa.types.is_timestamp(field.type):
+            chunk[field.name] = pd.to_datetime(chunk[field.name])
+        elif field.name == "price_monitoring_bounds":
+            chunk[field.name] = chunk[field.name].map(
+                lambda bounds: [
+                    {"min_valid_price": low, "max_valid_price": high}
+                    for low, high in ast.literal_eval(bounds)
+                ]
+            )
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    # Columns missing from older runs are left out and unknown ones kept as
+    # they were inferred
+    return table.cast(
+        pa.schema(
+            [
+                schema.field(name) if name in schema.names else table.field(name)
+                for name in table.column_names
+            ]
+        )
+    )
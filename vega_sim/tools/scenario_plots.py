@@ -1,5 +1,4 @@
 import os
-import ast
 
 import itertools
 import argparse
@@ -95,6 +94,8 @@ from vega_sim.tools.scenario_output import (
     load_agents_df,
     load_market_chain,
     load_resource_df,
+    load_process_resource_df,
+    process_resources_per_step,
     load_assets_df,
     load_ledger_entries_df,
     load_positions_df,
@@ -711,9 +712,7 @@ def plot_price_monitoring(
             all_bounds = list(
                 itertools.chain(
                     *[
-                        ast.literal_eval(
-                            bounds[0] if isinstance(bounds, np.ndarray) else bounds
-                        )
+                        bounds[0] if isinstance(bounds, np.ndarray) else bounds
                         for bounds in market_data_df.loc[index][
                             ["price_monitoring_bounds"]
                         ].values
@@ -833,6 +832,11 @@ def resource_monitoring_plot(run_name: Optional[str] = None):
     resource_df = load_resource_df(
         run_name=run_name,
     )
+    # Only present for runs sampled by a Snitch's resource_sample_hz
+    try:
+        process_df = load_process_resource_df(run_name=run_name)
+    except FileNotFoundError:
+        process_df = pd.DataFrame()
 
     fig = plt.figure(figsize=[11.69, 8.27])
     fig.suptitle(
@@ -845,7 +849,7 @@ def resource_monitoring_plot(run_name: Optional[str] = None):
     plt.rcParams.update({"font.size": 8})
     plt.rcParams.update({"axes.formatter.useoffset": False})
 
-    gs = GridSpec(nrows=3, ncols=2, hspace=0.5, wspace=0.3)
+    gs = GridSpec(nrows=3 if process_df.empty else 5, ncols=2, hspace=0.5, wspace=0.3)
 
     ax0 = fig.add_subplot(
         gs[0, :],
@@ -889,6 +893,46 @@ def resource_monitoring_plot(run_name: Optional[str] = None):
     ax4.set_xlabel("'vega' datetime")
     ax4.set_ylabel("VMS [GB]")
 
+    if process_df.empty:
+        return fig
+
+    per_step = process_resources_per_step(process_df)
+    per_process = list(per_step.groupby("process"))
+
+    ax5 = fig.add_subplot(gs[3, 0], sharex=ax0)
+    ax5.set_title("CPU Utilization (sampled, mean per step)")
+    for process, df in per_process:
+        ax5.plot(df.index, df.cpu_per, label=process)
+    ax5.legend()
+    ax5.set_xlabel("'vega' datetime")
+    ax5.set_ylabel("CPU [%]")
+
+    ax6 = fig.add_subplot(gs[3, 1], sharex=ax0)
+    ax6.set_title("Memory - USS (sampled, max per step)")
+    for process, df in per_process:
+        # USS is unavailable for some processes, which fall back to RSS
+        ax6.plot(df.index, df.mem_uss.fillna(df.mem_rss) / 1e9, label=process)
+    ax6.legend()
+    ax6.set_xlabel("'vega' datetime")
+    ax6.set_ylabel("USS [GB]")
+
+    ax7 = fig.add_subplot(gs[4, 0], sharex=ax0)
+    ax7.set_title("IO (sampled, read and written per step)")
+    for process, df in per_process:
+        ax7.plot(df.index, df.io_bytes / 1e6, label=process)
+    ax7.legend()
+    ax7.set_xlabel("'vega' datetime")
+    ax7.set_ylabel("IO [MB]")
+
+    ax8 = fig.add_subplot(gs[4, 1], sharex=ax0)
+    ax8.set_title("Open Files (solid) and Threads (dashed)")
+    for i, (process, df) in enumerate(per_process):
+        ax8.plot(df.index, df.num_fds, f"C{i}-", label=process)
+        ax8.plot(df.index, df.num_threads, f"C{i}--")
+    ax8.legend()
+    ax8.set_xlabel("'vega' datetime")
+    ax8.set_ylabel("Count")
+
     return fig
 
 
@@ -1273,7 +1317,7 @@ def price_series_plot(
 
     valid_prices = defaultdict(lambda: [])
     for index in market_data.index:
-        all_bounds = ast.literal_eval(market_data.loc[index]["price_monitoring_bounds"])
+        all_bounds = market_data.loc[index]["price_monitoring_bounds"]
         valid_prices["datetime"].append(index)
         valid_prices["min_valid_price"].append(np.nan)
         valid_prices["max_valid_price"].append(np.nan)
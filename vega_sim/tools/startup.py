@@ -0,0 +1,259 @@
+"""Helpers for launching the nullchain component processes.
+
+Startup is described as a set of named stages, each with a list of stages it
+depends on. Stages whose dependencies have completed are run concurrently on a
+thread pool and the wall-clock time of each stage is recorded so that slow
+startups can be spotted and compared between runs.
+"""
+
+import errno
+import logging
+import os
+import shutil
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ioctl request number for FICLONE (copy-on-write clone of a whole file) on Linux
+FICLONE = 0x40049409
+
+
+class StartupStageError(Exception):
+    def __init__(self, message: str, stage: Optional[str] = None):
+        super().__init__(message)
+        self.stage = stage
+
+
+class PortNotReadyError(Exception):
+    pass
+
+
+@dataclass
+class StartupStage:
+    name: str
+    func: Callable[[], None]
+    depends_on: List[str] = field(default_factory=list)
+
+
+@dataclass
+class StageTiming:
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def run_startup_stages(
+    stages: Iterable[StartupStage],
+    max_workers: Optional[int] = None,
+) -> Dict[str, StageTiming]:
+    """Runs a dependency graph of startup stages, running stages concurrently
+    whenever all of their dependencies have completed.
+
+    Args:
+        stages:
+            Iterable[StartupStage], The stages to run. Every name listed in a
+            stage's depends_on must be the name of another stage.
+        max_workers:
+            Optional[int], Maximum number of stages to run at once. Defaults to
+            the number of stages.
+
+    Returns:
+        Dict[str, StageTiming], Start and end times (from time.perf_counter) of
+            each stage, keyed by stage name.
+    """
+    stages = {stage.name: stage for stage in stages}
+    for stage in stages.values():
+        missing = [dep for dep in stage.depends_on if dep not in stages]
+        if missing:
+            raise StartupStageError(
+                f"Stage {stage.name} depends on unknown stage(s) {missing}"
+            )
+
+    timings: Dict[str, StageTiming] = {}
+    pending = dict(stages)
+    running: Dict[Future, str] = {}
+
+    def _timed(stage: StartupStage) -> StageTiming:
+        start = time.perf_counter()
+        stage.func()
+        return StageTiming(start=start, end=time.perf_counter())
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers or max(len(stages), 1),
+        thread_name_prefix="vega-startup",
+    ) as executor:
+        while pending or running:
+            ready = [
+                stage
+                for stage in pending.values()
+                if all(dep in timings for dep in stage.depends_on)
+            ]
+            for stage in ready:
+                del pending[stage.name]
+                running[executor.submit(_timed, stage)] = stage.name
+
+            if not running:
+                raise StartupStageError(
+                    "Startup stages have circular dependencies:"
+                    f" {sorted(pending.keys())}"
+                )
+
+            done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    timings[name] = future.result()
+                except Exception as e:
+                    for other in running:
+                        other.cancel()
+                    raise StartupStageError(
+                        f"Startup stage {name} failed: {e}", stage=name
+                    ) from e
+                logger.debug(
+                    f"Startup stage {name} finished in {timings[name].duration:.3f}s"
+                )
+    return timings
+
+
+def format_stage_timings(timings: Dict[str, StageTiming]) -> str:
+    if not timings:
+        return ""
+    origin = min(t.start for t in timings.values())
+    return ", ".join(
+        f"{name}: {t.duration:.2f}s (+{t.start - origin:.2f}s)"
+        for name, t in sorted(timings.items(), key=lambda kv: kv[1].start)
+    )
+
+
+def wait_for_port(
+    port: int,
+    host: str = "localhost",
+    timeout: float = 60,
+    initial_delay: float = 0.005,
+    max_delay: float = 0.5,
+    backoff: float = 1.5,
+) -> None:
+    """Blocks until a TCP connection to the given port can be established, backing
+    off exponentially between attempts.
+
+    Args:
+        port:
+            int, The port to connect to
+        host:
+            str, default "localhost", The host to connect to
+        timeout:
+            float, default 60, Seconds to wait before raising a PortNotReadyError
+        initial_delay:
+            float, default 0.005, Seconds to wait after the first failed attempt
+        max_delay:
+            float, default 0.5, Cap on the delay between attempts
+        backoff:
+            float, default 1.5, Factor by which the delay grows on each attempt
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=max_delay):
+                return
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise PortNotReadyError(
+                    f"Nothing accepted connections on {host}:{port} after {timeout}s"
+                )
+        time.sleep(delay)
+        delay = min(delay * backoff, max_delay)
+
+
+def wait_for_ready(
+    check: Callable[[], None],
+    timeout: float = 60,
+    initial_delay: float = 0.005,
+    max_delay: float = 0.5,
+    backoff: float = 1.5,
+    exceptions: Tuple[type, ...] = (Exception,),
+) -> None:
+    """Calls check until it stops raising, backing off exponentially between
+    attempts. Raises the final exception from check if the timeout is reached.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        try:
+            check()
+            return
+        except exceptions:
+            if time.monotonic() >= deadline:
+                raise
+        time.sleep(delay)
+        delay = min(delay * backoff, max_delay)
+
+
+def _clone_file(src: str, dst: str) -> None:
+    # Try a copy-on-write clone (btrfs, xfs, ...) before falling back to a copy.
+    # Either way the destination is an independent file that is safe to modify.
+    try:
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copymode(src, dst)
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copy(src, dst)
+
+
+def clone_home_dir(
+    src: str,
+    dst: str,
+    linkable: Callable[[str], bool] = lambda _: False,
+) -> None:
+    """Creates a private copy of a vega home template directory.
+
+    Files for which linkable returns True (called with the path relative to src)
+    are hard linked to the template, so must never be written to in place. All
+    other files are reflinked where the filesystem supports it and copied
+    otherwise. Hard links fall back to a copy across filesystems.
+
+    Copied files and directories get a modification time of now, as the
+    template's may be arbitrarily old.
+    """
+
+    def _copy(file_src: str, file_dst: str) -> None:
+        if linkable(os.path.relpath(file_src, src)):
+            try:
+                os.link(file_src, file_dst)
+                return
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                    raise
+        _clone_file(file_src, file_dst)
+
+    shutil.copytree(src, dst, copy_function=_copy)
+    for dirpath, _, _ in os.walk(dst):
+        os.utime(dirpath, None)
+
+
+def replace_file_contents(file_path: str, write: Callable) -> None:
+    """Atomically replaces a file by writing to a temporary sibling and renaming it
+    over the original. Unlike opening the file for writing this never modifies a
+    shared inode, so is safe on hard linked files.
+
+    Args:
+        file_path:
+            str, The file to replace
+        write:
+            Callable, Called with the open temporary file object to write to
+    """
+    tmp_path = f"{file_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        write(f)
+    os.replace(tmp_path, file_path)